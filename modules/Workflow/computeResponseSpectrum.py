@@ -1,11 +1,24 @@
 """Simple Python Script to integrate a strong motion record using
-the Newmark-Beta method
+the exact piecewise-linear (Nigam-Jennings) recurrence
 """  # noqa: INP001, D205, D400
 
+import os
+import sys
+from pathlib import Path
+
 import numpy as np
 from scipy.constants import g
 from scipy.integrate import cumtrapz
-from scipy.interpolate import interp1d
+
+sys.path.insert(
+    0,
+    str(
+        Path(os.path.dirname(os.path.abspath(__file__))).parents[0]  # noqa: PTH100, PTH120
+        / 'common'
+        / 'groundMotionIM'
+    ),
+)
+from IntensityMeasureComputer import sdof_responses
 
 
 def convert_accel_units(acceleration, from_, to_='cm/s/s'):  # noqa: C901
@@ -74,7 +87,12 @@ def get_velocity_displacement(
 
 
 class NewmarkBeta:
-    """Evaluates the response spectrum using the Newmark-Beta methodology"""  # noqa: D400
+    """Evaluates the response spectrum of a strong motion record
+
+    The class keeps its historical name, but the oscillator responses are
+    computed with the exact recurrence for piecewise-linear ground motions
+    that is shared with IntensityMeasureComputer.
+    """  # noqa: D400
 
     def __init__(
         self,
@@ -93,7 +111,8 @@ class NewmarkBeta:
         :param float damping:
             Fractional coefficient of damping
         :param float dt_disc:
-            Sampling rate of the acceleration
+            Maximum interval between the instants at which the response
+            is evaluated
         :param str units:
             Units of the acceleration time history {"g", "m/s", "cm/s/s"}
         """  # noqa: D205, D400, D401
@@ -163,7 +182,7 @@ class NewmarkBeta:
         return self.response_spectrum, time_series, accel, vel, disp  # noqa: DOC201, RUF100
 
     def _newmark_beta(self, omega, cval, kval):  # noqa: ARG002
-        """Newmark-beta integral
+        """Response histories of the oscillators
         :param numpy.ndarray omega:
             Angular period - (2 * pi) / T
         :param numpy.ndarray cval:
@@ -171,49 +190,30 @@ class NewmarkBeta:
         :param numpy.ndarray kval:
             ((2. * pi) / T) ** 2.
         :returns:
-            accel - Acceleration time series
+            accel - Relative acceleration response of a SDOF oscillator
             vel - Velocity response of a SDOF oscillator
             disp - Displacement response of a SDOF oscillator
             a_t - Acceleration response of a SDOF oscillator
         """  # noqa: D205, D400
-        # Parameters
-        dt = self.d_t
-        ground_acc = self.acceleration
-        num_steps = self.num_steps
-        dt_disc = self.dt_disc
-        # discritize
-        num_steps_disc = int(np.floor(num_steps * dt / dt_disc))
-        f = interp1d(
-            [dt * x for x in range(num_steps)],
-            ground_acc,
-            bounds_error=False,
-            fill_value=(ground_acc[0], ground_acc[-1]),
-        )
-        tmp_time = [dt_disc * x for x in range(num_steps_disc)]
-        ground_acc = f(tmp_time)
-        # Pre-allocate arrays
-        accel = np.zeros([num_steps_disc, self.num_per], dtype=float)
-        vel = np.zeros([num_steps_disc, self.num_per], dtype=float)
-        disp = np.zeros([num_steps_disc, self.num_per], dtype=float)
-        a_t = np.zeros([num_steps_disc, self.num_per], dtype=float)
-        # Initial line
-        accel[0, :] = (-ground_acc[0] - (cval * vel[0, :])) - (kval * disp[0, :])
-        for j in range(1, num_steps_disc):
-            delta_acc = ground_acc[j] - ground_acc[j - 1]
-            delta_d2u = (
-                -delta_acc
-                - dt_disc * cval * accel[j - 1, :]
-                - dt_disc * kval * (vel[j - 1, :] + 0.5 * dt_disc * accel[j - 1, :])
-            ) / (1.0 + 0.5 * dt_disc * cval + 0.25 * dt_disc**2 * kval)
-            delta_du = dt_disc * accel[j - 1, :] + 0.5 * dt_disc * delta_d2u
-            delta_u = (
-                dt_disc * vel[j - 1, :]
-                + 0.5 * dt_disc**2 * accel[j - 1, :]
-                + 0.25 * dt_disc**2 * delta_d2u
+        responses = list(
+            sdof_responses(
+                self.acceleration,
+                self.d_t,
+                self.periods,
+                self.damping,
+                max_time_step=self.dt_disc,
             )
-            accel[j, :] = delta_d2u + accel[j - 1, :]
-            vel[j, :] = delta_du + vel[j - 1, :]
-            disp[j, :] = delta_u + disp[j - 1, :]
-            a_t[j, :] = ground_acc[j] + accel[j, :]
+        )
+        disp = np.column_stack([x[1] for x in responses])
+        vel = np.column_stack([x[2] for x in responses])
+        a_t = np.column_stack([x[3] for x in responses])
+        # ground acceleration at the instants where the response is evaluated
+        duration = self.d_t * (self.num_steps - 1)
+        ground_acc = np.interp(
+            np.linspace(0.0, duration, a_t.shape[0]),
+            self.d_t * np.arange(self.num_steps),
+            self.acceleration,
+        )
+        accel = a_t - ground_acc[:, np.newaxis]
 
         return accel, vel, disp, a_t  # noqa: DOC201, RUF100
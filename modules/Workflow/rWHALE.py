@@ -276,18 +276,18 @@ def main(  # noqa: C901, D103
             requested_outputs = ['AIM', 'EDP', 'DM', 'DV']
         requested_outputs.append('every_realization')
 
+        # every process takes part in the aggregation
         if (
             asset_type == 'Buildings'  # noqa: PLR1714
             or asset_type == 'TransportationNetwork'
             or asset_type == 'WaterDistributionNetwork'
             or asset_type == 'PowerNetwork'
         ):
-            if procID == 0:
-                WF.aggregate_results(
-                    asst_data=asst_data, 
-                    asset_type=asset_type,
-                    out_types = requested_outputs
-                    )
+            WF.aggregate_results(
+                asst_data=asst_data, 
+                asset_type=asset_type,
+                out_types = requested_outputs
+                )
 
         elif asset_type == 'WaterNetworkPipelines':
             # Provide the headers and out types
@@ -295,13 +295,12 @@ def main(  # noqa: C901, D103
 
             out_types = ['DV']
 
-            if procID == 0:
-                WF.aggregate_results(
-                    asst_data=asst_data,
-                    asset_type=asset_type,
-                    out_types=out_types,
-                    headers=headers,
-                )
+            WF.aggregate_results(
+                asst_data=asst_data,
+                asset_type=asset_type,
+                out_types=out_types,
+                headers=headers,
+            )
 
         if doParallel == True:  # noqa: E712
             comm.Barrier()
@@ -333,96 +333,183 @@ def create_command(command_list, enforced_python=None):
     return command  # noqa: DOC201, RUF100
 
 
-def run_command(command, app_category=''):
-    """Short description
+# Python applications that have been loaded for in-process execution. Each
+# worker (e.g., MPI rank) keeps its own cache, so the source of an application
+# is only read and compiled once per worker regardless of how many assets it
+# processes. The libraries it imports (numpy, pandas, etc.) stay in
+# sys.modules after the first run.
+_in_process_apps = {}
 
-    Long description
+
+def _load_in_process_app(script_path):
+    """Compile a Python workflow application once and return its code.
 
     Parameters
     ----------
-    command_list: array of unicode strings
-        Explain...
+    script_path: string
+        Path to the Python script of the application.
 
-    """  # noqa: D400
-    # If it is a python script, we do not run it, but rather import the main
-    # function. This ensures that the script is run using the same python
-    # interpreter that this script uses and it is also faster because we do not
-    # need to run multiple python interpreters simultaneously.
-    Frank_trusts_this_approach = False  # noqa: N806
-    if command[:6] == 'python' and Frank_trusts_this_approach:
-        import importlib  # only import this when it's needed
-
-        command_list = command.split()[1:]
-        # py_args = command_list[1:]
-
-        # get the dir and file name
-        py_script_dir, py_script_file = os.path.split(command_list[0][1:-1])
-
-        # add the dir to the path
-        sys.path.insert(0, py_script_dir)
-
-        # import the file
-        py_script = importlib.__import__(
-            py_script_file[:-3],
-            globals(),
-            locals(),
-            [
-                'main',
-            ],
-            0,
-        )
+    """
+    script_path = os.path.abspath(script_path)  # noqa: PTH100
+
+    if script_path not in _in_process_apps:
+        with open(script_path, 'rb') as f:  # noqa: PTH123
+            source = f.read()
+
+        _in_process_apps[script_path] = compile(source, script_path, 'exec')
+
+    return _in_process_apps[script_path]  # noqa: DOC201, RUF100
+
+
+def _run_in_process(command_list):
+    """Run a Python workflow application in the current interpreter.
+
+    The application script is executed as `__main__` with `sys.argv` set to
+    the arguments it would receive on the command line, so it behaves as if
+    it was started in a new interpreter and does not need to expose any
+    particular entry point. Every run gets a fresh module namespace. The
+    working directory, `sys.argv`, and `sys.path` are restored after the run
+    and the text the application prints to stdout and stderr is captured, so
+    the result matches that of a subprocess run.
+
+    Parameters
+    ----------
+    command_list: list of strings
+        The command as it would be passed to subprocess; the first item is
+        the python executable and the second one is the application script.
+
+    Returns
+    -------
+    result: string
+        Captured stdout and stderr of the application.
+    returncode: int
+        0 on success; the exit code passed to sys.exit or 1 if the
+        application raised an exception.
+
+    """
+    import builtins  # only import these when they are needed
+    import contextlib
+    import io
+    import traceback
+
+    script_path = os.path.abspath(command_list[1])  # noqa: PTH100
+    arg_list = command_list[2:]
+
+    cwd = os.getcwd()  # noqa: PTH109
+    argv = sys.argv
+    path = list(sys.path)
+
+    output = io.StringIO()
+    returncode = 0
+
+    # applications often import helper modules from their own folder
+    sys.path.insert(0, os.path.dirname(script_path))  # noqa: PTH120
+
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            code = _load_in_process_app(script_path)
+
+            sys.argv = [script_path, *arg_list]
+
+            exec(  # noqa: S102
+                code,
+                {
+                    '__name__': '__main__',
+                    '__file__': script_path,
+                    '__builtins__': builtins,
+                },
+            )
+
+        except SystemExit as e:
+            if e.code is None:
+                returncode = 0
+            elif isinstance(e.code, int):
+                returncode = e.code
+            else:
+                print(e.code)  # noqa: T201
+                returncode = 1
 
-        # remove the quotes from the arguments
-        arg_list = [c[1:-1] for c in command_list[1:]]
+        except Exception:  # noqa: BLE001
+            traceback.print_exc(file=output)
+            returncode = 1
 
-        py_script.main(arg_list)
+        finally:
+            os.chdir(cwd)
+            sys.argv = argv
+            sys.path[:] = path
 
-        return '', ''  # noqa: DOC201, RUF100
+    return output.getvalue(), returncode
 
-    else:  # noqa: RET505
-        # fmk with Shell=True not working on older windows machines, new approach needed for quoted command .. turn into a list
-        command = shlex.split(command)
 
+def run_command(command, app_category='', in_process=False):  # noqa: FBT002
+    """Run a workflow application and check its return code.
+
+    Parameters
+    ----------
+    command: string
+        The command created by create_command.
+    app_category: string, optional
+        Name of the workflow step, used in the error message.
+    in_process: bool, optional, default: False
+        If True and the command runs a Python script, the script is not run
+        in a new interpreter, but executed as `__main__` in the current one.
+        This avoids paying for the interpreter start-up and the import of
+        numpy, pandas, etc. for every asset. Applications opt in to this
+        mode with the RunsInProcess flag in the registry.
+
+    """
+    # fmk with Shell=True not working on older windows machines, new approach needed for quoted command .. turn into a list
+    command_list = shlex.split(command)
+
+    if (
+        in_process
+        and len(command_list) > 1
+        and command_list[1].endswith('.py')
+        and os.path.basename(command_list[0]).startswith('python')  # noqa: PTH119
+    ):
+        result, returncode = _run_in_process(command_list)
+
+    else:
         try:
             result = subprocess.check_output(  # noqa: S603
-                command, stderr=subprocess.STDOUT, text=True
+                command_list, stderr=subprocess.STDOUT, text=True
             )
             returncode = 0
         except subprocess.CalledProcessError as e:
             result = e.output
             returncode = e.returncode
 
-        if returncode != 0:
-            log_error(f'return code: {returncode}')
+    if returncode != 0:
+        log_error(f'return code: {returncode}')
 
-        #
-        # sy - error checking trial 2 : only for windows and python & additional try statement
-        #
+    #
+    # sy - error checking trial 2 : only for windows and python & additional try statement
+    #
 
-        try:
-            # if (platform.system() == 'Windows') and ('python.exe' in str(command)):
+    try:
+        # if (platform.system() == 'Windows') and ('python.exe' in str(command)):
+        if returncode != 0:
+            raise WorkFlowInputError('Analysis Failed at ' + app_category)  # noqa: TRY301
+
+        # sy - safe apps should be added below
+        elif 'OpenSeesInput' in str(command):  # noqa: RET506
             if returncode != 0:
                 raise WorkFlowInputError('Analysis Failed at ' + app_category)  # noqa: TRY301
 
-            # sy - safe apps should be added below
-            elif 'OpenSeesInput' in str(command):  # noqa: RET506
-                if returncode != 0:
-                    raise WorkFlowInputError('Analysis Failed at ' + app_category)  # noqa: TRY301
-
-            return str(result), returncode
+        return str(result), returncode  # noqa: DOC201, RUF100
 
-        except WorkFlowInputError as e:
-            # this will catch the error
-            print(str(e).replace("'", ''))  # noqa: T201
-            print('         =====================================')  # noqa: T201
-            print(str(result))  # noqa: T201
-            sys.exit(-20)
+    except WorkFlowInputError as e:
+        # this will catch the error
+        print(str(e).replace("'", ''))  # noqa: T201
+        print('         =====================================')  # noqa: T201
+        print(str(result))  # noqa: T201
+        sys.exit(-20)
 
-        except:  # noqa: E722
-            # if for whatever reason the function inside "try" fails, move on without checking error
-            return str(result), 0
+    except:  # noqa: E722
+        # if for whatever reason the function inside "try" fails, move on without checking error
+        return str(result), 0
 
-        return result, returncode
+    return result, returncode
 
 
 def show_warning(warning_msg):  # noqa: D103
@@ -571,6 +658,10 @@ class WorkflowApplication:
         else:
             self.runsParallel = False
 
+        # Python applications can opt in to be compiled once and run in the
+        # interpreter of the workflow
+        self.runsInProcess = app_info.get('RunsInProcess', False)
+
         self.app_spec_inputs = app_info.get('ApplicationSpecificInputs', [])
 
         self.inputs = api_info['Inputs']
@@ -712,6 +803,490 @@ class WorkflowApplication:
         return arg_list  # noqa: DOC201, RUF100
 
 
+def _asset_type_hierarchy(asset_file):
+    """Return the folder of an asset file and the asset type hierarchy.
+
+    The hierarchy lists the names of the folders between the Results folder
+    of the run and the folder of the asset file, e.g., [Buildings].
+    """
+    bldg_dir = Path(os.path.dirname(asset_file)).resolve()  # noqa: PTH120
+    main_dir = bldg_dir
+    assetTypeHierarchy = [bldg_dir.name]  # noqa: N806
+    while main_dir.parent.name != 'Results':
+        main_dir = bldg_dir.parent
+        assetTypeHierarchy = [main_dir.name] + assetTypeHierarchy  # noqa: N806, RUF005
+    return bldg_dir, assetTypeHierarchy
+
+
+def _read_asset_dl_results(  # noqa: C901
+    asset_dir, asset_id, GI_data_i_det, sample_size, out_types, R2D_res_out_types, asset_label  # noqa: N803
+):
+    """Read the damage and loss outputs of one asset into arrays.
+
+    Parameters
+    ----------
+    asset_dir: Path
+        Folder with the outputs of the asset.
+    asset_id: string
+        Id of the asset.
+    GI_data_i_det: dict
+        GeneralInformation of the asset.
+    sample_size: int
+        Number of realizations.
+    out_types: list of strings
+        Requested outputs among EDP, DM, and DV.
+    R2D_res_out_types: list of strings
+        Outputs summarized in the R2Dres entry of the deterministic results.
+    asset_label: string
+        Asset type used in warning messages.
+
+    Returns
+    -------
+    det_data: dict
+        Deterministic results of the asset.
+    rlz_data: dict
+        For each of Demand, Damage, and Loss that is available, a tuple with
+        the list of column names and a (sample_size, columns) array of values.
+
+    """
+    det_data = {'GeneralInformation': GI_data_i_det, 'R2Dres': {}}
+    rlz_data = {}
+
+    asset_files = os.listdir(asset_dir)
+
+    def _rlz_frame(data):
+        # rows are realizations, stored under integer-like keys
+        data = pd.DataFrame(data)
+        data.index = data.index.astype(int)
+        return data.reindex(np.arange(sample_size))
+
+    if 'EDP' in out_types:
+        edp_out_file_i = 'DEM_sample.json'
+
+        if edp_out_file_i not in asset_files:
+            show_warning(f"Couldn't find EDP file for {asset_label} {asset_id}")
+
+        else:
+            with open(asset_dir / edp_out_file_i, encoding='utf-8') as f:  # noqa: PTH123
+                edp_data_i = json.load(f)
+
+            # remove the ONE demand
+            edp_data_i.pop('ONE-0-1')
+
+            # extract EDP unit info
+            edp_units = edp_data_i['Units']
+            del edp_data_i['Units']
+
+            # parse the demand data into a DataFrame
+            # we assume demands are stored in JSON with a SimpleIndex
+            edp_data_i = _rlz_frame(edp_data_i)
+
+            rlz_data['Demand'] = (
+                list(edp_data_i.columns),
+                edp_data_i.to_numpy(dtype=float),
+            )
+
+            # save the EDP units
+            det_data.update({'Demand': {'Units': edp_units}})
+
+    if 'DM' in out_types:
+        dmg_out_file_i = 'DMG_grp.json'
+
+        if dmg_out_file_i not in asset_files:
+            show_warning(f"Couldn't find DMG file for {asset_label} {asset_id}")
+
+        else:
+            with open(asset_dir / dmg_out_file_i, encoding='utf-8') as f:  # noqa: PTH123
+                dmg_data_i = json.load(f)
+
+            # remove damage unit info
+            del dmg_data_i['Units']
+
+            # parse damage data into a DataFrame
+            dmg_data_i = _rlz_frame(dmg_data_i)
+
+            # we assume that damage information is condensed
+            # TODO: implement condense_ds flag in DL_calc  # noqa: TD002
+            rlz_data['Damage'] = (
+                list(dmg_data_i.columns),
+                dmg_data_i.to_numpy(dtype=float),
+            )
+
+            if 'DM' in R2D_res_out_types:
+                det_data['R2Dres'].update(
+                    {
+                        'R2Dres_MostLikelyCriticalDamageState': dmg_data_i.max(
+                            axis=1
+                        )
+                        .mode()
+                        .mean()
+                    }
+                )
+
+    if 'DV' in out_types:
+        dv_out_file_i = 'DV_repair_grp.json'
+        dl_summary_file = 'DL_summary_stats.json'
+
+        if dv_out_file_i not in asset_files:
+            show_warning(f"Couldn't find DV file for {asset_label} {asset_id}")
+
+        elif dl_summary_file not in asset_files:
+            show_warning(
+                f"Couldn't find DL summary file for {asset_label} {asset_id}"
+            )
+
+        else:
+            with open(asset_dir / dv_out_file_i, encoding='utf-8') as f:  # noqa: PTH123
+                dv_data_i = json.load(f)
+
+            with open(asset_dir / dl_summary_file, encoding='utf-8') as f:  # noqa: PTH123
+                dl_summary = json.load(f)
+
+            # extract DV unit info
+            dv_units = dv_data_i['Units']
+            del dv_data_i['Units']
+
+            # parse decision variable data into a DataFrame
+            dv_data_i = _rlz_frame(dv_data_i)
+
+            # Convert cost from loss ratio to monetary value
+            replacement_cost = GI_data_i_det.get('ReplacementCost', 1.0)
+            for col in dv_data_i.columns:
+                if col.startswith('Cost'):
+                    dv_data_i[col] = dv_data_i[col] * replacement_cost
+
+            rlz_data['Loss'] = (
+                list(dv_data_i.columns),
+                dv_data_i.to_numpy(dtype=float),
+            )
+
+            # save DV units
+            det_data.update({'Loss': {'Units': dv_units}})
+
+            if 'DV' in R2D_res_out_types:
+                r2d_res_dv = dict()  # noqa: C408
+
+                if 'repair_cost' in dl_summary:
+                    repair_cost_data = dl_summary['repair_cost']
+
+                elif 'repair_cost-' in dl_summary:
+                    repair_cost_data = dl_summary['repair_cost-']
+
+                else:
+                    repair_cost_data = None
+
+                if repair_cost_data:
+
+                    cost_unit = [unit for dv_output, unit in dv_units.items() if dv_output.startswith('Cost')][0]
+
+                    r2d_res_dv.update({
+                        f'R2Dres_mean_RepairCost_{cost_unit}': repair_cost_data['mean'],
+                        f'R2Dres_std_RepairCost_{cost_unit}': repair_cost_data['std']
+                        })
+
+                    if cost_unit == 'loss_ratio' and np.abs(replacement_cost-1.0)>1e-5:
+                        r2d_res_dv.update({
+                            f'R2Dres_mean_RepairCost': repair_cost_data['mean'] * replacement_cost,
+                            f'R2Dres_std_RepairCost': repair_cost_data['std'] * replacement_cost
+                            })
+
+                if 'repair_time' in dl_summary:
+                    repair_time_data = dl_summary['repair_time']
+
+                elif 'repair_time-sequential' in dl_summary:
+                    repair_time_data = dl_summary['repair_time-sequential']
+
+                else:
+                    repair_time_data = None
+
+                if repair_time_data:
+
+                    time_unit = [unit for dv_output, unit in dv_units.items() if dv_output.startswith('Time')][0]
+
+                    r2d_res_dv.update({
+                        f'R2Dres_mean_RepairTime_{time_unit}': repair_time_data['mean'],
+                        f'R2Dres_std_RepairTime_{time_unit}': repair_time_data['std']
+                        })
+
+                det_data['R2Dres'].update(r2d_res_dv)
+
+    return det_data, rlz_data
+
+
+class RealizationStore:
+    """Columnar HDF5 store of the realization-level results of assets.
+
+    Every section (Demand, Damage, Loss) is a (realization, column) matrix in
+    which each asset owns a contiguous block of columns. The blocks are
+    located through an offset vector indexed by the position of the asset in
+    the store. Damage states are stored as floats with NaN for missing data.
+    Assets are buffered in memory and appended to the file in batches, so
+    the memory use does not grow with the number of assets.
+
+    Parameters
+    ----------
+    path: Path
+        Path to the HDF5 file.
+    sample_size: int
+        Number of realizations.
+
+    """
+
+    sections = ('Demand', 'Damage', 'Loss')
+
+    def __init__(self, path, sample_size, buffer_size=2**23):
+        import h5py  # only import this when it's needed
+
+        self.path = path
+        self.sample_size = sample_size
+        self.buffer_size = buffer_size
+        self.file = h5py.File(path, 'w')
+        self.file.attrs['sample_size'] = sample_size
+
+        str_dt = h5py.string_dtype()
+        self.file.create_dataset('asset_id', (0,), dtype=str_dt, maxshape=(None,))
+        self.file.create_dataset('hierarchy', (0,), dtype=str_dt, maxshape=(None,))
+        for section in self.sections:
+            grp = self.file.create_group(section)
+            grp.create_dataset(
+                'values',
+                (sample_size, 0),
+                dtype=float,
+                maxshape=(sample_size, None),
+                chunks=(min(sample_size, 64), 1024),
+            )
+            grp.create_dataset('columns', (0,), dtype=str_dt, maxshape=(None,))
+            grp.create_dataset('offsets', data=[0], maxshape=(None,))
+            grp.create_dataset('available', (0,), dtype=bool, maxshape=(None,))
+
+        self._reset_buffer()
+
+    def _reset_buffer(self):
+        self._buffer = {'asset_id': [], 'hierarchy': []}
+        for section in self.sections:
+            self._buffer[section] = {
+                'values': [],
+                'columns': [],
+                'widths': [],
+                'available': [],
+            }
+        self._buffer_count = 0
+
+    def append(self, asset_id, hierarchy, rlz_data):
+        """Add the realizations of one asset to the store."""
+        self._buffer['asset_id'].append(asset_id)
+        self._buffer['hierarchy'].append('/'.join(hierarchy))
+
+        for section in self.sections:
+            buffer = self._buffer[section]
+            columns, values = rlz_data.get(section, ([], None))
+            buffer['available'].append(section in rlz_data)
+            buffer['columns'] += columns
+            buffer['widths'].append(len(columns))
+            if len(columns) > 0:
+                buffer['values'].append(values)
+                self._buffer_count += values.size
+
+        if self._buffer_count >= self.buffer_size:
+            self.flush()
+
+    def _append_to(self, dataset, data):
+        n_old = dataset.shape[-1]
+        dataset.resize(n_old + np.shape(data)[-1], axis=dataset.ndim - 1)
+        if dataset.ndim == 1:
+            dataset[n_old:] = data
+        else:
+            dataset[:, n_old:] = data
+
+    def flush(self):
+        """Write the buffered assets to the file."""
+        if len(self._buffer['asset_id']) == 0:
+            return
+
+        self._append_to(self.file['asset_id'], self._buffer['asset_id'])
+        self._append_to(self.file['hierarchy'], self._buffer['hierarchy'])
+
+        for section in self.sections:
+            buffer = self._buffer[section]
+            grp = self.file[section]
+            offsets = grp['offsets']
+            self._append_to(
+                offsets, offsets[-1] + np.cumsum(buffer['widths'], dtype=int)
+            )
+            self._append_to(grp['available'], buffer['available'])
+            if len(buffer['columns']) > 0:
+                self._append_to(grp['columns'], buffer['columns'])
+                self._append_to(
+                    grp['values'], np.concatenate(buffer['values'], axis=1)
+                )
+
+        self._reset_buffer()
+
+    def close(self, deterministic):
+        """Flush the buffer and save the deterministic results as JSON."""
+        import h5py  # only import this when it's needed
+
+        self.flush()
+        self.file.create_dataset(
+            'deterministic', data=json.dumps(deterministic), dtype=h5py.string_dtype()
+        )
+        self.file.close()
+
+
+def _nest(data, hierarchy):
+    """Return the dict of an asset type hierarchy level in the results."""
+    pointer = data
+    for asset_type_iter in hierarchy:
+        pointer = pointer.setdefault(asset_type_iter, {})
+    return pointer
+
+
+def _wrap_hierarchy(data, hierarchy):
+    # This is also ugly but necessary for backward compatibility so that
+    # file structure created from apps other than GeoJSON_TO_ASSET can be
+    # dealt with
+    if len(hierarchy) == 1:
+        if hierarchy[0] == 'Buildings':
+            return {'Buildings': {'Building': data['Buildings']}}
+        return {hierarchy[0]: data}
+    return data
+
+
+def write_realization_files(  # noqa: C901
+    store_paths, rlz_list, out_dir, asset_type, asset_order, max_values=2**26
+):
+    """Write the per-realization JSON results from realization stores.
+
+    The realizations are read from the stores in batches that hold at most
+    max_values numbers in memory, and a JSON file is written for each
+    realization with the same layout as the one used by R2D.
+
+    Parameters
+    ----------
+    store_paths: list of Path
+        RealizationStore files, e.g., one from each process.
+    rlz_list: list of int
+        Realizations to write.
+    out_dir: Path
+        Folder of the output files.
+    asset_type: string
+        Asset type, used in the name of the files.
+    asset_order: list of strings
+        Asset ids in the order they are written to the files.
+
+    """
+    import h5py  # only import this when it's needed
+
+    stores = [h5py.File(path, 'r') for path in store_paths]
+
+    try:
+        # the static part of the stores is small and read only once
+        store_info = []
+        num_values = 0
+        for store in stores:
+            info = {
+                'asset_id': store['asset_id'].asstr()[()],
+                'hierarchy': [h.split('/') for h in store['hierarchy'].asstr()[()]],
+            }
+            for section in RealizationStore.sections:
+                grp = store[section]
+                info[section] = {
+                    'columns': grp['columns'].asstr()[()],
+                    'offsets': grp['offsets'][()],
+                    'available': grp['available'][()],
+                }
+                num_values += grp['columns'].shape[0]
+            store_info.append(info)
+
+        # locate every asset in the stores
+        asset_loc = {
+            asset_id: (s_i, a_i)
+            for s_i, info in enumerate(store_info)
+            for a_i, asset_id in enumerate(info['asset_id'])
+        }
+        asset_loc = [asset_loc[a] for a in asset_order if a in asset_loc]
+
+        hierarchy = None
+        if len(asset_loc) > 0:
+            s_i, a_i = asset_loc[-1]
+            hierarchy = store_info[s_i]['hierarchy'][a_i]
+
+        batch_size = max(1, max_values // max(num_values, 1))
+
+        for batch_start in range(0, len(rlz_list), batch_size):
+            rlz_batch = sorted(rlz_list[batch_start : batch_start + batch_size])
+
+            # read the values of every asset for the realizations in the batch
+            batch_values = [
+                {
+                    section: store[section]['values'][rlz_batch, :]
+                    for section in RealizationStore.sections
+                }
+                for store in stores
+            ]
+
+            for b_i, rlz_i in enumerate(rlz_batch):
+                rlz_data = {asset_type: {}}
+
+                for s_i, a_i in asset_loc:
+                    info = store_info[s_i]
+                    values = batch_values[s_i]
+                    asset_id = info['asset_id'][a_i]
+                    asset_data = {'GeneralInformation': {}}
+
+                    for section in RealizationStore.sections:
+                        sec_info = info[section]
+                        if not sec_info['available'][a_i]:
+                            continue
+                        col_slice = slice(
+                            sec_info['offsets'][a_i], sec_info['offsets'][a_i + 1]
+                        )
+                        columns = sec_info['columns'][col_slice]
+                        vals = values[section][b_i, col_slice]
+
+                        if section == 'Demand':
+                            asset_data['Demand'] = dict(
+                                zip(columns, vals.tolist())
+                            )
+
+                        elif section == 'Damage':
+                            asset_data['Damage'] = {
+                                col: int(val)
+                                for col, val in zip(columns, vals.tolist())
+                                if not np.isnan(val)
+                            }
+
+                        elif section == 'Loss':
+                            dv_output = {}
+                            for col, val in zip(columns, vals.tolist()):
+                                dv_type = col.split('-')[0]
+                                dv_output.setdefault(dv_type, {})[
+                                    col[len(dv_type) + 1 :]
+                                ] = val
+                            asset_data['Loss'] = {
+                                'Repair': {
+                                    dv_type: dv_output[dv_type]
+                                    for dv_type in sorted(dv_output)
+                                }
+                            }
+
+                    _nest(rlz_data, info['hierarchy'][a_i])[
+                        asset_id
+                    ] = asset_data
+
+                if hierarchy is not None:
+                    rlz_data = _wrap_hierarchy(rlz_data, hierarchy)
+
+                with open(  # noqa: PTH123
+                    out_dir / f'{asset_type}_{rlz_i}.json', 'w', encoding='utf-8'
+                ) as f:
+                    json.dump(rlz_data, f, indent=2)
+
+    finally:
+        for store in stores:
+            store.close()
+
+
 class Workflow:
     """A class that collects methods common to all workflows developed by the
     SimCenter. Child-classes will be introduced later if needed.
@@ -2158,7 +2733,9 @@ class Workflow:
                             )
 
                             result, returncode = run_command(
-                                command, f'{app_type} - at the initial setup (getRV)'
+                                command,
+                                f'{app_type} - at the initial setup (getRV)',
+                                in_process=item.runsInProcess,
                             )
 
                             log_msg(
@@ -2201,7 +2778,9 @@ class Workflow:
                             prepend_blank_space=False,
                         )
 
-                        result, returncode = run_command(command, app_type)
+                        result, returncode = run_command(
+                            command, app_type, in_process=workflow_app.runsInProcess
+                        )
 
                         log_msg(
                             'Output: ' + str(returncode),
@@ -2569,7 +3148,11 @@ class Workflow:
                 prepend_blank_space=False,
             )
 
-            result, returncode = run_command(command, 'Response Simulator')
+            result, returncode = run_command(
+                command,
+                'Response Simulator',
+                in_process=workflow_app.runsInProcess,
+            )
 
             if self.run_type in ['run', 'runningLocal']:
                 log_msg(
@@ -2739,7 +3322,9 @@ class Workflow:
                         prepend_blank_space=False,
                     )
 
-                    result, returncode = run_command(command, 'Damage and loss')
+                    result, returncode = run_command(
+                        command, 'Damage and loss', in_process=item.runsInProcess
+                    )
 
                     log_msg(result, prepend_timestamp=False)
 
@@ -2790,7 +3375,11 @@ class Workflow:
                     prepend_blank_space=False,
                 )
 
-                result, returncode = run_command(command, 'Damage and loss')
+                result, returncode = run_command(
+                    command,
+                    'Damage and loss',
+                    in_process=workflow_app.runsInProcess,
+                )
 
                 log_msg(result, prepend_timestamp=False)
 
@@ -2989,14 +3578,21 @@ class Workflow:
             'DL' in self.workflow_apps
             and self.workflow_apps['DL'][asset_type].name == 'Pelicun3'
         ):
-            initialize_dicts = True
+            run_path = Path(run_path)
+
+            # Every process collects the results of its share of the assets
+            # into a columnar store. The per-realization JSON files are then
+            # written from the stores, a batch of realizations at a time.
+            store_path = run_path / f'{asset_type}_rlz_{self.procID}.hdf5'
+            store_path.unlink(missing_ok=True)
+
+            store = None
+            deterministic = []
             for a_i, asst in enumerate(asst_data):
-                bldg_dir = Path(os.path.dirname(asst_data[a_i]['file'])).resolve()  # noqa: PTH120
-                main_dir = bldg_dir
-                assetTypeHierarchy = [bldg_dir.name]  # noqa: N806
-                while main_dir.parent.name != 'Results':
-                    main_dir = bldg_dir.parent
-                    assetTypeHierarchy = [main_dir.name] + assetTypeHierarchy  # noqa: N806, RUF005
+                if a_i % self.numP != self.procID:
+                    continue
+
+                bldg_dir, assetTypeHierarchy = _asset_type_hierarchy(asst['file'])  # noqa: N806
 
                 asset_id = asst['id']
                 asset_dir = bldg_dir / asset_id
@@ -3025,312 +3621,66 @@ class Workflow:
                     'Realizations'
                 ]
 
-                # initialize the output dict if this is the first asset
-                if initialize_dicts:
-                    # We assume all assets have the same output sample size
-                    # Variable sample size doesn't seem to make sense
-                    realizations = {
-                        rlz_i: {asset_type: {}} for rlz_i in range(sample_size)
-                    }
-
-                    # We also create a dict to collect deterministic info, i.e.,
-                    # data that is identical for all realizations
-                    deterministic = {asset_type: {}}
-                    initialize_dicts = False
-
-                # Check if the asset type hierarchy exist in deterministic and
-                # realizations. Create a hierarchy if it doesn't exist.
-                deter_pointer = deterministic
-                rlzn_pointer = {
-                    rlz_i: realizations[rlz_i] for rlz_i in range(sample_size)
-                }
-                for assetTypeIter in assetTypeHierarchy:  # noqa: N806
-                    if assetTypeIter not in deter_pointer.keys():  # noqa: SIM118
-                        deter_pointer.update({assetTypeIter: {}})
-                    deter_pointer = deter_pointer[assetTypeIter]
-                    for rlz_i in range(sample_size):
-                        if assetTypeIter not in rlzn_pointer[rlz_i].keys():  # noqa: SIM118
-                            rlzn_pointer[rlz_i].update({assetTypeIter: {}})
-                        rlzn_pointer[rlz_i] = rlzn_pointer[rlz_i][assetTypeIter]
+                # initialize the store if this is the first asset
+                # We assume all assets have the same output sample size
+                # Variable sample size doesn't seem to make sense
+                if store is None:
+                    store = RealizationStore(store_path, sample_size)
 
                 # Currently, all GI data is deterministic
-                GI_data_i_det = AIM_data_i['GeneralInformation']  # noqa: N806
-
                 # TODO: later update this to handle probabilistic GI attributes  # noqa: TD002
-                GI_data_i_prob = {}  # noqa: N806
-
-                for rlz_i in range(sample_size):
-                    rlzn_pointer[rlz_i].update(
-                        {asset_id: {'GeneralInformation': GI_data_i_prob}}
-                    )
-
-                deter_pointer.update(
-                    {asset_id: {'GeneralInformation': GI_data_i_det}}
+                det_data_i, rlz_data_i = _read_asset_dl_results(
+                    asset_dir,
+                    asset_id,
+                    AIM_data_i['GeneralInformation'],
+                    sample_size,
+                    out_types,
+                    R2D_res_out_types,
+                    assetTypeHierarchy[-1],
                 )
-                deter_pointer[asset_id].update({'R2Dres': {}})
 
-                if 'EDP' in out_types:
-                    edp_out_file_i = 'DEM_sample.json'
+                store.append(asset_id, assetTypeHierarchy, rlz_data_i)
+                deterministic.append([asset_id, assetTypeHierarchy, det_data_i])
 
-                    if edp_out_file_i not in os.listdir(asset_dir):
-                        show_warning(
-                            f"Couldn't find EDP file for {assetTypeHierarchy[-1]} {asset_id}"
-                        )
-
-                    else:
-                        with open(asset_dir / edp_out_file_i, encoding='utf-8') as f:  # noqa: PTH123
-                            edp_data_i = json.load(f)
-
-                        # remove the ONE demand
-                        edp_data_i.pop('ONE-0-1')
+            if store is not None:
+                store.close(deterministic)
 
-                        # extract EDP unit info
-                        edp_units = edp_data_i['Units']
-                        del edp_data_i['Units']
+            if self.numP > 1:
+                self.comm.Barrier()
 
-                        # parse the demand data into a DataFrame
-                        # we assume demands are stored in JSON with a SimpleIndex
-                        edp_data_i = pd.DataFrame(edp_data_i)
-
-                        # convert to a realization-by-realization format
-                        edp_output = {
-                            int(rlz_i): {
-                                col: float(edp_data_i.loc[rlz_i, col])
-                                for col in edp_data_i.columns
-                            }
-                            for rlz_i in edp_data_i.index
-                        }
-
-                        # save the EDP intensities in each realization
-                        for rlz_i in range(sample_size):
-                            rlzn_pointer[rlz_i][asset_id].update(
-                                {'Demand': edp_output[rlz_i]}
-                            )
-
-                        # save the EDP units
-                        deter_pointer[asset_id].update(
-                            {'Demand': {'Units': edp_units}}
-                        )
-                        if 'EDP' in R2D_res_out_types:
-                            pass
-                            # meanValues = edp_data_i.mean()
-                            # stdValues = edp_data_i.std()
-                            # r2d_res_edp = dict()
-                            # for key in edp_data_i.columns:
-                            #     meanKey = f'R2Dres_mean_{key}_{edp_units[key]}'
-                            #     stdKey = f'R2Dres_std_{key}_{edp_units[key]}'
-                            #     r2d_res_edp.update({meanKey:meanValues[key],\
-                            #                         stdKey:stdValues[key]})
-                            # r2d_res_i =  deter_pointer[asset_id].get('R2Dres', {})
-                            # r2d_res_i.update(r2d_res_edp)
-                            # deter_pointer[asset_id].update({
-                            #     "R2Dres":r2d_res_i
-                            # })
-                if 'DM' in out_types:
-                    dmg_out_file_i = 'DMG_grp.json'
-
-                    if dmg_out_file_i not in os.listdir(asset_dir):
-                        show_warning(
-                            f"Couldn't find DMG file for {assetTypeHierarchy[-1]} {asset_id}"
-                        )
-
-                    else:
-                        with open(asset_dir / dmg_out_file_i, encoding='utf-8') as f:  # noqa: PTH123
-                            dmg_data_i = json.load(f)
-
-                        # remove damage unit info
-                        del dmg_data_i['Units']
-
-                        # parse damage data into a DataFrame
-                        dmg_data_i = pd.DataFrame(dmg_data_i)
-
-                        # convert to realization-by-realization format
-                        dmg_output = {}
-                        for rlz_i in dmg_data_i.index:
-                            rlz_output = {}
-
-                            for col in dmg_data_i.columns:
-                                if not pd.isna(dmg_data_i.loc[rlz_i, col]):
-                                    rlz_output.update(
-                                        {col: int(dmg_data_i.loc[rlz_i, col])}
-                                    )
-
-                            dmg_output.update({rlz_i: rlz_output})
-
-                        # we assume that damage information is condensed
-                        # TODO: implement condense_ds flag in DL_calc  # noqa: TD002
-                        for rlz_i in range(sample_size):
-                            rlzn_pointer[rlz_i][asset_id].update(
-                                {'Damage': dmg_output[rlz_i]}
-                            )
-                        if 'DM' in R2D_res_out_types:
-                            # use forward fill in case of multiple modes
-                            meanValues = dmg_data_i.mode().ffill().mean()  # noqa: N806, F841
-                            stdValues = dmg_data_i.std()  # noqa: N806, F841
-                            r2d_res_dmg = dict()  # noqa: C408
-                            # for key in dmg_data_i.columns:
-                            #     meanKey = f'R2Dres_mode_{key}'
-                            #     stdKey = f'R2Dres_std_{key}'
-                            #     r2d_res_dmg.update({meanKey:meanValues[key],\
-                            #                         stdKey:stdValues[key]})
-                            r2d_res_dmg.update(
-                                {
-                                    'R2Dres_MostLikelyCriticalDamageState': dmg_data_i.max(
-                                        axis=1
-                                    )
-                                    .mode()
-                                    .mean()
-                                }
-                            )
-                            r2d_res_i = deter_pointer[asset_id].get('R2Dres', {})
-                            r2d_res_i.update(r2d_res_dmg)
-                            deter_pointer[asset_id].update({'R2Dres': r2d_res_i})
-
-                if 'DV' in out_types:
-                    dv_out_file_i = 'DV_repair_grp.json'
-                    dl_summary_file = 'DL_summary_stats.json'
-
-                    if dv_out_file_i not in os.listdir(asset_dir):
-                        show_warning(
-                            f"Couldn't find DV file for {assetTypeHierarchy[-1]} {asset_id}"
-                        )
-
-                    elif dl_summary_file not in os.listdir(asset_dir):
-                        show_warning(
-                            f"Couldn't find DL summary file for {assetTypeHierarchy[-1]} {asset_id}"
-                        )
-
-                    else:
-                        with open(asset_dir / dv_out_file_i, encoding='utf-8') as f:  # noqa: PTH123
-                            dv_data_i = json.load(f)
-
-                        with open(asset_dir / dl_summary_file, encoding='utf-8') as f:  # noqa: PTH123
-                            dl_summary = json.load(f)
-
-                        # extract DV unit info
-                        dv_units = dv_data_i['Units']
-                        del dv_data_i['Units']
-
-                        # parse decision variable data into a DataFrame
-                        dv_data_i = pd.DataFrame(dv_data_i)
-
-                        # Convert cost from loss ratio to monetary value
-                        replacement_cost = GI_data_i_det.get('ReplacementCost', 1.0)
-                        for col in dv_data_i.columns:
-                            if col.startswith('Cost'):
-                                dv_data_i[col] = (
-                                    dv_data_i[col] * replacement_cost
-                                )
-                        # get a list of dv types
-                        dv_types = np.unique(
-                            [col.split('-')[0] for col in dv_data_i.columns]
-                        )
-
-                        # convert to realization-by-realization format
-                        dv_output = {
-                            int(rlz_i): {
-                                dv_type: {
-                                    col[len(dv_type) + 1 :]: float(
-                                        dv_data_i.loc[rlz_i, col]
-                                    )
-                                    for col in dv_data_i.columns
-                                    if col.startswith(dv_type)
-                                }
-                                for dv_type in dv_types
-                            }
-                            for rlz_i in dv_data_i.index
-                        }
-
-                        # save loss data
-                        for rlz_i in range(sample_size):
-                            rlzn_pointer[rlz_i][asset_id].update(
-                                {'Loss': {'Repair': dv_output[rlz_i]}}
-                            )
-
-                        # save DV units
-                        deter_pointer[asset_id].update({'Loss': {'Units': dv_units}})
-
-                        if 'DV' in R2D_res_out_types:
-                            r2d_res_dv = dict()  # noqa: C408
-
-                            if 'repair_cost' in dl_summary:
-                                repair_cost_data = dl_summary['repair_cost']
-
-                            elif 'repair_cost-' in dl_summary:
-                                repair_cost_data = dl_summary['repair_cost-']
-
-                            else:
-                                repair_cost_data = None
-
-                            if repair_cost_data:
-
-                                cost_unit = [unit for dv_output, unit in dv_units.items() if dv_output.startswith('Cost')][0]                            
-
-                                r2d_res_dv.update({
-                                    f'R2Dres_mean_RepairCost_{cost_unit}': repair_cost_data['mean'],
-                                    f'R2Dres_std_RepairCost_{cost_unit}': repair_cost_data['std']                                  
-                                    })
-
-                                if cost_unit == 'loss_ratio' and np.abs(replacement_cost-1.0)>1e-5:
-                                    r2d_res_dv.update({
-                                        f'R2Dres_mean_RepairCost': repair_cost_data['mean'] * replacement_cost,
-                                        f'R2Dres_std_RepairCost': repair_cost_data['std'] * replacement_cost                                    
-                                        })
-
-                            if 'repair_time' in dl_summary:
-                                repair_time_data = dl_summary['repair_time']
-
-                            elif 'repair_time-sequential' in dl_summary:
-                                repair_time_data = dl_summary['repair_time-sequential']
-
-                            else:
-                                repair_time_data = None
-
-                            if repair_time_data:
+            store_paths = [
+                run_path / f'{asset_type}_rlz_{proc_i}.hdf5'
+                for proc_i in range(self.numP)
+            ]
+            store_paths = [path for path in store_paths if path.exists()]
 
-                                time_unit = [unit for dv_output, unit in dv_units.items() if dv_output.startswith('Time')][0]
+            if len(store_paths) > 0:
+                main_dir = _asset_type_hierarchy(asst_data[0]['file'])[0]
+                while main_dir.parent.name != 'Results':
+                    main_dir = main_dir.parent
+                asset_order = [asst['id'] for asst in asst_data]
 
-                                r2d_res_dv.update({
-                                    f'R2Dres_mean_RepairTime_{time_unit}': repair_time_data['mean'],
-                                    f'R2Dres_std_RepairTime_{time_unit}': repair_time_data['std']
-                                    })
+                if self.procID == 0:
+                    self._merge_realization_stores(
+                        store_paths, run_path, main_dir, asset_type, asset_order
+                    )
 
-                            r2d_res_i = deter_pointer[asset_id].get('R2Dres', {})
-                            r2d_res_i.update(r2d_res_dv)
-                            deter_pointer[asset_id].update({'R2Dres': r2d_res_i})
+                # the realizations are written by all processes in parallel
+                import h5py  # only import this when it's needed
 
-            # This is also ugly but necessary for backward compatibility so that
-            # file structure created from apps other than GeoJSON_TO_ASSET can be
-            # dealt with
-            if len(assetTypeHierarchy) == 1:
-                if assetTypeHierarchy[0] == 'Buildings':
-                    deterministic = {
-                        'Buildings': {'Building': deterministic['Buildings']}
-                    }
-                    for rlz_i in realizations:
-                        realizations[rlz_i] = {
-                            'Buildings': {
-                                'Building': realizations[rlz_i]['Buildings']
-                            }
-                        }
-                else:
-                    deterministic = {assetTypeHierarchy[0]: deterministic}
-                    for rlz_i in realizations:
-                        realizations[rlz_i] = {
-                            assetTypeHierarchy[0]: realizations[rlz_i]
-                        }
+                with h5py.File(store_paths[0], 'r') as f:
+                    sample_size = int(f.attrs['sample_size'])
 
-            # save outputs to JSON files
-            for rlz_i, rlz_data in realizations.items():
-                with open(  # noqa: PTH123
-                    main_dir / f'{asset_type}_{rlz_i}.json', 'w', encoding='utf-8'
-                ) as f:
-                    json.dump(rlz_data, f, indent=2)
+                write_realization_files(
+                    store_paths,
+                    list(range(self.procID, sample_size, self.numP)),
+                    main_dir,
+                    asset_type,
+                    asset_order,
+                )
 
-            with open(  # noqa: PTH123
-                main_dir / f'{asset_type}_det.json', 'w', encoding='utf-8'
-            ) as f:
-                json.dump(deterministic, f, indent=2)
+            if self.numP > 1:
+                self.comm.Barrier()
 
         else:
             # This is legacy for Pelicun 2 runs
@@ -3352,6 +3702,10 @@ class Workflow:
                     self.output_types.get(out_type, False)
                 ):
                     if out_type == 'every_realization':
+                        # this output is collected by the first process only
+                        if self.procID != 0:
+                            continue
+
                         realizations_EDP = None  # noqa: N806
                         realizations_DL = None  # noqa: N806
 
@@ -3542,6 +3896,47 @@ class Workflow:
         )
         log_div()
 
+    def _merge_realization_stores(
+        self, store_paths, run_path, main_dir, asset_type, asset_order
+    ):
+        """Merge the realization stores of the processes.
+
+        The deterministic results of the assets are collected into the
+        {asset_type}_det.json file and an {asset_type}_rlz.hdf5 file is
+        created that links to the store of every process, so that the
+        realization data can be accessed through a single file.
+        """
+        import h5py  # only import this when it's needed
+
+        det_data = {}
+        with h5py.File(run_path / f'{asset_type}_rlz.hdf5', 'w') as index_file:
+            for path in store_paths:
+                with h5py.File(path, 'r') as f:
+                    index_file.attrs['sample_size'] = f.attrs['sample_size']
+                    for asset_id, hierarchy, det_data_i in json.loads(
+                        f['deterministic'].asstr()[()]
+                    ):
+                        det_data[asset_id] = (hierarchy, det_data_i)
+
+                index_file[path.stem] = h5py.ExternalLink(path.name, '/')
+
+        # We also create a dict to collect deterministic info, i.e.,
+        # data that is identical for all realizations
+        deterministic = {asset_type: {}}
+        hierarchy = None
+        for asset_id in asset_order:
+            if asset_id in det_data:
+                hierarchy, det_data_i = det_data[asset_id]
+                _nest(deterministic, hierarchy)[asset_id] = det_data_i
+
+        if hierarchy is not None:
+            deterministic = _wrap_hierarchy(deterministic, hierarchy)
+
+        with open(  # noqa: PTH123
+            main_dir / f'{asset_type}_det.json', 'w', encoding='utf-8'
+        ) as f:
+            json.dump(deterministic, f, indent=2)
+
     def compile_r2d_results_geojson(self, asset_files):  # noqa: D102
         run_path = self.run_dir
         with open(self.input_file, encoding='utf-8') as f:  # noqa: PTH123
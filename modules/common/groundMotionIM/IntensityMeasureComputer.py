@@ -48,6 +48,8 @@ import numpy as np
 import pandas as pd
 from scipy.integrate import cumtrapz
 from scipy.interpolate import interp1d
+from scipy.linalg import expm
+from scipy.signal import lfilter
 from scipy.stats.mstats import gmean
 
 this_dir = Path(os.path.dirname(os.path.abspath(__file__))).resolve()  # noqa: PTH100, PTH120
@@ -71,11 +73,246 @@ IM_MAP = {
 }
 
 
+def sdof_filter_coefficients(periods, damping, dt):
+    """
+    Exact recurrence of damped SDOF oscillators as linear filters.
+
+    For a ground acceleration that varies linearly within each time step,
+    the displacement u and velocity v of the oscillator
+    u'' + 2 * damping * omega * u' + omega**2 * u = -ag
+    at the end of a step follow exactly from their values at the start of
+    the step and the two ground acceleration samples (Nigam and Jennings,
+    1969). The transition matrices are obtained from the exponential of
+    the augmented state matrix and the two-state recurrence is rewritten
+    as a pair of second-order IIR filters with a common denominator.
+
+    Parameters
+    ----------
+    periods : array_like
+        Oscillator periods (sec).
+    damping : array_like
+        Damping ratios, broadcast against periods.
+    dt : array_like
+        Time step of the ground acceleration (sec), broadcast against
+        periods.
+
+    Returns
+    -------
+    num_disp, num_vel, den : numpy.ndarray
+        Numerator coefficients of the displacement and velocity filters and
+        the common denominator coefficients, each of shape
+        broadcast(periods, damping).shape + (3,).
+    """
+    periods, damping = np.broadcast_arrays(
+        np.asarray(periods, dtype=float), np.asarray(damping, dtype=float)
+    )
+    omega = 2.0 * np.pi / periods
+    state = np.zeros((*periods.shape, 4, 4))
+    state[..., 0, 1] = 1.0
+    state[..., 1, 0] = -(omega**2)
+    state[..., 1, 1] = -2.0 * damping * omega
+    state[..., 1, 2] = -1.0
+    state[..., 2, 3] = 1.0
+    dt = np.broadcast_to(np.asarray(dt, dtype=float), periods.shape)
+    transition = expm(state * dt[..., np.newaxis, np.newaxis])
+    phi = transition[..., :2, :2]
+    # coefficients of the ground acceleration at the end and start of a step
+    b_end = transition[..., :2, 3] / dt[..., np.newaxis]
+    b_start = transition[..., :2, 2] - b_end
+
+    den = np.stack(
+        [
+            np.ones_like(omega),
+            -(phi[..., 0, 0] + phi[..., 1, 1]),
+            np.linalg.det(phi),
+        ],
+        axis=-1,
+    )
+    num_disp = np.stack(
+        [
+            b_end[..., 0],
+            b_start[..., 0]
+            - phi[..., 1, 1] * b_end[..., 0]
+            + phi[..., 0, 1] * b_end[..., 1],
+            -phi[..., 1, 1] * b_start[..., 0] + phi[..., 0, 1] * b_start[..., 1],
+        ],
+        axis=-1,
+    )
+    num_vel = np.stack(
+        [
+            b_end[..., 1],
+            b_start[..., 1]
+            - phi[..., 0, 0] * b_end[..., 1]
+            + phi[..., 1, 0] * b_end[..., 0],
+            -phi[..., 0, 0] * b_start[..., 1] + phi[..., 1, 0] * b_start[..., 0],
+        ],
+        axis=-1,
+    )
+    return num_disp, num_vel, den
+
+
+def _num_substeps(dt, max_time_step):
+    # number of points per time step at which the response is evaluated
+    if max_time_step is None:
+        return np.ones((), dtype=int)
+    return np.maximum(np.ceil(dt / np.asarray(max_time_step) - 1e-9), 1).astype(int)
+
+
+def _subdivide_steps(acceleration, num_sub):
+    # Evaluate the piecewise linear record at intermediate points of each
+    # step, so that peaks between the samples are captured. The record
+    # itself (and therefore the exact response) is unchanged.
+    if num_sub == 1:
+        return acceleration
+    weights = np.arange(num_sub) / num_sub
+    fine = (
+        acceleration[..., :-1, np.newaxis] * (1.0 - weights)
+        + acceleration[..., 1:, np.newaxis] * weights
+    ).reshape(acceleration.shape[:-1] + (-1,))
+    return np.concatenate([fine, acceleration[..., -1:]], axis=-1)
+
+
+def sdof_responses(acceleration, dt, periods, damping=0.05, max_time_step=None):
+    """
+    Yield the response histories of damped SDOF oscillators.
+
+    The oscillators start at rest and are integrated with the exact
+    piecewise-linear recurrence of `sdof_filter_coefficients`, evaluated
+    with a compiled linear filter along the time axis for all records at
+    once.
+
+    Parameters
+    ----------
+    acceleration : array_like
+        Ground acceleration histories of shape (..., num_steps).
+    dt : float
+        Time step of the ground acceleration (sec).
+    periods : array_like
+        Oscillator periods (sec).
+    damping : array_like, optional
+        Damping ratios, broadcast against periods (default 0.05).
+    max_time_step : array_like, optional
+        Maximum interval between the instants at which the response is
+        evaluated, broadcast against periods. Each time step is divided
+        into equal parts as needed; by default the response is evaluated
+        at the samples of the record only.
+
+    Yields
+    ------
+    index : tuple
+        Index of the period and damping in broadcast(periods, damping).
+    disp, vel, abs_acc : numpy.ndarray
+        Relative displacement, relative velocity, and absolute acceleration
+        histories of shape acceleration.shape[:-1] + (num_instants,), in the
+        units of acceleration times sec**2, sec, and 1.
+    """
+    acceleration = np.asarray(acceleration, dtype=float)
+    periods, damping = np.broadcast_arrays(
+        np.asarray(periods, dtype=float), np.asarray(damping, dtype=float)
+    )
+    num_sub = np.broadcast_to(_num_substeps(dt, max_time_step), periods.shape)
+    num_disp, num_vel, den = sdof_filter_coefficients(periods, damping, dt / num_sub)
+    fine_records = dict()  # noqa: C408
+    for index in np.ndindex(periods.shape):
+        if num_sub[index] not in fine_records:
+            fine_records[num_sub[index]] = _subdivide_steps(
+                acceleration, num_sub[index]
+            )
+        fine = fine_records[num_sub[index]]
+        first = fine[..., :1]
+        zero = np.zeros_like(first)
+        # initial filter state such that the oscillator starts at rest
+        disp = lfilter(
+            num_disp[index],
+            den[index],
+            fine,
+            zi=np.concatenate([-num_disp[index][0] * first, zero], axis=-1),
+        )[0]
+        vel = lfilter(
+            num_vel[index],
+            den[index],
+            fine,
+            zi=np.concatenate([-num_vel[index][0] * first, zero], axis=-1),
+        )[0]
+        omega = 2.0 * np.pi / periods[index]
+        abs_acc = -(2.0 * damping[index] * omega * vel + omega**2 * disp)
+        yield index, disp, vel, abs_acc
+
+
+def response_spectrum(
+    acceleration,
+    dt,
+    periods,
+    damping=0.05,
+    num_steps=None,
+    max_time_step=None,
+):
+    """
+    Compute the response spectra of a batch of ground acceleration records.
+
+    Parameters
+    ----------
+    acceleration : array_like
+        Ground acceleration histories of shape (..., num_steps), padded at
+        the end if the records have different lengths.
+    dt : float
+        Time step of the ground acceleration (sec).
+    periods : array_like
+        1D array of oscillator periods (sec).
+    damping : float or array_like, optional
+        Damping ratio(s) (default 0.05).
+    num_steps : array_like, optional
+        Number of valid steps of each record, of shape acceleration.shape[:-1].
+        Records are assumed to span the full time axis if not given.
+    max_time_step : float or array_like, optional
+        Maximum interval between the instants at which the peak responses
+        are searched, scalar or one value per period (see `sdof_responses`).
+
+    Returns
+    -------
+    disp, vel, abs_acc : numpy.ndarray
+        Peak relative displacement, relative velocity, and absolute
+        acceleration of shape acceleration.shape[:-1] + np.shape(damping)
+        + (len(periods),).
+    """
+    acceleration = np.asarray(acceleration, dtype=float)
+    periods = np.atleast_1d(np.asarray(periods, dtype=float))
+    damping = np.asarray(damping, dtype=float)
+    grid_periods = np.broadcast_to(periods, damping.shape + periods.shape)
+    grid_damping = np.broadcast_to(damping[..., np.newaxis], grid_periods.shape)
+    grid_num_sub = np.broadcast_to(_num_substeps(dt, max_time_step), periods.shape)
+    grid_num_sub = np.broadcast_to(grid_num_sub, grid_periods.shape)
+
+    if num_steps is not None and np.all(
+        np.asarray(num_steps) >= acceleration.shape[-1]
+    ):
+        num_steps = None
+
+    out_shape = acceleration.shape[:-1] + grid_periods.shape
+    peaks = [np.zeros(out_shape) for _ in range(3)]
+    for index, *histories in sdof_responses(
+        acceleration, dt, grid_periods, grid_damping, dt / grid_num_sub
+    ):
+        valid = None
+        if num_steps is not None:
+            last = (np.asarray(num_steps) - 1) * grid_num_sub[index]
+            valid = np.arange(histories[0].shape[-1]) <= last[..., np.newaxis]
+        for peak, history in zip(peaks, histories):
+            history = np.fabs(history)  # noqa: PLW2901
+            if valid is not None:
+                history[~valid] = 0.0
+            peak[(Ellipsis, *index)] = np.max(history, axis=-1)
+    return tuple(peaks)
+
+
 class IntensityMeasureComputer:  # noqa: D101
     def __init__(self, time_hist_dict=dict(), units=dict(), ampScaled=False):  # noqa: FBT002, B006, C408, ARG002, N803
         self.time_hist_dict = time_hist_dict
         self.units = units
         self._define_constants()
+        # peak SDOF responses by (damping, dt_disc, period), shared by the
+        # response spectrum and SaRatio
+        self._peak_responses = dict()  # noqa: C408
 
         # convert acc
         if 'acceleration' in list(units.keys()):
@@ -344,63 +581,10 @@ class IntensityMeasureComputer:  # noqa: D101
         elif type(periods) == list:  # noqa: RET505, E721
             periods = np.array(periods)
 
-        for cur_hist_name, cur_hist in self.time_hist_dict.items():
-            dt = cur_hist[1]
-            ground_acc = cur_hist[2]
-            num_steps = len(ground_acc)
-            # discretize
-            dt_disc = 0.005
-            num_steps_disc = int(np.floor(num_steps * dt / dt_disc))
-            f = interp1d(
-                [dt * x for x in range(num_steps)],
-                ground_acc,
-                bounds_error=False,
-                fill_value=(ground_acc[0], ground_acc[-1]),
-            )
-            tmp_time = [dt_disc * x for x in range(num_steps_disc)]
-            ground_acc = f(tmp_time)
-
-            # circular frequency, damping, and stiffness terms
-            omega = (2.0 * np.pi) / periods
-            cval = damping * 2.0 * omega
-            kval = ((2.0 * np.pi) / periods) ** 2
-            denom = 1.0 + 0.5 * dt_disc * cval + 0.25 * (dt_disc**2) * kval
-
-            # state vectors (length = num_periods)
-            accel = np.zeros_like(omega)
-            vel = np.zeros_like(omega)
-            disp = np.zeros_like(omega)
-
-            # rolling maxima for spectra
-            max_disp = np.zeros_like(omega)
-            max_vel = np.zeros_like(omega)
-            max_at = np.zeros_like(omega)
-
-            # Newmark-Beta
-            accel[:] = -ground_acc[0] - (cval * vel) - (kval * disp)
-            for j in range(1, num_steps_disc):
-                delta_acc = ground_acc[j] - ground_acc[j - 1]
-                delta_d2u = (
-                    -delta_acc
-                    - dt_disc * cval * accel
-                    - dt_disc * kval * (vel + 0.5 * dt_disc * accel)
-                ) / denom
-                delta_du = dt_disc * accel + 0.5 * dt_disc * delta_d2u
-                delta_u = (
-                    dt_disc * vel
-                    + 0.5 * dt_disc**2 * accel
-                    + 0.25 * dt_disc**2 * delta_d2u
-                )
-                accel += delta_d2u
-                vel += delta_du
-                disp += delta_u
-                a_t = ground_acc[j] + accel
-
-                # update rolling maxima in-place
-                np.maximum(np.fabs(disp), max_disp, out=max_disp)
-                np.maximum(np.fabs(vel), max_vel, out=max_vel)
-                np.maximum(np.fabs(a_t), max_at, out=max_at)
+        omega = (2.0 * np.pi) / periods
+        spectra = self._compute_peak_responses(periods, damping)
 
+        for cur_hist_name, (max_disp, max_vel, max_at) in spectra.items():
             # collect data
             self.disp_spectrum.update(
                 {cur_hist_name: np.ndarray.tolist(unit_factor_psd * max_disp)}
@@ -431,6 +615,59 @@ class IntensityMeasureComputer:  # noqa: D101
             )
             self.periods.update({cur_hist_name: periods.tolist()})
 
+    def _compute_peak_responses(self, periods, damping, dt_disc=0.005):
+        # peak SDOF responses of all records (cm, cm/sec, cm/sec/sec); only
+        # the periods that were not computed before are integrated
+        keys = [(damping, dt_disc, round(float(x), 10)) for x in periods]
+        new_periods = dict()  # noqa: C408
+        for key, period in zip(keys, periods):
+            if key not in self._peak_responses:
+                new_periods.setdefault(key, period)
+        if len(new_periods) > 0:
+            spectra = self._integrate_peak_responses(
+                np.array(list(new_periods.values())), damping, dt_disc
+            )
+            for j, key in enumerate(new_periods):
+                self._peak_responses[key] = {
+                    cur_hist_name: tuple(peak[j] for peak in peaks)
+                    for cur_hist_name, peaks in spectra.items()
+                }
+        return {
+            cur_hist_name: tuple(
+                np.array(
+                    [self._peak_responses[key][cur_hist_name][k] for key in keys]
+                )
+                for k in range(3)
+            )
+            for cur_hist_name in self.time_hist_dict
+        }
+
+    def _integrate_peak_responses(self, periods, damping, dt_disc):
+        # peak SDOF responses of all records, batched over records that
+        # share a time step; the peaks are searched at least every dt_disc
+        # and 50 times per oscillator period
+        records_by_dt = dict()  # noqa: C408
+        for cur_hist_name, cur_hist in self.time_hist_dict.items():
+            records_by_dt.setdefault(cur_hist[1], []).append(cur_hist_name)
+
+        spectra = dict()  # noqa: C408
+        for dt, hist_names in records_by_dt.items():
+            num_steps = [len(self.time_hist_dict[x][2]) for x in hist_names]
+            ground_acc = np.zeros((len(hist_names), max(num_steps)))
+            for i, cur_hist_name in enumerate(hist_names):
+                ground_acc[i, : num_steps[i]] = self.time_hist_dict[cur_hist_name][2]
+            max_disp, max_vel, max_at = response_spectrum(
+                ground_acc,
+                dt,
+                periods,
+                damping=damping,
+                num_steps=num_steps,
+                max_time_step=np.minimum(dt_disc, np.asarray(periods) / 50.0),
+            )
+            for i, cur_hist_name in enumerate(hist_names):
+                spectra[cur_hist_name] = (max_disp[i], max_vel[i], max_at[i])
+        return spectra
+
     def compute_peak_ground_responses(self, im_units=dict()):  # noqa: B006, C408, D102
         if len(im_units) == 0:
             unit_factor_pga = 1.0
@@ -520,7 +757,14 @@ class IntensityMeasureComputer:  # noqa: D101
         # return
         return ds575, ds595
 
-    def compute_saratio(self, T1=1.0, Ta=0.02, Tb=3.0, im_units=dict()):  # noqa: B006, C408, N803, D102
+    def compute_saratio(  # noqa: D102
+        self,
+        T1=1.0,  # noqa: N803
+        Ta=0.02,  # noqa: N803
+        Tb=3.0,  # noqa: N803
+        damping=0.05,
+        im_units=dict(),  # noqa: B006, C408
+    ):
         if len(self.psa) == 0:
             return
 
@@ -535,17 +779,15 @@ class IntensityMeasureComputer:  # noqa: D101
         period_list = [0.01 * x for x in range(1500)]
         period_list = [x for x in period_list if x <= Tb and x >= Ta]
 
-        for cur_hist_name, cur_hist in self.time_hist_dict.items():  # noqa: B007, PERF102
-            cur_psa = self.psa.get(cur_hist_name, None)
-            cur_periods = self.periods.get(cur_hist_name, None)
-            if (cur_psa is None) or (cur_periods is None):
-                # put zero if the psa is empty
-                self.saratio.update({cur_hist_name: 0.0})
-            else:
-                f = interp1d(cur_periods, cur_psa)
-                self.saratio.update(
-                    {cur_hist_name: f(T1) / gmean(f(period_list)) * unit_factor}
-                )
+        # spectral accelerations at T1 and over the period list, reusing the
+        # peaks of the response spectrum at the periods it shares
+        periods = np.array([T1, *period_list])
+        spectra = self._compute_peak_responses(periods, damping)
+        for cur_hist_name, (max_disp, _, _) in spectra.items():
+            cur_psa = (2.0 * np.pi / periods) ** 2 * max_disp
+            self.saratio.update(
+                {cur_hist_name: cur_psa[0] / gmean(cur_psa[1:]) * unit_factor}
+            )
 
 
 def load_records(event_file, ampScaled):  # noqa: N803, D103
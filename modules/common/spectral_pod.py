@@ -0,0 +1,193 @@
+#  # noqa: INP001
+# Copyright (c) 2018 Leland Stanford Junior University
+# Copyright (c) 2018 The Regents of the University of California
+#
+# This file is part of the SimCenter Backend Applications
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# You should have received a copy of the BSD 3-Clause License along with
+# this file. If not, see <http://www.opensource.org/licenses/>.
+#
+
+"""Cross power spectral density and spectral proper orthogonal decomposition.
+
+Shared by the experimental wind pressure and wind force event generators.
+The Welch segments of every component are windowed and transformed once,
+and the cross power spectral density (CPSD) of all component pairs is formed
+by a batched matrix product of the segment spectra. The leading modes of the
+CPSD matrices are computed with a Hermitian eigensolver.
+"""
+
+import numpy as np
+from scipy import linalg
+from scipy.signal import windows
+
+# Maximum size (in bytes) of the block of CPSD matrices formed at once
+CPSD_BLOCK_BYTES = 2**28
+
+
+def welch_segment_spectra(components, wind_size, nover, nfft, fs):
+    """Compute the scaled spectra of the Welch segments of all components.
+
+    The segments are detrended (mean removed), multiplied by a Hann window
+    and zero padded to nfft points as in scipy.signal.csd. The spectra are
+    scaled such that the CPSD of components i and j at frequency k is
+    sum(conj(spectra[k, :, i]) * spectra[k, :, j]).
+
+    Parameters
+    ----------
+    components : numpy.ndarray
+        Time series of shape (#time step, #component).
+    wind_size : float
+        Number of time steps of the window (segment length).
+    nover : float
+        Number of overlapping time steps between segments.
+    nfft : int
+        Length of the FFT.
+    fs : float
+        Sampling frequency.
+
+    Returns
+    -------
+    spectra : numpy.ndarray
+        Scaled spectra of shape (#frequency, #segment, #component).
+    f_target : numpy.ndarray
+        Frequencies.
+    """
+    window = windows.hann(int(wind_size))
+    nperseg = len(window)
+    step = nperseg - int(nover)
+    num_segments = (components.shape[0] - nperseg) // step + 1
+
+    # windowed segments (#segment, #time step, #component)
+    segments = components[
+        np.arange(num_segments)[:, np.newaxis] * step + np.arange(nperseg)
+    ]
+    segments = segments - np.mean(segments, axis=1, keepdims=True)
+    segments *= window[:, np.newaxis]
+    spectra = np.fft.rfft(segments, n=int(nfft), axis=1)
+    f_target = np.fft.rfftfreq(int(nfft), 1 / fs)
+
+    # one-sided power spectral density averaged over the segments
+    scale = np.full(len(f_target), 2.0 / (fs * np.sum(window**2) * num_segments))
+    scale[0] /= 2
+    if int(nfft) % 2 == 0:
+        scale[-1] /= 2
+    spectra *= np.sqrt(scale)[:, np.newaxis]
+
+    return np.ascontiguousarray(spectra.transpose(1, 0, 2)), f_target
+
+
+def cross_power_spectral_density(components, wind_size, nover, nfft, fs):
+    """Compute the CPSD matrix of all pairs of components.
+
+    Equivalent to scipy.signal.csd of every pair of components with a Hann
+    window, but each component is transformed only once.
+
+    Parameters
+    ----------
+    components : numpy.ndarray
+        Time series of shape (#time step, #component).
+    wind_size : float
+        Number of time steps of the window (segment length).
+    nover : float
+        Number of overlapping time steps between segments.
+    nfft : int
+        Length of the FFT.
+    fs : float
+        Sampling frequency.
+
+    Returns
+    -------
+    s_target : numpy.ndarray
+        CPSD of shape (#component, #component, #frequency).
+    f_target : numpy.ndarray
+        Frequencies.
+    """
+    spectra, f_target = welch_segment_spectra(components, wind_size, nover, nfft, fs)
+    num_freqs, _, ncomp = spectra.shape
+
+    s_target = np.zeros((ncomp, ncomp, num_freqs), dtype=complex)
+    block_size = max(1, CPSD_BLOCK_BYTES // (16 * ncomp**2))
+    for start in range(0, num_freqs, block_size):
+        block = spectra[start : start + block_size]
+        s_target[:, :, start : start + block_size] = np.moveaxis(
+            np.matmul(block.conj().transpose(0, 2, 1), block), 0, 2
+        )
+
+    return s_target, f_target
+
+
+def proper_orthogonal_decomposition(s_target, l_mo):
+    """Compute the leading modes of the CPSD matrix at every frequency.
+
+    The CPSD matrices are Hermitian, so only their l_mo largest eigenvalues
+    and eigenvectors are computed. The eigenvectors are normalized as in
+    numpy.linalg.eig (unit norm, largest component real and positive).
+
+    Parameters
+    ----------
+    s_target : numpy.ndarray
+        CPSD of shape (#component, #component, #frequency).
+    l_mo : int
+        Number of modes.
+
+    Returns
+    -------
+    V : numpy.ndarray
+        Eigenvectors of shape (#component, l_mo, #frequency), in descending
+        order of the eigenvalues.
+    D1 : numpy.ndarray
+        Eigenvalues of shape (l_mo, 1, #frequency).
+    SpeN : int
+        Number of frequencies.
+    """
+    ncomp = s_target.shape[0]
+    SpeN = s_target.shape[2]  # noqa: N806
+
+    V = np.zeros((ncomp, l_mo, SpeN), dtype=complex)  # noqa: N806
+    D1 = np.zeros((l_mo, 1, SpeN))  # noqa: N806
+    if l_mo == 0:
+        return V, D1, SpeN
+
+    for ii in range(SpeN):
+        eigenvalues, eigenvectors = linalg.eigh(
+            s_target[:, :, ii],
+            subset_by_index=[ncomp - l_mo, ncomp - 1],
+            check_finite=False,
+        )
+        # rotate the phase of each eigenvector to make its largest component
+        # real and positive
+        largest = eigenvectors[
+            np.argmax(np.abs(eigenvectors), axis=0), np.arange(l_mo)
+        ]
+        eigenvectors *= np.conj(largest) / np.abs(largest)
+        V[:, :, ii] = eigenvectors[:, ::-1]
+        D1[:, 0, ii] = eigenvalues[::-1]
+
+    return V, D1, SpeN
@@ -0,0 +1,100 @@
+"""Regression tests of spectral_pod against the SciPy and NumPy routines it replaces.
+
+Run with ``python -m pytest modules/common/test_spectral_pod.py``.
+"""  # noqa: INP001
+
+import numpy as np
+import pytest
+from scipy.signal import csd, windows
+from spectral_pod import (
+    cross_power_spectral_density,
+    proper_orthogonal_decomposition,
+)
+
+WIND_SIZE = 256
+NOVER = 128
+NFFT = 300
+FS = 20.0
+
+
+@pytest.fixture
+def components():
+    """Correlated time series of shape (#time step, #component)."""
+    rng = np.random.default_rng(2024)
+    white_noise = rng.standard_normal((4000, 6))
+    mixing = rng.standard_normal((6, 6))
+    return white_noise @ mixing + np.linspace(0.0, 1.0, 6)
+
+
+def test_cpsd_matches_scipy_csd(components):
+    """The CPSD of every pair matches scipy.signal.csd with a Hann window."""
+    s_target, f_target = cross_power_spectral_density(
+        components, WIND_SIZE, NOVER, NFFT, FS
+    )
+    ncomp = components.shape[1]
+    assert s_target.shape == (ncomp, ncomp, NFFT // 2 + 1)
+    for i in range(ncomp):
+        for j in range(ncomp):
+            f_ref, s_ref = csd(
+                components[:, i],
+                components[:, j],
+                window=windows.hann(WIND_SIZE),
+                noverlap=NOVER,
+                nfft=NFFT,
+                fs=FS,
+            )
+            np.testing.assert_allclose(f_target, f_ref)
+            np.testing.assert_allclose(
+                s_target[i, j], s_ref, rtol=1e-10, atol=1e-12 * np.abs(s_ref).max()
+            )
+
+
+def test_pod_matches_numpy_eig(components):
+    """The leading modes match numpy.linalg.eig of every CPSD matrix."""
+    s_target, _ = cross_power_spectral_density(
+        components, WIND_SIZE, NOVER, NFFT, FS
+    )
+    l_mo = 3
+    V, D1, SpeN = proper_orthogonal_decomposition(s_target, l_mo)  # noqa: N806
+    assert SpeN == s_target.shape[2]
+    assert V.shape == (s_target.shape[0], l_mo, SpeN)
+    assert D1.shape == (l_mo, 1, SpeN)
+
+    for ii in range(SpeN):
+        eigenvalues, eigenvectors = np.linalg.eig(s_target[:, :, ii])
+        order = np.argsort(eigenvalues.real)[::-1][:l_mo]
+        np.testing.assert_allclose(
+            D1[:, 0, ii],
+            eigenvalues.real[order],
+            rtol=1e-8,
+            atol=1e-12 * np.abs(eigenvalues).max(),
+        )
+        # numpy.linalg.eig fixes the phase of each eigenvector arbitrarily,
+        # so only the unit norm and the spanned direction are compared
+        np.testing.assert_allclose(np.linalg.norm(V[:, :, ii], axis=0), 1.0)
+        overlap = np.abs(
+            np.sum(np.conj(eigenvectors[:, order]) * V[:, :, ii], axis=0)
+        )
+        np.testing.assert_allclose(overlap, 1.0, rtol=1e-6)
+
+
+def test_pod_largest_component_is_real_and_positive(components):
+    """Each mode is rotated to make its largest component real and positive."""
+    s_target, _ = cross_power_spectral_density(
+        components, WIND_SIZE, NOVER, NFFT, FS
+    )
+    V, _, SpeN = proper_orthogonal_decomposition(s_target, 2)  # noqa: N806
+    for ii in range(SpeN):
+        largest = V[np.argmax(np.abs(V[:, :, ii]), axis=0), np.arange(2), ii]
+        np.testing.assert_allclose(largest.imag, 0.0, atol=1e-12)
+        assert np.all(largest.real > 0)
+
+
+def test_pod_without_modes(components):
+    """Zero modes give empty eigenvectors and eigenvalues."""
+    s_target, _ = cross_power_spectral_density(
+        components, WIND_SIZE, NOVER, NFFT, FS
+    )
+    V, D1, SpeN = proper_orthogonal_decomposition(s_target, 0)  # noqa: N806
+    assert V.shape == (s_target.shape[0], 0, SpeN)
+    assert D1.shape == (0, 1, SpeN)
@@ -2,6 +2,10 @@ import json  # noqa: INP001, D100
 import os
 import sys
 import time
+from pathlib import Path
+
+# import the shared spectral methods
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'common'))
 
 try:
     moduleName = 'numpy'  # noqa: N816
@@ -9,7 +13,10 @@ try:
 
     moduleName = 'scipy'  # noqa: N816
     from scipy.interpolate import interp1d
-    from scipy.signal import csd, windows
+    from spectral_pod import (
+        cross_power_spectral_density,
+        proper_orthogonal_decomposition,
+    )
 
     error_tag = False  # global variable
 except:  # noqa: E722
@@ -224,7 +231,7 @@ def main(aimName, evtName, getRV):  # noqa: C901, N803, D103, PLR0915
     #
 
     if (case == 'timeHistory') or (case == 'spectra'):  # noqa: PLR1714
-        V, D1, SpeN = perform_POD(s_target, f_target, ncomp, l_mo)  # noqa: N806
+        V, D1, SpeN = proper_orthogonal_decomposition(s_target, l_mo)  # noqa: N806
 
         if getRV:
             #    # let us overwrite the json file.
@@ -437,37 +444,6 @@ def main(aimName, evtName, getRV):  # noqa: C901, N803, D103, PLR0915
     """
 
 
-def perform_POD(s_target, f_target, ncomp, l_mo):  # noqa: N802, D103
-    S_F = s_target[:, :, 0:]  # do not exclude freq = 0 Hz  # noqa: N806
-    f_full = f_target[0:]  # do not exclude freq = 0 Hz
-
-    SpeN = f_full.shape[0]  # exclude freq = 0 Hz  # noqa: N806
-
-    Vs = np.zeros((ncomp, ncomp, SpeN), dtype='complex_')  # noqa: N806
-    Ds = np.zeros((ncomp, ncomp, SpeN))  # noqa: N806
-
-    for ii in range(
-        SpeN
-    ):  # eigen - decomposition at every frequency of CPSD matrix and sort them
-        [D_all, V_all] = np.linalg.eig(S_F[:, :, ii])  # noqa: N806
-        ind = np.argsort(D_all)
-        Ds[:, :, ii] = np.real(np.diag(D_all[ind]))
-        Vs[:, :, ii] = V_all[:, ind]
-
-    # Truncation
-    V = np.zeros((ncomp, l_mo, SpeN), dtype='complex_')  # noqa: N806
-    D0 = np.zeros((l_mo, l_mo, SpeN))  # noqa: N806
-    for tt in range(l_mo):
-        V[:, tt, :] = Vs[:, ncomp - 1 - tt, :]
-        D0[tt, tt, :] = Ds[ncomp - 1 - tt, ncomp - 1 - tt, :]
-
-    D1 = np.zeros((l_mo, 1, SpeN))  # noqa: N806
-    for ii in range(SpeN):
-        D1[:, 0, ii] = np.diag(D0[:, :, ii])
-
-    return V, D1, SpeN
-
-
 def learn_CPSD(  # noqa: N802, D103, PLR0913
     Fx,  # noqa: N803
     Fy,  # noqa: N803
@@ -527,10 +503,11 @@ def learn_CPSD(  # noqa: N802, D103, PLR0913
     N_t = round(T_full / dt)  # number of time points  # noqa: N806
     nfft = N_t
 
+    print('Training cross power spectrum density..')  # noqa: T201
     t_init = time.time()
     # [s_target,f_target] = cpsd(Components,Components,hanning(wind_size),nover,nfft,fp,'mimo');
-    s_target, f_target = cpsd_matlab(
-        Components, Components, wind_size, nover, nfft, fp
+    s_target, f_target = cross_power_spectral_density(
+        Components, wind_size, nover, nfft, fp
     )
 
     print(f' - Elapsed time: {time.time() - t_init:.3} seconds.\n')  # noqa: T201
@@ -538,30 +515,6 @@ def learn_CPSD(  # noqa: N802, D103, PLR0913
     return s_target, f_target, norm_all, comp_CFmean, Fx_full, Fy_full, Tz_full
 
 
-def cpsd_matlab(Components1, Components2, wind_size, nover, nfft, fp):  # noqa: N803, D103
-    window = windows.hann(int(wind_size))
-
-    ncombs1 = Components1.shape[1]
-    ncombs2 = Components2.shape[1]
-    nSampPoints = int(nfft / 2 + 1)  # noqa: N806
-    s_target = np.zeros((ncombs1, ncombs2, nSampPoints), dtype='complex_')
-
-    print('Training cross power spectrum density..')  # noqa: T201
-    for nc2 in range(ncombs2):
-        for nc1 in range(ncombs1):
-            [f_target, s_tmp] = csd(
-                Components1[:, nc1],
-                Components2[:, nc2],
-                window=window,
-                noverlap=nover,
-                nfft=nfft,
-                fs=fp,
-            )
-            s_target[nc1, nc2, :] = s_tmp  # *4/np.pi
-
-    return s_target, f_target
-
-
 def simulation_gaussian(  # noqa: D103, PLR0913
     ncomp,
     N_t,  # noqa: N803
@@ -2,6 +2,10 @@ import json  # noqa: INP001, D100
 import os
 import sys
 import time
+from pathlib import Path
+
+# import the shared spectral methods
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'common'))
 
 try:
     moduleName = 'numpy'  # noqa: N816
@@ -10,8 +14,12 @@ try:
     moduleName = 'scipy'  # noqa: N816
     from scipy import interpolate
     from scipy.interpolate import interp1d
-    from scipy.signal import butter, csd, lfilter, windows
+    from scipy.signal import butter, lfilter
     from scipy.stats import gaussian_kde, genpareto, norm
+    from spectral_pod import (
+        cross_power_spectral_density,
+        proper_orthogonal_decomposition,
+    )
 
     error_tag = False  # global variable
 except:  # noqa: E722
@@ -60,9 +68,6 @@ def main(aimName, evtName, getRV):  # noqa: C901, N803, D103, PLR0915
         'windowSize'
     ]  # 4, window size/duration (sec) - smaller window leads to more smoothing - model scale
     overlap = evt_data['overlapPerc'] / 100  # 0.5   , 50% overlap - user defined
-    gg = evt_data[
-        'cpsdGroupSize'
-    ]  # 5 , User defined: variable that subdivides the CPSD matrix into ggxgg "groups" in order to avoid running out of memory
 
     ms = evt_data.get('modelScale', 0)  # model scale
 
@@ -225,51 +230,22 @@ def main(aimName, evtName, getRV):  # noqa: C901, N803, D103, PLR0915
         # Learning CPSD only if needed
         #
 
-        out = np.mod(tap, gg)
-        c = (tap - out) / gg
-        d = np.arange(0, c + 1, dtype=int) * int(gg)
-        if out > 0:
-            d = np.concatenate([d, np.array([d[-1] + out])])
-
-        # TODO: dealing with gpuArray, gather  # noqa: TD002
-        nSampPoints = int(nfft / 2 + 1)  # noqa: N806
-        s_target = np.zeros(
-            (len(selected_taps), len(selected_taps), nSampPoints), dtype='complex_'
-        )
-        startTime = time.time()  # noqa: N806, F841
-        # TODO: works only if the selected taps are is continuous  # noqa: TD002
-        selected_taps_tmp = np.concatenate(
-            [selected_taps, [selected_taps[-1] + 1]]
-        )  # zero is dummy that will not appear in the analysis
+        if nfft < 2500:  # noqa: PLR2004
+            print('ERROR: time series is too short. Please put a longer duration')  # noqa: T201
+            exit(-1)  # noqa: PLR1722
 
         print('Training cross power spectrum density..')  # noqa: T201
         t_init = time.time()
 
-        nloop = (len(d) - 1) * (len(d) - 1)
-        for i in range(1, len(d)):
-            for j in range(1, len(d)):
-                if np.mod((i - 1) * (len(d) - 1) + j, round(nloop / 10)) == 0:
-                    print(  # noqa: T201
-                        f'{((i - 1) * (len(d) - 1) + j) / nloop * 100:.0f} % completed'
-                    )
-
-                kk = np.arange(d[i - 1], d[i])
-                ll = np.arange(d[j - 1], d[j])
-                # ii = np.arange(selected_taps_tmp[d[i-1]],selected_taps_tmp[d[i]])
-                # jj = np.arange(selected_taps_tmp[d[j-1]],selected_taps_tmp[d[j]])
-                ii = selected_taps_tmp[kk]
-                jj = selected_taps_tmp[ll]
-
-                [s, f_target] = cpsd_matlab(
-                    Cp_norm[:, ii - 1],
-                    Cp_norm[:, jj - 1],
-                    wind_size,
-                    nover,
-                    nfft,
-                    fp,
-                )  # -1 because tab1 is at column 0
-                # cpsd_all[kk,ll] = s
-                s_target[d[i - 1] : d[i], d[j - 1] : d[j]] = s
+        # each tap is transformed once and the CPSD of all pairs of taps is
+        # formed in blocks of frequencies
+        [s_target, f_target] = cross_power_spectral_density(
+            Cp_norm[:, selected_taps - 1],
+            wind_size,
+            nover,
+            nfft,
+            fp,
+        )  # -1 because tab1 is at column 0
 
         print(f' - Elapsed time: {time.time() - t_init:.1f} seconds.\n')  # noqa: T201
 
@@ -280,7 +256,7 @@ def main(aimName, evtName, getRV):  # noqa: C901, N803, D103, PLR0915
         t_init = time.time()
 
         # Spectral Proper Orthogonal Decomposition
-        V, D1, SpeN = perform_POD(s_target, f_target, tap, l_mo, pool)  # noqa: N806
+        V, D1, SpeN = proper_orthogonal_decomposition(s_target, l_mo)  # noqa: N806
         print(f' - Elapsed time: {time.time() - t_init:.1f} seconds.\n')  # noqa: T201
 
         #
@@ -782,80 +758,6 @@ def paretotails_icdf(pf, nl, nu, temp, my_cdf_vect, my_cdf_x):  # noqa: D103
     return kernel, gpareto_param_lower, gpareto_param_upper  # noqa: F405
 
 
-def cpsd_matlab(Components1, Components2, wind_size, nover, nfft, fp):  # noqa: N803, D103
-    window = windows.hann(int(wind_size))
-
-    ncombs1 = Components1.shape[1]
-    ncombs2 = Components2.shape[1]
-    nSampPoints = int(nfft / 2 + 1)  # noqa: N806
-
-    if nfft < 2500:  # noqa: PLR2004
-        print('ERROR: time series is too short. Please put a longer duration')  # noqa: T201
-        exit(-1)  # noqa: PLR1722
-
-    s_target = np.zeros((ncombs1, ncombs2, nSampPoints), dtype='complex_')
-
-    for nc2 in range(ncombs2):
-        for nc1 in range(ncombs1):
-            [f_target, s_tmp] = csd(
-                Components1[:, nc1],
-                Components2[:, nc2],
-                window=window,
-                noverlap=nover,
-                nfft=nfft,
-                fs=fp,
-            )
-            s_target[nc1, nc2, :] = s_tmp  # *4/np.pi
-
-    return s_target, f_target
-
-
-def perform_POD(s_target, f_target, ncomp, l_mo, pool):  # noqa: N802, D103
-    S_F = s_target[:, :, 0:]  # do not exclude freq = 0 Hz  # noqa: N806
-    f_full = f_target[0:]  # do not exclude freq = 0 Hz
-
-    SpeN = f_full.shape[0]  # exclude freq = 0 Hz  # noqa: N806
-
-    Vs = np.zeros((ncomp, ncomp, SpeN), dtype='complex_')  # noqa: N806
-    Ds = np.zeros((ncomp, ncomp, SpeN))  # noqa: N806
-
-    #
-    # eigenvalue analysis in parallel
-    #
-    iterables = ((S_F[:, :, ii],) for ii in range(SpeN))
-    try:
-        result_objs = list(pool.starmap(np.linalg.eig, iterables))
-    except MemoryError:
-        err_exit('Low memory performing POD')
-
-    except KeyboardInterrupt:
-        print('Ctrl+c received, terminating and joining pool.')  # noqa: T201
-        try:
-            self.pool.shutdown()  # noqa: F405
-        except Exception:  # noqa: BLE001
-            sys.exit()
-
-    for ii in range(SpeN):
-        D_all = result_objs[ii][0]  # noqa: N806
-        V_all = result_objs[ii][1]  # noqa: N806
-        ind = np.argsort(D_all)
-        Ds[:, :, ii] = np.real(np.diag(D_all[ind]))
-        Vs[:, :, ii] = V_all[:, ind]
-
-    # Truncation
-    V = np.zeros((ncomp, l_mo, SpeN), dtype='complex_')  # noqa: N806
-    D0 = np.zeros((l_mo, l_mo, SpeN))  # noqa: N806
-    for tt in range(l_mo):
-        V[:, tt, :] = Vs[:, ncomp - 1 - tt, :]
-        D0[tt, tt, :] = Ds[ncomp - 1 - tt, ncomp - 1 - tt, :]
-
-    D1 = np.zeros((l_mo, 1, SpeN))  # noqa: N806
-    for ii in range(SpeN):
-        D1[:, 0, ii] = np.diag(D0[:, :, ii])
-
-    return V, D1, SpeN
-
-
 def simulation_gaussian(  # noqa: D103, PLR0913
     ncomp,
     N_t,  # noqa: N803
@@ -0,0 +1,349 @@
+"""Portable format of the GP surrogates and a NumPy predictor that reads it."""  # noqa: INP001
+
+# A trained surrogate is saved as a directory with a model.json file and one
+# .npy file per array: the training inputs, the Woodbury vector and the
+# Cholesky factor of the posterior of every GP. The arrays are memory-mapped
+# when the surrogate is loaded, and the predictions only need NumPy and
+# SciPy, so GPy does not have to be imported to use the surrogate.
+
+import hashlib
+import json
+import os
+
+import numpy as np
+from scipy.linalg import lapack
+
+PORTABLE_FORMAT_VERSION = 1
+PORTABLE_MODEL_FILE = 'model.json'
+
+# keys of the surrogate information that the portable model depends on
+_FINGERPRINT_KEYS = [
+    'doStochastic',
+    'doLogtransform',
+    'doNormalization',
+    'doLinear',
+    'doMultiFidelity',
+    'kernName',
+    'xlabels',
+    'ylabels',
+    'xExact',
+    'yExact',
+    'highFidelityInfo',
+    'modelInfo',
+]
+
+
+class PortableGP:
+    """
+    Posterior of a GPy regression model, predicted with NumPy.
+
+    Parameters
+    ----------
+    kernel : str
+        GPy name of the stationary kernel: rbf, Exponential, Mat32 or Mat52.
+    variance : float
+        Variance of the kernel.
+    lengthscale : np.ndarray
+        Lengthscale of each input, or a single lengthscale.
+    X : np.ndarray
+        Training inputs.
+    woodbury_vector : np.ndarray
+        Inverse of the training covariance times the normalized outputs.
+    woodbury_chol : np.ndarray
+        Lower Cholesky factor of the training covariance.
+    noise_var : float
+        Variance of the Gaussian likelihood.
+    norm_mean, norm_std : float, optional
+        Mean and standard deviation used to normalize the outputs.
+    ard : bool, optional
+        Whether the kernel has a lengthscale for each input.
+    """
+
+    def __init__(
+        self,
+        kernel,
+        variance,
+        lengthscale,
+        X,  # noqa: N803
+        woodbury_vector,
+        woodbury_chol,
+        noise_var,
+        norm_mean=0.0,
+        norm_std=1.0,
+        ard=True,  # noqa: FBT002
+    ):
+        if kernel not in ('rbf', 'Exponential', 'Mat32', 'Mat52'):
+            msg = f'Kernel {kernel} is not supported by the portable surrogate'
+            raise ValueError(msg)
+        self.kernel = kernel
+        self.variance = variance
+        self.lengthscale = np.asarray(lengthscale, dtype=float)
+        self.X = X
+        self.woodbury_vector = woodbury_vector
+        self.woodbury_chol = woodbury_chol
+        self.noise_var = noise_var
+        self.norm_mean = norm_mean
+        self.norm_std = norm_std
+        self.ard = ard
+
+    @classmethod
+    def from_gpy(cls, m):
+        """Read the posterior of a trained GPy regression model."""
+        if m.normalizer is None:
+            norm_mean, norm_std = 0.0, 1.0
+        else:
+            norm_mean = float(np.squeeze(m.normalizer.mean))
+            norm_std = float(np.squeeze(m.normalizer.std))
+        return cls(
+            m.kern.name,
+            float(np.squeeze(m.kern.variance)),
+            np.array(m.kern.lengthscale, dtype=float),
+            np.array(m.X, dtype=float),
+            np.array(m.posterior.woodbury_vector, dtype=float),
+            np.ascontiguousarray(m.posterior.woodbury_chol, dtype=float),
+            float(np.squeeze(m.likelihood.variance)),
+            norm_mean,
+            norm_std,
+            bool(m.kern.ARD),
+        )
+
+    def K(self, X):  # noqa: N802, N803
+        """Covariance between the training inputs and the rows of X."""
+        # same operations as GPy, including the column copies of its active
+        # dimensions, so the predictions match GPy to the last digit
+        active = np.arange(self.X.shape[1])
+        X1 = self.X[:, active].astype('float')  # noqa: N806
+        X2 = X[:, active].astype('float')  # noqa: N806
+        if self.ard:
+            X1 = X1 / self.lengthscale  # noqa: N806
+            X2 = X2 / self.lengthscale  # noqa: N806
+        X1sq = np.sum(np.square(X1), 1)  # noqa: N806
+        X2sq = np.sum(np.square(X2), 1)  # noqa: N806
+        r2 = -2.0 * np.dot(X1, X2.T) + (X1sq[:, None] + X2sq[None, :])
+        r = np.sqrt(np.clip(r2, 0, np.inf))
+        if not self.ard:
+            r = r / self.lengthscale
+        if self.kernel == 'rbf':
+            return self.variance * np.exp(-0.5 * r**2)
+        if self.kernel == 'Exponential':
+            return self.variance * np.exp(-r)
+        if self.kernel == 'Mat32':
+            return (
+                self.variance * (1.0 + np.sqrt(3.0) * r) * np.exp(-np.sqrt(3.0) * r)
+            )
+        return (
+            self.variance
+            * (1 + np.sqrt(5.0) * r + 5.0 / 3 * r**2)
+            * np.exp(-np.sqrt(5.0) * r)
+        )
+
+    def _raw_predict(self, X):  # noqa: N803
+        Kx = self.K(X)  # noqa: N806
+        mu = np.dot(Kx.T, self.woodbury_vector).reshape(-1, 1)
+        # the transpose of the C-ordered lower factor is an upper factor in
+        # Fortran order, so LAPACK reads the memory-mapped array without a copy
+        tmp = lapack.dtrtrs(self.woodbury_chol.T, Kx, lower=0, trans=1)[0]
+        var = (self.variance - np.square(tmp).sum(0))[:, None]
+        return mu, var
+
+    def predict_noiseless(self, X):  # noqa: N803
+        """Predict the mean and variance of the latent function at X."""
+        mu, var = self._raw_predict(X)
+        return mu * self.norm_std + self.norm_mean, var * self.norm_std**2
+
+    def predict(self, X):  # noqa: N803
+        """Predict the mean and variance of the observations at X."""
+        mu, var = self._raw_predict(X)
+        var = var + self.noise_var
+        return mu * self.norm_std + self.norm_mean, var * self.norm_std**2
+
+    def to_dict(self, array_prefix):
+        """Describe the GP in json, with the arrays saved under array_prefix."""
+        return {
+            'kernel': self.kernel,
+            'variance': self.variance,
+            'lengthscale': self.lengthscale.tolist(),
+            'noise_var': self.noise_var,
+            'norm_mean': self.norm_mean,
+            'norm_std': self.norm_std,
+            'ard': self.ard,
+            'arrays': array_prefix,
+        }
+
+    def save_arrays(self, path, array_prefix):
+        """Save the arrays of the GP as .npy files in path."""
+        for name in ('X', 'woodbury_vector', 'woodbury_chol'):
+            np.save(
+                os.path.join(path, f'{array_prefix}_{name}.npy'),  # noqa: PTH118
+                getattr(self, name),
+            )
+
+    @classmethod
+    def from_dict(cls, gp_dict, path, mmap_mode='r'):
+        """Load a GP described by to_dict from the directory path."""
+        arrays = [
+            np.load(
+                os.path.join(path, '{}_{}.npy'.format(gp_dict['arrays'], name)),  # noqa: PTH118
+                mmap_mode=mmap_mode,
+            )
+            for name in ('X', 'woodbury_vector', 'woodbury_chol')
+        ]
+        return cls(
+            gp_dict['kernel'],
+            gp_dict['variance'],
+            gp_dict['lengthscale'],
+            *arrays,
+            gp_dict['noise_var'],
+            gp_dict['norm_mean'],
+            gp_dict['norm_std'],
+            gp_dict['ard'],
+        )
+
+
+class PortableLinear:
+    """Linear trend of a surrogate output, the prediction of LinearRegression."""
+
+    def __init__(self, coef, intercept):
+        self.coef_ = np.asarray(coef, dtype=float)
+        self.intercept_ = float(intercept)
+
+    def predict(self, X):  # noqa: N803, D102
+        return X @ self.coef_ + self.intercept_
+
+
+def surrogate_fingerprint(sur):
+    """Hash of the surrogate information the portable model was built from."""
+    content = json.dumps(
+        {key: sur.get(key) for key in _FINGERPRINT_KEYS}, sort_keys=True
+    )
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()  # noqa: S324
+
+
+def save_portable_surrogate(surrogate, path, sur):
+    """
+    Save a surrogate in the portable format.
+
+    Parameters
+    ----------
+    surrogate : dict
+        Surrogate returned by gpPredict.load_surrogate.
+    path : str
+        Directory of the portable surrogate, created if needed.
+    sur : dict
+        Surrogate information the models were built from.
+    """
+    if surrogate['did_mf']:
+        msg = 'Multi-fidelity surrogates cannot be saved in the portable format'
+        raise ValueError(msg)
+
+    os.makedirs(path, exist_ok=True)  # noqa: PTH103
+    outputs = []
+    for ny in range(surrogate['y_dim']):
+        gp = PortableGP.from_gpy(surrogate['m_list'][ny])
+        gp.save_arrays(path, f'gp{ny}')
+        output = {'gp': gp.to_dict(f'gp{ny}'), 'nugget_var': None, 'var_field': None}
+
+        if surrogate['var_field_list'][ny] is None:
+            output['nugget_var'] = float(surrogate['nugget_var_list'][ny])
+        else:
+            m_var, var_norm_fact = surrogate['var_field_list'][ny]
+            noise_var, Y_normFact = surrogate['nugget_var_list'][ny]  # noqa: N806
+            var_gp = PortableGP.from_gpy(m_var)
+            var_gp.save_arrays(path, f'var{ny}')
+            output['var_field'] = {
+                'gp': var_gp.to_dict(f'var{ny}'),
+                'var_norm_fact': float(var_norm_fact),
+                'noise_var': float(np.squeeze(np.array(noise_var, dtype=float))),
+                'Y_normFact': float(Y_normFact),
+            }
+
+        if surrogate['lin_list'] is not None:
+            lin = surrogate['lin_list'][ny]
+            output['lin'] = {
+                'coef': np.atleast_1d(np.squeeze(lin.coef_)).tolist(),
+                'intercept': float(lin.intercept_),
+            }
+        outputs += [output]
+
+    model = {
+        'format': 'SimCenter portable GP surrogate',
+        'version': PORTABLE_FORMAT_VERSION,
+        'fingerprint': surrogate_fingerprint(sur),
+        'rv_names': surrogate['rv_names'],
+        'g_names': surrogate['g_names'],
+        'did_logtransform': bool(surrogate['did_logtransform']),
+        'constIdx': list(surrogate['constIdx']),
+        'constVal': list(surrogate['constVal']),
+        'y_data_var': np.asarray(surrogate['y_data_var'], dtype=float).tolist(),
+        'outputs': outputs,
+    }
+    with open(os.path.join(path, PORTABLE_MODEL_FILE), 'w', encoding='utf-8') as f:  # noqa: PTH118, PTH123
+        json.dump(model, f, indent=1)
+
+
+def load_portable_surrogate(path, sur=None, mmap_mode='r'):
+    """
+    Load a surrogate saved by save_portable_surrogate.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the portable surrogate.
+    sur : dict, optional
+        Surrogate information the models should have been built from. None
+        is returned when the portable surrogate was built from different
+        information.
+    mmap_mode : str, optional
+        Memory-map mode of the arrays, None to read them into memory.
+
+    Returns
+    -------
+    dict or None
+        Surrogate in the layout of gpPredict.load_surrogate, or None if the
+        directory does not hold a matching portable surrogate.
+    """
+    model_file = os.path.join(path, PORTABLE_MODEL_FILE)  # noqa: PTH118
+    if not os.path.isfile(model_file):  # noqa: PTH113
+        return None
+    with open(model_file, encoding='utf-8') as f:  # noqa: PTH123
+        model = json.load(f)
+    if model.get('version') != PORTABLE_FORMAT_VERSION:
+        return None
+    if sur is not None and model['fingerprint'] != surrogate_fingerprint(sur):
+        return None
+
+    m_list, nugget_var_list, var_field_list, lin_list = [], [], [], []
+    for output in model['outputs']:
+        m_list += [PortableGP.from_dict(output['gp'], path, mmap_mode)]
+        if output['var_field'] is None:
+            nugget_var_list += [output['nugget_var']]
+            var_field_list += [None]
+        else:
+            var_field = output['var_field']
+            nugget_var_list += [(var_field['noise_var'], var_field['Y_normFact'])]
+            var_field_list += [
+                (
+                    PortableGP.from_dict(var_field['gp'], path, mmap_mode),
+                    var_field['var_norm_fact'],
+                )
+            ]
+        if 'lin' in output:
+            lin_list += [
+                PortableLinear(output['lin']['coef'], output['lin']['intercept'])
+            ]
+
+    return {
+        'rv_names': model['rv_names'],
+        'g_names': model['g_names'],
+        'y_dim': len(m_list),
+        'm_list': m_list,
+        'nugget_var_list': nugget_var_list,
+        'var_field_list': var_field_list,
+        'lin_list': lin_list if len(lin_list) > 0 else None,
+        'lin_index': [True] * len(model['rv_names']),
+        'y_data_var': np.array(model['y_data_var']),
+        'did_logtransform': model['did_logtransform'],
+        'did_mf': False,
+        'constIdx': model['constIdx'],
+        'constVal': model['constVal'],
+    }
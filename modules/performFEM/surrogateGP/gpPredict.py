@@ -7,22 +7,15 @@ import sys
 import time
 
 import numpy as np
+from gpPortable import load_portable_surrogate
 from scipy.stats import lognorm, norm
 from sklearn.linear_model import LinearRegression
 
-# errFileName = os.path.join(os.getcwd(), 'workflow.err')  # noqa: N816, PTH109, PTH118
-# sys.stderr = open(errFileName, 'a')  # noqa: SIM115, PTH123
-
-try:
-    moduleName = 'GPy'  # noqa: N816
-    import GPy as GPy  # noqa: PLC0414
-except:  # noqa: E722
-    print(  # noqa: T201
-        'Error running surrogate prediction - Failed to import module: Surrogate modeling module uses GPy python package which is facing a version compatibility issue at this moment (01.05.2024). To use the surrogate module, one needs to update manually the GPy version to 1.13. The instruction can be found in the the documentation: https://nheri-simcenter.github.io/quoFEM-Documentation/common/user_manual/usage/desktop/SimCenterUQSurrogate.html#lblsimsurrogate',
-        file=sys.stderr,
-    )
-    exit(-1)  # noqa: PLR1722
+# errFileName = os.path.join(os.getcwd(), 'workflow.err')
+# sys.stderr = open(errFileName, 'a')
 
+# GPy is only needed to build the models of a surrogate that has no portable
+# copy, so a missing GPy is reported by load_surrogate
 try:
     moduleName = 'GPy'  # noqa: N816
     import GPy as GPy  # noqa: PLC0414
@@ -32,6 +25,11 @@ try:
         convert_x_list_to_array,
     )
 
+    gpy_error = None
+except:  # noqa: E722
+    gpy_error = moduleName
+
+try:
     moduleName = 'Pandas'  # noqa: N816
     import pandas as pd
 
@@ -109,32 +107,17 @@ def main(params_dir, surrogate_dir, json_dir, result_file, input_json):  # noqa:
             # current input file
             with open('sc_inputRWHALE.json') as f:  # noqa: PTH123
                 inp_tmp = json.load(f)
-        except:  # noqa: S110, E722
-            pass
-
-    try:
-        if isEEUQ or isWEUQ or isHydroUQ:
-            inp_fem = inp_tmp['Applications']['Modeling']
-        else:
-            inp_fem = inp_tmp['FEM']
-    except:  # noqa: E722
-        inp_fem = {}
-        print('invalid json format - dakota.json')  # noqa: T201
-
-    norm_var_thr = inp_fem.get('varThres', 0.02)
-    when_inaccurate = inp_fem.get('femOption', 'continue')
-    do_mf = False  # noqa: F841
-    myseed = inp_fem.get('gpSeed', None)
-    prediction_option = inp_fem.get('predictionOption', 'random')
-    if myseed == None:  # noqa: E711
-        try:
-            myseed = inp_tmp['UQ']['samplingMethodData']['seed']
         except:  # noqa: E722
-            myseed = 42
-        # folderName = os.path.basename(os.path.dirname(os.getcwd()))  # noqa: N806, PTH109, PTH119, PTH120, RUF100
-        # myseed = int(folderName) * int(1.0e7)
+            inp_tmp = {}
 
-    np.random.seed(int(myseed) + int(sampNum))
+    options = read_prediction_options(inp_tmp, isEEUQ or isWEUQ or isHydroUQ)
+    norm_var_thr = options['varThres']
+    when_inaccurate = options['femOption']
+    prediction_option = options['predictionOption']
+    # folderName = os.path.basename(os.path.dirname(os.getcwd()))  # noqa: N806, PTH109, PTH119, PTH120, RUF100
+    # myseed = int(folderName) * int(1.0e7)
+
+    np.random.seed(options['seed'] + int(sampNum))
 
     # if no g and rv,
 
@@ -144,198 +127,13 @@ def main(params_dir, surrogate_dir, json_dir, result_file, input_json):  # noqa:
 
     f.close()
 
-    did_stochastic = sur['doStochastic']
-    did_logtransform = sur['doLogtransform']
-    did_normalization = sur['doNormalization']
-    kernel = sur['kernName']
-
-    if kernel == 'Radial Basis':
-        kern_name = 'rbf'
-    elif kernel == 'Exponential':
-        kern_name = 'Exponential'
-    elif kernel == 'Matern 3/2':
-        kern_name = 'Mat32'
-    elif kernel == 'Matern 5/2':
-        kern_name = 'Mat52'  # noqa: F841
-    did_mf = sur['doMultiFidelity']
-
-    # from json
-    g_name_sur = list()  # noqa: C408
-    ng_sur = 0
-    Y = np.zeros((sur['highFidelityInfo']['valSamp'], sur['ydim']))  # noqa: N806
-    for g in sur['ylabels']:
-        g_name_sur += [g]
-        Y[:, ng_sur] = np.array(sur['yExact'][g])
-        ng_sur += 1
-
-    rv_name_sur = list()  # noqa: C408
-    nrv_sur = 0
-    X = np.zeros((sur['highFidelityInfo']['valSamp'], sur['xdim']))  # noqa: N806
-    for rv in sur['xlabels']:
-        rv_name_sur += [rv]
-        X[:, nrv_sur] = np.array(sur['xExact'][rv])
-        nrv_sur += 1
-
-    try:
-        constIdx = sur['highFidelityInfo']['constIdx']  # noqa: N806
-        constVal = sur['highFidelityInfo']['constVal']  # noqa: N806
-    except:  # noqa: E722
-        constIdx = []  # noqa: N806
-        constVal = []  # noqa: N806
-
-        # Read pickles
-
-    if did_stochastic:
-        #
-        # Modify GPy package
-        #
-        def monkeypatch_method(cls):
-            def decorator(func):
-                setattr(cls, func.__name__, func)
-                return func
-
-            return decorator
-
-        @monkeypatch_method(GPy.likelihoods.Gaussian)
-        def gaussian_variance(self, Y_metadata=None):  # noqa: N803
-            if Y_metadata is None:
-                return self.variance
-            else:  # noqa: RET505
-                return self.variance * Y_metadata['variance_structure']
-
-        @monkeypatch_method(GPy.core.GP)
-        def set_XY2(self, X=None, Y=None, Y_metadata=None):  # noqa: N802, N803
-            if Y_metadata is not None:
-                if self.Y_metadata is None:
-                    self.Y_metadata = Y_metadata
-                else:
-                    self.Y_metadata.update(Y_metadata)
-                    # print("metadata_updated")
-
-            self.set_XY(X, Y)
-
-        def get_stochastic_variance(X, Y, x, ny):  # noqa: C901, N803
-            # X_unique, X_idx, indices, counts = np.unique(X, axis=0, return_index=True, return_counts=True, return_inverse=True)
-            X_unique, dummy, indices, counts = np.unique(  # noqa: N806
-                X, axis=0, return_index=True, return_counts=True, return_inverse=True
-            )
-
-            idx_repl = [i for i in np.where(counts > 1)[0]]  # noqa: C416
-
-            if len(idx_repl) > 0:
-                n_unique = X_unique.shape[0]
-                Y_mean, Y_var = np.zeros((n_unique, 1)), np.zeros((n_unique, 1))  # noqa: N806
-
-                for idx in range(n_unique):
-                    Y_subset = Y[[i for i in np.where(indices == idx)[0]], :]  # noqa: C416, N806
-                    Y_mean[idx, :] = np.mean(Y_subset, axis=0)
-                    Y_var[idx, :] = np.var(Y_subset, axis=0)
-
-                if (np.max(Y_var) / np.var(Y_mean) < 1.0e-10) and len(idx_repl) > 0:  # noqa: PLR2004
-                    return np.ones((X.shape[0], 1))
-
-                # kernel_var = GPy.kern.Matern52(
-                #    input_dim=nrv_sur, ARD=True
-                # ) + GPy.kern.Linear(input_dim=nrv_sur, ARD=True)
-                kernel_var = GPy.kern.Matern52(input_dim=nrv_sur, ARD=True)
-                log_vars = np.log(Y_var[idx_repl])
-                m_var = GPy.models.GPRegression(
-                    X_unique[idx_repl, :],
-                    log_vars,
-                    kernel_var,
-                    normalizer=True,
-                    Y_metadata=None,
-                )
-                # print("Collecting variance field of ny={}".format(ny))
-                for key, val in sur['modelInfo'][g_name_sur[ny] + '_Var'].items():  # noqa: B007, PERF102
-                    exec('m_var.' + key + '= np.array(val)')  # noqa: S102
-
-                log_var_pred, dum = m_var.predict(X_unique)
-                var_pred = np.exp(log_var_pred)
-
-                if did_normalization:
-                    # Y_normFact = np.var(Y_mean)  # noqa: N806, RUF100
-                    Y_normFact = np.mean(var_pred.T[0])  # noqa: N806
-                else:
-                    Y_normFact = 1  # noqa: N806
-
-                norm_var_str = (
-                    (var_pred.T[0]) / Y_normFact
-                )  # if normalization was used..
-
-                log_var_pred_x, dum = m_var.predict(x)
-                nugget_var_pred_x = np.exp(log_var_pred_x.T[0]) / Y_normFact
-
-            else:
-                X_unique = X  # noqa: N806
-                Y_mean = Y  # noqa: N806
-                indices = range(Y.shape[0])
-
-                #
-                # check if we have an old example file - to be deleted in the future
-                #
-                old_version = False
-                for key, val in sur['modelInfo'][g_name_sur[ny] + '_Var'].items():  # noqa: B007, PERF102
-                    if 'sum' in key:
-                        old_version = True
-                        break
-
-                if old_version:
-                    print(  # noqa: T201
-                        'The surrogate model was trained using an older version of the tool. Please retrain the model using this version or use older version.',
-                        file=sys.stderr,
-                    )
-                    exit(-1)  # noqa: PLR1722
-
-                log_vars = np.atleast_2d(
-                    sur['modelInfo'][g_name_sur[ny] + '_Var']['TrainingSamplesY']
-                ).T
-
-                kernel_var = GPy.kern.Matern52(input_dim=nrv_sur, ARD=True)
-
-                m_var = GPy.models.GPRegression(
-                    X, log_vars, kernel_var, normalizer=True, Y_metadata=None
-                )
-
-                # print("Variance field obtained for ny={}".format(ny))
-                for key, val in sur['modelInfo'][g_name_sur[ny] + '_Var'].items():  # noqa: B007, PERF102
-                    exec('m_var.' + key + '= np.array(val)')  # noqa: S102
-
-                log_var_pred, dum = m_var.predict(X)
-                var_pred = np.exp(log_var_pred)
-
-                if did_normalization:
-                    # Y_normFact = np.var(Y)  # noqa: N806, RUF100
-                    Y_normFact = np.mean(var_pred.T[0])  # noqa: N806
-
-                else:
-                    Y_normFact = 1  # noqa: N806
-
-                norm_var_str = (
-                    (var_pred.T[0]) / Y_normFact
-                )  # if normalization was used..
-
-                log_var_pred_x, dum = m_var.predict(x)
-                nugget_var_pred_x = np.exp(log_var_pred_x.T[0]) / Y_normFact
-
-            return (
-                X_unique,
-                Y_mean,
-                norm_var_str,
-                counts,
-                nugget_var_pred_x,
-                np.var(Y_mean),
-            )
+    g_name_sur = list(sur['ylabels'])
+    rv_name_sur = list(sur['xlabels'])
+    nrv_sur = len(rv_name_sur)
 
     # REQUIRED: rv_name, y_var
 
-    # Collect also dummy rvs
-    id_vec = []
-    rv_name_dummy = []
-
     t_total = time.process_time()  # noqa: F841
-    first_rv_found = False
-    first_dummy_found = False
 
     #
     # Check how many RVs overlap
@@ -343,78 +141,17 @@ def main(params_dir, surrogate_dir, json_dir, result_file, input_json):  # noqa:
 
     with open(params_dir) as x_file:  # noqa: PTH123
         data = x_file.readlines()
-        nrv = int(data[0])
-        for i in range(nrv):
-            name_values = data[i + 1].split()
-            name = name_values[0]
-            # print(name)
-
-            # = pass if is string. GP cannot handle that
-            if ((name == 'MultipleEvent') or (name == 'eventID')) and isEEUQ:  # noqa: PLR1714
-                continue
-
-            if (
-                not name_values[1]
-                .replace('.', '', 1)
-                .replace('e', '', 1)
-                .replace('-', '', 2)
-                .replace('+', '', 1)
-                .isdigit()
-            ):
-                # surrogate model does not accept discrete
-                continue
-
-            # = atleast_2d because there may be multiple samples
-            samples = np.atleast_2d([float(vals) for vals in name_values[1:]]).T
-            ns = len(samples)
-            if name not in rv_name_sur:
-                rv_name_dummy += [name]
-                if not first_dummy_found:
-                    rv_val_dummy = samples
-                    first_dummy_found = True
-                else:
-                    rv_val_dummy = np.hstack([rv_val_dummy, samples])
-                continue
-
-            id_map = rv_name_sur.index(name)
-            # print(name)
-            # print(rv_name_sur)
-            # try:
-            #    id_map = rv_name_sur.index(name)
-            # except ValueError:
-            #    msg = 'Error importing input data: variable "{}" not identified.'.format(name)
-            #    error_exit(msg)
-
-            if not first_rv_found:
-                nsamp = ns
-                rv_tmp = samples
-                id_vec = [id_map]
-                first_rv_found = True
-            else:
-                rv_tmp = np.hstack([rv_tmp, samples])
-                id_vec += [id_map]
-
-            if ns != nsamp:
-                msg = 'Error importing input data to surrogate: sample size in params.in is not consistent.'
-                error_exit(msg)
-
-        g_idx = []
-        for edp in inp_tmp['EDP']:
-            edp_names = []
-            if edp['length'] == 1:
-                edp_names += [edp['name']]
-            else:
-                for i in range(edp['length']):
-                    edp_names += [edp['name'] + '_' + str(i + 1)]
-            try:
-                for i in range(edp['length']):
-                    id_map = g_name_sur.index(edp_names[i])
-                    g_idx += [id_map]
-            except ValueError:
-                msg = 'Error importing input data to surrogate: qoi "{}" not identified.'.format(
-                    edp['name']
-                )
-                error_exit(msg)
+    try:
+        rv_tmp, id_vec, rv_name_dummy, rv_val_dummy = read_params(
+            data, rv_name_sur, isEEUQ
+        )
+        g_idx = get_output_index(inp_tmp['EDP'], g_name_sur)
+    except ValueError as e:
+        error_exit(str(e))
+    first_rv_found = rv_tmp is not None
+    first_dummy_found = rv_val_dummy is not None
+    if first_rv_found:
+        nsamp = rv_tmp.shape[0]
 
     # if eeuq
     first_eeuq_found = False
@@ -528,225 +265,36 @@ def main(params_dir, surrogate_dir, json_dir, result_file, input_json):  # noqa:
     for i in range(nrv):
         rv_val[:, id_vec[i]] = rv_tmp[:, i]
 
-    if kernel == 'Radial Basis':
-        kr = GPy.kern.RBF(input_dim=nrv_sur, ARD=True)
-    elif kernel == 'Exponential':
-        kr = GPy.kern.Exponential(input_dim=nrv_sur, ARD=True)
-    elif kernel == 'Matern 3/2':
-        kr = GPy.kern.Matern32(input_dim=nrv_sur, ARD=True)
-    elif kernel == 'Matern 5/2':
-        kr = GPy.kern.Matern52(input_dim=nrv_sur, ARD=True)
+    surrogate = open_surrogate(sur, json_dir, surrogate_dir)
+    prediction = predict_surrogate(
+        surrogate,
+        rv_val,
+        np.random.standard_normal((surrogate['y_dim'], nsamp)).T,
+    )
+    y_pred_median = prediction['median']
+    y_pred_var = prediction['var']
+    y_pred_var_m = prediction['var_m']
+    y_samp = prediction['samp']
+    y_q1 = prediction['q1']
+    y_q3 = prediction['q3']
+    y_q1m = prediction['q1m']
+    y_q3m = prediction['q3m']
 
-    if sur['doLinear']:
-        # kr = kr + GPy.kern.Linear(input_dim=nrv_sur, ARD=True)
-        did_linear = True
-        lin_index = [True] * nrv
-        lin_list = []
-        for ny in range(ng_sur):
-            tmp_lin = LinearRegression()
-            tmp_lin.coef_ = np.array(
-                sur['modelInfo'][g_name_sur[ny] + '_Lin']['coef']
-            )
-            tmp_lin.intercept_ = np.array(
-                sur['modelInfo'][g_name_sur[ny] + '_Lin']['intercept']
-            )
-            lin_list += [tmp_lin]
-    else:
-        did_linear = False
+    # error_ratio1 = y_pred_var.T / y_pred_prior_var
+    error_ratio2 = prediction['error_ratio']
+    idx = np.argmax(error_ratio2, axis=1) + 1
 
-    # preprocessing..
+    """
+    if np.max(error_ratio1) > norm_var_thr:
 
-    if did_logtransform:
-        Y = np.log(Y)  # noqa: N806
+        is_accurate = False
+        idx = np.argmax(error_ratio1) + 1
 
-    if did_linear:
-        for ny in range(ng_sur):
-            y_lin_pred = lin_list[ny].predict(X[:, lin_index])
-            Y[:, ny] = Y[:, ny] - y_lin_pred
+        msg = 'Prediction error of output {} is {:.2f}%, which is greater than threshold={:.2f}%  '.format(idx, np.max(
+            error_ratio1)*100, norm_var_thr*100)
+    """
 
-    kg = kr
-    m_list = list()  # noqa: C408
-    nugget_var_list = [0] * ng_sur
-
-    if not did_mf:
-        for ny in range(ng_sur):
-            if did_stochastic[ny]:
-                m_list = m_list + [  # noqa: RUF005
-                    GPy.models.GPRegression(
-                        X,
-                        Y[:, ny][np.newaxis].transpose(),
-                        kernel=kg.copy(),
-                        normalizer=did_normalization,
-                    )
-                ]
-                (
-                    X_unique,  # noqa: N806
-                    Y_mean,  # noqa: N806
-                    norm_var_str,
-                    counts,
-                    nugget_var_pred,
-                    Y_normFact,  # noqa: N806
-                ) = get_stochastic_variance(X, Y[:, ny][np.newaxis].T, rv_val, ny)
-                Y_metadata = {'variance_structure': norm_var_str / counts}  # noqa: N806
-                m_list[ny].set_XY2(X_unique, Y_mean, Y_metadata=Y_metadata)
-                for key, val in sur['modelInfo'][g_name_sur[ny]].items():  # noqa: B007, PERF102
-                    exec('m_list[ny].' + key + '= np.array(val)')  # noqa: S102
-
-                nugget_var_list[ny] = (
-                    m_list[ny].Gaussian_noise.parameters
-                    * nugget_var_pred
-                    * Y_normFact
-                )
-
-            else:
-                m_list = m_list + [  # noqa: RUF005
-                    GPy.models.GPRegression(
-                        X,
-                        Y[:, ny][np.newaxis].transpose(),
-                        kernel=kg.copy(),
-                        normalizer=True,
-                    )
-                ]
-                for key, val in sur['modelInfo'][g_name_sur[ny]].items():  # noqa: B007, PERF102
-                    exec('m_list[ny].' + key + '= np.array(val)')  # noqa: S102
-
-                Y_normFact = np.var(Y[:, ny])  # noqa: N806
-                nugget_var_list[ny] = np.squeeze(
-                    np.array(m_list[ny].Gaussian_noise.parameters)
-                    * np.array(Y_normFact)
-                )
-
-    else:
-        with open(surrogate_dir, 'rb') as file:  # noqa: PTH123
-            m_list = pickle.load(file)  # noqa: S301
-
-        for ny in range(ng_sur):
-            Y_normFact = np.var(Y[:, ny])  # noqa: N806
-            nugget_var_list[ny] = (
-                m_list[ny].gpy_model['mixed_noise.Gaussian_noise.variance']
-                * Y_normFact
-            )
-
-    # read param in file and sort input
-    y_dim = len(m_list)
-
-    y_pred_median = np.zeros([nsamp, y_dim])
-    y_pred_var_tmp = np.zeros([nsamp, y_dim])  # might be log space
-    y_pred_var_m_tmp = np.zeros([nsamp, y_dim])  # might be log space
-
-    y_pred_var = np.zeros([nsamp, y_dim])
-    y_pred_var_m = np.zeros([nsamp, y_dim])
-
-    y_data_var = np.zeros([nsamp, y_dim])
-    y_samp = np.zeros([nsamp, y_dim])
-    y_q1 = np.zeros([nsamp, y_dim])
-    y_q3 = np.zeros([nsamp, y_dim])
-    y_q1m = np.zeros([nsamp, y_dim])
-    y_q3m = np.zeros([nsamp, y_dim])
-
-    for ny in range(y_dim):
-        y_data_var[:, ny] = np.var(m_list[ny].Y)
-        if ny in constIdx:
-            y_pred_median_tmp, y_pred_var_tmp[ny], y_pred_var_m_tmp[ny] = (
-                np.ones([nsamp]) * constVal[constIdx.index(ny)],
-                np.zeros([nsamp]),
-                np.zeros([nsamp]),
-            )
-        else:
-            y_pred_median_tmp, y_pred_var_tmp_tmp = predict(
-                m_list[ny], rv_val, did_mf
-            )  # noiseless
-            y_pred_median_tmp = np.squeeze(y_pred_median_tmp)
-            y_pred_var_tmp_tmp = np.squeeze(y_pred_var_tmp_tmp)
-
-            if did_linear:
-                y_lin_pred = lin_list[ny].predict(rv_val[:, lin_index])
-                y_pred_median_tmp = y_pred_median_tmp + y_lin_pred
-
-        y_pred_var_tmp[:, ny] = y_pred_var_tmp_tmp
-        y_pred_var_m_tmp[:, ny] = y_pred_var_tmp_tmp + np.squeeze(
-            nugget_var_list[ny]
-        )
-        y_samp_tmp = np.random.normal(
-            y_pred_median_tmp, np.sqrt(y_pred_var_m_tmp[:, ny])
-        )
-
-        if did_logtransform:
-            y_pred_median[:, ny] = np.exp(y_pred_median_tmp)
-            y_pred_var[:, ny] = np.exp(
-                2 * y_pred_median_tmp + y_pred_var_tmp[:, ny]
-            ) * (np.exp(y_pred_var_tmp[:, ny]) - 1)
-            y_pred_var_m[:, ny] = np.exp(
-                2 * y_pred_median_tmp + y_pred_var_m_tmp[:, ny]
-            ) * (np.exp(y_pred_var_m_tmp[:, ny]) - 1)
-
-            y_samp[:, ny] = np.exp(y_samp_tmp)
-
-            y_q1[:, ny] = lognorm.ppf(
-                0.05,
-                s=np.sqrt(y_pred_var_tmp[:, ny]),
-                scale=np.exp(y_pred_median_tmp),
-            )
-            y_q3[:, ny] = lognorm.ppf(
-                0.95,
-                s=np.sqrt(y_pred_var_tmp[:, ny]),
-                scale=np.exp(y_pred_median_tmp),
-            )
-            y_q1m[:, ny] = lognorm.ppf(
-                0.05,
-                s=np.sqrt(y_pred_var_m_tmp[:, ny]),
-                scale=np.exp(y_pred_median_tmp),
-            )
-            y_q3m[:, ny] = lognorm.ppf(
-                0.95,
-                s=np.sqrt(y_pred_var_m_tmp[:, ny]),
-                scale=np.exp(y_pred_median_tmp),
-            )
-
-        else:
-            y_pred_median[:, ny] = y_pred_median_tmp
-            y_pred_var[:, ny] = y_pred_var_tmp[:, ny]
-            y_pred_var_m[:, ny] = y_pred_var_m_tmp[:, ny]
-            y_samp[:, ny] = y_samp_tmp
-            y_q1[:, ny] = norm.ppf(
-                0.05, loc=y_pred_median_tmp, scale=np.sqrt(y_pred_var_tmp[:, ny])
-            )
-            y_q3[:, ny] = norm.ppf(
-                0.95, loc=y_pred_median_tmp, scale=np.sqrt(y_pred_var_tmp[:, ny])
-            )
-            y_q1m[:, ny] = norm.ppf(
-                0.05, loc=y_pred_median_tmp, scale=np.sqrt(y_pred_var_m_tmp[:, ny])
-            )
-            y_q3m[:, ny] = norm.ppf(
-                0.95, loc=y_pred_median_tmp, scale=np.sqrt(y_pred_var_m_tmp[:, ny])
-            )
-
-        if np.isnan(y_samp[:, ny]).any():
-            y_samp[:, ny] = np.nan_to_num(y_samp[:, ny])
-        if np.isnan(y_pred_var[:, ny]).any():
-            y_pred_var[:, ny] = np.nan_to_num(y_pred_var[:, ny])
-        if np.isnan(y_pred_var_m[:, ny]).any():
-            y_pred_var_m[:, ny] = np.nan_to_num(y_pred_var_m[:, ny])  # noqa: F821
-
-        # for parname in m_list[ny].parameter_names():
-        #    if (kern_name in parname) and parname.endswith('variance'):
-        #        exec('y_pred_prior_var[ny]=m_list[ny].' + parname)
-
-    # error_ratio1 = y_pred_var.T / y_pred_prior_var
-    error_ratio2 = y_pred_var_m_tmp / y_data_var
-    idx = np.argmax(error_ratio2, axis=1) + 1
-
-    """
-    if np.max(error_ratio1) > norm_var_thr:
-
-        is_accurate = False
-        idx = np.argmax(error_ratio1) + 1
-
-        msg = 'Prediction error of output {} is {:.2f}%, which is greater than threshold={:.2f}%  '.format(idx, np.max(
-            error_ratio1)*100, norm_var_thr*100)
-    """
-
-    is_accurate_array = np.max(error_ratio2, axis=1) < norm_var_thr
+    is_accurate_array = np.max(error_ratio2, axis=1) < norm_var_thr
 
     y_pred_subset = np.zeros([nsamp, len(g_idx)])
     msg1 = []
@@ -1020,15 +568,684 @@ def main(params_dir, surrogate_dir, json_dir, result_file, input_json):  # noqa:
     file_object.close()
 
 
-def predict(m, X, did_mf):  # noqa: N803, D103
-    if not did_mf:
-        return m.predict_noiseless(X)
-    else:  # noqa: RET505
-        # TODO change below to noiseless  # noqa: TD002, TD004
-        X_list = convert_x_list_to_array([X, X])  # noqa: N806
-        X_list_l = X_list[: X.shape[0]]  # noqa: N806, F841
-        X_list_h = X_list[X.shape[0] :]  # noqa: N806
-        return m.predict(X_list_h)
+def read_prediction_options(inp_tmp, is_sc_input=False):  # noqa: FBT002
+    """
+    Read the prediction settings of a surrogate from the workflow input.
+
+    Parameters
+    ----------
+    inp_tmp : dict
+        Workflow input of the current analysis.
+    is_sc_input : bool, optional
+        True when the input is the EE-UQ, WE-UQ or HydroUQ input file.
+
+    Returns
+    -------
+    dict
+        Error threshold, action for inaccurate predictions, prediction
+        option and seed.
+    """
+    try:
+        if is_sc_input:
+            inp_fem = inp_tmp['Applications']['Modeling']
+        else:
+            inp_fem = inp_tmp['FEM']
+    except:  # noqa: E722
+        inp_fem = {}
+        print('invalid json format - dakota.json')  # noqa: T201
+
+    myseed = inp_fem.get('gpSeed', None)
+    if myseed == None:  # noqa: E711
+        try:
+            myseed = inp_tmp['UQ']['samplingMethodData']['seed']
+        except:  # noqa: E722
+            myseed = 42
+
+    return {
+        'varThres': inp_fem.get('varThres', 0.02),
+        'femOption': inp_fem.get('femOption', 'continue'),
+        'predictionOption': inp_fem.get('predictionOption', 'random'),
+        'seed': int(myseed),
+    }
+
+
+def read_params(data, rv_name_sur, isEEUQ=False):  # noqa: FBT002, N803
+    """
+    Read the values of the surrogate inputs from the lines of a params.in file.
+
+    Parameters
+    ----------
+    data : list of str
+        Lines of the params.in file.
+    rv_name_sur : list of str
+        Input names of the surrogate.
+    isEEUQ : bool, optional
+        True when the surrogate was trained in EE-UQ.
+
+    Returns
+    -------
+    tuple
+        Samples of the surrogate inputs found in the file, their positions
+        in rv_name_sur, and the names and samples of the other numeric
+        variables. The sample arrays are None when no variable was found.
+
+    Raises
+    ------
+    ValueError
+        If the variables do not have the same number of samples.
+    """
+    rv_tmp, id_vec = None, []
+    rv_name_dummy, rv_val_dummy = [], None
+
+    nrv = int(data[0])
+    for i in range(nrv):
+        name_values = data[i + 1].split()
+        name = name_values[0]
+
+        # = pass if is string. GP cannot handle that
+        if ((name == 'MultipleEvent') or (name == 'eventID')) and isEEUQ:  # noqa: PLR1714
+            continue
+
+        if (
+            not name_values[1]
+            .replace('.', '', 1)
+            .replace('e', '', 1)
+            .replace('-', '', 2)
+            .replace('+', '', 1)
+            .isdigit()
+        ):
+            # surrogate model does not accept discrete
+            continue
+
+        # = atleast_2d because there may be multiple samples
+        samples = np.atleast_2d([float(vals) for vals in name_values[1:]]).T
+        if name not in rv_name_sur:
+            rv_name_dummy += [name]
+            if rv_val_dummy is None:
+                rv_val_dummy = samples
+            else:
+                rv_val_dummy = np.hstack([rv_val_dummy, samples])
+            continue
+
+        if rv_tmp is None:
+            rv_tmp = samples
+        elif len(samples) != rv_tmp.shape[0]:
+            msg = 'Error importing input data to surrogate: sample size in params.in is not consistent.'
+            raise ValueError(msg)
+        else:
+            rv_tmp = np.hstack([rv_tmp, samples])
+        id_vec += [rv_name_sur.index(name)]
+
+    return rv_tmp, id_vec, rv_name_dummy, rv_val_dummy
+
+
+def get_output_index(edps, g_name_sur):
+    """
+    Find the surrogate outputs of the EDPs requested by the workflow.
+
+    Parameters
+    ----------
+    edps : list of dict
+        EDP entries of the workflow input.
+    g_name_sur : list of str
+        Output names of the surrogate.
+
+    Returns
+    -------
+    list of int
+        Positions of the requested outputs in g_name_sur.
+
+    Raises
+    ------
+    ValueError
+        If an EDP is not an output of the surrogate.
+    """
+    g_idx = []
+    for edp in edps:
+        edp_names = []
+        if edp['length'] == 1:
+            edp_names += [edp['name']]
+        else:
+            for i in range(edp['length']):
+                edp_names += [edp['name'] + '_' + str(i + 1)]
+        try:
+            for i in range(edp['length']):
+                id_map = g_name_sur.index(edp_names[i])
+                g_idx += [id_map]
+        except ValueError:
+            msg = 'Error importing input data to surrogate: qoi "{}" not identified.'.format(
+                edp['name']
+            )
+            raise ValueError(msg)  # noqa: B904
+    return g_idx
+
+
+def open_surrogate(sur, json_dir, surrogate_dir='dummy'):
+    """
+    Load a surrogate from its portable copy, or build its GP models.
+
+    A portable copy, saved by surrogateBuild in a directory named after the
+    surrogate json file or the model file, is used when it was built from
+    the same surrogate information, so GPy does not have to be imported.
+    Otherwise the models are built by load_surrogate.
+
+    Parameters
+    ----------
+    sur : dict
+        Surrogate information saved by surrogateBuild.
+    json_dir : str
+        Path to the surrogate json file.
+    surrogate_dir : str, optional
+        Path to the pickled models of a multi-fidelity surrogate.
+
+    Returns
+    -------
+    dict
+        Models and constants used by predict_surrogate.
+    """
+    if not sur['doMultiFidelity']:
+        for path in (json_dir, surrogate_dir):
+            surrogate = load_portable_surrogate(os.path.splitext(path)[0], sur)  # noqa: PTH122
+            if surrogate is not None:
+                return surrogate
+    return load_surrogate(sur, surrogate_dir)
+
+
+def load_surrogate(sur, surrogate_dir='dummy'):  # noqa: C901
+    """
+    Build the GP models of a trained surrogate.
+
+    Everything that only depends on the training data is done here, so a
+    surrogate can be loaded once and then used by predict_surrogate for any
+    number of samples.
+
+    Parameters
+    ----------
+    sur : dict
+        Surrogate information saved by surrogateBuild.
+    surrogate_dir : str, optional
+        Path to the pickled models of a multi-fidelity surrogate.
+
+    Returns
+    -------
+    dict
+        Models and constants used by predict_surrogate.
+    """
+    if gpy_error == 'GPy':
+        print(  # noqa: T201
+            'Error running surrogate prediction - Failed to import module: Surrogate modeling module uses GPy python package which is facing a version compatibility issue at this moment (01.05.2024). To use the surrogate module, one needs to update manually the GPy version to 1.13. The instruction can be found in the the documentation: https://nheri-simcenter.github.io/quoFEM-Documentation/common/user_manual/usage/desktop/SimCenterUQSurrogate.html#lblsimsurrogate',
+            file=sys.stderr,
+        )
+        exit(-1)  # noqa: PLR1722
+    elif gpy_error is not None:
+        print(  # noqa: T201
+            'Error running surrogate prediction - Failed to import module:'
+            + gpy_error,
+            file=sys.stderr,
+        )
+        exit(-1)  # noqa: PLR1722
+
+    did_stochastic = sur['doStochastic']
+    did_logtransform = sur['doLogtransform']
+    did_normalization = sur['doNormalization']
+    kernel = sur['kernName']
+    did_mf = sur['doMultiFidelity']
+
+    # from json
+    g_name_sur = list()  # noqa: C408
+    ng_sur = 0
+    Y = np.zeros((sur['highFidelityInfo']['valSamp'], sur['ydim']))  # noqa: N806
+    for g in sur['ylabels']:
+        g_name_sur += [g]
+        Y[:, ng_sur] = np.array(sur['yExact'][g])
+        ng_sur += 1
+
+    rv_name_sur = list()  # noqa: C408
+    nrv_sur = 0
+    X = np.zeros((sur['highFidelityInfo']['valSamp'], sur['xdim']))  # noqa: N806
+    for rv in sur['xlabels']:
+        rv_name_sur += [rv]
+        X[:, nrv_sur] = np.array(sur['xExact'][rv])
+        nrv_sur += 1
+
+    try:
+        constIdx = sur['highFidelityInfo']['constIdx']  # noqa: N806
+        constVal = sur['highFidelityInfo']['constVal']  # noqa: N806
+    except:  # noqa: E722
+        constIdx = []  # noqa: N806
+        constVal = []  # noqa: N806
+
+        # Read pickles
+
+    if did_stochastic:
+        #
+        # Modify GPy package
+        #
+        def monkeypatch_method(cls):
+            def decorator(func):
+                setattr(cls, func.__name__, func)
+                return func
+
+            return decorator
+
+        @monkeypatch_method(GPy.likelihoods.Gaussian)
+        def gaussian_variance(self, Y_metadata=None):  # noqa: N803
+            if Y_metadata is None:
+                return self.variance
+            else:  # noqa: RET505
+                return self.variance * Y_metadata['variance_structure']
+
+        @monkeypatch_method(GPy.core.GP)
+        def set_XY2(self, X=None, Y=None, Y_metadata=None):  # noqa: N802, N803
+            if Y_metadata is not None:
+                if self.Y_metadata is None:
+                    self.Y_metadata = Y_metadata
+                else:
+                    self.Y_metadata.update(Y_metadata)
+                    # print("metadata_updated")
+
+            self.set_XY(X, Y)
+
+        def get_stochastic_variance(X, Y, ny):  # noqa: C901, N803
+            # X_unique, X_idx, indices, counts = np.unique(X, axis=0, return_index=True, return_counts=True, return_inverse=True)
+            X_unique, dummy, indices, counts = np.unique(  # noqa: N806
+                X, axis=0, return_index=True, return_counts=True, return_inverse=True
+            )
+
+            idx_repl = [i for i in np.where(counts > 1)[0]]  # noqa: C416
+
+            if len(idx_repl) > 0:
+                n_unique = X_unique.shape[0]
+                Y_mean, Y_var = np.zeros((n_unique, 1)), np.zeros((n_unique, 1))  # noqa: N806
+
+                for idx in range(n_unique):
+                    Y_subset = Y[[i for i in np.where(indices == idx)[0]], :]  # noqa: C416, N806
+                    Y_mean[idx, :] = np.mean(Y_subset, axis=0)
+                    Y_var[idx, :] = np.var(Y_subset, axis=0)
+
+                if (np.max(Y_var) / np.var(Y_mean) < 1.0e-10) and len(idx_repl) > 0:  # noqa: PLR2004
+                    return np.ones((X.shape[0], 1))
+
+                # kernel_var = GPy.kern.Matern52(
+                #    input_dim=nrv_sur, ARD=True
+                # ) + GPy.kern.Linear(input_dim=nrv_sur, ARD=True)
+                kernel_var = GPy.kern.Matern52(input_dim=nrv_sur, ARD=True)
+                log_vars = np.log(Y_var[idx_repl])
+                m_var = GPy.models.GPRegression(
+                    X_unique[idx_repl, :],
+                    log_vars,
+                    kernel_var,
+                    normalizer=True,
+                    Y_metadata=None,
+                )
+                # print("Collecting variance field of ny={}".format(ny))
+                for key, val in sur['modelInfo'][g_name_sur[ny] + '_Var'].items():  # noqa: B007, PERF102
+                    exec('m_var.' + key + '= np.array(val)')  # noqa: S102
+
+                log_var_pred, dum = m_var.predict(X_unique)
+                var_pred = np.exp(log_var_pred)
+
+                if did_normalization:
+                    # Y_normFact = np.var(Y_mean)  # noqa: N806, RUF100
+                    Y_normFact = np.mean(var_pred.T[0])  # noqa: N806
+                else:
+                    Y_normFact = 1  # noqa: N806
+
+                norm_var_str = (
+                    (var_pred.T[0]) / Y_normFact
+                )  # if normalization was used..
+
+            else:
+                X_unique = X  # noqa: N806
+                Y_mean = Y  # noqa: N806
+                indices = range(Y.shape[0])
+
+                #
+                # check if we have an old example file - to be deleted in the future
+                #
+                old_version = False
+                for key, val in sur['modelInfo'][g_name_sur[ny] + '_Var'].items():  # noqa: B007, PERF102
+                    if 'sum' in key:
+                        old_version = True
+                        break
+
+                if old_version:
+                    print(  # noqa: T201
+                        'The surrogate model was trained using an older version of the tool. Please retrain the model using this version or use older version.',
+                        file=sys.stderr,
+                    )
+                    exit(-1)  # noqa: PLR1722
+
+                log_vars = np.atleast_2d(
+                    sur['modelInfo'][g_name_sur[ny] + '_Var']['TrainingSamplesY']
+                ).T
+
+                kernel_var = GPy.kern.Matern52(input_dim=nrv_sur, ARD=True)
+
+                m_var = GPy.models.GPRegression(
+                    X, log_vars, kernel_var, normalizer=True, Y_metadata=None
+                )
+
+                # print("Variance field obtained for ny={}".format(ny))
+                for key, val in sur['modelInfo'][g_name_sur[ny] + '_Var'].items():  # noqa: B007, PERF102
+                    exec('m_var.' + key + '= np.array(val)')  # noqa: S102
+
+                log_var_pred, dum = m_var.predict(X)
+                var_pred = np.exp(log_var_pred)
+
+                if did_normalization:
+                    # Y_normFact = np.var(Y)  # noqa: N806, RUF100
+                    Y_normFact = np.mean(var_pred.T[0])  # noqa: N806
+
+                else:
+                    Y_normFact = 1  # noqa: N806
+
+                norm_var_str = (
+                    (var_pred.T[0]) / Y_normFact
+                )  # if normalization was used..
+
+            # the variance field is evaluated at the prediction points by
+            # predict_surrogate
+            return (
+                X_unique,
+                Y_mean,
+                norm_var_str,
+                counts,
+                (m_var, Y_normFact),
+                np.var(Y_mean),
+            )
+
+    if kernel == 'Radial Basis':
+        kr = GPy.kern.RBF(input_dim=nrv_sur, ARD=True)
+    elif kernel == 'Exponential':
+        kr = GPy.kern.Exponential(input_dim=nrv_sur, ARD=True)
+    elif kernel == 'Matern 3/2':
+        kr = GPy.kern.Matern32(input_dim=nrv_sur, ARD=True)
+    elif kernel == 'Matern 5/2':
+        kr = GPy.kern.Matern52(input_dim=nrv_sur, ARD=True)
+
+    lin_index = [True] * nrv_sur
+    if sur['doLinear']:
+        # kr = kr + GPy.kern.Linear(input_dim=nrv_sur, ARD=True)
+        lin_list = []
+        for ny in range(ng_sur):
+            tmp_lin = LinearRegression()
+            tmp_lin.coef_ = np.array(
+                sur['modelInfo'][g_name_sur[ny] + '_Lin']['coef']
+            )
+            tmp_lin.intercept_ = np.array(
+                sur['modelInfo'][g_name_sur[ny] + '_Lin']['intercept']
+            )
+            lin_list += [tmp_lin]
+    else:
+        lin_list = None
+
+    # preprocessing..
+
+    if did_logtransform:
+        Y = np.log(Y)  # noqa: N806
+
+    if lin_list is not None:
+        for ny in range(ng_sur):
+            y_lin_pred = lin_list[ny].predict(X[:, lin_index])
+            Y[:, ny] = Y[:, ny] - y_lin_pred
+
+    kg = kr
+    m_list = list()  # noqa: C408
+    # nugget variance of each output, or the variance field and the factors
+    # that scale it for stochastic outputs
+    nugget_var_list = [0] * ng_sur
+    var_field_list = [None] * ng_sur
+
+    if not did_mf:
+        for ny in range(ng_sur):
+            if did_stochastic[ny]:
+                m_list = m_list + [  # noqa: RUF005
+                    GPy.models.GPRegression(
+                        X,
+                        Y[:, ny][np.newaxis].transpose(),
+                        kernel=kg.copy(),
+                        normalizer=did_normalization,
+                    )
+                ]
+                (
+                    X_unique,  # noqa: N806
+                    Y_mean,  # noqa: N806
+                    norm_var_str,
+                    counts,
+                    var_field_list[ny],
+                    Y_normFact,  # noqa: N806
+                ) = get_stochastic_variance(X, Y[:, ny][np.newaxis].T, ny)
+                Y_metadata = {'variance_structure': norm_var_str / counts}  # noqa: N806
+                m_list[ny].set_XY2(X_unique, Y_mean, Y_metadata=Y_metadata)
+                for key, val in sur['modelInfo'][g_name_sur[ny]].items():  # noqa: B007, PERF102
+                    exec('m_list[ny].' + key + '= np.array(val)')  # noqa: S102
+
+                nugget_var_list[ny] = (
+                    m_list[ny].Gaussian_noise.parameters,
+                    Y_normFact,
+                )
+
+            else:
+                m_list = m_list + [  # noqa: RUF005
+                    GPy.models.GPRegression(
+                        X,
+                        Y[:, ny][np.newaxis].transpose(),
+                        kernel=kg.copy(),
+                        normalizer=True,
+                    )
+                ]
+                for key, val in sur['modelInfo'][g_name_sur[ny]].items():  # noqa: B007, PERF102
+                    exec('m_list[ny].' + key + '= np.array(val)')  # noqa: S102
+
+                Y_normFact = np.var(Y[:, ny])  # noqa: N806
+                nugget_var_list[ny] = np.squeeze(
+                    np.array(m_list[ny].Gaussian_noise.parameters)
+                    * np.array(Y_normFact)
+                )
+
+    else:
+        with open(surrogate_dir, 'rb') as file:  # noqa: PTH123
+            m_list = pickle.load(file)  # noqa: S301
+
+        for ny in range(ng_sur):
+            Y_normFact = np.var(Y[:, ny])  # noqa: N806
+            nugget_var_list[ny] = (
+                m_list[ny].gpy_model['mixed_noise.Gaussian_noise.variance']
+                * Y_normFact
+            )
+
+    return {
+        'rv_names': rv_name_sur,
+        'g_names': g_name_sur,
+        'y_dim': len(m_list),
+        'm_list': m_list,
+        'nugget_var_list': nugget_var_list,
+        'var_field_list': var_field_list,
+        'lin_list': lin_list,
+        'lin_index': lin_index,
+        'y_data_var': np.array([np.var(m.Y) for m in m_list]),
+        'did_logtransform': did_logtransform,
+        'did_mf': did_mf,
+        'constIdx': constIdx,
+        'constVal': constVal,
+    }
+
+
+def predict_surrogate(surrogate, rv_val, std_normal, batch_size=None):
+    """
+    Predict the outputs of a surrogate loaded by load_surrogate.
+
+    Parameters
+    ----------
+    surrogate : dict
+        Surrogate returned by load_surrogate.
+    rv_val : np.ndarray
+        Inputs of the samples, one sample per row.
+    std_normal : np.ndarray
+        Standard normal numbers used to draw the random predictions, one
+        row per sample and one column per output.
+    batch_size : int, optional
+        Largest number of samples passed to the GP models at once.
+
+    Returns
+    -------
+    dict
+        Median, variance, random prediction and 5% and 95% quantiles of the
+        outputs, with and without the measurement noise, and the ratio of
+        the predictive variance to the variance of the training data.
+    """
+    nsamp = rv_val.shape[0]
+    y_dim = surrogate['y_dim']
+    m_list = surrogate['m_list']
+    lin_list = surrogate['lin_list']
+    constIdx = surrogate['constIdx']  # noqa: N806
+
+    y_pred_median = np.zeros([nsamp, y_dim])
+    y_pred_var_tmp = np.zeros([nsamp, y_dim])  # might be log space
+    y_pred_var_m_tmp = np.zeros([nsamp, y_dim])  # might be log space
+
+    y_pred_var = np.zeros([nsamp, y_dim])
+    y_pred_var_m = np.zeros([nsamp, y_dim])
+
+    y_samp = np.zeros([nsamp, y_dim])
+    y_q1 = np.zeros([nsamp, y_dim])
+    y_q3 = np.zeros([nsamp, y_dim])
+    y_q1m = np.zeros([nsamp, y_dim])
+    y_q3m = np.zeros([nsamp, y_dim])
+    error_ratio = np.zeros([nsamp, y_dim])
+
+    for ny in range(y_dim):
+        if ny in constIdx:
+            y_pred_median_tmp = (
+                np.ones([nsamp]) * surrogate['constVal'][constIdx.index(ny)]
+            )
+        else:
+            y_pred_median_tmp, y_pred_var_tmp_tmp = predict(
+                m_list[ny], rv_val, surrogate['did_mf'], batch_size
+            )  # noiseless
+            y_pred_median_tmp = np.squeeze(y_pred_median_tmp)
+            y_pred_var_tmp_tmp = np.squeeze(y_pred_var_tmp_tmp)
+
+            if lin_list is not None:
+                y_lin_pred = lin_list[ny].predict(rv_val[:, surrogate['lin_index']])
+                y_pred_median_tmp = y_pred_median_tmp + y_lin_pred
+
+            if surrogate['var_field_list'][ny] is None:
+                nugget_var = surrogate['nugget_var_list'][ny]
+            else:
+                m_var, var_norm_fact = surrogate['var_field_list'][ny]
+                noise_var, Y_normFact = surrogate['nugget_var_list'][ny]  # noqa: N806
+                log_var_pred_x, dum = predict_in_batches(
+                    m_var.predict, rv_val, batch_size
+                )
+                nugget_var_pred_x = np.exp(log_var_pred_x.T[0]) / var_norm_fact
+                nugget_var = noise_var * nugget_var_pred_x * Y_normFact
+
+            y_pred_var_tmp[:, ny] = y_pred_var_tmp_tmp
+            y_pred_var_m_tmp[:, ny] = y_pred_var_tmp_tmp + np.squeeze(nugget_var)
+            error_ratio[:, ny] = (
+                y_pred_var_m_tmp[:, ny] / surrogate['y_data_var'][ny]
+            )
+
+        y_samp_tmp = (
+            y_pred_median_tmp
+            + np.sqrt(y_pred_var_m_tmp[:, ny]) * (std_normal[:, ny])
+        )
+
+        if surrogate['did_logtransform']:
+            y_pred_median[:, ny] = np.exp(y_pred_median_tmp)
+            y_pred_var[:, ny] = np.exp(
+                2 * y_pred_median_tmp + y_pred_var_tmp[:, ny]
+            ) * (np.exp(y_pred_var_tmp[:, ny]) - 1)
+            y_pred_var_m[:, ny] = np.exp(
+                2 * y_pred_median_tmp + y_pred_var_m_tmp[:, ny]
+            ) * (np.exp(y_pred_var_m_tmp[:, ny]) - 1)
+
+            y_samp[:, ny] = np.exp(y_samp_tmp)
+
+            y_q1[:, ny] = lognorm.ppf(
+                0.05,
+                s=np.sqrt(y_pred_var_tmp[:, ny]),
+                scale=np.exp(y_pred_median_tmp),
+            )
+            y_q3[:, ny] = lognorm.ppf(
+                0.95,
+                s=np.sqrt(y_pred_var_tmp[:, ny]),
+                scale=np.exp(y_pred_median_tmp),
+            )
+            y_q1m[:, ny] = lognorm.ppf(
+                0.05,
+                s=np.sqrt(y_pred_var_m_tmp[:, ny]),
+                scale=np.exp(y_pred_median_tmp),
+            )
+            y_q3m[:, ny] = lognorm.ppf(
+                0.95,
+                s=np.sqrt(y_pred_var_m_tmp[:, ny]),
+                scale=np.exp(y_pred_median_tmp),
+            )
+
+        else:
+            y_pred_median[:, ny] = y_pred_median_tmp
+            y_pred_var[:, ny] = y_pred_var_tmp[:, ny]
+            y_pred_var_m[:, ny] = y_pred_var_m_tmp[:, ny]
+            y_samp[:, ny] = y_samp_tmp
+            y_q1[:, ny] = norm.ppf(
+                0.05, loc=y_pred_median_tmp, scale=np.sqrt(y_pred_var_tmp[:, ny])
+            )
+            y_q3[:, ny] = norm.ppf(
+                0.95, loc=y_pred_median_tmp, scale=np.sqrt(y_pred_var_tmp[:, ny])
+            )
+            y_q1m[:, ny] = norm.ppf(
+                0.05, loc=y_pred_median_tmp, scale=np.sqrt(y_pred_var_m_tmp[:, ny])
+            )
+            y_q3m[:, ny] = norm.ppf(
+                0.95, loc=y_pred_median_tmp, scale=np.sqrt(y_pred_var_m_tmp[:, ny])
+            )
+
+        if np.isnan(y_samp[:, ny]).any():
+            y_samp[:, ny] = np.nan_to_num(y_samp[:, ny])
+        if np.isnan(y_pred_var[:, ny]).any():
+            y_pred_var[:, ny] = np.nan_to_num(y_pred_var[:, ny])
+        if np.isnan(y_pred_var_m[:, ny]).any():
+            y_pred_var_m[:, ny] = np.nan_to_num(y_pred_var_m[:, ny])
+
+    return {
+        'median': y_pred_median,
+        'var': y_pred_var,
+        'var_m': y_pred_var_m,
+        'samp': y_samp,
+        'q1': y_q1,
+        'q3': y_q3,
+        'q1m': y_q1m,
+        'q3m': y_q3m,
+        'error_ratio': error_ratio,
+    }
+
+
+def predict_in_batches(predict_fun, X, batch_size=None):  # noqa: N803
+    """Call a GP predict function on blocks of at most batch_size rows of X."""
+    if batch_size is None or X.shape[0] <= batch_size:
+        return predict_fun(X)
+    blocks = [
+        predict_fun(X[i : i + batch_size]) for i in range(0, X.shape[0], batch_size)
+    ]
+    return tuple(np.vstack(outputs) for outputs in zip(*blocks))
+
+
+def predict(m, X, did_mf, batch_size=None):  # noqa: N803, D103
+    if not did_mf:
+        return predict_in_batches(m.predict_noiseless, X, batch_size)
+    else:  # noqa: RET505
+        return predict_in_batches(lambda x: predict_mf(m, x), X, batch_size)
+
+
+def predict_mf(m, X):  # noqa: N803, D103
+    # TODO change below to noiseless  # noqa: TD002, TD004
+    X_list = convert_x_list_to_array([X, X])  # noqa: N806
+    X_list_l = X_list[: X.shape[0]]  # noqa: N806, F841
+    X_list_h = X_list[X.shape[0] :]  # noqa: N806
+    return m.predict(X_list_h)
 
 
 if __name__ == '__main__':
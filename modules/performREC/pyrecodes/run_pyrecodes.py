@@ -10,6 +10,9 @@ from pathlib import Path
 import matplotlib.pyplot as plt
 import shutil
 import pickle
+import copy
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 # Add the path to the pyrecodes package
 # sys.path.append('/Users/jinyanzhao/Desktop/SimCenterBuild/r2d_pyrecodes')
@@ -19,6 +22,37 @@ from pyrecodes.geovisualizer.r2d_geovisualizer import R2D_GeoVisualizer
 from pyrecodes.plotter.concrete_plotter import ConcretePlotter
 
 
+def parse_realization_filter(rlz_filter):
+    """
+    Parse a realization filter such as '1,3-5' into a list of realizations.
+
+    Parameters
+    ----------
+    rlz_filter : str
+        Comma separated realizations and ranges of realizations.
+
+    Returns
+    -------
+    list
+        List of realizations in the filter.
+    """
+    rlzs_requested = []
+
+    if "," not in rlz_filter:
+        rlz_filter = rlz_filter + ","
+
+    for rlzs in rlz_filter.split(','):
+        if rlzs == '':
+            continue
+
+        if '-' in rlzs:
+            rlzs_low, rlzs_high = rlzs.split('-')
+            rlzs_requested += list(range(int(rlzs_low), int(rlzs_high) + 1))
+        else:
+            rlzs_requested.append(int(rlzs))
+    return rlzs_requested
+
+
 def select_realizations_to_run(damage_input, run_dir):
     """
     Select the realizations to run based on the damage input and available realizations.
@@ -44,24 +78,10 @@ def select_realizations_to_run(damage_input, run_dir):
     ])
     # Get the number of realizations
     if damage_input['Type'] == 'SpecificRealization':
-        rlz_filter = damage_input['Parameters']['Filter']
-        rlzs_requested = []
-
-        if "," not in rlz_filter:
-            rlz_filter = rlz_filter + ","
-
-        for rlzs in rlz_filter.split(','):
-            if rlzs == '':
-                continue
-
-            if '-' in rlzs:
-                rlzs_low, rlzs_high = rlzs.split('-')
-                rlzs_requested += list(range(int(rlzs_low), int(rlzs_high) + 1))
-            else:
-                rlzs_requested.append(int(rlzs))
-
-        rlzs_requested = np.array(rlzs_requested)
-        rlzs_in_available = np.in1d(rlzs_requested, rlzs_available)  # noqa: NPY201
+        rlzs_requested = np.array(
+            parse_realization_filter(damage_input['Parameters']['Filter'])
+        )
+        rlzs_in_available = np.isin(rlzs_requested, rlzs_available)
         if rlzs_in_available.sum() != 0:
             rlzs_to_run = rlzs_requested[np.where(rlzs_in_available)[0]]
         else:
@@ -79,7 +99,33 @@ def select_realizations_to_run(damage_input, run_dir):
             raise ValueError(msg)
 
     return rlzs_to_run
-def run_one_realization(main_file, rlz, rwhale_run_dir, system_config, save_pickle_file):
+def select_resources_to_plot(system_config):
+    """
+    Select the resources whose recovery is plotted and their units.
+
+    Parameters
+    ----------
+    system_config : dict
+        System configuration dictionary.
+
+    Returns
+    -------
+    tuple
+        List of resources to plot and list of their units.
+    """
+    first_resource = next(iter(system_config['Resources'].keys()))
+    first_unit = system_config['Resources'][first_resource].get('Unit', f'unit_{first_resource}')
+    resources_to_plot = [first_resource]
+    units_to_plot = [first_unit]
+    if 'PotableWater' in system_config['Resources']:
+        resources_to_plot.append('PotableWater')
+        units_to_plot.append(system_config['Resources']['PotableWater'].get('Unit', 'unit_PotableWater'))
+    if 'TransportationService' in system_config['Resources']:
+        resources_to_plot.append('TransportationService')
+        units_to_plot.append(system_config['Resources']['TransportationService'].get('Unit', 'unit_TransportationService'))
+    return resources_to_plot, units_to_plot
+
+def run_one_realization(main_file, rlz, rwhale_run_dir, system_config, save_pickle_file, render_figures=True):  # noqa: PLR0913, FBT002
     """
     Run a single realization of the pyrecodes simulation.
 
@@ -89,6 +135,14 @@ def run_one_realization(main_file, rlz, rwhale_run_dir, system_config, save_pick
     rlz (int): Realization number.
     rwhale_run_dir (str): Directory where the results are stored.
     system_config (dict): System configuration dictionary.
+    save_pickle_file (bool): If the system components are saved as a pickle file.
+    render_figures (bool): If the recovery figures and the gif are rendered.
+
+    Returns
+    -------
+    dict
+        Recovery curves of the resources and recovery times of the components
+        of the realization, see collect_recovery_record.
     """
     # Run the pyrecodes
     system = pyrecodes.main.run(main_file)
@@ -110,6 +164,77 @@ def run_one_realization(main_file, rlz, rwhale_run_dir, system_config, save_pick
     with (Path(f'Results_{rlz}.json')).open('w') as f:
         json.dump(results_rlz, f)
 
+    if render_figures:
+        render_realization_figures(system, system_config)
+
+    if save_pickle_file:
+        # Save the system components as a pickle file
+        with open(f'system_{rlz}.pickle', 'wb') as f:
+            pickle.dump(system.components, f)
+    # Test load the system object from the pickle file
+    # system_loaded = system.load_as_pickle(f'system_{rlz}.pickle')
+
+    return collect_recovery_record(system, rlz)
+
+def collect_recovery_record(system, rlz):
+    """
+    Collect the recovery results of a realization in a compact record.
+
+    Parameters
+    ----------
+    system : pyrecodes System
+        System after the recovery simulation and resilience calculation.
+    rlz : int
+        Realization number.
+
+    Returns
+    -------
+    dict
+        Last time step, names of the resources, supply, demand and
+        consumption of the resources at every time step (n_resources x
+        n_time_steps arrays), and the asset type, subtype, id and recovery
+        time of the R2D components.
+    """
+    calculator = system.resilience_calculators[0]
+    time_range = system.time_step + 1
+    resources = list(calculator.system_supply.keys())
+    record = {'rlz': rlz, 'time_step': system.time_step, 'resources': resources}
+    for name, curves in [
+        ('supply', calculator.system_supply),
+        ('demand', calculator.system_demand),
+        ('consumption', calculator.system_consumption),
+    ]:
+        record[name] = np.array(
+            [curves[resource][:time_range] for resource in resources], dtype=float
+        ).reshape(len(resources), -1)
+
+    all_recovery_time = system.resilience_calculators[1].component_recovery_times
+    components = []
+    recovery_time = []
+    for ind, comp in enumerate(system.components):
+        if getattr(comp, 'r2d_comp', False) is True:
+            components.append(
+                (comp.asset_type, comp.asset_subtype, str(comp.general_information['AIM_id']))
+            )
+            recovery_time.append(next(iter(all_recovery_time[ind].values())))
+    record['components'] = components
+    record['recovery_time'] = np.array(recovery_time, dtype=float)
+    return record
+
+def render_realization_figures(system, system_config):
+    """
+    Render the recovery figures of a realization in the current directory.
+
+    The status maps and the gif need the components of the simulated system,
+    so these figures can only be rendered while the realization is alive.
+
+    Parameters
+    ----------
+    system : pyrecodes System
+        System after the recovery simulation and resilience calculation.
+    system_config : dict
+        System configuration dictionary.
+    """
     # Create a gif of the recovery process
     geo_visualizer = R2D_GeoVisualizer(system.components)
     # time_step_list = list(range(0, system.time_step, 1))
@@ -120,21 +245,13 @@ def run_one_realization(main_file, rlz, rwhale_run_dir, system_config, save_pick
         legend = ax.get_legend()
         legend.set(loc='center left', bbox_to_anchor=(1, 0.5))
         plt.savefig(f'status_at_time_step_{time_step}.png', dpi=300, bbox_inches='tight', transparent=False, pad_inches=0)
+        plt.close(fig)
     geo_visualizer.create_recovery_gif(time_step_list, file_name = \
                                 'status_at_time_step_TIME_STEP.png', fps=2)
 
     # create a plot of the supply and demand recovery of the first resource
     plotter_object = ConcretePlotter()
-    first_resource = next(iter(system_config['Resources'].keys()))
-    first_unit = system_config['Resources'][first_resource].get('Unit', f'unit_{first_resource}')
-    resources_to_plot = [first_resource]
-    units_to_plot = [first_unit]
-    if 'PotableWater' in system_config['Resources']:
-        resources_to_plot.append('PotableWater')
-        units_to_plot.append(system_config['Resources']['PotableWater'].get('Unit', 'unit_PotableWater'))
-    if 'TransportationService' in system_config['Resources']:
-        resources_to_plot.append('TransportationService')
-        units_to_plot.append(system_config['Resources']['TransportationService'].get('Unit', 'unit_TransportationService'))
+    resources_to_plot, units_to_plot = select_resources_to_plot(system_config)
     print(f'Resources to plot {resources_to_plot}')
 
     for calculator_i, calculator in enumerate(system.resilience_calculators):
@@ -160,18 +277,11 @@ def run_one_realization(main_file, rlz, rwhale_run_dir, system_config, save_pick
                                         show = False
                                         )
         plotter_object.save_current_figure(savename = f'{resource}_supply_demand_consumption.png')
+        plt.close()
         
         plotter_object.save_supply_demand_consumption(system, [resource])
 
         plotter_object.save_component_recovery_progress(system.components)
-    if save_pickle_file:
-        # Save the system components as a pickle file
-        with open(f'system_{rlz}.pickle', 'wb') as f:
-            pickle.dump(system.components, f)
-    # Test load the system object from the pickle file
-    # system_loaded = system.load_as_pickle(f'system_{rlz}.pickle')
-    
-    return True
 
 def modify_system_config_conent(system_config, input_data_dir, rwhale_run_dir):
     """
@@ -369,6 +479,290 @@ def aggregate_results_to_det(results_agg, results_det_path):
     with results_det_path.open('w') as f:
         json.dump(results_det, f)
 
+def save_recovery_store(records, store_path):
+    """
+    Save the recovery records of all realizations in one compressed npz file.
+
+    Curves of realizations that recovered earlier are extended with their
+    final value up to the longest realization. Resources missing from a
+    realization are NaN. Components missing from a realization get an
+    infinite recovery time, as in append_to_results_agg.
+
+    Parameters
+    ----------
+    records : list
+        Records returned by run_one_realization.
+    store_path : Path
+        Path to the npz file.
+    """
+    resources = list(dict.fromkeys(r for record in records for r in record['resources']))
+    components = list(dict.fromkeys(c for record in records for c in record['components']))
+    n_time = max(record['supply'].shape[1] for record in records)
+    curves = {
+        name: np.full((len(records), len(resources), n_time), np.nan)
+        for name in ['supply', 'demand', 'consumption']
+    }
+    recovery_time = np.full((len(records), len(components)), np.inf)
+    component_index = {comp: i for i, comp in enumerate(components)}
+    for i, record in enumerate(records):
+        rows = [resources.index(r) for r in record['resources']]
+        for name, values in curves.items():
+            length = record[name].shape[1]
+            values[i, rows, :length] = record[name]
+            values[i, rows, length:] = record[name][:, -1:]
+        cols = [component_index[comp] for comp in record['components']]
+        recovery_time[i, cols] = record['recovery_time']
+    components = np.array(components, dtype=str).reshape(-1, 3)
+    np.savez_compressed(
+        store_path,
+        rlz=np.array([record['rlz'] for record in records]),
+        time_step=np.array([record['time_step'] for record in records]),
+        resources=np.array(resources, dtype=str),
+        asset_type=components[:, 0],
+        asset_subtype=components[:, 1],
+        asset_id=components[:, 2],
+        recovery_time=recovery_time,
+        **curves,
+    )
+
+def render_recovery_figures(store_path, output_dir, resources, units, realizations=None, quantiles=(0.05, 0.95)):  # noqa: PLR0913
+    """
+    Plot the recovery of resources over all realizations from a recovery store.
+
+    Each figure shows the median and a quantile band of the supply, demand
+    and consumption of a resource, and the consumption of the selected
+    realizations.
+
+    Parameters
+    ----------
+    store_path : Path
+        Path to the npz file written by save_recovery_store.
+    output_dir : Path
+        Directory where the figures are saved.
+    resources : list
+        Resources to plot.
+    units : list
+        Units of the resources.
+    realizations : list, optional
+        Realizations whose consumption is plotted on top of the bands.
+    quantiles : tuple, optional
+        Lower and upper quantiles of the bands.
+    """
+    store = np.load(store_path)
+    store_resources = list(store['resources'])
+    time_steps = np.arange(store['supply'].shape[2])
+    rlz_index = {rlz: i for i, rlz in enumerate(store['rlz'].tolist())}
+    plotter_object = ConcretePlotter()
+    for resource, unit in zip(resources, units):
+        if resource not in store_resources:
+            continue
+        resource_i = store_resources.index(resource)
+        axis_object = plotter_object.setup_lor_plot_fig(
+            'Time step [day]', f'{resource} {unit} | {len(rlz_index)} realizations'
+        )
+        for name in ['supply', 'demand', 'consumption']:
+            values = store[name][:, resource_i, :]
+            # resources missing from a realization are NaN in the store
+            lower, median, upper = np.nanquantile(
+                values, [quantiles[0], 0.5, quantiles[1]], axis=0
+            )
+            line = axis_object.plot(time_steps, median, label=f'{name.capitalize()} (median)')
+            axis_object.fill_between(
+                time_steps, lower, upper, color=line[0].get_color(), alpha=0.3,
+                label=f'{name.capitalize()} ({quantiles[0]:g}-{quantiles[1]:g} quantiles)',
+            )
+        for rlz in realizations or []:
+            if rlz in rlz_index:
+                axis_object.plot(
+                    time_steps, store['consumption'][rlz_index[rlz], resource_i, :],
+                    linewidth=1, linestyle='--', label=f'Consumption, realization {rlz}',
+                )
+        axis_object.legend(loc='lower right')
+        plotter_object.save_current_figure(
+            savename=str(Path(output_dir) / f'{resource}_recovery_quantiles.png')
+        )
+        plt.close()
+
+# shared by all realizations run in a process, see run_realizations
+_realization_context = None
+
+
+def _init_realization_worker(context, headless):  # noqa: FBT001
+    global _realization_context  # noqa: PLW0603
+    _realization_context = context
+    if headless:
+        # workers never show figures
+        plt.switch_backend('Agg')
+
+def prepare_realization(rlz, context):
+    """
+    Set up the work directory and the input files of a realization.
+
+    Parameters
+    ----------
+    rlz : int
+        Realization number.
+    context : dict
+        Paths and configurations shared by the realizations.
+
+    Returns
+    -------
+    tuple
+        Path to the work directory, path to the main file and the system
+        configuration of the realization.
+    """
+    run_dir = context['run_dir']
+    input_data_dir = context['input_data_dir']
+    # Create a directory for the realization
+    rlz_run_dir = run_dir / 'RecoverySimulation'/f'workdir.{rlz}'
+    rlz_run_dir.mkdir()
+    os.chdir(rlz_run_dir)
+    # Every realization works on its own copy of the configurations
+    system_config = copy.deepcopy(context['system_config'])
+    main_file_dict = copy.deepcopy(context['main_file_dict'])
+    # Create a Results_rlz.json file for the specific realization
+    pyrecodes_damage_input = system_config['DamageInput']
+    pyrecodes_damage_input['Parameters']['DamageFile'] = str(
+        run_dir / f'Results_{rlz}.json')
+
+    # Modify the loss values in the Results_rlz.json file so that the
+    # loss values are a small number if the damage is nonzero but loss is zero
+    # This needs to be removed once the pyrecodes is updated to handle this
+    with Path(run_dir / f'Results_{rlz}.json').open() as f:
+        results_rlz = json.load(f)
+    for asset_type_dict in results_rlz.values():
+        for asset_subtype_dict in asset_type_dict.values():
+            for asset_id_dict in asset_subtype_dict.values():
+                # damage_dict = asset_id_dict['Damage']
+                if 'Loss' in asset_id_dict:
+                    loss_dist = asset_id_dict['Loss']
+                    for comp in loss_dist['Repair']['Cost']:
+                        # A minimum cost of 0.00001 is set to avoid division by zero
+                        loss_dist['Repair']['Cost'][comp] = max(loss_dist['Repair']['Cost'][comp], 0.00001)
+                    for comp in loss_dist['Repair']['Time']:
+                        # A minimum time of 0.00001 is set to avoid division by zero
+                        loss_dist['Repair']['Time'][comp] = max(loss_dist['Repair']['Time'][comp], 0.00001)
+    with Path(run_dir / f'Results_{rlz}.json').open('w') as f:
+        json.dump(results_rlz, f)
+
+    # Modify the file paths in the REWETDistributionModel part of the system configuration
+    system_config = modify_system_config_rewet_distribution(system_config, input_data_dir, rlz_run_dir)
+    system_config = modify_system_config_residual_demand_distribution(system_config, input_data_dir, rlz_run_dir)
+    # Write the modified system configuration to a file
+    with Path('SystemConfiguration.json').open('w') as f:
+        json.dump(system_config, f)
+
+    # Modify the main file and write to a file
+    main_file_path = modify_main_file(main_file_dict, context['component_library'], rlz_run_dir)
+    return rlz_run_dir, main_file_path, system_config
+
+def run_realization(rlz):
+    """
+    Run a realization in its own work directory.
+
+    Parameters
+    ----------
+    rlz : int
+        Realization number.
+
+    Returns
+    -------
+    dict
+        Recovery record of the realization, see collect_recovery_record.
+    """
+    context = _realization_context
+    print(f'Running realization {rlz}')  # noqa: T201
+    rlz_run_dir, main_file_path, system_config = prepare_realization(rlz, context)
+
+    # Run the pyrecodes
+    figure_realizations = context['figure_realizations']
+    record = run_one_realization(
+        main_file_path, rlz, context['run_dir'], system_config,
+        context['save_pickle_file'],
+        render_figures=figure_realizations is None or rlz in figure_realizations,
+    )
+    record['results_file'] = rlz_run_dir / f'Results_{rlz}.json'
+    print(f'Rrealization {rlz} completed')  # noqa: T201
+    return record
+
+def run_realizations(rlz_to_run, context, num_processes=1, comm=None):
+    """
+    Run the recovery simulations of a set of realizations.
+
+    Realizations are spread over the MPI ranks when a communicator is given,
+    over num_processes worker processes when more than one is requested, and
+    run one after another otherwise.
+
+    Parameters
+    ----------
+    rlz_to_run : list
+        Realizations to run.
+    context : dict
+        Paths and configurations shared by the realizations.
+    num_processes : int, optional
+        Number of worker processes used without MPI.
+    comm : mpi4py.MPI.Comm, optional
+        Communicator of the ranks sharing the realizations.
+
+    Returns
+    -------
+    list
+        Recovery records in the order of rlz_to_run on the root rank, None on
+        the other ranks.
+    """
+    if comm is not None:
+        from mpi4py import MPI
+
+        # the root broadcasts None instead of the context if it could not
+        # set up the run, and all ranks stop
+        context = comm.bcast(context, root=0)
+        if context is None:
+            return None
+        rlz_to_run = comm.bcast(rlz_to_run, root=0)
+        rank, size = comm.Get_rank(), comm.Get_size()
+        _init_realization_worker(context, True)  # noqa: FBT003
+        records = {}
+        try:
+            # every rank runs its share and the root collects the records
+            # between and after its own realizations
+            for rlz in rlz_to_run[rank::size]:
+                record = run_realization(rlz)
+                if rank == 0:
+                    records[rlz] = record
+                    while comm.Iprobe(source=MPI.ANY_SOURCE, tag=1):
+                        record = comm.recv(source=MPI.ANY_SOURCE, tag=1)
+                        records[record['rlz']] = record
+                else:
+                    comm.send(record, dest=0, tag=1)
+            if rank != 0:
+                return None
+            while len(records) < len(rlz_to_run):
+                record = comm.recv(source=MPI.ANY_SOURCE, tag=1)
+                records[record['rlz']] = record
+        except Exception:
+            # the other ranks are blocked in point-to-point calls with this
+            # one, so a failed realization stops the whole job
+            traceback.print_exc()
+            sys.stderr.flush()
+            comm.Abort(1)
+    elif num_processes > 1 and len(rlz_to_run) > 1:
+        records = {}
+        with ProcessPoolExecutor(
+            max_workers=num_processes,
+            initializer=_init_realization_worker,
+            initargs=(context, True),
+        ) as executor:
+            pending = {executor.submit(run_realization, rlz) for rlz in rlz_to_run}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record = future.result()
+                    records[record['rlz']] = record
+    else:
+        _init_realization_worker(context, False)  # noqa: FBT003
+        records = {rlz: run_realization(rlz) for rlz in rlz_to_run}
+    return [records[rlz] for rlz in rlz_to_run]
+
 
 def run_pyrecodes(  # noqa: C901
         main_file,
@@ -378,6 +772,9 @@ def run_pyrecodes(  # noqa: C901
         input_data_dir,
         realization,
         save_pickle_file,
+        parallel_type='seqRUN',
+        num_processes=1,
+        figure_realizations=None,
 ):
     """
     Run pyrecodes simulation.
@@ -388,141 +785,145 @@ def run_pyrecodes(  # noqa: C901
     system_config_file (str): Path to the system file.
     component_library (str): Path to the component library file.
     locality_geojson (str): Path to the locality geojson file.
+    parallel_type (str): seqRUN runs the realizations one after another,
+        parRUN runs them on the MPI ranks or on num_processes processes.
+    num_processes (int): Number of processes used by parRUN without MPI.
+    figure_realizations (list): Realizations whose figures are rendered.
+        If None, figures are rendered for every realization.
     """
-    # Assume Results_det.json and Results_rlz.json are in rwhale run dir
-    # This script is call in rwhale run dir
-    if r2d_run_dir is None:
-        run_dir = Path.cwd()
-    else:
-        run_dir = Path(r2d_run_dir)
-
-    if input_data_dir is not None:
-        input_data_dir = Path(input_data_dir)
-    else:
-        input_data_dir = Path(os.getcwd()).parent / 'input_data'
-    if not Path(input_data_dir).exists():
-        raise RuntimeError(f"Input data directory {input_data_dir} does not exist.")
-
-    # Make a dir for RecoverySimulation
-    if (run_dir / 'RecoverySimulation').exists():
-        msg = 'RecoverySimulation directory already exists'
-        # Remove all the files and subfolders
-        for filename in os.listdir(str(run_dir / 'RecoverySimulation')):
-            file_path = run_dir / 'RecoverySimulation' / filename
-            try:
-                # If it's a file, remove it
-                if file_path.is_file() or Path(file_path).is_symlink():
-                    file_path.unlink()
-                # If it's a folder, remove it and its contents
-                elif file_path.is_dir():
-                    shutil.rmtree(file_path)
-            except (OSError, shutil.Error) as e:
-                msg = f"Failed to delete {file_path}. Reason: {e}"
-                raise RuntimeError(msg) from e
-        # raise ValueError(msg)
-    else:
-        (run_dir / 'RecoverySimulation').mkdir()
-    os.chdir(run_dir / 'RecoverySimulation')
-
-    # Load the system configuration and modify the damage input part
-    with Path(system_config_file).open() as f:
-        system_config = json.load(f)
-
-    # Modify the file paths in the Content part of the system configuration
-    system_config = modify_system_config_conent(system_config, input_data_dir,
-                                                run_dir)
+    # Realizations are shared by the ranks when running parRUN with MPI
+    comm = None
+    if parallel_type == 'parRUN' and importlib.util.find_spec('mpi4py') is not None:
+        from mpi4py import MPI
+
+        if MPI.COMM_WORLD.Get_size() > 1:
+            comm = MPI.COMM_WORLD
+            if comm.Get_rank() != 0:
+                # the root rank sets up the run and shares the realizations
+                run_realizations(None, None, comm=comm)
+                return
+    if parallel_type != 'parRUN':
+        num_processes = 1
+
+    try:
+        # Assume Results_det.json and Results_rlz.json are in rwhale run dir
+        # This script is call in rwhale run dir
+        if r2d_run_dir is None:
+            run_dir = Path.cwd()
+        else:
+            run_dir = Path(r2d_run_dir)
 
-    # Sina: Main_File is optional. If not provided, one is made by the code.
-    # Required for the workflow app widget run.
-    if main_file is not None:
-        # Modify the DamageInput part of the system configuration
-        with Path(main_file).open() as f:
-            main_file_dict = json.load(f)
-    else:
-        # Check the realization value
-        if realization is None:
-            raise RuntimeError("Realization is not provided")
-        elif type(realization) is not str:
-            raise RuntimeError(f"Realization text type must be string: {type(realization)}.")
-        main_file_dict = {
-            "ComponentLibrary":{
-                "ComponentLibraryCreatorClassName": "JSONComponentLibraryCreator",
-                "ComponentLibraryCreatorFileName": "json_component_library_creator",
-                "ComponentLibraryFile": f"{component_library}"
+        if input_data_dir is not None:
+            input_data_dir = Path(input_data_dir)
+        else:
+            input_data_dir = Path(os.getcwd()).parent / 'input_data'
+        if not Path(input_data_dir).exists():
+            raise RuntimeError(f"Input data directory {input_data_dir} does not exist.")
+
+        # Make a dir for RecoverySimulation
+        if (run_dir / 'RecoverySimulation').exists():
+            msg = 'RecoverySimulation directory already exists'
+            # Remove all the files and subfolders
+            for filename in os.listdir(str(run_dir / 'RecoverySimulation')):
+                file_path = run_dir / 'RecoverySimulation' / filename
+                try:
+                    # If it's a file, remove it
+                    if file_path.is_file() or Path(file_path).is_symlink():
+                        file_path.unlink()
+                    # If it's a folder, remove it and its contents
+                    elif file_path.is_dir():
+                        shutil.rmtree(file_path)
+                except (OSError, shutil.Error) as e:
+                    msg = f"Failed to delete {file_path}. Reason: {e}"
+                    raise RuntimeError(msg) from e
+            # raise ValueError(msg)
+        else:
+            (run_dir / 'RecoverySimulation').mkdir()
+        os.chdir(run_dir / 'RecoverySimulation')
+
+        # Load the system configuration and modify the damage input part
+        with Path(system_config_file).open() as f:
+            system_config = json.load(f)
+
+        # Modify the file paths in the Content part of the system configuration
+        system_config = modify_system_config_conent(system_config, input_data_dir,
+                                                    run_dir)
+
+        # Sina: Main_File is optional. If not provided, one is made by the code.
+        # Required for the workflow app widget run.
+        if main_file is not None:
+            # Modify the DamageInput part of the system configuration
+            with Path(main_file).open() as f:
+                main_file_dict = json.load(f)
+        else:
+            # Check the realization value
+            if realization is None:
+                raise RuntimeError("Realization is not provided")
+            elif type(realization) is not str:
+                raise RuntimeError(f"Realization text type must be string: {type(realization)}.")
+            main_file_dict = {
+                "ComponentLibrary":{
+                    "ComponentLibraryCreatorClassName": "JSONComponentLibraryCreator",
+                    "ComponentLibraryCreatorFileName": "json_component_library_creator",
+                    "ComponentLibraryFile": f"{component_library}"
+                    },
+                "DamageInput": {
+                    "Parameters": {
+                        "Filter": realization
+    				},
+                    "Type": "SpecificRealization"
                 },
-            "DamageInput": {
-                "Parameters": {
-                    "Filter": realization
-				},
-                "Type": "SpecificRealization"
-            },
-            "System":{
-                "SystemClassName": "BuiltEnvironment",
-                "SystemConfigurationFile": f"{system_config_file}",
-                "SystemCreatorClassName": "ConcreteSystemCreator",
-                "SystemCreatorFileName": "concrete_system_creator",
-                "SystemFileName": "built_environment"
+                "System":{
+                    "SystemClassName": "BuiltEnvironment",
+                    "SystemConfigurationFile": f"{system_config_file}",
+                    "SystemCreatorClassName": "ConcreteSystemCreator",
+                    "SystemCreatorFileName": "concrete_system_creator",
+                    "SystemFileName": "built_environment"
+                    }
                 }
-            }
 
-    damage_input = main_file_dict['DamageInput']
+        damage_input = main_file_dict['DamageInput']
+        if damage_input['Type'] not in ('SpecificRealization', 'SampleFromRealizations'):
+            msg = 'Damage input type not recognized'
+            raise ValueError(msg)
 
-    if damage_input['Type'] == 'SpecificRealization' or \
-            damage_input['Type'] == 'SampleFromRealizations':
         rlz_to_run = select_realizations_to_run(damage_input, run_dir)
         results_agg = create_agg_results_dict(Path(run_dir/'Results_det.json'))
-        for rlz in rlz_to_run:
-            print(f'Running realization {rlz}')  # noqa: T201
-            # Create a directory for the realization
-            rlz_run_dir = run_dir / 'RecoverySimulation'/f'workdir.{rlz}'
-            rlz_run_dir.mkdir()
-            os.chdir(rlz_run_dir)
-            # Create a Results_rlz.json file for the specific realization
-            pyrecodes_damage_input = system_config['DamageInput']
-            pyrecodes_damage_input['Parameters']['DamageFile'] = str(
-                run_dir / f'Results_{rlz}.json')
-
-            # Modify the loss values in the Results_rlz.json file so that the
-            # loss values are a small number if the damage is nonzero but loss is zero
-            # This needs to be removed once the pyrecodes is updated to handle this
-            with Path(run_dir / f'Results_{rlz}.json').open() as f:
-                results_rlz = json.load(f)
-            for asset_type_dict in results_rlz.values():
-                for asset_subtype_dict in asset_type_dict.values():
-                    for asset_id_dict in asset_subtype_dict.values():
-                        # damage_dict = asset_id_dict['Damage']
-                        if 'Loss' in asset_id_dict:
-                            loss_dist = asset_id_dict['Loss']
-                            for comp in loss_dist['Repair']['Cost']:
-                                # A minimum cost of 0.00001 is set to avoid division by zero
-                                loss_dist['Repair']['Cost'][comp] = max(loss_dist['Repair']['Cost'][comp], 0.00001)
-                            for comp in loss_dist['Repair']['Time']:
-                                # A minimum time of 0.00001 is set to avoid division by zero
-                                loss_dist['Repair']['Time'][comp] = max(loss_dist['Repair']['Time'][comp], 0.00001)
-            with Path(run_dir / f'Results_{rlz}.json').open('w') as f:
-                json.dump(results_rlz, f)
-
-            # Modify the file paths in the REWETDistributionModel part of the system configuration
-            system_config = modify_system_config_rewet_distribution(system_config, input_data_dir, rlz_run_dir)
-            system_config = modify_system_config_residual_demand_distribution(system_config, input_data_dir, rlz_run_dir)
-            # Write the modified system configuration to a file
-            with Path('SystemConfiguration.json').open('w') as f:
-                json.dump(system_config, f)
-
-            # Modify the main file and write to a file
-            main_file_path = modify_main_file(main_file_dict, component_library, rlz_run_dir)
-
-            # Run the pyrecodes
-            run_one_realization(main_file_path, rlz, run_dir, system_config, save_pickle_file)
-
-            # Append the results to the aggregated results dictionary
-            results_agg = append_to_results_agg(results_agg, Path(rlz_run_dir / f'Results_{rlz}.json'))
-            print(f'Rrealization {rlz} completed')  # noqa: T201
-        # Write the aggregated results to the Results_det.json file
-        aggregate_results_to_det(results_agg, Path(run_dir / 'Results_det.json'))
-    else:
-        msg = 'Damage input type not recognized'
-        raise ValueError(msg)
+        context = {
+            'run_dir': run_dir,
+            'input_data_dir': input_data_dir,
+            'component_library': component_library,
+            'system_config': system_config,
+            'main_file_dict': main_file_dict,
+            'save_pickle_file': save_pickle_file,
+            'figure_realizations': figure_realizations,
+        }
+    except BaseException:
+        if comm is not None:
+            # release the other ranks waiting for the realizations
+            comm.bcast(None, root=0)
+        raise
+
+    records = run_realizations(
+        list(rlz_to_run), context, num_processes=num_processes, comm=comm
+    )
+    for record in records:
+        # Append the results to the aggregated results dictionary
+        results_agg = append_to_results_agg(results_agg, Path(record['results_file']))
+    os.chdir(run_dir / 'RecoverySimulation')
+
+    # Keep the recovery of all realizations in one file and plot the
+    # spread of the recovery over the realizations
+    if len(records) > 0:
+        store_path = run_dir / 'RecoverySimulation' / 'recovery_results.npz'
+        save_recovery_store(records, store_path)
+        resources_to_plot, units_to_plot = select_resources_to_plot(system_config)
+        render_recovery_figures(
+            store_path, run_dir / 'RecoverySimulation', resources_to_plot,
+            units_to_plot, realizations=figure_realizations,
+        )
+    # Write the aggregated results to the Results_det.json file
+    aggregate_results_to_det(results_agg, Path(run_dir / 'Results_det.json'))
 
 
 
@@ -589,11 +990,13 @@ if __name__ == '__main__':
         help='R2D input data directory',
     )
 
-    # Below are for future parallelization
+    # Below are for parallelization
     workflowArgParser.add_argument(
         '--parallelType',
         default='seqRUN',
-        help='How parallel runs: options seqRUN, parSETUP, parRUN',
+        help='How parallel runs: options seqRUN, parSETUP, parRUN. parRUN '
+        'runs the realizations on the MPI ranks if started with mpiexec, and '
+        'on numP processes otherwise',
     )
     workflowArgParser.add_argument(
         '--mpiexec',
@@ -605,12 +1008,24 @@ if __name__ == '__main__':
         default='8',
         help='If parallel, how many jobs to start with mpiexec option',
     )
+    workflowArgParser.add_argument(
+        '--figureRealizations',
+        default=None,
+        help='Realizations whose figures are rendered, e.g. "1,3-5", or "none". '
+        'By default, figures are rendered for every realization with seqRUN '
+        'and for none with parRUN',
+    )
 
     # Parsing the command line arguments
     wfArgs = workflowArgParser.parse_args()  # noqa: N816
 
     # Calling the main workflow method and passing the parsed arguments
-    # numPROC = int(wfArgs.numP)
+    if wfArgs.figureRealizations is None:
+        figure_realizations = [] if wfArgs.parallelType == 'parRUN' else None
+    elif wfArgs.figureRealizations.lower() == 'none':
+        figure_realizations = []
+    else:
+        figure_realizations = parse_realization_filter(wfArgs.figureRealizations)
     # If run in the main workflow
     if wfArgs.input is not None: 
         json_input_file_path = Path(wfArgs.input)
@@ -669,5 +1084,8 @@ if __name__ == '__main__':
         r2d_run_dir=wfArgs.r2dRunDir,
         input_data_dir=wfArgs.inputDataDir,
         realization=realization_text,
-        save_pickle_file=wfArgs.savePickleFile
+        save_pickle_file=wfArgs.savePickleFile,
+        parallel_type=wfArgs.parallelType,
+        num_processes=int(wfArgs.numP),
+        figure_realizations=figure_realizations,
     )
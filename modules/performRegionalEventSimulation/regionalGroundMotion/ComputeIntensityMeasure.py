@@ -71,6 +71,9 @@ LOCAL_IM_GMPE = {
     ],
 }
 
+# site parameters used by the local GMPEs
+LOCAL_GMPE_SITE_KEYS = ['rJB', 'rRup', 'rX', 'vs30', 'vsInferred', 'z1pt0', 'z2pt5']
+
 OPENSHA_IM_GMPE = {
     'SA': [
         'Abrahamson, Silva & Kamai (2014)',
@@ -95,11 +98,19 @@ OPENSHA_IM_GMPE = {
 IM_GMPE = {'LOCAL': LOCAL_IM_GMPE, 'OPENSHA': OPENSHA_IM_GMPE}
 
 import collections  # noqa: E402
+import hashlib  # noqa: E402
 import json  # noqa: E402
+import multiprocessing  # noqa: E402
 import os  # noqa: E402
 import socket  # noqa: E402
 import sys  # noqa: E402
 import time  # noqa: E402
+from concurrent.futures import (  # noqa: E402
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
 from pathlib import Path  # noqa: E402
 
 import pandas as pd  # noqa: E402
@@ -407,84 +418,91 @@ class IM_Calculator:  # noqa: D101
                 )
             )
             return res
+        # site parameters and site-rupture distances as arrays over sites
+        num_sites = len(self.site_info)
+        site_arrays = {
+            key: np.array(
+                [cur_site.get(key, np.nan) for cur_site in self.site_info],
+                dtype=float,
+            )
+            for key in LOCAL_GMPE_SITE_KEYS
+        }
         for cur_gmpe in gmpe_list:
-            gm_collector = []
             if cur_gmpe not in avail_gmpe:
                 print(  # noqa: T201
                     f'ComputeIntensityMeasure.get_im_from_local: warning - {cur_gmpe} is not available.'
                 )
                 continue
-            for cur_site in self.site_info:
-                # current site-rupture distance
-                cur_dist = cur_site['rRup']
-                cur_vs30 = cur_site['vs30']
+            # evaluate the gmpe for all sites at once
+            if cur_gmpe == 'Bommer, Stafford & Alarcon (2009)':
+                mean, stdDev, interEvStdDev, intraEvStdDev = (  # noqa: N806
+                    SignificantDurationModel.bommer_stafford_alarcon_ds_2009(
+                        magnitude=eq_magnitude,
+                        distance=site_arrays['rRup'],
+                        vs30=site_arrays['vs30'],
+                        duration_type=im_type,
+                    )
+                )
+                tmpResult = {  # noqa: N806
+                    'Mean': [mean],
+                    'TotalStdDev': [stdDev],
+                    'InterEvStdDev': [interEvStdDev],
+                    'IntraEvStdDev': [intraEvStdDev],
+                }
+            elif cur_gmpe == 'Afshari & Stewart (2016)':
+                mean, stdDev, interEvStdDev, intraEvStdDev = (  # noqa: N806
+                    SignificantDurationModel.afshari_stewart_ds_2016(
+                        magnitude=eq_magnitude,
+                        distance=site_arrays['rRup'],
+                        vs30=site_arrays['vs30'],
+                        duration_type=im_type,
+                    )
+                )
+                tmpResult = {  # noqa: N806
+                    'Mean': [mean],
+                    'TotalStdDev': [stdDev],
+                    'InterEvStdDev': [interEvStdDev],
+                    'IntraEvStdDev': [intraEvStdDev],
+                }
+            elif cur_gmpe == 'Chiou & Youngs (2014)':
+                tmpResult = self.CY.get_IM(  # noqa: N806
+                    eq_magnitude, self.site_rup_dict, site_arrays, im_info
+                )
+            elif cur_gmpe == 'Abrahamson, Silva & Kamai (2014)':
+                tmpResult = self.ASK.get_IM(  # noqa: N806
+                    eq_magnitude, self.site_rup_dict, site_arrays, im_info
+                )
+            elif cur_gmpe == 'Boore, Stewart, Seyhan & Atkinson (2014)':
+                tmpResult = self.BSSA.get_IM(  # noqa: N806
+                    eq_magnitude, self.site_rup_dict, site_arrays, im_info
+                )
+            elif cur_gmpe == 'Campbell & Bozorgnia (2014)':
+                tmpResult = self.CB.get_IM(  # noqa: N806
+                    eq_magnitude, self.site_rup_dict, site_arrays, im_info
+                )
+            else:
+                print(  # noqa: T201
+                    f'ComputeIntensityMeasure.get_im_from_local: gmpe_name {cur_gmpe} is not supported.'
+                )
                 tmpResult = {  # noqa: N806
                     'Mean': [],
                     'TotalStdDev': [],
                     'InterEvStdDev': [],
                     'IntraEvStdDev': [],
                 }
-                if cur_gmpe == 'Bommer, Stafford & Alarcon (2009)':
-                    mean, stdDev, interEvStdDev, intraEvStdDev = (  # noqa: N806
-                        SignificantDurationModel.bommer_stafford_alarcon_ds_2009(
-                            magnitude=eq_magnitude,
-                            distance=cur_dist,
-                            vs30=cur_vs30,
-                            duration_type=im_type,
-                        )
-                    )
-                    tmpResult['Mean'].append(float(mean))
-                    tmpResult['TotalStdDev'].append(float(stdDev))
-                    tmpResult['InterEvStdDev'].append(float(interEvStdDev))
-                    tmpResult['IntraEvStdDev'].append(float(intraEvStdDev))
-                elif cur_gmpe == 'Afshari & Stewart (2016)':
-                    mean, stdDev, interEvStdDev, intraEvStdDev = (  # noqa: N806
-                        SignificantDurationModel.afshari_stewart_ds_2016(
-                            magnitude=eq_magnitude,
-                            distance=cur_dist,
-                            vs30=cur_vs30,
-                            duration_type=im_type,
-                        )
-                    )
-                    tmpResult['Mean'].append(float(mean))
-                    tmpResult['TotalStdDev'].append(float(stdDev))
-                    tmpResult['InterEvStdDev'].append(float(interEvStdDev))
-                    tmpResult['IntraEvStdDev'].append(float(intraEvStdDev))
-                elif cur_gmpe == 'Chiou & Youngs (2014)':
-                    # start = time.process_time_ns()
-                    tmpResult = self.CY.get_IM(  # noqa: N806
-                        eq_magnitude, self.site_rup_dict, cur_site, im_info
-                    )
-                    # self.timeGetIM += time.process_time_ns() - start
-                elif cur_gmpe == 'Abrahamson, Silva & Kamai (2014)':
-                    # start = time.process_time_ns()
-                    tmpResult = self.ASK.get_IM(  # noqa: N806
-                        eq_magnitude, self.site_rup_dict, cur_site, im_info
-                    )
-                    # self.timeGetIM += time.process_time_ns() - start
-                elif cur_gmpe == 'Boore, Stewart, Seyhan & Atkinson (2014)':
-                    # start = time.process_time_ns()
-                    tmpResult = self.BSSA.get_IM(  # noqa: N806
-                        eq_magnitude, self.site_rup_dict, cur_site, im_info
-                    )
-                    # self.timeGetIM += time.process_time_ns() - start
-                elif cur_gmpe == 'Campbell & Bozorgnia (2014)':
-                    # start = time.process_time_ns()
-                    tmpResult = self.CB.get_IM(  # noqa: N806
-                        eq_magnitude, self.site_rup_dict, cur_site, im_info
-                    )
-                    # self.timeGetIM += time.process_time_ns() - start
-                else:
-                    print(  # noqa: T201
-                        f'ComputeIntensityMeasure.get_im_from_local: gmpe_name {cur_gmpe} is not supported.'
-                    )
-                # collect sites
-                # gm_collector.append({
-                # 	"Location": {'Latitude':cur_site['lat'], 'Longitude':cur_site['lon']},
-                #              "SiteData": {key: cur_site[key] for key in cur_site if key not in ['lat','lon']},
-                # 			 'ln'+im_type: tmpResult
-                # 			 })
-                gm_collector.append({'ln' + im_type: tmpResult})
+            # split the (period, site) values into the results of each site
+            site_values = {
+                key: np.array(
+                    [np.broadcast_to(x, num_sites) for x in value], dtype=float
+                )
+                .reshape(len(value), num_sites)
+                .T.tolist()
+                for key, value in tmpResult.items()
+            }
+            gm_collector = [
+                {'ln' + im_type: {key: value[i] for key, value in site_values.items()}}
+                for i in range(num_sites)
+            ]
 
             # Final results
             cur_res = {
@@ -667,6 +685,33 @@ def get_im_dict(im_info):  # noqa: D103
     return im_dict
 
 
+def get_im_chunk_options(event_info):
+    """Read the options of compute_im_chunks from the event configuration.
+
+    The options are given in the optional `IntensityMeasureComputation`
+    object of the event, e.g.,
+    `{"NumProcesses": 4, "ScenarioChunkSize": 16, "SiteChunkSize": 10000}`.
+
+    Parameters
+    ----------
+    event_info : dict
+        Event configuration of the hazard simulation.
+
+    Returns
+    -------
+    dict
+        `num_processes`, `scenario_chunk_size` and `site_chunk_size` keyword
+        arguments of compute_im.
+
+    """
+    options = event_info.get('IntensityMeasureComputation', {})
+    return {
+        'num_processes': int(options.get('NumProcesses', 1)),
+        'scenario_chunk_size': int(options.get('ScenarioChunkSize', 16)),
+        'site_chunk_size': int(options.get('SiteChunkSize', 10000)),
+    }
+
+
 def get_gmpe_from_im_vector(im_info, gmpe_info):  # noqa: D103
     gmpe_dict = dict()  # noqa: C408
     gmpe_weights_dict = dict()  # noqa: C408
@@ -744,6 +789,9 @@ def compute_im(  # noqa: C901, D103
     output_dir,
     filename='IntensityMeasureMeanStd.hdf5',
     mth_flag=True,  # noqa: FBT002
+    num_processes=1,
+    scenario_chunk_size=16,
+    site_chunk_size=10000,
 ):
     # Calling OpenSHA to compute median PSA
     if len(scenarios) < 10:  # noqa: PLR2004
@@ -815,36 +863,26 @@ def compute_im(  # noqa: C901, D103
 
     t_start = time.time()
     # Loop over scenarios
-    if mth_flag is False:
+    if mth_flag is False and not saveInJson:
+        # scenario x site chunks written straight into the hdf5 file
+        compute_im_chunks(
+            scenarios,
+            stations,
+            EqRupture_info,
+            im_dict,
+            gmpe_dict,
+            gmpe_weights_dict,
+            im_list,
+            filename,
+            num_processes=num_processes,
+            scenario_chunk_size=scenario_chunk_size,
+            site_chunk_size=site_chunk_size,
+        )
+    elif mth_flag is False:
         # create a IM calculator
-        im_calculator = IM_Calculator(
-            im_dict=im_dict,
-            gmpe_dict=gmpe_dict,
-            gmpe_weights_dict=gmpe_weights_dict,
-            site_info=stations,
+        im_calculator = create_im_calculator(
+            im_dict, gmpe_dict, gmpe_weights_dict, EqRupture_info, stations
         )
-        if EqRupture_info['EqRupture']['Type'] == 'ERF':
-            im_calculator.erf = getERF(EqRupture_info)  # noqa: F405
-        else:
-            im_calculator.erf = None
-        gmpe_set = set()
-        for _, item in gmpe_dict.items():  # noqa: PERF102
-            gmpe_set = gmpe_set.union(set(item))
-        for gmpe in gmpe_set:
-            if gmpe == 'Chiou & Youngs (2014)':
-                im_calculator.CY = openSHAGMPE.chiou_youngs_2013()
-            if gmpe == 'Abrahamson, Silva & Kamai (2014)':
-                im_calculator.ASK = openSHAGMPE.abrahamson_silva_kamai_2014()
-            if gmpe == 'Boore, Stewart, Seyhan & Atkinson (2014)':
-                im_calculator.BSSA = openSHAGMPE.boore_etal_2014()
-            if gmpe == 'Campbell & Bozorgnia (2014)':
-                im_calculator.CB = openSHAGMPE.campbell_bozorgnia_2014()
-            # if gmpe == 'Afshari & Stewart (2016)':
-            #     im_calculator.AS2016 = SignificantDurationModel.afshari_stewart_ds_2016()
-        # for i in tqdm(range(len(scenarios.keys())), desc=f"Evaluate GMPEs for {len(scenarios.keys())} scenarios"):
-        # Initialize an hdf5 file for IMmeanStd
-        if os.path.exists(filename):  # noqa: PTH110
-            os.remove(filename)  # noqa: PTH107
         for i in tqdm(
             range(len(scenarios.keys())),
             desc=f'Evaluate GMPEs for {len(scenarios.keys())} scenarios',
@@ -862,27 +900,8 @@ def compute_im(  # noqa: C901, D103
                 res_list.update({cur_im_type: im_calculator.calculate_im()})
             # Collecting outputs
             # collectedResult.update({'SourceIndex':source_info['SourceIndex'], 'RuptureIndex':source_info['RuptureIndex']})
-            if saveInJson:
-                collectedResult = collect_multi_im_res(res_list)  # noqa: N806
-                im_raw.update({key: collectedResult})
-            else:
-                collectedResult = collect_multi_im_res_hdf5(res_list, im_list)  # noqa: N806
-                with h5py.File(filename, 'a') as f:
-                    # Add a group named by the scenario index and has four dataset
-                    # mean, totalSTd, interStd,itrastd
-                    grp = f.create_group(str(i))
-                    grp.create_dataset('Mean', data=collectedResult['Mean'])
-                    grp.create_dataset(
-                        'InterEvStdDev', data=collectedResult['InterEvStdDev']
-                    )
-                    grp.create_dataset(
-                        'IntraEvStdDev', data=collectedResult['IntraEvStdDev']
-                    )
-            # if (i % 250 == 0):
-            # 	if saveInJson:
-            # 		print(f"Size of im_raw for {i} scenario is {sys.getsizeof(im_raw)}")
-            # 	else:
-            # 		print(f"Another 250 scenarios computed")
+            collectedResult = collect_multi_im_res(res_list)  # noqa: N806
+            im_raw.update({key: collectedResult})
 
     if mth_flag:
         res_dict = {}
@@ -932,6 +951,281 @@ def compute_im(  # noqa: C901, D103
     return filename, im_list
 
 
+def create_im_calculator(  # noqa: D103
+    im_dict,
+    gmpe_dict,
+    gmpe_weights_dict,
+    EqRupture_info,  # noqa: N803
+    stations=dict(),  # noqa: B006, C408
+):
+    im_calculator = IM_Calculator(
+        im_dict=im_dict,
+        gmpe_dict=gmpe_dict,
+        gmpe_weights_dict=gmpe_weights_dict,
+        site_info=stations,
+    )
+    if EqRupture_info['EqRupture']['Type'] == 'ERF':
+        im_calculator.erf = getERF(EqRupture_info)  # noqa: F405
+    else:
+        im_calculator.erf = None
+    gmpe_set = set()
+    for _, item in gmpe_dict.items():  # noqa: PERF102
+        gmpe_set = gmpe_set.union(set(item))
+    for gmpe in gmpe_set:
+        if gmpe == 'Chiou & Youngs (2014)':
+            im_calculator.CY = openSHAGMPE.chiou_youngs_2013()
+        if gmpe == 'Abrahamson, Silva & Kamai (2014)':
+            im_calculator.ASK = openSHAGMPE.abrahamson_silva_kamai_2014()
+        if gmpe == 'Boore, Stewart, Seyhan & Atkinson (2014)':
+            im_calculator.BSSA = openSHAGMPE.boore_etal_2014()
+        if gmpe == 'Campbell & Bozorgnia (2014)':
+            im_calculator.CB = openSHAGMPE.campbell_bozorgnia_2014()
+        # if gmpe == 'Afshari & Stewart (2016)':
+        #     im_calculator.AS2016 = SignificantDurationModel.afshari_stewart_ds_2016()
+    # return
+    return im_calculator
+
+
+def compute_im_chunk(im_calculator, source_infos, stations, im_dict, im_list):
+    """Compute the IM mean and standard deviations of a scenario x site chunk.
+
+    Parameters
+    ----------
+    im_calculator : IM_Calculator
+        Calculator from `create_im_calculator`.
+    source_infos : list
+        Scenarios of the chunk.
+    stations : list
+        Sites of the chunk.
+    im_dict : dict
+        Intensity measures to compute, by IM type.
+    im_list : list
+        Names of the IMs, in the order of the output columns.
+
+    Returns
+    -------
+    numpy.ndarray
+        Mean, inter- and intra-event standard deviations, stacked in an
+        array of shape (3, scenarios, sites, IMs).
+
+    """
+    res = np.zeros((3, len(source_infos), len(stations), len(im_list)))
+    im_calculator.set_sites(stations)
+    for k, source_info in enumerate(source_infos):
+        im_calculator.set_source(source_info)
+        res_list = dict()  # noqa: C408
+        for cur_im_type in list(im_dict.keys()):
+            im_calculator.set_im_type(cur_im_type)
+            res_list.update({cur_im_type: im_calculator.calculate_im()})
+        collected = collect_multi_im_res_hdf5(res_list, im_list)
+        res[0, k] = collected['Mean']
+        res[1, k] = collected['InterEvStdDev']
+        res[2, k] = collected['IntraEvStdDev']
+    return res
+
+
+# IM calculator of a worker process of compute_im_chunks
+_worker_im_calculator = None
+
+
+def _init_im_worker(im_dict, gmpe_dict, gmpe_weights_dict, EqRupture_info):  # noqa: N803
+    global _worker_im_calculator  # noqa: PLW0603
+    _worker_im_calculator = create_im_calculator(
+        im_dict, gmpe_dict, gmpe_weights_dict, EqRupture_info
+    )
+
+
+def _compute_im_chunk_in_worker(source_infos, stations, im_dict, im_list):
+    return compute_im_chunk(
+        _worker_im_calculator, source_infos, stations, im_dict, im_list
+    )
+
+
+def compute_im_chunks(  # noqa: C901
+    scenarios,
+    stations,
+    EqRupture_info,  # noqa: N803
+    im_dict,
+    gmpe_dict,
+    gmpe_weights_dict,
+    im_list,
+    filename,
+    num_processes=1,
+    scenario_chunk_size=16,
+    site_chunk_size=10000,
+):
+    """Compute IM means and standard deviations chunk by chunk into hdf5.
+
+    The scenarios and sites are split into chunks that are evaluated in
+    `num_processes` worker processes, each with its own IM calculator. The
+    results are written into datasets preallocated for every scenario
+    (group `str(i)` with `Mean`, `InterEvStdDev` and `IntraEvStdDev`), and
+    the `CompletedChunks` dataset records the chunks written so far. If the
+    file was left by an interrupted run with the same inputs, the completed
+    chunks are skipped; otherwise the file is recreated.
+
+    Parameters
+    ----------
+    scenarios : dict
+        Earthquake scenarios.
+    stations : list
+        Sites.
+    EqRupture_info : dict
+        Earthquake rupture information.
+    im_dict : dict
+        Intensity measures to compute, by IM type.
+    gmpe_dict : dict
+        GMPEs, by IM type.
+    gmpe_weights_dict : dict
+        GMPE weights, by IM type.
+    im_list : list
+        Names of the IMs, in the order of the output columns.
+    filename : str
+        Path of the hdf5 file.
+    num_processes : int, optional
+        Number of worker processes, chunks are evaluated in this process if
+        it is 1.
+    scenario_chunk_size : int, optional
+        Number of scenarios in a chunk.
+    site_chunk_size : int, optional
+        Number of sites in a chunk.
+
+    """
+    scenario_keys = list(scenarios.keys())
+    num_scenarios = len(scenario_keys)
+    num_sites = len(stations)
+    site_chunk_size = max(1, min(site_chunk_size, num_sites))
+    num_scenario_chunks = int(np.ceil(num_scenarios / scenario_chunk_size))
+    num_site_chunks = int(np.ceil(num_sites / site_chunk_size))
+    # the inputs are fingerprinted, so only a file of the same run is resumed
+    fingerprint = hashlib.sha256(
+        json.dumps(
+            [
+                [scenarios[key] for key in scenario_keys],
+                stations,
+                EqRupture_info,
+                im_dict,
+                gmpe_dict,
+                gmpe_weights_dict,
+                im_list,
+                scenario_chunk_size,
+                site_chunk_size,
+            ],
+            sort_keys=True,
+            default=str,
+        ).encode()
+    ).hexdigest()
+
+    try:
+        f = h5py.File(filename, 'a')
+    except OSError:
+        # not a readable hdf5 file, e.g., the run was killed while creating it
+        os.remove(filename)  # noqa: PTH107
+        f = h5py.File(filename, 'a')
+    with f:
+        if f.attrs.get('Fingerprint', '') != fingerprint:
+            for key in list(f.keys()):
+                del f[key]
+            for i in range(num_scenarios):
+                grp = f.create_group(str(i))
+                for name in ['Mean', 'InterEvStdDev', 'IntraEvStdDev']:
+                    grp.create_dataset(
+                        name,
+                        shape=(num_sites, len(im_list)),
+                        dtype=float,
+                        # small enough for the chunk cache of readers that
+                        # access the sites one by one
+                        chunks=(
+                            min(site_chunk_size, max(1, 2**16 // len(im_list))),
+                            len(im_list),
+                        ),
+                        compression='gzip',
+                    )
+            f.create_dataset(
+                'CompletedChunks',
+                data=np.zeros((num_scenario_chunks, num_site_chunks), dtype=bool),
+            )
+            f.attrs['Fingerprint'] = fingerprint
+        completed = f['CompletedChunks'][()]
+    todo = [
+        (i, j)
+        for i in range(num_scenario_chunks)
+        for j in range(num_site_chunks)
+        if not completed[i, j]
+    ]
+    if len(todo) < completed.size:
+        print(  # noqa: T201
+            f'ComputeIntensityMeasure: resuming, {completed.size - len(todo)} of {completed.size} chunks were computed before.'
+        )
+
+    def chunk_args(chunk):
+        scen_ids = range(
+            chunk[0] * scenario_chunk_size,
+            min((chunk[0] + 1) * scenario_chunk_size, num_scenarios),
+        )
+        site_ids = slice(
+            chunk[1] * site_chunk_size, (chunk[1] + 1) * site_chunk_size
+        )
+        return (
+            [scenarios[int(scenario_keys[i])] for i in scen_ids],
+            stations[site_ids],
+            im_dict,
+            im_list,
+        )
+
+    def write_chunk(f, chunk, res):
+        site_ids = slice(
+            chunk[1] * site_chunk_size, (chunk[1] + 1) * site_chunk_size
+        )
+        for k in range(res.shape[1]):
+            grp = f[str(chunk[0] * scenario_chunk_size + k)]
+            grp['Mean'][site_ids, :] = res[0, k]
+            grp['InterEvStdDev'][site_ids, :] = res[1, k]
+            grp['IntraEvStdDev'][site_ids, :] = res[2, k]
+        f['CompletedChunks'][chunk] = True
+        f.flush()
+
+    with h5py.File(filename, 'a') as f, tqdm(
+        total=len(todo),
+        desc=f'Evaluate GMPEs for {num_scenarios} scenarios in {len(todo)} chunks',
+    ) as progress:
+        if num_processes <= 1:
+            im_calculator = create_im_calculator(
+                im_dict, gmpe_dict, gmpe_weights_dict, EqRupture_info
+            )
+            for chunk in todo:
+                write_chunk(
+                    f, chunk, compute_im_chunk(im_calculator, *chunk_args(chunk))
+                )
+                progress.update()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=num_processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_im_worker,
+                initargs=(im_dict, gmpe_dict, gmpe_weights_dict, EqRupture_info),
+            ) as executor:
+                # a bounded number of chunks in flight keeps the memory use
+                # independent of the number of scenarios
+                todo = iter(todo)
+                running = {}
+                for chunk in todo:
+                    running[
+                        executor.submit(
+                            _compute_im_chunk_in_worker, *chunk_args(chunk)
+                        )
+                    ] = chunk
+                    if len(running) < 2 * num_processes:
+                        continue
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        write_chunk(f, running.pop(future), future.result())
+                        progress.update()
+                for future in as_completed(running):
+                    write_chunk(f, running[future], future.result())
+                    progress.update()
+
+
 def compute_im_para(  # noqa: D103
     ids,
     scenario_infos,
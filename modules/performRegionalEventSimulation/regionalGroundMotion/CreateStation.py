@@ -37,44 +37,29 @@
 # Kuanshi Zhong
 #
 
-import socket  # noqa: I001
+import functools
+import os
+import pickle
+import socket
 import sys
+import tempfile
+import zipfile
 
 import numpy as np
 import pandas as pd
 from tqdm import tqdm
-import importlib
-import subprocess
 
-
-if importlib.util.find_spec('joblib') is None:
-    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'joblib'])  # noqa: S603
-
-if importlib.util.find_spec('contextlib') is None:
-    subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'contextlib'])  # noqa: S603
-
-import joblib  # noqa: I001
-import contextlib
-from joblib import Parallel, delayed
-import multiprocessing
-
-
-@contextlib.contextmanager
-def tqdm_joblib(tqdm_object):
-    """Context manager to patch joblib to report into tqdm progress bar given as argument."""
-
-    class TqdmBatchCompletionCallback(joblib.parallel.BatchCompletionCallBack):
-        def __call__(self, *args, **kwargs):
-            tqdm_object.update(n=self.batch_size)
-            return super().__call__(*args, **kwargs)
-
-    old_batch_callback = joblib.parallel.BatchCompletionCallBack
-    joblib.parallel.BatchCompletionCallBack = TqdmBatchCompletionCallback
-    try:
-        yield tqdm_object
-    finally:
-        joblib.parallel.BatchCompletionCallBack = old_batch_callback
-        tqdm_object.close()
+# Gridded site databases (database/site/<name>.pkl) are converted on first
+# use to .npy files that are memory-mapped afterwards, and site parameters
+# fetched from web services are cached by coordinates rounded to
+# SITE_PARAMETER_CACHE_DECIMALS decimals in SITE_PARAMETER_CACHE_DIR
+SITE_DATABASE_DIR = os.path.join(  # noqa: PTH118
+    os.path.dirname(os.path.realpath(__file__)),  # noqa: PTH120
+    'database',
+    'site',
+)
+SITE_PARAMETER_CACHE_DIR = os.path.join(SITE_DATABASE_DIR, 'cache')  # noqa: PTH118
+SITE_PARAMETER_CACHE_DECIMALS = 5
 
 
 if 'stampede2' not in socket.gethostname():
@@ -94,6 +79,208 @@ def get_label(options, labels, label_name):  # noqa: D103
     print(f'WARNING: Could not identify the label for the {label_name}')  # noqa: T201, RET503
 
 
+def _save_atomically(path, save):
+    """Write a file with save(f) and move it to path in one step.
+
+    The file is written to a temporary file next to path and renamed, so
+    concurrent runs never read a partially written file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')  # noqa: PTH120
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            save(f)
+        os.replace(tmp_path, path)  # noqa: PTH105
+    except BaseException:
+        if os.path.isfile(tmp_path):  # noqa: PTH113
+            os.remove(tmp_path)  # noqa: PTH107
+        raise
+
+
+@functools.lru_cache(maxsize=None)
+def load_site_grid(name, key, invalid_below=None, invalid_value=None):
+    """Load a gridded site database as memory-mapped arrays.
+
+    The pickled dictionary database/site/<name>.pkl (1-D Latitude and
+    Longitude ticks and a 2-D Latitude x Longitude array under key) is
+    converted once to .npy files in database/site/<name>/, which are
+    memory-mapped in this and later runs instead of unpickling the grid.
+
+    Parameters
+    ----------
+    name : str
+        Name of the database.
+    key : str
+        Key of the gridded values.
+    invalid_below : float, optional
+        Values below invalid_below are replaced by invalid_value.
+    invalid_value : float, optional
+        Replacement of the invalid values.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Latitude ticks, longitude ticks and the gridded values.
+    """
+    grid_dir = os.path.join(SITE_DATABASE_DIR, name)  # noqa: PTH118
+    grid_files = [
+        os.path.join(grid_dir, f'{x}.npy')  # noqa: PTH118
+        for x in ['Latitude', 'Longitude', key]
+    ]
+    pickle_file = os.path.join(SITE_DATABASE_DIR, f'{name}.pkl')  # noqa: PTH118
+    if all(os.path.isfile(x) for x in grid_files) and not (  # noqa: PTH113
+        os.path.isfile(pickle_file)  # noqa: PTH113
+        and os.path.getmtime(pickle_file) > os.path.getmtime(grid_files[-1])  # noqa: PTH204
+    ):
+        try:
+            return tuple(np.load(x, mmap_mode='r') for x in grid_files)
+        except (OSError, ValueError):
+            # unreadable grid files are converted again
+            pass
+
+    with open(pickle_file, 'rb') as f:  # noqa: PTH123
+        grid = pickle.load(f)  # noqa: S301
+    values = np.asarray(grid[key])
+    if invalid_below is not None:
+        values = np.where(values < invalid_below, invalid_value, values).astype(
+            values.dtype
+        )
+    arrays = [
+        np.asarray(grid['Latitude'], dtype=float),
+        np.asarray(grid['Longitude'], dtype=float),
+        values,
+    ]
+    try:
+        os.makedirs(grid_dir, exist_ok=True)  # noqa: PTH103
+        for grid_file, array in zip(grid_files, arrays):
+            _save_atomically(grid_file, lambda f, a=array: np.save(f, a))
+    except OSError:
+        # read-only database, keep the grid in memory for this run
+        return tuple(arrays)
+    return tuple(np.load(x, mmap_mode='r') for x in grid_files)
+
+
+def _grid_cell(ticks, x):
+    # lower node and weight of the upper node of the cells containing x,
+    # with x clamped to the grid as in scipy.interpolate.interp2d
+    x = np.clip(np.asarray(x, dtype=float), ticks[0], ticks[-1])
+    i = np.clip(np.searchsorted(ticks, x, side='right') - 1, 0, len(ticks) - 2)
+    return i, (x - ticks[i]) / (ticks[i + 1] - ticks[i])
+
+
+def interpolate_site_grid(grid, lat, lon):
+    """Bilinear interpolation of a gridded site database at all locations.
+
+    Only the grid nodes around the locations are read from the
+    memory-mapped values.
+
+    Parameters
+    ----------
+    grid : tuple of numpy.ndarray
+        Latitude ticks, longitude ticks and gridded values (load_site_grid).
+    lat : array_like
+        Latitudes of the locations.
+    lon : array_like
+        Longitudes of the locations.
+
+    Returns
+    -------
+    numpy.ndarray
+        Interpolated values.
+    """
+    grid_lat, grid_lon, values = grid
+    i, w_lat = _grid_cell(grid_lat, lat)
+    j, w_lon = _grid_cell(grid_lon, lon)
+    return (1.0 - w_lat) * (
+        (1.0 - w_lon) * values[i, j] + w_lon * values[i, j + 1]
+    ) + w_lat * ((1.0 - w_lon) * values[i + 1, j] + w_lon * values[i + 1, j + 1])
+
+
+def cached_site_parameter(name, lat, lon, fetch):
+    """Look up a site parameter in the cache of earlier runs.
+
+    Locations are matched by coordinates rounded to
+    SITE_PARAMETER_CACHE_DECIMALS decimals. Only the locations missing from
+    SITE_PARAMETER_CACHE_DIR/<name>.npz are passed (once each) to
+    fetch(lat, lon), and the fetched values other than NaN are added to the
+    cache. An unreadable cache is treated as empty.
+
+    Parameters
+    ----------
+    name : str
+        Name of the site parameter (and its source).
+    lat : array_like
+        Latitudes of the sites.
+    lon : array_like
+        Longitudes of the sites.
+    fetch : callable
+        Function returning the values at lists of latitudes and longitudes.
+
+    Returns
+    -------
+    numpy.ndarray
+        Values of the site parameter.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    scale = 10.0**SITE_PARAMETER_CACHE_DECIMALS
+    keys = (np.rint((lat + 90.0) * scale).astype(np.int64) << 32) + np.rint(
+        (lon + 180.0) * scale
+    ).astype(np.int64)
+
+    cache_file = os.path.join(SITE_PARAMETER_CACHE_DIR, f'{name}.npz')  # noqa: PTH118
+    cached_keys = np.empty(0, dtype=np.int64)
+    cached_values = np.empty(0)
+    if os.path.isfile(cache_file):  # noqa: PTH113
+        try:
+            with np.load(cache_file) as cache:
+                cached_keys = cache['keys']
+                cached_values = cache['values']
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            print(  # noqa: T201
+                f'CreateStation: Warning - ignoring the unreadable site parameter cache {cache_file}.'
+            )
+        # failed lookups of earlier versions are fetched again
+        valid = np.isfinite(cached_values)
+        cached_keys, cached_values = cached_keys[valid], cached_values[valid]
+    values = np.full(len(keys), np.nan)
+    missing = np.ones(len(keys), dtype=bool)
+    if len(cached_keys):
+        pos = np.minimum(np.searchsorted(cached_keys, keys), len(cached_keys) - 1)
+        missing = cached_keys[pos] != keys
+        values[~missing] = cached_values[pos[~missing]]
+
+    if missing.any():
+        missing_ids = np.flatnonzero(missing)
+        new_keys, first = np.unique(keys[missing_ids], return_index=True)
+        new_values = np.asarray(
+            fetch(
+                lat[missing_ids[first]].tolist(), lon[missing_ids[first]].tolist()
+            ),
+            dtype=float,
+        )
+        values[missing_ids] = new_values[
+            np.searchsorted(new_keys, keys[missing_ids])
+        ]
+        # failed lookups (NaN) are not cached so that they are fetched again
+        fetched = np.isfinite(new_values)
+        all_keys = np.concatenate([cached_keys, new_keys[fetched]])
+        all_values = np.concatenate([cached_values, new_values[fetched]])
+        order = np.argsort(all_keys)
+        try:
+            os.makedirs(SITE_PARAMETER_CACHE_DIR, exist_ok=True)  # noqa: PTH103
+            _save_atomically(
+                cache_file,
+                lambda f: np.savez(
+                    f, keys=all_keys[order], values=all_values[order]
+                ),
+            )
+        except OSError:
+            print(  # noqa: T201
+                f'CreateStation: Warning - could not write the site parameter cache {cache_file}.'
+            )
+    return values
+
+
 class Station:
     """A class for stations in an earthquake scenario"""  # noqa: D400
 
@@ -295,23 +482,27 @@ def create_stations(  # noqa: C901, PLR0912, PLR0915
         )
     if len(nan_loc) and vs30_tag == 3:  # noqa: PLR2004
         print('CreateStation: Fetch National Crustal Model Vs for defined stations.')  # noqa: T201
-        selected_stn.loc[nan_loc, vs30_label] = get_vs30_ncm(
+        selected_stn.loc[nan_loc, vs30_label] = cached_site_parameter(
+            'ncm_vs30',
             selected_stn.iloc[  # noqa: PD011
                 nan_loc, list(selected_stn.keys()).index(lat_label)
             ].values.tolist(),
             selected_stn.iloc[  # noqa: PD011
                 nan_loc, list(selected_stn.keys()).index(lon_label)
             ].values.tolist(),
+            get_vs30_ncm,
         )
     if len(nan_loc) and vs30_tag == 0:
         print('CreateStation: Fetch OpenSHA Vs30 map for defined stations.')  # noqa: T201
-        selected_stn.loc[nan_loc, vs30_label] = get_site_vs30_from_opensha(
+        selected_stn.loc[nan_loc, vs30_label] = cached_site_parameter(
+            'opensha_vs30',
             selected_stn.iloc[  # noqa: PD011
                 nan_loc, list(selected_stn.keys()).index(lat_label)
             ].values.tolist(),
             selected_stn.iloc[  # noqa: PD011
                 nan_loc, list(selected_stn.keys()).index(lon_label)
             ].values.tolist(),
+            get_site_vs30_from_opensha,
         )
 
     # Get zTR
@@ -346,13 +537,15 @@ def create_stations(  # noqa: C901, PLR0912, PLR0915
         )
         selected_stn.loc[nan_loc, zTR_label] = [
             max(0, x)
-            for x in get_zTR_ncm(
+            for x in cached_site_parameter(
+                'ncm_zTR',
                 selected_stn.iloc[  # noqa: PD011
                     nan_loc, list(selected_stn.keys()).index(lat_label)
                 ].values.tolist(),
                 selected_stn.iloc[  # noqa: PD011
                     nan_loc, list(selected_stn.keys()).index(lon_label)
                 ].values.tolist(),
+                get_zTR_ncm,
             )
         ]
     elif len(nan_loc):
@@ -468,59 +661,31 @@ def create_stations(  # noqa: C901, PLR0912, PLR0915
                         'chi',
                     ]:
                         user_param_list.pop(user_param_list.index(cur_param))
-    # If z1pt0 is OpenSHA default model, use parallel processing to get z1pt0
+    # If z1pt0 or z2pt5 is OpenSHA default model, fetch all sites at once
     if z1Config['Type'] == 'OpenSHA default model':
         z1_tag = z1Config['z1_tag']
         if z1_tag == 2:  # noqa: PLR2004
-            # num_cores = z1Config.get('num_cores', multiprocessing.cpu_count())
-            num_cores = z1Config.get('num_cores', 1)
-            if num_cores == 1:
-                z1pt0_results = [
-                    get_site_z1pt0_from_opensha(lat, lon)
-                    for lat, lon in zip(
-                        selected_stn['Latitude'].tolist(),
-                        selected_stn['Longitude'].tolist(),
-                    )
-                ]
-            else:
-                with tqdm_joblib(
-                    tqdm(desc='Get z1pt0 from openSHA', total=selected_stn.shape[0])
-                ) as progress_bar:
-                    z1pt0_results = Parallel(n_jobs=num_cores)(
-                        delayed(get_site_z1pt0_from_opensha)(lat, lon)
-                        for lat, lon in zip(
-                            selected_stn['Latitude'].tolist(),
-                            selected_stn['Longitude'].tolist(),
-                        )
-                    )
+            z1pt0_results = cached_site_parameter(
+                'opensha_z1pt0',
+                selected_stn['Latitude'].tolist(),
+                selected_stn['Longitude'].tolist(),
+                get_site_z1pt0_from_opensha,
+            )
     if z25Config['Type'] == 'OpenSHA default model':
         z25_tag = z25Config['z25_tag']
         if z25_tag == 2:  # noqa: PLR2004
-            # num_cores = z25Config.get('num_cores', multiprocessing.cpu_count())
-            num_cores = z25Config.get('num_cores', 1)
-            if num_cores == 1:
-                z2pt5_results = [
-                    get_site_z2pt5_from_opensha(lat, lon)
-                    for lat, lon in zip(
-                        selected_stn['Latitude'].tolist(),
-                        selected_stn['Longitude'].tolist(),
-                    )
-                ]
-            else:
-                with tqdm_joblib(
-                    tqdm(desc='Get z2pt5 from openSHA', total=selected_stn.shape[0])
-                ) as progress_bar:  # noqa: F841
-                    z2pt5_results = Parallel(n_jobs=num_cores)(
-                        delayed(get_site_z2pt5_from_opensha)(lat, lon)
-                        for lat, lon in zip(
-                            selected_stn['Latitude'].tolist(),
-                            selected_stn['Longitude'].tolist(),
-                        )
-                    )
+            z2pt5_results = cached_site_parameter(
+                'opensha_z2pt5',
+                selected_stn['Latitude'].tolist(),
+                selected_stn['Longitude'].tolist(),
+                get_site_z2pt5_from_opensha,
+            )
 
     ground_failure_input_keys = set()
+    # rows as dictionaries, which is much faster than indexing the data frame
+    stn_records = selected_stn.to_dict('records')
     for ind in tqdm(range(selected_stn.shape[0]), desc='Stations'):
-        stn = selected_stn.iloc[ind, :]
+        stn = stn_records[ind]
         stn_id = selected_stn.index[ind]
         # for stn_id, stn in selected_stn.iterrows():
         # Creating a Station object
@@ -591,7 +756,7 @@ def create_stations(  # noqa: C901, PLR0912, PLR0915
                 z2pt5 = get_z25(tmp['z1pt0'])
                 tmp.update({'z2pt5': z2pt5})
 
-        if 'DepthToRock' in stn.index:
+        if 'DepthToRock' in stn:
             tmp.update({'DepthToRock': stn.get('DepthToRock')})
         else:
             # tmp.update({'zTR': max(0,get_zTR_global([stn[lat_label]], [stn[lon_label]])[0])})
@@ -733,20 +898,10 @@ def get_vs30_global(lat, lon):
     Output:
         vs30: list of vs30
     """  # noqa: D205, D400
-    import os
-    import pickle
-
-    from scipy import interpolate
-
     # Loading global Vs30 data
-    cwd = os.path.dirname(os.path.realpath(__file__))  # noqa: PTH120
-    with open(cwd + '/database/site/global_vs30_4km.pkl', 'rb') as f:  # noqa: PTH123
-        vs30_global = pickle.load(f)  # noqa: S301
-    # Interpolation function (linear)
-    interpFunc = interpolate.interp2d(  # noqa: N806
-        vs30_global['Longitude'], vs30_global['Latitude'], vs30_global['Vs30']
-    )
-    vs30 = [float(interpFunc(x, y)) for x, y in zip(lon, lat)]
+    vs30_global = load_site_grid('global_vs30_4km', 'Vs30')
+    # Interpolation (linear)
+    vs30 = interpolate_site_grid(vs30_global, lat, lon).tolist()
     # return
     return vs30  # noqa: DOC201, RET504, RUF100
 
@@ -771,21 +926,12 @@ def get_vs30_thompson(lat, lon):
     Output:
         vs30: list of vs30
     """  # noqa: D205, D400
-    import os
-    import pickle
-
-    from scipy import interpolate
-
-    # Loading Thompson Vs30 data
-    cwd = os.path.dirname(os.path.realpath(__file__))  # noqa: PTH120
-    with open(cwd + '/database/site/thompson_vs30_4km.pkl', 'rb') as f:  # noqa: PTH123
-        vs30_thompson = pickle.load(f)  # noqa: S301
-    # Interpolation function (linear)
-    vs30_thompson['Vs30'][vs30_thompson['Vs30'] < 0.1] = 760  # noqa: PLR2004
-    interpFunc = interpolate.interp2d(  # noqa: N806
-        vs30_thompson['Longitude'], vs30_thompson['Latitude'], vs30_thompson['Vs30']
+    # Loading Thompson Vs30 data (760 m/s where the map has no data)
+    vs30_thompson = load_site_grid(
+        'thompson_vs30_4km', 'Vs30', invalid_below=0.1, invalid_value=760
     )
-    vs30 = [float(interpFunc(x, y)) for x, y in zip(lon, lat)]
+    # Interpolation (linear)
+    vs30 = interpolate_site_grid(vs30_thompson, lat, lon).tolist()
 
     num_zeros = len([x for x in vs30 if x == 0])
     if num_zeros > 0:
@@ -823,20 +969,10 @@ def get_zTR_global(lat, lon):  # noqa: N802
     Output:
         zTR: list of zTR
     """
-    import os
-    import pickle
-
-    from scipy import interpolate
-
     # Loading depth to rock data
-    cwd = os.path.dirname(os.path.realpath(__file__))  # noqa: PTH120
-    with open(cwd + '/database/site/global_zTR_4km.pkl', 'rb') as f:  # noqa: PTH123
-        zTR_global = pickle.load(f)  # noqa: S301, N806
-    # Interpolation function (linear)
-    interpFunc = interpolate.interp2d(  # noqa: N806
-        zTR_global['Longitude'], zTR_global['Latitude'], zTR_global['zTR']
-    )
-    zTR = [float(interpFunc(x, y)) for x, y in zip(lon, lat)]  # noqa: N806
+    zTR_global = load_site_grid('global_zTR_4km', 'zTR')  # noqa: N806
+    # Interpolation (linear)
+    zTR = interpolate_site_grid(zTR_global, lat, lon).tolist()  # noqa: N806
     # return
     return zTR  # noqa: DOC201, RET504, RUF100
 
@@ -1066,29 +1066,26 @@ def get_site_vs30_from_opensha(lat, lon, vs30model='CGS/Wills VS30 Map (2015)'):
     return vs30
 
 
-def get_site_z1pt0_from_opensha(lat, lon):  # noqa: D103
+def _get_site_depth_from_opensha(lat, lon, data_type):
+    # set up site java object for all sites
     sites = ArrayList()  # noqa: F405
-    sites.add(Site(Location(lat, lon)))  # noqa: F405
+    for cur_lat, cur_lon in zip(lat, lon):
+        sites.add(Site(Location(cur_lat, cur_lon)))  # noqa: F405
     # prepare site data java object
     siteDataProviders = OrderedSiteDataProviderList.createSiteDataProviderDefaults()  # noqa: N806, F405
     siteData = siteDataProviders.getAllAvailableData(sites)  # noqa: N806
+    # first non-nan value of the data type in the order of the providers
+    depth = np.full(len(lat), np.nan)
     for data in siteData:
-        if data.getValue(0).getDataType() == 'Depth to Vs = 1.0 km/sec':
-            z1pt0 = float(data.getValue(0).getValue())
-            if not np.isnan(z1pt0):
-                break
-    return z1pt0 * 1000.0
+        if data.getValue(0).getDataType() == data_type:
+            for i in np.where(np.isnan(depth))[0].tolist():
+                depth[i] = float(data.getValue(i).getValue())
+    return (depth * 1000.0).tolist()
+
+
+def get_site_z1pt0_from_opensha(lat, lon):  # noqa: D103
+    return _get_site_depth_from_opensha(lat, lon, 'Depth to Vs = 1.0 km/sec')
 
 
 def get_site_z2pt5_from_opensha(lat, lon):  # noqa: D103
-    sites = ArrayList()  # noqa: F405
-    sites.add(Site(Location(lat, lon)))  # noqa: F405
-    # prepare site data java object
-    siteDataProviders = OrderedSiteDataProviderList.createSiteDataProviderDefaults()  # noqa: N806, F405
-    siteData = siteDataProviders.getAllAvailableData(sites)  # noqa: N806
-    for data in siteData:
-        if data.getValue(0).getDataType() == 'Depth to Vs = 2.5 km/sec':
-            z2pt5 = float(data.getValue(0).getValue())
-            if not np.isnan(z2pt5):
-                break
-    return z2pt5 * 1000.0
+    return _get_site_depth_from_opensha(lat, lon, 'Depth to Vs = 2.5 km/sec')
@@ -49,7 +49,6 @@ import h5py
 import numpy as np
 import ujson
 import geopandas as gpd
-from scipy.spatial.distance import cdist
 from gmpe import CorrelationModel
 from tqdm import tqdm
 
@@ -160,6 +159,12 @@ def simulate_ground_motion(  # noqa: D103
 
 
 class GM_Simulator:  # noqa: D101
+    # above this number of sites, spatial correlation is simulated with a
+    # nearest-neighbor approximation instead of a dense factorization
+    max_dense_sites = 10000
+    # number of neighbors that condition each site in that approximation
+    num_neighbors = 30
+
     def __init__(
         self,
         site_info=[],  # noqa: B006
@@ -179,28 +184,17 @@ class GM_Simulator:  # noqa: D101
         self.sites = site_info.copy()
         self.num_sites = len(self.sites)
         if self.num_sites < 2:  # noqa: PLR2004
-            self.stn_dist = None
             print(  # noqa: T201
                 'GM_Simulator: Only one site is defined, spatial correlation models ignored.'
             )
+        if self.num_sites == 0:
+            self.stn_dist = None
             return
+        self._compute_site_coordinates()
         self._compute_distance_matrix()
 
-    def _compute_distance_matrix(self):
-        # site number check
-        if self.num_sites < 2:  # noqa: PLR2004
-            print('GM_Simulator: error - please give at least two sites.')  # noqa: T201
-            self.stn_dist = None
-            return
-        # compute the distance matrix
-        # tmp = np.zeros((self.num_sites, self.num_sites))
-        # # for i in tqdm(range(self.num_sites)):
-        #     loc_i = np.array([self.sites[i]['lat'], self.sites[i]['lon']])
-        #     for j in range(self.num_sites):
-        #         loc_j = np.array([self.sites[j]['lat'], self.sites[j]['lon']])
-        #         # Computing station-wise distances
-        #         tmp[i, j] = CorrelationModel.get_distance_from_lat_lon(loc_i, loc_j)
-        # self.stn_dist = tmp
+    def _compute_site_coordinates(self):
+        # project the sites to get coordinates in km
         loc_i = np.array(
             [
                 [self.sites[i]['lat'], self.sites[i]['lon']]
@@ -211,12 +205,20 @@ class GM_Simulator:  # noqa: D101
             {'geometry': gpd.points_from_xy(loc_i[:, 1], loc_i[:, 0])},
             crs='EPSG:4326',
         ).to_crs('EPSG:6500')
-        lat = loc_i_gdf.geometry.y
-        lon = loc_i_gdf.geometry.x
-        loc_i = np.array([[lon[i], lat[i]] for i in range(self.num_sites)])
-        loc_j = np.array([[lon[i], lat[i]] for i in range(self.num_sites)])
-        distances = cdist(loc_i, loc_j, 'euclidean') / 1000  # in km
-        self.stn_dist = distances
+        self.stn_loc = (
+            np.column_stack([loc_i_gdf.geometry.x, loc_i_gdf.geometry.y]) / 1000
+        )
+
+    def _compute_distance_matrix(self):
+        # station distances are served by a KD-tree on the projected
+        # coordinates instead of a dense matrix; the correlation models query
+        # it in tiles, and it also caches their factorizations as long as
+        # the sites are kept
+        self.stn_dist = CorrelationModel.StationDistance(
+            self.stn_loc,
+            max_dense_sites=self.max_dense_sites,
+            num_neighbors=self.num_neighbors,
+        )
 
     def set_num_simu(self, num_simu):  # noqa: D102
         # set simulation number
@@ -459,22 +461,19 @@ class GM_Simulator:  # noqa: D101
 
     def compute_intra_event_residual_i(self, cm, im_name_list, num_simu):  # noqa: D102
         if cm == 'Jayaram & Baker (2009)':
-            rho = np.zeros((self.num_sites, self.num_sites, len(im_name_list)))
-            for i in range(self.num_sites):
-                for j in range(self.num_sites):
-                    cur_stn_dist = self.stn_dist[i, j]
-                    for k in range(len(im_name_list)):
-                        rho[i, j, k] = (
-                            CorrelationModel.jayaram_baker_correlation_2009(
-                                im_name_list[k], cur_stn_dist, flag_clustering=False
-                            )
-                        )
-            # Simulating residuals
+            # Simulating residuals; IMs with the same range parameter share
+            # the factorized correlation matrix
             residuals = np.zeros((self.num_sites, len(im_name_list), num_simu))
-            for k in range(self.num_im):
-                residuals[:, k, :] = np.random.multivariate_normal(
-                    np.zeros(self.num_sites), rho[:, :, k], num_simu
-                ).T
+            for k, im_name in enumerate(im_name_list):
+                range_b = CorrelationModel.jayaram_baker_range_2009(
+                    im_name, flag_clustering=False
+                )
+                residuals[:, k, :] = CorrelationModel.simulate_field(
+                    self.stn_dist,
+                    lambda h, b=range_b: np.exp(-3.0 * h / b),
+                    num_simu,
+                    key=(cm, range_b),
+                )
         elif cm == 'Loth & Baker (2013)':
             residuals = CorrelationModel.loth_baker_correlation_2013(
                 self.sites, im_name_list, num_simu, self.stn_dist
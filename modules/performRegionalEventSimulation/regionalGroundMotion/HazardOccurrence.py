@@ -38,22 +38,33 @@
 #
 
 import collections
-import itertools
 import json
 import os
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import h5py
 import numpy as np
 import pandas as pd
 import pulp
+from scipy import sparse
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+from scipy.special import ndtr
 from scipy.stats import norm
+from sklearn.cluster import KMeans
 from sklearn.linear_model import lasso_path
 from tqdm import tqdm
 from USGS_API import *  # noqa: F403
 
+# intensity measure levels of the hazard curves
+HAZARD_CURVE_IM_LEVELS = np.power(10, np.linspace(-4, 2, 60))
+# number of scenarios read and processed together
+HAZARD_CURVE_SCENARIO_CHUNK = 1000
+# maximum number of (scenario, site, IM level) terms evaluated at once
+HAZARD_CURVE_BLOCK_SIZE = 2**22
+
 
 def configure_hazard_occurrence(  # noqa: C901, D103
     input_dir,
@@ -68,6 +79,8 @@ def configure_hazard_occurrence(  # noqa: C901, D103
     if hzo_config is None or site_config is None:
         # no model is defined
         return {}
+    # number of threads for the hazard curve integration
+    num_threads = (os.cpu_count() or 1) if mth_flag else 1
     # model type
     model_type = hzo_config.get('Model')
     # number of earthquake in the subset
@@ -163,10 +176,17 @@ def configure_hazard_occurrence(  # noqa: C901, D103
         if IMfile.lower().endswith('.json'):
             with open(IMfile) as f:  # noqa: PTH123
                 IMdata = json.load(f)  # noqa: N806
-            hc_data = calc_hazard_curves(IMdata, site_config, cur_imt)
+            hc_data = calc_hazard_curves(
+                IMdata, site_config, cur_imt, num_threads=num_threads
+            )
         elif IMfile.lower().endswith('.hdf5'):
             hc_data = calc_hazard_curves_hdf5(
-                IMfile, im_list, site_config, cur_imt, scenarios
+                IMfile,
+                im_list,
+                site_config,
+                cur_imt,
+                scenarios,
+                num_threads=num_threads,
             )
         # c_vect = calc_hazard_contribution(IMdata, site_config,
         #                                   return_periods, hc_data, cur_imt)
@@ -285,7 +305,77 @@ def calc_hazard_contribution(IMdata, site_config, targetReturnPeriods, hc_data,
     return c_vect
 
 
-def calc_hazard_curves(IMdata, site_config, im):  # noqa: N803, D103
+def accumulate_exceedance_rates(
+    exceed_rate,
+    mar,
+    ln_mean,
+    ln_std,
+    im_levels=HAZARD_CURVE_IM_LEVELS,
+    num_threads=1,
+):
+    """
+    Add the exceedance rates of a chunk of scenarios to the hazard curves.
+
+    The probability of exceeding each IM level is evaluated for blocks of
+    scenarios x sites x IM levels at once with the standard normal
+    survival function, which keeps its relative precision in the far
+    tail where 1 - norm.cdf rounds to zero.
+
+    Parameters
+    ----------
+    exceed_rate : numpy.ndarray
+        Annual exceedance rates of shape (num_im_levels, num_sites),
+        updated in place.
+    mar : array_like
+        Mean annual rate of each scenario, shape (num_scenarios,).
+    ln_mean, ln_std : array_like
+        Mean and total standard deviation of the log IM of each scenario at
+        each site, shape (num_scenarios, num_sites).
+    im_levels : array_like, optional
+        IM levels of the hazard curves.
+    num_threads : int, optional
+        Number of threads working on separate blocks of sites.
+    """
+    mar = np.asarray(mar, dtype=float)
+    ln_mean = np.asarray(ln_mean, dtype=float)
+    ln_std = np.asarray(ln_std, dtype=float)
+    ln_im = np.log(im_levels)
+    num_scen, num_sites = ln_mean.shape
+    block_size = max(1, HAZARD_CURVE_BLOCK_SIZE // max(1, num_scen * len(ln_im)))
+    site_blocks = [
+        slice(k, min(k + block_size, num_sites))
+        for k in range(0, num_sites, block_size)
+    ]
+
+    def add_site_block(block):
+        # P(IM > im) = Phi((mean - ln(im)) / std)
+        p_exceed = ndtr(
+            (ln_mean[:, block, np.newaxis] - ln_im) / ln_std[:, block, np.newaxis]
+        )
+        exceed_rate[:, block] += np.tensordot(mar, p_exceed, axes=(0, 0)).T
+
+    if num_threads > 1 and len(site_blocks) > 1:
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            list(executor.map(add_site_block, site_blocks))
+    else:
+        for block in site_blocks:
+            add_site_block(block)
+
+
+def _hazard_curve_data(exceed_rate, site_config, im_levels):
+    exceed_rate[exceed_rate < 1e-20] = 1e-20  # noqa: PLR2004
+    return_periods = 1 / exceed_rate
+    return [
+        {
+            'SiteID': site['ID'],
+            'ReturnPeriod': list(return_periods[:, site_ind]),
+            'IM': list(im_levels),
+        }
+        for site_ind, site in enumerate(site_config)
+    ]
+
+
+def calc_hazard_curves(IMdata, site_config, im, num_threads=1):  # noqa: N803, D103
     if im[0:2] == 'SA':
         period = float(im[2:].replace('P', '.'))
         im_name = 'lnSA'
@@ -294,68 +384,69 @@ def calc_hazard_curves(IMdata, site_config, im):  # noqa: N803, D103
     else:
         im_name = 'lnPGA'
         im_ind = 0
-    IMRange = np.power(10, np.linspace(-4, 2, 60))  # noqa: N806
-    exceedRate = np.zeros((len(IMRange), len(site_config)))  # noqa: N806
-    hc_data = [
-        {'siteID': 0, 'ReturnPeriod': list(exceedRate), 'IM': list(exceedRate)}
-    ] * len(site_config)
+    IMRange = HAZARD_CURVE_IM_LEVELS  # noqa: N806
+    num_sites = len(site_config)
+    exceedRate = np.zeros((len(IMRange), num_sites))  # noqa: N806
     scenario_idx = list(IMdata.keys())
-    for scenario_ind in tqdm(
-        range(len(scenario_idx)),
-        desc='Calculate ' f'Hazard Curves from {len(scenario_idx)} scenarios',
+    for k in tqdm(
+        range(0, len(scenario_idx), HAZARD_CURVE_SCENARIO_CHUNK),
+        desc='Calculate '
+        f'Hazard Curves from {len(scenario_idx)} scenarios '
+        f'in chunks of {HAZARD_CURVE_SCENARIO_CHUNK}',
     ):
-        scenario = IMdata[scenario_idx[scenario_ind]]
-        mar = scenario['MeanAnnualRate']
-        for site_ind in range(len(site_config)):
-            lnIM = scenario['GroundMotions'][site_ind][im_name]  # noqa: N806
-            lnIM_mean = lnIM['Mean'][im_ind]  # noqa: N806
-            lnIM_std = lnIM['TotalStdDev'][im_ind]  # noqa: N806
-            p_exceed = 1 - norm.cdf(np.log(IMRange), lnIM_mean, lnIM_std)
-            rate_exceed = mar * p_exceed
-            exceedRate[:, site_ind] = exceedRate[:, site_ind] + rate_exceed
-    exceedRate[exceedRate < 1e-20] = 1e-20  # noqa: PLR2004
-    for site_ind, site in enumerate(site_config):
-        hc_data[site_ind] = {
-            'SiteID': site['ID'],
-            'ReturnPeriod': list(1 / exceedRate[:, site_ind]),
-            'IM': list(IMRange),
-        }
-    return hc_data
+        chunk = [
+            IMdata[x] for x in scenario_idx[k : k + HAZARD_CURVE_SCENARIO_CHUNK]
+        ]
+        mar = [scenario['MeanAnnualRate'] for scenario in chunk]
+        lnIM = [  # noqa: N806
+            [gm[im_name] for gm in scenario['GroundMotions'][:num_sites]]
+            for scenario in chunk
+        ]
+        lnIM_mean = [[x['Mean'][im_ind] for x in row] for row in lnIM]  # noqa: N806
+        lnIM_std = [  # noqa: N806
+            [x['TotalStdDev'][im_ind] for x in row] for row in lnIM
+        ]
+        accumulate_exceedance_rates(
+            exceedRate, mar, lnIM_mean, lnIM_std, IMRange, num_threads
+        )
+    return _hazard_curve_data(exceedRate, site_config, IMRange)
 
 
-def calc_hazard_curves_hdf5(IMfile, im_list, site_config, im, scenarios):  # noqa: N803, D103
+def calc_hazard_curves_hdf5(  # noqa: D103
+    IMfile,  # noqa: N803
+    im_list,
+    site_config,
+    im,
+    scenarios,
+    num_threads=1,
+):
     im_ind = im_list.index(im)
-    IMRange = np.power(10, np.linspace(-4, 2, 60))  # noqa: N806
-    exceedRate = np.zeros((len(IMRange), len(site_config)))  # noqa: N806
-    hc_data = [
-        {'siteID': 0, 'ReturnPeriod': list(exceedRate), 'IM': list(exceedRate)}
-    ] * len(site_config)
+    IMRange = HAZARD_CURVE_IM_LEVELS  # noqa: N806
+    num_sites = len(site_config)
+    exceedRate = np.zeros((len(IMRange), num_sites))  # noqa: N806
     scenario_idx = list(scenarios.keys())
     with h5py.File(IMfile, 'r') as IMdata:  # noqa: N806
-        for scenario_ind in tqdm(
-            range(len(scenario_idx)),
-            desc='Calculate ' f'Hazard Curves from {len(scenario_idx)} scenarios',
+        for k in tqdm(
+            range(0, len(scenario_idx), HAZARD_CURVE_SCENARIO_CHUNK),
+            desc='Calculate '
+            f'Hazard Curves from {len(scenario_idx)} scenarios '
+            f'in chunks of {HAZARD_CURVE_SCENARIO_CHUNK}',
         ):
-            scenario_im = IMdata[str(scenario_idx[scenario_ind])]
-            mar = scenarios[scenario_idx[scenario_ind]]['MeanAnnualRate']
-            lnIM_mean = scenario_im['Mean'][:, im_ind]  # noqa: N806
-            lnIM_interStd = scenario_im['InterEvStdDev'][:, im_ind]  # noqa: N806
-            lnIM_intraStd = scenario_im['IntraEvStdDev'][:, im_ind]  # noqa: N806
-            lnIM_std = np.sqrt(lnIM_intraStd**2 + lnIM_interStd**2)  # noqa: N806
-            for site_ind in range(len(site_config)):
-                p_exceed = 1 - norm.cdf(
-                    np.log(IMRange), lnIM_mean[site_ind], lnIM_std[site_ind]
+            chunk = scenario_idx[k : k + HAZARD_CURVE_SCENARIO_CHUNK]
+            mar = [scenarios[x]['MeanAnnualRate'] for x in chunk]
+            lnIM_mean = np.empty((len(chunk), num_sites))  # noqa: N806
+            lnIM_var = np.empty((len(chunk), num_sites))  # noqa: N806
+            for row, scenario in enumerate(chunk):
+                scenario_im = IMdata[str(scenario)]
+                lnIM_mean[row] = scenario_im['Mean'][:num_sites, im_ind]
+                lnIM_var[row] = (
+                    scenario_im['InterEvStdDev'][:num_sites, im_ind] ** 2
+                    + scenario_im['IntraEvStdDev'][:num_sites, im_ind] ** 2
                 )
-                rate_exceed = mar * p_exceed
-                exceedRate[:, site_ind] = exceedRate[:, site_ind] + rate_exceed
-    exceedRate[exceedRate < 1e-20] = 1e-20  # noqa: PLR2004
-    for site_ind, site in enumerate(site_config):
-        hc_data[site_ind] = {
-            'SiteID': site['ID'],
-            'ReturnPeriod': list(1 / exceedRate[:, site_ind]),
-            'IM': list(IMRange),
-        }
-    return hc_data
+            accumulate_exceedance_rates(
+                exceedRate, mar, lnIM_mean, np.sqrt(lnIM_var), IMRange, num_threads
+            )
+    return _hazard_curve_data(exceedRate, site_config, IMRange)
 
 
 def get_hazard_curves(input_dir=None, input_csv=None, input_json=None):  # noqa: D103
@@ -517,8 +608,12 @@ def sample_earthquake_occurrence(  # noqa: D103
     im_exceedance_prob,
     reweight_only,
     occurence_rate_origin,
-    hzo_config,
+    hzo_config=None,
 ):
+    # options of the sparse problem assembly
+    hzo_config = hzo_config or {}
+    exceedance_prob_tol = hzo_config.get('ExceedanceProbabilityTolerance', 1e-6)
+    num_site_clusters = hzo_config.get('SiteClusters', None)
     # model type
     if model_type == 'Manzour & Davidson (2016)':
         # create occurrence model
@@ -528,6 +623,9 @@ def sample_earthquake_occurrence(  # noqa: D103
             num_scenarios=num_target_eqs,
             reweight_only=reweight_only,
             occurence_rate_origin=occurence_rate_origin,
+            exceedance_prob_tol=exceedance_prob_tol,
+            num_site_clusters=num_site_clusters,
+            solver=hzo_config.get('Solver', 'CBC'),
         )
         # solve the optimiation
         om.solve_opt()
@@ -540,6 +638,8 @@ def sample_earthquake_occurrence(  # noqa: D103
             reweight_only=reweight_only,
             occurence_rate_origin=occurence_rate_origin,
             hzo_config=hzo_config,
+            exceedance_prob_tol=exceedance_prob_tol,
+            num_site_clusters=num_site_clusters,
         )
         # solve the optimiation
         om.solve_opt()
@@ -612,6 +712,65 @@ def export_sampled_earthquakes(error, id_selected_eqs, eqdata, P, output_dir=Non
 #             json.dump(dict_selected_eqs, f, indent=2)
 
 
+def assemble_hazard_matching_rows(
+    im_exceedance_probs,
+    return_periods,
+    exceedance_prob_tol=0.0,
+    num_site_clusters=None,
+):
+    """
+    Assemble the hazard-matching equations of the scenario down-selection.
+
+    Each (site, return period) pair gives one equation
+    sum_k EP(i, k, r) * P(k) = 1 / RP(r), stored as a sparse matrix with
+    one row per pair (site-major) and one column per earthquake.
+
+    Parameters
+    ----------
+    im_exceedance_probs : numpy.ndarray
+        Exceedance probabilities EP(i, k, r) of shape (#site, #eq, #return_period).
+    return_periods : array_like
+        Return periods RP(r).
+    exceedance_prob_tol : float, optional
+        Exceedance probabilities below exceedance_prob_tol / RP(r) are
+        dropped. Since P(k) <= 1, a dropped term changes the hazard at a
+        site by less than this fraction of the target rate.
+    num_site_clusters : int, optional
+        If given, sites with similar exceedance probabilities are grouped
+        with k-means and each group is represented by its mean equations.
+
+    Returns
+    -------
+    A : scipy.sparse.csr_matrix
+        Matrix of the equations.
+    b : numpy.ndarray
+        Target rates 1 / RP(r) of the equations.
+    row_weights : numpy.ndarray
+        Number of sites represented by each equation.
+    """
+    return_periods = np.asarray(return_periods, dtype=float)
+    num_sites, num_eqs, num_rps = im_exceedance_probs.shape
+    site_weights = np.ones(num_sites)
+    if num_site_clusters is not None and num_site_clusters < num_sites:
+        # cluster sites by their exceedance probabilities relative to the targets
+        labels = KMeans(
+            n_clusters=num_site_clusters, n_init=10, random_state=0
+        ).fit_predict((im_exceedance_probs * return_periods).reshape(num_sites, -1))
+        site_weights = np.bincount(labels, minlength=num_site_clusters)
+        cluster_probs = np.zeros((num_site_clusters, num_eqs, num_rps))
+        np.add.at(cluster_probs, labels, im_exceedance_probs)
+        im_exceedance_probs = cluster_probs / site_weights[:, None, None]
+        num_sites = num_site_clusters
+
+    rows = im_exceedance_probs.transpose(0, 2, 1).reshape(-1, num_eqs)
+    row_return_periods = np.tile(return_periods, num_sites)
+    rows = np.where(
+        rows * row_return_periods[:, None] < exceedance_prob_tol, 0.0, rows
+    )
+    A = sparse.csr_matrix(rows)  # noqa: N806
+    return A, 1 / row_return_periods, np.repeat(site_weights, num_rps)
+
+
 class OccurrenceModel_ManzourDavidson2016:  # noqa: D101
     def __init__(
         self,
@@ -620,12 +779,18 @@ class OccurrenceModel_ManzourDavidson2016:  # noqa: D101
         num_scenarios=-1,
         reweight_only=False,  # noqa: FBT002
         occurence_rate_origin=None,
+        exceedance_prob_tol=1e-6,
+        num_site_clusters=None,
+        solver='CBC',
     ):
         """__init__: initialization a hazard occurrence optimizer
         :param return_periods: 1-D array of return periods, RP(r)
         :param earthquake_mafs: 1-D array of annual occurrence probability, MAF(j)
         :param im_exceedance_probs: 3-D array of exceedance probability of Sa, EP(i,j,r) for site #i, earthquake #j, return period #r
         :param num_scenarios: integer for number of target scenarios
+        :param exceedance_prob_tol: exceedance probabilities below this fraction of the target rate are dropped
+        :param num_site_clusters: integer for number of site clusters (None: no clustering)
+        :param solver: "CBC" (through PuLP, warm started) or "HiGHS" (scipy.optimize.milp)
         """  # noqa: D205, D400
         # read input parameters
         self.return_periods = return_periods
@@ -634,6 +799,9 @@ class OccurrenceModel_ManzourDavidson2016:  # noqa: D101
         self.num_scenarios = num_scenarios
         self.reweight_only = reweight_only
         self.occurence_rate_origin = occurence_rate_origin
+        self.exceedance_prob_tol = exceedance_prob_tol
+        self.num_site_clusters = num_site_clusters
+        self.solver = solver
         # check input parameters
         self.input_valid = self._input_check()
         if not self.input_valid:
@@ -694,98 +862,213 @@ class OccurrenceModel_ManzourDavidson2016:  # noqa: D101
 
     def _opt_initialization(self):
         """_opt_initialization: initialization of optimization problem"""  # noqa: D400
-        # the problem is mixed integer program
-        self.prob = pulp.LpProblem('MIP', pulp.LpMinimize)
-
-        # variables
-        self.e_plus = {}
-        self.e_minus = {}
-        self.e_plus_name = {}
-        self.e_minus_name = {}
-        for i in range(self.num_sites):
-            for j in range(self.num_return_periods):
-                self.e_plus_name[i, j] = f'ep-{i}-{j}'
-                self.e_minus_name[i, j] = f'en-{i}-{j}'
-                self.e_plus[i, j] = pulp.LpVariable(self.e_plus_name[i, j], 0, None)
-                self.e_minus[i, j] = pulp.LpVariable(
-                    self.e_minus_name[i, j], 0, None
-                )
-        self.P = {}
-        self.Z = {}
-        self.P_name = {}
-        self.Z_name = {}
-        for i in range(self.num_eqs):
-            self.P_name[i] = f'p-{i}'
-            self.Z_name[i] = f'z-{i}'
-            if self.reweight_only:
-                self.P[i] = pulp.LpVariable(
-                    self.P_name[i], self.occurence_rate_origin[i], 1
-                )
-            else:
-                self.P[i] = pulp.LpVariable(self.P_name[i], 0, 1)
-                self.Z[i] = pulp.LpVariable(self.Z_name[i], 0, 1, pulp.LpBinary)
-
-        # objective function
-        comb_sites_rps = list(
-            itertools.product(range(self.num_sites), range(self.num_return_periods))
+        t_start = time.time()
+        # hazard-matching equations A @ P + e_minus - e_plus = b
+        self.A, self.b, row_weights = assemble_hazard_matching_rows(
+            self.im_exceedance_probs,
+            self.return_periods,
+            self.exceedance_prob_tol,
+            self.num_site_clusters,
         )
-        self.prob += pulp.lpSum(
-            self.return_periods[j] * self.e_plus[(i, j)]  # noqa: RUF031, RUF100
-            + self.return_periods[j] * self.e_minus[(i, j)]  # noqa: RUF031, RUF100
-            for (i, j) in comb_sites_rps
+        num_rows = self.A.shape[0]
+        num_eqs = self.num_eqs
+        num_z = 0 if self.reweight_only else num_eqs
+        print(  # noqa: T201
+            f'OccurrenceModel_ManzourDavidson2016._opt_initialization: {num_rows} '
+            f'equations with {self.A.nnz} non-zero exceedance probabilities.'
         )
 
-        # constraints
-        for i in range(self.num_sites):
-            for j in range(self.num_return_periods):
-                self.prob += (
-                    pulp.lpSum(
-                        self.P[k] * self.im_exceedance_probs[i, k, j]
-                        for k in range(self.num_eqs)
-                    )
-                    + self.e_minus[i, j]
-                    - self.e_plus[i, j]
-                    == 1.0 / self.return_periods[j]
-                )
-
+        # variables x = [P, Z, e_plus, e_minus] and objective
+        row_rps = np.tile(self.return_periods, num_rows // self.num_return_periods)
+        self.c = np.concatenate(
+            [np.zeros(num_eqs + num_z), row_rps * row_weights, row_rps * row_weights]
+        )
+        identity = sparse.identity(num_rows, format='csr')
+        self.A_eq = sparse.hstack(
+            [self.A, sparse.csr_matrix((num_rows, num_z)), -identity, identity],
+            format='csr',
+        )
+        if self.reweight_only:
+            p_lower = np.asarray(self.occurence_rate_origin, dtype=float)
+        else:
+            p_lower = np.zeros(num_eqs)
+        self.lb = np.concatenate([p_lower, np.zeros(num_z + 2 * num_rows)])
+        self.ub = np.concatenate(
+            [np.ones(num_eqs + num_z), np.full(2 * num_rows, np.inf)]
+        )
+        self.integrality = np.concatenate(
+            [np.zeros(num_eqs), np.ones(num_z), np.zeros(2 * num_rows)]
+        )
+        # P <= Z and sum(Z) <= number of scenarios
         if not self.reweight_only:
-            for i in range(self.num_eqs):
-                self.prob += self.P[i] - self.Z[i] <= 0
-
-            self.prob += (
-                pulp.lpSum(self.Z[i] for i in range(self.num_eqs))
-                <= self.num_scenarios
+            self.A_ub = sparse.vstack(
+                [
+                    sparse.hstack(
+                        [
+                            sparse.identity(num_eqs),
+                            -sparse.identity(num_eqs),
+                            sparse.csr_matrix((num_eqs, 2 * num_rows)),
+                        ]
+                    ),
+                    sparse.hstack(
+                        [
+                            sparse.csr_matrix((1, num_eqs)),
+                            np.ones((1, num_eqs)),
+                            sparse.csr_matrix((1, 2 * num_rows)),
+                        ]
+                    ),
+                ],
+                format='csr',
             )
+            self.b_ub = np.append(np.zeros(num_eqs), self.num_scenarios)
 
+        if self.solver == 'CBC':
+            self._build_pulp_problem()
+        self.build_time = time.time() - t_start
         return True  # noqa: DOC201, RUF100
 
+    def _build_pulp_problem(self):
+        # create the PuLP model from the rows of the sparse matrices
+        self.prob = pulp.LpProblem('MIP', pulp.LpMinimize)
+        num_eqs = self.num_eqs
+        num_rows = self.A.shape[0]
+        self.P = [pulp.LpVariable(f'p-{i}', self.lb[i], 1) for i in range(num_eqs)]
+        self.Z = []
+        if not self.reweight_only:
+            self.Z = [
+                pulp.LpVariable(f'z-{i}', 0, 1, pulp.LpBinary)
+                for i in range(num_eqs)
+            ]
+        self.e_plus = [pulp.LpVariable(f'ep-{i}', 0, None) for i in range(num_rows)]
+        self.e_minus = [pulp.LpVariable(f'en-{i}', 0, None) for i in range(num_rows)]
+        lp_vars = self.P + self.Z + self.e_plus + self.e_minus
+
+        self.prob += pulp.LpAffineExpression(
+            [(lp_vars[k], self.c[k]) for k in np.flatnonzero(self.c)]
+        )
+        constraints = [(self.A_eq, self.b, pulp.LpConstraintEQ)]
+        if not self.reweight_only:
+            constraints.append((self.A_ub, self.b_ub, pulp.LpConstraintLE))
+        for matrix, rhs, sense in constraints:
+            for r in range(matrix.shape[0]):
+                start, end = matrix.indptr[r], matrix.indptr[r + 1]
+                self.prob += pulp.LpConstraint(
+                    [
+                        (lp_vars[k], v)
+                        for k, v in zip(
+                            matrix.indices[start:end], matrix.data[start:end]
+                        )
+                    ],
+                    sense,
+                    rhs=rhs[r],
+                )
+
+    def _solve_reweighting(self, scenario_ids):
+        # LP of the hazard matching in which only the given scenarios are
+        # reweighted (no limit on their number)
+        num_eqs = self.num_eqs
+        num_rows = self.A.shape[0]
+        lp_cols = np.r_[scenario_ids, 2 * num_eqs : 2 * num_eqs + 2 * num_rows]
+        res = linprog(
+            self.c[lp_cols],
+            A_eq=self.A_eq[:, lp_cols],
+            b_eq=self.b,
+            bounds=np.column_stack([self.lb[lp_cols], self.ub[lp_cols]]),
+            method='highs-ipm',
+        )
+        if res.x is None:
+            return None
+        p = np.zeros(num_eqs)
+        p[scenario_ids] = res.x[: len(scenario_ids)]
+        return p
+
+    def _warm_start_solution(self):
+        # reweight all scenarios, keep the ones with the largest weights and
+        # reweight them again (the interior point method is much faster than
+        # simplex on these dense rows)
+        p = self._solve_reweighting(np.arange(self.num_eqs))
+        if p is None:
+            return None
+        selected = np.sort(np.argsort(-p)[: self.num_scenarios])
+        p = self._solve_reweighting(selected)
+        if p is None:
+            return None
+        z = np.zeros(self.num_eqs)
+        z[selected] = 1.0
+        residual = self.b - self.A @ p
+        return np.concatenate(
+            [p, z, np.maximum(-residual, 0.0), np.maximum(residual, 0.0)]
+        )
+
     def solve_opt(self):
         """target_function: compute the target function to be minimized
         :param X: 2-D array of annual occurrence probability of earthquakes and corresponding binary variables (many values are reduced to zeros)
         """  # noqa: D205, D400
         maximum_runtime = 1 * 60 * 60  # 1 hours maximum
-        self.prob.solve(pulp.PULP_CBC_CMD(timeLimit=maximum_runtime, gapRel=0.001))
-        print('Status:', pulp.LpStatus[self.prob.status])  # noqa: T201
+        t_start = time.time()
+        x0 = None if self.reweight_only else self._warm_start_solution()
+        if self.solver == 'HiGHS':
+            constraints = [LinearConstraint(self.A_eq, self.b, self.b)]
+            if not self.reweight_only:
+                constraints.append(LinearConstraint(self.A_ub, -np.inf, self.b_ub))
+            res = milp(
+                self.c,
+                integrality=self.integrality,
+                bounds=Bounds(self.lb, self.ub),
+                constraints=constraints,
+                options={'time_limit': maximum_runtime, 'mip_rel_gap': 0.001},
+            )
+            print('Status:', res.message)  # noqa: T201
+            self.x = res.x
+        else:
+            lp_vars = self.P + self.Z + self.e_plus + self.e_minus
+            if x0 is not None:
+                for var, value in zip(lp_vars, x0):
+                    var.setInitialValue(value, check=False)
+            self.prob.solve(
+                pulp.PULP_CBC_CMD(
+                    timeLimit=maximum_runtime,
+                    gapRel=0.001,
+                    warmStart=x0 is not None,
+                )
+            )
+            print('Status:', pulp.LpStatus[self.prob.status])  # noqa: T201
+            values = [var.varValue for var in lp_vars]
+            self.x = None if None in values else np.array(values)
+        # fall back to the warm start if the solver stopped without a better solution
+        if x0 is not None and (self.x is None or self.c @ self.x > self.c @ x0):
+            print(  # noqa: T201
+                'OccurrenceModel_ManzourDavidson2016.solve_opt: '
+                'using the warm start solution.'
+            )
+            self.x = x0
+        if self.x is None:
+            sys.exit(
+                'ERROR: OccurrenceModel_ManzourDavidson2016.solve_opt: the solver '
+                f'stopped without a feasible solution within {maximum_runtime} sec.\n'
+                'Try increasing the number of scenarios or using a different solver.'
+            )
+        self.solve_time = time.time() - t_start
+        print(  # noqa: T201
+            'OccurrenceModel_ManzourDavidson2016.solve_opt: problem built in '
+            f'{self.build_time:.2f} sec and solved in {self.solve_time:.2f} sec.'
+        )
 
     def get_selected_earthquake(self):  # noqa: D102
-        P_selected = [self.P[i].varValue for i in range(self.num_eqs)]  # noqa: N806
+        P_selected = self.x[: self.num_eqs].tolist()  # noqa: N806
         if self.reweight_only:
             Z_selected = [1 for i in range(self.num_eqs)]  # noqa: N806
         else:
-            Z_selected = [self.Z[i].varValue for i in range(self.num_eqs)]  # noqa: N806
+            Z_selected = self.x[self.num_eqs : 2 * self.num_eqs].tolist()  # noqa: N806
 
         return P_selected, Z_selected
 
     def get_error_vector(self):  # noqa: D102
-        e_plus_selected = np.zeros([self.num_sites, self.num_return_periods])
-        e_minus_selected = np.zeros([self.num_sites, self.num_return_periods])
-        for i in range(self.num_sites):
-            for j in range(self.num_return_periods):
-                e_plus_selected[i, j] = self.e_plus[i, j].varValue
-                e_minus_selected[i, j] = self.e_minus[i, j].varValue
-        error = ((e_plus_selected - e_minus_selected) ** 2).sum(
-            axis=1
-        ) / self.num_return_periods
+        # hazard mismatch (e_minus - e_plus at the optimum) at every site
+        residual = 1.0 / np.asarray(self.return_periods) - np.einsum(
+            'ikj,k->ij', self.im_exceedance_probs, self.x[: self.num_eqs]
+        )
+        error = (residual**2).sum(axis=1) / self.num_return_periods
         return error  # noqa: RET504
 
     def export_sampled_gmms(  # noqa: D102
@@ -815,12 +1098,16 @@ class OccurrenceModel_Wangetal2023:  # noqa: D101
         reweight_only=False,  # noqa: FBT002
         occurence_rate_origin=None,
         hzo_config=None,
+        exceedance_prob_tol=1e-6,
+        num_site_clusters=None,
     ):
         """__init__: initialization a hazard occurrence optimizer
         :param return_periods: 1-D array of return periods, RP(r)
         :param earthquake_mafs: 1-D array of annual occurrence probability, MAF(j)
         :param im_exceedance_probs: 3-D array of exceedance probability of Sa, EP(i,j,r) for site #i, earthquake #j, return period #r
         :param num_scenarios: integer for number of target scenarios
+        :param exceedance_prob_tol: exceedance probabilities below this fraction of the target rate are dropped
+        :param num_site_clusters: integer for number of site clusters (None: no clustering)
         """  # noqa: D205, D400
         # read input parameters
         self.return_periods = return_periods
@@ -829,6 +1116,8 @@ class OccurrenceModel_Wangetal2023:  # noqa: D101
         self.num_scenarios = num_scenarios
         self.reweight_only = reweight_only
         self.occurence_rate_origin = occurence_rate_origin
+        self.exceedance_prob_tol = exceedance_prob_tol
+        self.num_site_clusters = num_site_clusters
         if len(hzo_config['LassoTuningParameter']) > 0:
             self.alpha_path = hzo_config['LassoTuningParameter']
         else:
@@ -893,33 +1182,32 @@ class OccurrenceModel_Wangetal2023:  # noqa: D101
 
     def _opt_initialization(self):
         """_opt_initialization: initialization of LASSO regression"""  # noqa: D400
-        # define X
-        self.X_P = (
-            self.im_exceedance_probs.transpose(1, 0, 2)
-            .reshape(self.im_exceedance_probs.shape[1], -1)
-            .T
-        )
-        self.y = 1 / np.tile(self.return_periods, self.im_exceedance_probs.shape[0])
-
-        # define weights
-        self.W = np.diag(np.sqrt(1 / self.y))
-
-        # rate matrix for events
-        # self.occurence_rate_origin_mat = np.repeat(self.occurence_rate_origin, self.X_P.shape[0]).reshape(self.X_P.shape[0], -1)
-        self.occurence_rate_origin_mat = np.vstack(
-            [np.array(self.occurence_rate_origin)] * self.X_P.shape[0]
+        t_start = time.time()
+        # define X (sparse, one row per site and return period)
+        self.X_P, self.y, row_weights = assemble_hazard_matching_rows(
+            self.im_exceedance_probs,
+            self.return_periods,
+            self.exceedance_prob_tol,
+            self.num_site_clusters,
         )
 
         # hazard by each event
-        self.X = self.X_P * self.occurence_rate_origin_mat
+        self.X = self.X_P @ sparse.diags(np.asarray(self.occurence_rate_origin))
 
-        self.X_weighted = np.dot(self.W, self.X)
-        self.y_weighted = np.dot(self.W, self.y)
+        # define weights (W = diag(sqrt(1 / y)), scaled by the number of
+        # sites each row represents) and scale the rows instead of forming W;
+        # the weighted matrix is kept dense so that lasso_path can use the
+        # Gram matrix, which is much faster than sparse coordinate descent
+        weights = np.sqrt(row_weights / self.y)
+        self.X_weighted = (sparse.diags(weights) @ self.X).toarray()
+        self.y_weighted = weights * self.y
 
+        self.build_time = time.time() - t_start
         return True  # noqa: DOC201, RUF100
 
     def solve_opt(self):
         """LASSO regression"""  # noqa: D400
+        t_start = time.time()
         if self.alpha_path:
             self.alphas, self.coefs, _ = lasso_path(
                 X=self.X_weighted,
@@ -936,6 +1224,11 @@ class OccurrenceModel_Wangetal2023:  # noqa: D101
                 alphas=None,
                 positive=True,
             )
+        self.solve_time = time.time() - t_start
+        print(  # noqa: T201
+            'OccurrenceModel_Wangetal2023.solve_opt: problem built in '
+            f'{self.build_time:.2f} sec and solved in {self.solve_time:.2f} sec.'
+        )
 
         # re-regression may be needed here !!!
 
@@ -967,8 +1260,11 @@ class OccurrenceModel_Wangetal2023:  # noqa: D101
 
     def get_error_vector(self):  # noqa: D102
         # self.e_selected = self.y - np.dot(self.X, self.coefs[:,self.selected_alpha_ind])
-        error = self.y - self.X.sum(axis=1)
-        error = error.reshape(self.num_sites, self.num_return_periods)
+        error = 1 / np.asarray(self.return_periods) - np.einsum(
+            'ikj,k->ij',
+            self.im_exceedance_probs,
+            np.asarray(self.occurence_rate_origin),
+        )
         error = (error**2).sum(axis=1) / self.num_return_periods
         return error  # noqa: RET504
 
@@ -131,6 +131,7 @@ def hazard_job(hazard_info):  # noqa: C901, D103, PLR0915
                 scenario_info['Generator'],
                 output_dir,
                 mth_flag=False,
+                **get_im_chunk_options(event_info),  # noqa: F405
             )
             # update the im_info
             event_info['IntensityMeasure'] = im_info
@@ -437,6 +438,8 @@ def hazard_job(hazard_info):  # noqa: C901, D103, PLR0915
     gf_im_list = []
     if 'GroundFailure' in hazard_info['Event'].keys():  # noqa: SIM118
         ground_failure_info = hazard_info['Event']['GroundFailure']
+        # worker processes evaluating blocks of realizations, 1 for no workers
+        gf_num_processes = int(ground_failure_info.get('NumProcesses', 1))
         if 'Liquefaction' in ground_failure_info.keys():  # noqa: SIM118
             import liquefaction
 
@@ -456,6 +459,7 @@ def hazard_job(hazard_info):  # noqa: C901, D103, PLR0915
                 im_list,
                 trigging_output_keys,
                 additional_output_required_keys,
+                num_processes=gf_num_processes,
             )
             del trigging_model
             gf_im_list += trigging_info['Output']
@@ -474,14 +478,14 @@ def hazard_job(hazard_info):  # noqa: C901, D103, PLR0915
                     stations, lat_spread_para
                 )
                 ln_im_mr, mag_maf, im_list = lat_spread_model.run(
-                    ln_im_mr, mag_maf, im_list
+                    ln_im_mr, mag_maf, im_list, num_processes=gf_num_processes
                 )
                 gf_im_list += lat_spread_info['Output']
             if 'Settlement' in ground_failure_info['Liquefaction'].keys():  # noqa: SIM118
                 settlement_info = ground_failure_info['Liquefaction']['Settlement']
                 settlement_model = getattr(liquefaction, settlement_info['Model'])()
                 ln_im_mr, mag_maf, im_list = settlement_model.run(
-                    ln_im_mr, mag_maf, im_list
+                    ln_im_mr, mag_maf, im_list, num_processes=gf_num_processes
                 )
                 gf_im_list += settlement_info['Output']
         if 'Landslide' in ground_failure_info.keys():  # noqa: SIM118
@@ -493,7 +497,7 @@ def hazard_job(hazard_info):  # noqa: C901, D103, PLR0915
                     lsld_info['Parameters'], stations
                 )
                 ln_im_mr, mag_maf, im_list = lsld_model.run(
-                    ln_im_mr, mag_maf, im_list
+                    ln_im_mr, mag_maf, im_list, num_processes=gf_num_processes
                 )
                 gf_im_list += lsld_info['Output']
 
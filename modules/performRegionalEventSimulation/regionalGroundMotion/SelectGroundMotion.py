@@ -44,12 +44,15 @@ from pathlib import Path
 R2D = True
 if not R2D:
     pass
-import copy  # noqa: E402
 import csv  # noqa: E402
 
 import numpy as np  # noqa: E402
 import pandas as pd  # noqa: E402
 
+# Maximum size (in bytes) of the (target, record, IM) block of scaled record
+# IMs evaluated at once in GM_Selector.select_records_batch
+SELECTION_BLOCK_BYTES = 2**27
+
 
 class GM_Selector:  # noqa: D101
     def __init__(
@@ -97,25 +100,99 @@ class GM_Selector:  # noqa: D101
         self.target_im = [target_im for k in range(self.num_gm)]
 
     def select_records(self):  # noqa: D102
-        im_table = self.gmdb_im_df.iloc[:, 1:]
-        min_err = 1000000.0
-        for s in self.sf_range:
-            cur_im_table = copy.copy(im_table)
-            for i in range(cur_im_table.shape[1]):
-                if self.scalable[i]:
-                    cur_im_table.iloc[:, i] = cur_im_table.iloc[:, i] * s
-            err = np.linalg.norm(
-                np.exp(self.target_im) - cur_im_table.to_numpy(), axis=1
+        loc_tag, sf, min_err = self.select_records_batch(
+            np.atleast_2d(self.target_im[0])
+        )
+        self.loc_tag = loc_tag[0]
+        self.min_err = min_err[0]
+        self.rsn_tag = self.gmdb_im_df['RSN'].values.tolist()[self.loc_tag]  # noqa: PD011
+        self.sf = sf[0]
+
+    def select_records_batch(self, target_ims, chunk_size=None):
+        """Select the best record and scale factor for many targets.
+
+        The error of a record is the norm of the difference between the
+        target IMs and the scaled record IMs, and only the scale factors in
+        `sf_range` are considered. The error is a convex quadratic function
+        of the scale factor, so the best grid point of a record is next to
+        its optimal scale factor, and only those grid points are evaluated.
+        Ties are resolved as in a scan of `sf_range` in ascending order,
+        i.e., towards the smaller scale factor and then the first record.
+
+        Parameters
+        ----------
+        target_ims : array_like
+            Target log IMs, one row per target and one column per IM in
+            `im_list`.
+        chunk_size : int, optional
+            Number of targets processed at once. By default, it is chosen
+            such that the (target, record, IM) block of scaled record IMs
+            does not exceed `SELECTION_BLOCK_BYTES`.
+
+        Returns
+        -------
+        loc_tag : numpy.ndarray
+            Row index of the selected record for each target.
+        sf : numpy.ndarray
+            Scale factor of the selected record for each target.
+        min_err : numpy.ndarray
+            Error of the selected record for each target.
+
+        """
+        target_ims = np.exp(np.atleast_2d(target_ims))
+        im_table = self.gmdb_im_df.iloc[:, 1:].to_numpy(dtype=float)
+        scalable = np.array(self.scalable, dtype=bool)
+        # scaled and fixed parts of the record IMs
+        im_scaled = np.where(scalable, im_table, 0.0)
+        im_fixed = np.where(scalable, 0.0, im_table)
+        im_scaled_norm = np.sum(im_scaled**2, axis=1)
+        num_sf = len(self.sf_range)
+
+        num_targets = target_ims.shape[0]
+        if chunk_size is None:
+            chunk_size = max(
+                1, SELECTION_BLOCK_BYTES // (im_table.size * im_table.itemsize)
+            )
+        loc_tag = np.zeros(num_targets, dtype=int)
+        sf = np.zeros(num_targets)
+        min_err = np.zeros(num_targets)
+        for start in range(0, num_targets, chunk_size):
+            targets = target_ims[start : start + chunk_size]
+            # optimal scale factor of every record and the grid points
+            # around it
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sf_opt = (targets @ im_scaled.T) / im_scaled_norm
+            sf_opt = np.where(im_scaled_norm > 0, sf_opt, self.sf_range[0])
+            k_opt = np.searchsorted(self.sf_range, sf_opt)
+            err = np.full(sf_opt.shape, np.inf)
+            k_best = np.zeros(sf_opt.shape, dtype=int)
+            for offset in range(-2, 2):
+                k = np.clip(k_opt + offset, 0, num_sf - 1)
+                cur_err = np.linalg.norm(
+                    targets[:, np.newaxis, :]
+                    - (
+                        im_scaled[np.newaxis, :, :]
+                        * self.sf_range[k][:, :, np.newaxis]
+                        + im_fixed[np.newaxis, :, :]
+                    ),
+                    axis=2,
+                )
+                better = (cur_err < err) | ((cur_err == err) & (k < k_best))
+                err = np.where(better, cur_err, err)
+                k_best = np.where(better, k, k_best)
+            # the smallest error, then the smallest scale factor, then the
+            # first record
+            min_err_chunk = err.min(axis=1)
+            candidates = np.where(
+                err == min_err_chunk[:, np.newaxis], k_best, num_sf
             )
-            if np.min(err) < min_err:
-                min_err = np.min(err)
-                tmp_tag = err.argmin()
-                sf = s
+            best = np.argmin(candidates, axis=1)
+            rows = np.arange(err.shape[0])
+            loc_tag[start : start + chunk_size] = best
+            sf[start : start + chunk_size] = self.sf_range[k_best[rows, best]]
+            min_err[start : start + chunk_size] = min_err_chunk
 
-        self.loc_tag = tmp_tag
-        self.min_err = min_err
-        self.rsn_tag = self.gmdb_im_df['RSN'].values.tolist()[tmp_tag]  # noqa: PD011
-        self.sf = sf
+        return loc_tag, sf, min_err
 
 
 def select_ground_motion(  # noqa: C901, D103
@@ -182,6 +259,13 @@ def select_ground_motion(  # noqa: C901, D103
                 )
         # ground motion database intensity measure data frame
         gmdb_im_df = pd.DataFrame.from_dict(gmdb_im_dict)
+        # create a ground motion selector
+        gm_selector = GM_Selector(
+            gmdb_im_df=gmdb_im_df,
+            num_records=1,
+            sf_min=sf_min,
+            sf_max=sf_max,
+        )
         count = 0
         # Looping over all scenarios
         for cur_target in target_ln_im:
@@ -189,32 +273,23 @@ def select_ground_motion(  # noqa: C901, D103
             count = count + 1
             print('-Scenario #' + str(tmp_scen))  # noqa: T201
             num_stations, num_periods, num_simu = cur_target.shape
-            tmp_id = np.zeros((num_stations, num_simu))
-            tmp_sf = np.zeros((num_stations, num_simu))
-            tmp_min_err = np.zeros((num_stations, num_simu))
+            # select records for all stations and realizations at once
+            loc_tag, sf, _ = gm_selector.select_records_batch(
+                cur_target.transpose(2, 0, 1).reshape(-1, num_periods)
+            )
+            loc_tag = loc_tag.reshape(num_simu, num_stations).T
+            tmp_id = gmdb['RecId'].to_numpy()[loc_tag].astype(float)
+            tmp_sf = sf.reshape(num_simu, num_stations).T
             tmp_filename = []
             for i in range(num_simu):
                 print('--Realization #' + str(i + 1))  # noqa: T201
                 for j in range(num_stations):
-                    # create a ground motion selector
-                    gm_selector = GM_Selector(
-                        gmdb_im_df=gmdb_im_df,
-                        num_records=1,
-                        sf_min=sf_min,
-                        sf_max=sf_max,
-                        target_im=cur_target[j, :, i],
-                    )
-                    # select records
-                    gm_selector.select_records()
                     # collect results
-                    tmp_min_err[j, i] = gm_selector.min_err
-                    tmp_id[j, i] = int(gmdb['RecId'][gm_selector.loc_tag])
-                    tmp_sf[j, i] = gm_selector.sf
                     tmp_filename.append(
                         'RSN'
                         + str(int(tmp_id[j, i]))
                         + '_'
-                        + gmdb['FileNameHorizontal1'][gm_selector.loc_tag]
+                        + gmdb['FileNameHorizontal1'][loc_tag[j, i]]
                         .replace('\\', '_')
                         .replace('/', '_')
                     )
@@ -222,7 +297,7 @@ def select_ground_motion(  # noqa: C901, D103
                         'RSN'
                         + str(int(tmp_id[j, i]))
                         + '_'
-                        + gmdb['FileNameHorizontal2'][gm_selector.loc_tag]
+                        + gmdb['FileNameHorizontal2'][loc_tag[j, i]]
                         .replace('\\', '_')
                         .replace('/', '_')
                     )
@@ -32,7 +32,7 @@ if GlobalVariable.JVM_started is False:
     jpype.addClassPath(opensha_path)
     jpype.startJVM(f'-Xmx{memory_request}G', convertStrings=False)
 print('JVM started')
-from ComputeIntensityMeasure import compute_im  # noqa: F403
+from ComputeIntensityMeasure import compute_im, get_im_chunk_options  # noqa: F403
 # print('debug 3')
 from GMSimulators import simulate_ground_motion
 # print('debug 1')
@@ -93,6 +93,7 @@ def run_scenario_i(sce_idx, hazard_info_orig, all_rups, procID = 0):
                 scenario_info['Generator'],
                 output_dir,
                 mth_flag=False,
+                **get_im_chunk_options(event_info),
             )
     
     # current, peak = tracemalloc.get_traced_memory()
@@ -153,6 +154,8 @@ def run_scenario_i(sce_idx, hazard_info_orig, all_rups, procID = 0):
     gf_im_list = []
     if 'GroundFailure' in hazard_info['Event'].keys():  # noqa: SIM118
         ground_failure_info = hazard_info['Event']['GroundFailure']
+        # worker processes evaluating blocks of realizations, 1 for no workers
+        gf_num_processes = int(ground_failure_info.get('NumProcesses', 1))
         if 'Liquefaction' in ground_failure_info.keys():  # noqa: SIM118
             import liquefaction
 
@@ -172,6 +175,7 @@ def run_scenario_i(sce_idx, hazard_info_orig, all_rups, procID = 0):
                 im_list,
                 trigging_output_keys,
                 additional_output_required_keys,
+                num_processes=gf_num_processes,
             )
             del trigging_model
             gf_im_list += trigging_info['Output']
@@ -190,14 +194,14 @@ def run_scenario_i(sce_idx, hazard_info_orig, all_rups, procID = 0):
                     stations, lat_spread_para
                 )
                 ln_im_mr, mag_maf, im_list = lat_spread_model.run(
-                    ln_im_mr, mag_maf, im_list
+                    ln_im_mr, mag_maf, im_list, num_processes=gf_num_processes
                 )
                 gf_im_list += lat_spread_info['Output']
             if 'Settlement' in ground_failure_info['Liquefaction'].keys():  # noqa: SIM118
                 settlement_info = ground_failure_info['Liquefaction']['Settlement']
                 settlement_model = getattr(liquefaction, settlement_info['Model'])()
                 ln_im_mr, mag_maf, im_list = settlement_model.run(
-                    ln_im_mr, mag_maf, im_list
+                    ln_im_mr, mag_maf, im_list, num_processes=gf_num_processes
                 )
                 gf_im_list += settlement_info['Output']
         if 'Landslide' in ground_failure_info.keys():  # noqa: SIM118
@@ -209,7 +213,7 @@ def run_scenario_i(sce_idx, hazard_info_orig, all_rups, procID = 0):
                     lsld_info['Parameters'], stations
                 )
                 ln_im_mr, mag_maf, im_list = lsld_model.run(
-                    ln_im_mr, mag_maf, im_list
+                    ln_im_mr, mag_maf, im_list, num_processes=gf_num_processes
                 )
                 gf_im_list += lsld_info['Output']
     if event_info['SaveIM'] and ln_im_mr:
@@ -42,7 +42,7 @@ import os
 import numpy as np
 import pandas as pd
 import scipy
-from scipy.interpolate import interp1d, interp2d
+from scipy.interpolate import interp1d
 
 
 def baker_jayaram_correlation_2008(im1, im2, flag_orth=False):  # noqa: FBT002, C901
@@ -239,6 +239,26 @@ def jayaram_baker_correlation_2009(im, h, flag_clustering=False):  # noqa: FBT00
     Output:
         rho: correlation between normalized intra-event residuals
     """  # noqa: D205, D400, D401
+    b = jayaram_baker_range_2009(im, flag_clustering=flag_clustering)
+    rho = np.exp(-3.0 * np.asarray(h) / b)
+    return rho  # noqa: DOC201, RET504, RUF100
+
+
+def jayaram_baker_range_2009(im, flag_clustering=False):  # noqa: FBT002
+    """Computing the range parameter of the Jayaram and Baker (2009) model
+    Reference:
+        Jayaram and Baker (2009) Correlation model for spatially distributed
+        ground-motion intensities
+    Input:
+        im: intensity measure name
+        flag_clustering: the geologic condition of the soil varies widely over
+                         the region (default: false)
+    Output:
+        b: range parameter (km) of the exponential correlation function
+    Note:
+        IMs with the same range parameter share the same spatial correlation
+        matrix, so the factorization of that matrix can be reused.
+    """  # noqa: D205, D400, D401
     # parse period form im
     try:
         # for Sa
@@ -257,8 +277,257 @@ def jayaram_baker_correlation_2009(im, h, flag_clustering=False):  # noqa: FBT00
         b = 8.5 + 17.2 * T
     else:
         b = 40.7 - 15.0 * T
-    rho = np.exp(-3.0 * h / b)
-    return rho  # noqa: DOC201, RET504, RUF100
+    return b  # noqa: DOC201, RET504, RUF100
+
+
+def cholesky_factor(cov_matrix):
+    """Computing a lower triangular factor of a covariance matrix
+    Input:
+        cov_matrix: covariance matrix
+    Output:
+        factor: lower triangular matrix L with L @ L.T = cov_matrix
+    Note:
+        Coincident sites make the matrix positive semi-definite only. The
+        factor is computed from the eigen decomposition in that case.
+    """  # noqa: D205, D400, D401
+    try:
+        return scipy.linalg.cholesky(cov_matrix, lower=True)  # noqa: DOC201, RUF100
+    except np.linalg.LinAlgError:
+        eig_val, eig_vec = np.linalg.eigh(cov_matrix)
+        return eig_vec * np.sqrt(np.maximum(eig_val, 0.0))
+
+
+def nngp_factor(stn_loc, cov_fun, num_neighbors=30):
+    """Building a nearest-neighbor Gaussian process approximation of a field
+    Reference:
+        Vecchia (1988) Estimation and model identification for continuous
+        spatial processes
+        Datta et al. (2016) Hierarchical nearest-neighbor Gaussian process
+        models for large geostatistical datasets
+    Input:
+        stn_loc: projected station coordinates (km), one row per station
+        cov_fun: covariance as a function of the separation distance (km)
+        num_neighbors: number of previous stations that condition each station
+    Output:
+        factor: dictionary used by sample_nngp
+    Note:
+        Stations are visited in a random order that spreads the first
+        stations over the region. Every station is conditioned on its nearest
+        previously visited stations, which gives a sparse lower triangular
+        system (I - B) x = D z. Memory scales with the number of stations
+        times num_neighbors.
+    """  # noqa: D205, D400, D401
+    from scipy.sparse import csc_matrix
+    from scipy.sparse.linalg import splu
+    from scipy.spatial import cKDTree
+
+    num_stations = stn_loc.shape[0]
+    order = np.random.default_rng(0).permutation(num_stations)
+    loc = np.asarray(stn_loc)[order]
+    var = cov_fun(np.zeros(1))[0]
+
+    rows = []
+    cols = []
+    vals = []
+    cond_std = np.empty(num_stations)
+    start = 0
+    while start < num_stations:
+        # the neighbor search runs in blocks that double in size, so at least
+        # half of the candidates of a station precede it in the visiting
+        # order; the others are dropped, so query more than num_neighbors
+        end = min(max(2 * start, 4 * num_neighbors), num_stations)
+        num_query = min(3 * num_neighbors + 1, end)
+        dist, nbrs = cKDTree(loc[:end]).query(loc[start:end], k=num_query)
+        dist = dist.reshape(end - start, num_query)
+        nbrs = nbrs.reshape(end - start, num_query)
+        valid = nbrs < np.arange(start, end)[:, np.newaxis]
+        # keep the closest num_neighbors valid candidates of each station
+        keep = np.argsort(~valid, axis=1, kind='stable')[:, :num_neighbors]
+        dist = np.take_along_axis(dist, keep, axis=1)
+        nbrs = np.take_along_axis(nbrs, keep, axis=1)
+        valid = np.take_along_axis(valid, keep, axis=1)
+        num_nbrs = nbrs.shape[1]
+
+        chunk = max(1, 2**22 // num_nbrs**2)
+        for i in range(0, end - start, chunk):
+            rows_i = slice(i, min(i + chunk, end - start))
+            nbr_loc = loc[nbrs[rows_i]]
+            valid_i = valid[rows_i]
+            pair_valid = valid_i[:, :, np.newaxis] & valid_i[:, np.newaxis, :]
+            cov_nn = np.where(
+                pair_valid,
+                cov_fun(
+                    np.linalg.norm(
+                        nbr_loc[:, :, np.newaxis, :] - nbr_loc[:, np.newaxis, :, :],
+                        axis=-1,
+                    )
+                ),
+                0.0,
+            )
+            # invalid candidates become independent unit variables with no
+            # influence; a small nugget keeps coincident neighbors solvable
+            diag = np.arange(num_nbrs)
+            cov_nn[:, diag, diag] = np.where(valid_i, var * (1.0 + 1e-8), 1.0)
+            cov_in = np.where(valid_i, cov_fun(dist[rows_i]), 0.0)
+            w = np.linalg.solve(cov_nn, cov_in[:, :, np.newaxis])[:, :, 0]
+            cond_std[start + rows_i.start : start + rows_i.stop] = np.sqrt(
+                np.maximum(var - np.sum(w * cov_in, axis=1), 1e-12 * var)
+            )
+            row_ids = np.arange(start + rows_i.start, start + rows_i.stop)
+            rows.append(np.repeat(row_ids, num_nbrs)[valid_i.ravel()])
+            cols.append(nbrs[rows_i][valid_i])
+            vals.append(-w[valid_i])
+        start = end
+
+    rows.append(np.arange(num_stations))
+    cols.append(np.arange(num_stations))
+    vals.append(np.ones(num_stations))
+    precision_factor = csc_matrix(
+        (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(num_stations, num_stations),
+    )
+    # the matrix is lower triangular, so the LU factorization is the matrix
+    # itself as long as the natural order and diagonal pivots are kept
+    solver = splu(precision_factor, permc_spec='NATURAL', diag_pivot_thresh=0.0)
+
+    return {'order': order, 'solver': solver, 'cond_std': cond_std}  # noqa: DOC201, RUF100
+
+
+def sample_nngp(factor, num_simu):
+    """Simulating a spatially correlated field from an nngp_factor
+    Input:
+        factor: output of nngp_factor
+        num_simu: number of realizations
+    Output:
+        field: field values, one row per station
+    """  # noqa: D205, D400, D401
+    order = factor['order']
+    noise = factor['cond_std'][:, np.newaxis] * np.random.standard_normal(
+        (len(order), num_simu)
+    )
+    field = factor['solver'].solve(noise)
+    # back to the original station order
+    residuals = np.empty_like(field)
+    residuals[order] = field
+    return residuals  # noqa: DOC201, RUF100
+
+
+class StationDistance:
+    """Station separation distances served by a KD-tree
+    Input:
+        stn_loc: projected station coordinates (km), one row per station
+        max_dense_sites: largest number of stations that are simulated with
+            a dense factorization of the correlation matrix
+        num_neighbors: number of neighbors that condition each station in the
+            nearest-neighbor approximation used above max_dense_sites
+        tile_size: number of rows in the distance tiles
+    Note:
+        The full distance matrix is never stored. Dense correlation matrices
+        are assembled tile by tile, and larger station sets only query the
+        nearest neighbors of every station, so memory scales with the number
+        of stations times num_neighbors. Factorized correlation models are
+        cached by key (dense factors up to max_cache_bytes), so models sharing
+        their parameters reuse them.
+    """  # noqa: D205, D400
+
+    max_cache_bytes = 2**30
+
+    def __init__(self, stn_loc, max_dense_sites=10000, num_neighbors=30, tile_size=1024):  # noqa: D107
+        self.stn_loc = np.asarray(stn_loc, dtype=float)
+        self.num_stations = self.stn_loc.shape[0]
+        self.max_dense_sites = max_dense_sites
+        self.num_neighbors = num_neighbors
+        self.tile_size = tile_size
+        self._tree = None
+        self._factors = dict()  # noqa: C408
+        self._dense_bytes = 0
+
+    @property
+    def tree(self):  # noqa: D102
+        if self._tree is None:
+            from scipy.spatial import cKDTree
+
+            self._tree = cKDTree(self.stn_loc)
+        return self._tree
+
+    def tiles(self):
+        """Iterating over the distance matrix in blocks of rows
+        Output:
+            (start, end, dist): rows start:end of the distance matrix (km)
+        """  # noqa: D205, D400, D401
+        from scipy.spatial.distance import cdist
+
+        for start in range(0, self.num_stations, self.tile_size):
+            end = min(start + self.tile_size, self.num_stations)
+            yield start, end, cdist(self.stn_loc[start:end], self.stn_loc)
+
+    def matrix(self):
+        """Assembling the dense distance matrix (km)"""  # noqa: D400, D401
+        dist = np.empty((self.num_stations, self.num_stations))
+        for start, end, dist_tile in self.tiles():
+            dist[start:end] = dist_tile
+        return dist  # noqa: DOC201, RUF100
+
+    def factor(self, cov_fun, key=None):
+        """Factorizing a covariance model at the stations
+        Input:
+            cov_fun: covariance as a function of the separation distance (km)
+            key: hashable description of cov_fun to reuse the factorization
+        Output:
+            factor: lower triangular matrix, or nngp_factor output above
+            max_dense_sites stations
+        """  # noqa: D205, D400, D401
+        if key is not None and key in self._factors:
+            return self._factors[key]
+        if self.num_stations <= self.max_dense_sites:
+            cov_matrix = np.empty((self.num_stations, self.num_stations))
+            for start, end, dist_tile in self.tiles():
+                cov_matrix[start:end] = cov_fun(dist_tile)
+            factor = cholesky_factor(cov_matrix)
+            del cov_matrix
+            if key is not None and (
+                self._dense_bytes + factor.nbytes <= self.max_cache_bytes
+            ):
+                self._factors[key] = factor
+                self._dense_bytes += factor.nbytes
+        else:
+            factor = nngp_factor(
+                self.stn_loc, cov_fun, num_neighbors=self.num_neighbors
+            )
+            if key is not None:
+                self._factors[key] = factor
+        return factor  # noqa: DOC201, RUF100
+
+    def simulate(self, cov_fun, num_simu, key=None):
+        """Simulating a zero-mean Gaussian field at the stations
+        Input:
+            cov_fun: covariance as a function of the separation distance (km)
+            num_simu: number of realizations
+            key: hashable description of cov_fun to reuse the factorization
+        Output:
+            field: field values, one row per station
+        """  # noqa: D205, D400, D401
+        factor = self.factor(cov_fun, key=key)
+        if isinstance(factor, dict):
+            return sample_nngp(factor, num_simu)  # noqa: DOC201, RUF100
+        return factor @ np.random.standard_normal((self.num_stations, num_simu))
+
+
+def simulate_field(stn_dist, cov_fun, num_simu, key=None):
+    """Simulating a zero-mean, spatially correlated Gaussian field
+    Input:
+        stn_dist: StationDistance, or dense station distance matrix (km)
+        cov_fun: covariance as a function of the separation distance (km)
+        num_simu: number of realizations
+        key: hashable description of cov_fun to reuse the factorization
+    Output:
+        field: field values, one row per station
+    """  # noqa: D205, D400, D401
+    if isinstance(stn_dist, StationDistance):
+        return stn_dist.simulate(cov_fun, num_simu, key=key)  # noqa: DOC201, RUF100
+    return cholesky_factor(cov_fun(stn_dist)) @ np.random.standard_normal(
+        (stn_dist.shape[0], num_simu)
+    )
 
 
 def load_loth_baker_correlation_2013(datapath):
@@ -279,6 +548,20 @@ def load_loth_baker_correlation_2013(datapath):
     return B1, B2, B3  # noqa: DOC201, RUF100
 
 
+def _interp_loth_baker_correlation_2013(B, T1, T2):  # noqa: N803
+    # bilinear interpolation of a coregionalization matrix, periods beyond
+    # the tabulated range are given the boundary value
+    from scipy.interpolate import RegularGridInterpolator
+
+    model_periods = B['Period (s)'].to_numpy(dtype=float)
+    interp_fun = RegularGridInterpolator(
+        (model_periods, model_periods), B.iloc[:, 1:].to_numpy(dtype=float)
+    )
+    T1 = np.clip(T1, model_periods[0], model_periods[-1])  # noqa: N806
+    T2 = np.clip(T2, model_periods[0], model_periods[-1])  # noqa: N806
+    return interp_fun(np.stack(np.broadcast_arrays(T1, T2), axis=-1))
+
+
 def compute_rho_loth_baker_correlation_2013(T1, T2, h, B1, B2, B3):  # noqa: N803
     """Computing intra-event correlation coeffcieint between Sa(Ti) and Sa(Tj)
     at two sites
@@ -297,14 +580,10 @@ def compute_rho_loth_baker_correlation_2013(T1, T2, h, B1, B2, B3):  # noqa: N80
     Note:
         The valid range for T1 and T2 is 0.01s ~ 10.0s
     """  # noqa: D205, D400, D401
-    # Interpolation functions
-    f1 = interp2d(B1['Period (s)'], B1['Period (s)'], B1.iloc[:, 1:])
-    f2 = interp2d(B2['Period (s)'], B2['Period (s)'], B2.iloc[:, 1:])
-    f3 = interp2d(B3['Period (s)'], B3['Period (s)'], B3.iloc[:, 1:])
     # Three coefficients (T1, T2 < 0.01 would be given the boundary value)
-    b1 = f1(T1, T2)
-    b2 = f2(T1, T2)
-    b3 = f3(T1, T2)
+    b1 = _interp_loth_baker_correlation_2013(B1, T1, T2)
+    b2 = _interp_loth_baker_correlation_2013(B2, T1, T2)
+    b3 = _interp_loth_baker_correlation_2013(B3, T1, T2)
     # Covariance functions
     Ch = b1 * np.exp(-3.0 * h / 20.0) + b2 * np.exp(-3.0 * h / 70.0) + b3 * (h == 0)  # noqa: N806
     # Correlation coefficient
@@ -312,7 +591,7 @@ def compute_rho_loth_baker_correlation_2013(T1, T2, h, B1, B2, B3):  # noqa: N80
     return rho  # noqa: DOC201, RET504, RUF100
 
 
-def loth_baker_correlation_2013(stations, im_name_list, stn_dist, num_simu):
+def loth_baker_correlation_2013(stations, im_name_list, num_simu, stn_dist):
     """Simulating intra-event residuals
     Reference:
         Loth and Baker (2013) A spatial cross-correlation model of spectral
@@ -321,10 +600,16 @@ def loth_baker_correlation_2013(stations, im_name_list, stn_dist, num_simu):
         stations: stations coordinates
         im_name_list: simulated intensity measure names
         num_simu: number of realizations
+        stn_dist: StationDistance, or dense station distance matrix (km)
     Output:
         residuals: intra-event residuals
     Note:
         The valid range for T1 and T2 is 0.01s ~ 10.0s
+        The linear model of coregionalization is simulated one structure at
+        a time: each structure is a coregionalization matrix B_k times a
+        scalar correlation function, so the residuals are A_k @ Z_k summed
+        over the structures, with A_k @ A_k.T = B_k and Z_k independent
+        fields following that correlation function.
     """  # noqa: D205, D400, D401
     # Parse periods from intensity measure list
     periods = []
@@ -342,43 +627,25 @@ def loth_baker_correlation_2013(stations, im_name_list, stn_dist, num_simu):
     B1, B2, B3 = load_loth_baker_correlation_2013(  # noqa: N806
         os.path.dirname(__file__) + '/data/'  # noqa: PTH120
     )
-    # Computing distance matrix
     num_stations = len(stations)
-    # Creating a covariance matrices for each of the principal components
     num_periods = len(periods)
-    cov_matrix = np.zeros((num_stations * num_periods, num_stations * num_periods))
-    for i in range(num_periods):
-        for j in range(num_periods):
-            cov_matrix[
-                num_stations * i : num_stations * (i + 1),
-                num_stations * j : num_stations * (j + 1),
-            ] = compute_rho_loth_baker_correlation_2013(
-                periods[i], periods[j], stn_dist, B1, B2, B3
-            )
-
-    # mu = np.zeros(num_stations * num_periods)
-    # residuals_raw = np.random.multivariate_normal(mu, covMatrix, num_simu)
-    # Replace np multivariate_normal with cholesky and standard normal
-    standard_normal = np.random.standard_normal((num_simu, num_stations))
-    chole_lower = scipy.linalg.cholesky(cov_matrix, lower=True)
-    corr_samples = chole_lower @ standard_normal.T
-    residuals_raw = corr_samples.T
-    # reorder residual_raw [[period1],[period2],...,[]]-->[[site1],[site2],...,[]]
-    residuals_reorder = []
-    for i in range(num_simu):
-        tmp = []
-        for j in range(num_stations):
-            for k in range(num_periods):
-                tmp.append(residuals_raw[i, j + k * num_stations])  # noqa: PERF401
-        residuals_reorder.append(tmp)
-    residuals_reorder = np.array(residuals_reorder)
-    residuals = (
-        residuals_reorder.reshape(num_simu, num_stations, num_periods)
-        .swapaxes(0, 1)
-        .swapaxes(1, 2)
-    )
+    # Short-range, long-range and nugget structures
+    structures = [
+        (B1, 'short', lambda h: np.exp(-3.0 * h / 20.0)),
+        (B2, 'long', lambda h: np.exp(-3.0 * h / 70.0)),
+        (B3, 'nugget', lambda h: 1.0 * (h == 0)),
+    ]
+    residuals = np.zeros((num_stations, num_periods, num_simu))
+    for B, name, cov_fun in structures:  # noqa: N806
+        coreg = _interp_loth_baker_correlation_2013(
+            B, np.array(periods)[:, np.newaxis], np.array(periods)[np.newaxis, :]
+        )
+        field = simulate_field(
+            stn_dist, cov_fun, num_periods * num_simu, key=('Loth & Baker', name)
+        ).reshape(num_stations, num_periods, num_simu)
+        residuals += np.einsum('ij,njs->nis', cholesky_factor(coreg), field)
     # return
-    return residuals  # noqa: DOC201, RET504, RUF100
+    return residuals  # noqa: DOC201, RUF100
 
 
 def load_markhvida_ceferino_baker_correlation_2017(datapath):
@@ -428,6 +695,7 @@ def markhvida_ceferino_baker_correlation_2017(  # noqa: C901
         stations: stations coordinates
         im_name_list: simulated intensity measure names
         num_simu: number of realizations
+        stn_dist: StationDistance, or dense station distance matrix (km)
         num_pc: number of principle components
     Output:
         residuals: intra-event residuals
@@ -478,22 +746,22 @@ def markhvida_ceferino_baker_correlation_2017(  # noqa: C901
         # Creating a covariance matrices for each of the principal components
         if c1.iloc[0, i] == 0:
             # nug
-            cov_matrix = np.eye(num_stations) * c0.iloc[0, i]
+            residuals_pca[:, :, i] = np.sqrt(
+                c0.iloc[0, i]
+            ) * np.random.standard_normal((num_stations, num_simu))
         else:
             # iso nest
-            cov_matrix = (
-                c0.iloc[0, i] * (stn_dist == 0)
-                + c1.iloc[0, i] * np.exp(-3.0 * stn_dist / a1.iloc[0, i])
-                + c2.iloc[0, i] * np.exp(-3.0 * stn_dist / a2.iloc[0, i])
+            coef = tuple(
+                float(x.iloc[0, i]) for x in [c0, c1, a1, c2, a2]
+            )
+            residuals_pca[:, :, i] = simulate_field(
+                stn_dist,
+                lambda h, c=coef: c[0] * (h == 0)
+                + c[1] * np.exp(-3.0 * h / c[2])
+                + c[3] * np.exp(-3.0 * h / c[4]),
+                num_simu,
+                key=('Markhvida et al.', *coef),
             )
-        # residuals_pca[:, :, i] = np.random.multivariate_normal(
-        #     mu, cov_matrix, num_simu
-        # ).T
-        # Replace np multivariate_normal with cholesky and standard normal
-        standard_normal = np.random.standard_normal((num_simu, num_stations))
-        chole_lower = scipy.linalg.cholesky(cov_matrix, lower=True)
-        corr_samples = chole_lower @ standard_normal.T
-        residuals_pca[:, :, i] = corr_samples
 
     # Interpolating model_coef by periods
     interp_fun = interp1d(model_periods, model_coef, axis=0)
@@ -597,24 +865,22 @@ def du_ning_correlation_2021_simple(stations, im_name_list, num_simu, stn_dist):
     for i in range(num_pc):
         if a1.iloc[0, i] == 0:
             # nug
-            cov_matrix = np.eye(num_stations) * c1.iloc[0, i]
+            residuals_pca[:, :, i] = np.sqrt(
+                c1.iloc[0, i]
+            ) * np.random.standard_normal((num_stations, num_simu))
         else:
             # iso nest
-            cov_matrix = (
-                c1.iloc[0, i] * (stn_dist == 0)
-                + a1.iloc[0, i] * np.exp(-3.0 * stn_dist / b1.iloc[0, i])
-                + a2.iloc[0, i] * np.exp(-3.0 * stn_dist / b2.iloc[0, i])
+            coef = tuple(
+                float(x.iloc[0, i]) for x in [c1, a1, b1, a2, b2]
+            )
+            residuals_pca[:, :, i] = simulate_field(
+                stn_dist,
+                lambda h, c=coef: c[0] * (h == 0)
+                + c[1] * np.exp(-3.0 * h / c[2])
+                + c[3] * np.exp(-3.0 * h / c[4]),
+                num_simu,
+                key=('Du & Ning', *coef),
             )
-        # residuals_pca[:, :, i] = np.random.multivariate_normal(
-        #     mu, cov_matrix, num_simu
-        # ).T
-        # Replace np multivariate_normal with cholesky and standard normal
-        standard_normal = np.random.standard_normal((num_simu, num_stations))
-        # cov_matrix[cov_matrix < 0.05] = 0
-        chole_lower = scipy.linalg.cholesky(cov_matrix, lower=True)
-        corr_samples = chole_lower @ standard_normal.T
-        
-        residuals_pca[:, :, i] = corr_samples
 
     # Interpolating model_coef by periods
     pseudo_periods = [x for x in model_periods if type(x) == float] + [  # noqa: E721
@@ -655,6 +921,7 @@ def du_ning_correlation_2021(stations, im_name_list, num_simu, stn_dist, num_pc=
         stations: stations coordinates
         im_name_list: simulated intensity measure names
         num_simu: number of realizations
+        stn_dist: StationDistance, or dense station distance matrix (km)
         num_pc: number of principle components
     Output:
         residuals: intra-event residuals
@@ -706,22 +973,22 @@ def du_ning_correlation_2021(stations, im_name_list, num_simu, stn_dist, num_pc=
         # for i in tqdm(range(num_pc)):
         if a1.iloc[0, i] == 0:
             # nug
-            cov_matrix = np.eye(num_stations) * c1.iloc[0, i]
+            residuals_pca[:, :, i] = np.sqrt(
+                c1.iloc[0, i]
+            ) * np.random.standard_normal((num_stations, num_simu))
         else:
             # iso nest
-            cov_matrix = (
-                c1.iloc[0, i] * (stn_dist == 0)
-                + a1.iloc[0, i] * np.exp(-3.0 * stn_dist / b1.iloc[0, i])
-                + a2.iloc[0, i] * np.exp(-3.0 * stn_dist / b2.iloc[0, i])
+            coef = tuple(
+                float(x.iloc[0, i]) for x in [c1, a1, b1, a2, b2]
+            )
+            residuals_pca[:, :, i] = simulate_field(
+                stn_dist,
+                lambda h, c=coef: c[0] * (h == 0)
+                + c[1] * np.exp(-3.0 * h / c[2])
+                + c[3] * np.exp(-3.0 * h / c[4]),
+                num_simu,
+                key=('Du & Ning', *coef),
             )
-        # residuals_pca[:, :, i] = np.random.multivariate_normal(
-        #     mu, cov_matrix, num_simu
-        # ).T
-        # Replace np multivariate_normal with cholesky and standard normal
-        standard_normal = np.random.standard_normal((num_simu, num_stations))
-        chole_lower = scipy.linalg.cholesky(cov_matrix, lower=True)
-        corr_samples = chole_lower @ standard_normal.T
-        residuals_pca[:, :, i] = corr_samples
 
     # Interpolating model_coef by periods
     pseudo_periods = [x for x in model_periods if type(x) == float] + [  # noqa: E721
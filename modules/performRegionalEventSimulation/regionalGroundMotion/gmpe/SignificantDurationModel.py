@@ -77,33 +77,21 @@ def abrahamson_silva_ds_1999(
     Drat = [0.000, 0.000, 0.845, 0.646]  # noqa: N806
     sigma = [0.55, 0.46, 0.49, 0.45]
     # median
-    if distance > rc[dur_tag]:
-        ds_median = np.exp(
-            np.log(
-                (
-                    np.exp(b1[dur_tag] + b2[dur_tag] * (magnitude - m_star[dur_tag]))
-                    / (10 ** (1.5 * magnitude + 16.05))
-                )
-                ** (-1 / 3)
-                / (4.9e6 * beta[dur_tag])
-                + soil * c1[dur_tag]
-                + c2[dur_tag] * (distance - rc[dur_tag])
+    ds_median = np.exp(
+        np.log(
+            (
+                np.exp(b1[dur_tag] + b2[dur_tag] * (magnitude - m_star[dur_tag]))
+                / (10 ** (1.5 * magnitude + 16.05))
             )
-            + Drat[dur_tag]
-        )
-    else:
-        ds_median = np.exp(
-            np.log(
-                (
-                    np.exp(b1[dur_tag] + b2[dur_tag] * (magnitude - m_star[dur_tag]))
-                    / (10 ** (1.5 * magnitude + 16.05))
-                )
-                ** (-1 / 3)
-                / (4.9e6 * beta[dur_tag])
-                + soil * c1[dur_tag]
+            ** (-1 / 3)
+            / (4.9e6 * beta[dur_tag])
+            + soil * c1[dur_tag]
+            + np.where(
+                distance > rc[dur_tag], c2[dur_tag] * (distance - rc[dur_tag]), 0.0
             )
-            + Drat[dur_tag]
         )
+        + Drat[dur_tag]
+    )
     # sigma
     ds_sigma = sigma[dur_tag]
 
@@ -269,10 +257,10 @@ def afshari_stewart_ds_2016(  # noqa: C901
             -5.23 / 4 * np.log((vs30**4 + 412.39**4) / (1360**4 + 412.39**4))
         )
     # differential basin depth
-    if z1 is None or z1 < 0 or reg_tag == 2:  # noqa: PLR2004
+    if z1 is None or reg_tag == 2:  # noqa: PLR2004
         dz1 = 0
     else:
-        dz1 = z1 - mu_z1
+        dz1 = np.where(np.asarray(z1) < 0, 0, z1 - mu_z1)
 
     # source term
     if magnitude < M1[dur_tag]:
@@ -293,26 +281,26 @@ def afshari_stewart_ds_2016(  # noqa: C901
         f_0 = 4.9e6 * 3.2 * (deltaSigma / M_0) ** (1 / 3)
         F_E = 1 / f_0  # noqa: N806
     # path term
-    if distance < RR1[dur_tag]:
-        F_P = c1[dur_tag] * distance  # noqa: N806
-    elif distance < RR2[dur_tag]:
-        F_P = c1[dur_tag] * RR1[dur_tag] + c2[dur_tag] * (distance - RR1[dur_tag])  # noqa: N806
-    else:
-        F_P = (  # noqa: N806
+    F_P = np.where(  # noqa: N806
+        distance < RR1[dur_tag],
+        c1[dur_tag] * distance,
+        np.where(
+            distance < RR2[dur_tag],
+            c1[dur_tag] * RR1[dur_tag] + c2[dur_tag] * (distance - RR1[dur_tag]),
             c1[dur_tag] * RR1[dur_tag]
             + c2[dur_tag] * (RR2[dur_tag] - RR1[dur_tag])
-            + c3[dur_tag] * (distance - RR2[dur_tag])
-        )
+            + c3[dur_tag] * (distance - RR2[dur_tag]),
+        ),
+    )
     # F_deltaz term
-    if dz1 <= dz1ref[dur_tag]:
-        F_deltaz = c5[dur_tag] * dz1  # noqa: N806
-    else:
-        F_deltaz = c5[dur_tag] * dz1ref[dur_tag]  # noqa: N806
+    F_deltaz = np.where(  # noqa: N806
+        dz1 <= dz1ref[dur_tag], c5[dur_tag] * dz1, c5[dur_tag] * dz1ref[dur_tag]
+    )
     # site term
-    if vs30 < V1[dur_tag]:
-        F_S = c4[dur_tag] * np.log(vs30 / Vref[dur_tag]) + F_deltaz  # noqa: N806
-    else:
-        F_S = c4[dur_tag] * np.log(V1[dur_tag] / Vref[dur_tag]) + F_deltaz  # noqa: N806
+    F_S = (  # noqa: N806
+        c4[dur_tag] * np.log(np.minimum(vs30, V1[dur_tag]) / Vref[dur_tag])
+        + F_deltaz
+    )
 
     # median
     ds_median = np.exp(np.log(F_E + F_P) + F_S)
@@ -160,18 +160,18 @@ class chiou_youngs_2013:  # noqa: D101
         else:
             r4 += 0.0
         # Hanging-wall effect
-        r5 = 0.0
-        if rX >= 0.0:
-            r5 = (
-                self.c9
-                * np.cos(dip * np.pi / 180.0)
-                * (self.c9a + (1.0 - self.c9a) * np.tanh(rX / self.c9b))
-                * (1 - np.sqrt(rJB * rJB + zTop * zTop) / (rRup + 1.0))
-            )
+        r5 = np.where(
+            rX >= 0.0,
+            self.c9
+            * np.cos(dip * np.pi / 180.0)
+            * (self.c9a + (1.0 - self.c9a) * np.tanh(rX / self.c9b))
+            * (1 - np.sqrt(rJB * rJB + zTop * zTop) / (rRup + 1.0)),
+            0.0,
+        )
         return np.exp(r1 + r2 + r3 + r4 + r5)
 
     def calcSoilNonLin(self, vs30):  # noqa: N802, D102
-        exp1 = np.exp(self.phi3 * (min(vs30, 1130.0) - 360.0))
+        exp1 = np.exp(self.phi3 * (np.minimum(vs30, 1130.0) - 360.0))
         exp2 = np.exp(self.phi3 * (1130.0 - 360.0))
         return self.phi2 * (exp1 - exp2)
 
@@ -181,16 +181,16 @@ class chiou_youngs_2013:  # noqa: D101
         return np.exp(-7.15 / 4 * np.log((vsPow4 + self.A) / self.B)) / 1000.0  # km
 
     def calcDeltaZ1(self, z1p0, vs30):  # noqa: N802, D102
-        if np.isnan(z1p0):
-            return 0.0
-        return 1000.0 * (z1p0 - self.calcZ1ref(vs30))
+        return np.where(
+            np.isnan(z1p0), 0.0, 1000.0 * (z1p0 - self.calcZ1ref(vs30))
+        )
 
     # Mean ground motion model -- Equation 12
     def calcMean(self, vs30, z1p0, snl, saRef):  # noqa: N802, N803, D102
         # Soil effect: linear response
-        sl = self.phi1 * min(np.log(vs30 / 1130.0), 0.0)
+        sl = self.phi1 * np.minimum(np.log(vs30 / 1130.0), 0.0)
         # Soil effect: nonlinear response (base passed in)
-        snl *= np.log((saRef + self.phi4) / self.phi4)
+        snl = snl * np.log((saRef + self.phi4) / self.phi4)
         # Soil effect: sediment thickness
         dZ1 = self.calcDeltaZ1(z1p0, vs30)  # noqa: N806
         rkdepth = self.phi5 * (1.0 - np.exp(-dZ1 / self.PHI6))
@@ -208,7 +208,7 @@ class chiou_youngs_2013:  # noqa: D101
 
     def calcPhiSq(self, vsInf, NL0sq, mTest):  # noqa: N802, N803, D102
         sigmaNL0 = self.sigma1 + (self.sigma2 - self.sigma1) / 1.5 * mTest  # noqa: N806
-        vsTerm = self.sigma3 if vsInf else 0.7  # noqa: N806
+        vsTerm = np.where(vsInf, self.sigma3, 0.7)  # noqa: N806
         sigmaNL0 *= np.sqrt(vsTerm + NL0sq)  # noqa: N806
         phiSq = sigmaNL0 * sigmaNL0  # noqa: N806
         return phiSq  # noqa: RET504
@@ -228,6 +228,8 @@ class chiou_youngs_2013:  # noqa: D101
         vsInferred whether vs30 is an inferred or measured value
         z1p0 depth to V<sub>s</sub>=1.0 km/sec (in km)
         style of faulting
+        The site terms (rJB, rRup, rX, vs30, vsInferred, z1p0) can be arrays
+        over sites, in which case the outputs are arrays over the same sites.
         Output:
         Mean
         TotalStdDev
@@ -261,7 +263,8 @@ class chiou_youngs_2013:  # noqa: D101
             return 'NORMAL'
 
     def get_IM(self, Mw, site_rup_dict, site_info, im_info):  # noqa: N802, N803, D102
-        vsInf = bool(site_info['vsInferred'])  # noqa: N806
+        # site_info values are either scalars of a site or arrays over sites
+        vsInf = np.asarray(site_info['vsInferred'], dtype=bool)  # noqa: N806
         style = self.getFaultFromRake(site_rup_dict['aveRake'])
         if 'SA' in im_info['Type']:
             cur_T = im_info.get('Periods', None)  # noqa: N806
@@ -398,13 +401,13 @@ class abrahamson_silva_kamai_2014:  # noqa: D101
         return np.exp(-7.67 / 4.0 * np.log((vsPow4 + self.A) / self.B)) / 1000.0
 
     def calcSoilTerm(self, vs30, z1p0):  # noqa: N802, D102
-        if np.isnan(z1p0):
-            return 0.0
         z1ref = self.calcZ1ref(vs30)
         vsCoeff = np.array([self.a43, self.a44, self.a45, self.a46, self.a46])  # noqa: N806
         VS_BINS = np.array([150.0, 250.0, 400.0, 700.0, 1000.0])  # noqa: N806
         z1c = np.interp(vs30, VS_BINS, vsCoeff)
-        return z1c * np.log((z1p0 + 0.01) / (z1ref + 0.01))
+        return np.where(
+            np.isnan(z1p0), 0.0, z1c * np.log((z1p0 + 0.01) / (z1ref + 0.01))
+        )
 
     def getPhiA(self, Mw, s1, s2):  # noqa: N802, N803, D102
         if Mw < 4.0:  # noqa: PLR2004
@@ -422,10 +425,11 @@ class abrahamson_silva_kamai_2014:  # noqa: D101
         return s3 + ((s4 - s3) / 2) * (Mw - 5.0)
 
     def get_dAmp(self, b, c, vLin, vs30, saRock):  # noqa: N802, N803, D102
-        if vs30 >= vLin:
-            return 0.0
-        return (-b * saRock) / (saRock + c) + (b * saRock) / (
-            saRock + c * np.power(vs30 / vLin, self.N)
+        return np.where(
+            vs30 >= vLin,
+            0.0,
+            (-b * saRock) / (saRock + c)
+            + (b * saRock) / (saRock + c * np.power(vs30 / vLin, self.N)),
         )
 
     def calcValues(  # noqa: C901, N802, D102
@@ -481,7 +485,7 @@ class abrahamson_silva_kamai_2014:  # noqa: D101
 
         # Hanging Wall Model
         f4 = 0.0
-        if rJB < 30 and rX >= 0.0 and Mw > 5.5 and zTop <= 10.0:  # noqa: PLR2004
+        if Mw > 5.5 and zTop <= 10.0:  # noqa: PLR2004
             T1 = (90.0 - dip) / 45 if (dip > 30.0) else 1.33333333  # noqa: N806, PLR2004
             dM = Mw - 6.5  # noqa: N806
             T2 = (  # noqa: N806
@@ -493,14 +497,19 @@ class abrahamson_silva_kamai_2014:  # noqa: D101
             r1 = width * np.cos(dip * np.pi / 180.0)
             r2 = 3 * r1
             if r1 != 0:
-                if rX <= r1:
-                    rXr1 = rX / r1  # noqa: N806
-                    T3 = self.H1 + self.H2 * rXr1 + self.H3 * rXr1 * rXr1  # noqa: N806
-                elif rX <= r2:
-                    T3 = 1 - (rX - r1) / (r2 - r1)  # noqa: N806
+                rXr1 = rX / r1  # noqa: N806
+                T3 = np.where(  # noqa: N806
+                    rX <= r1,
+                    self.H1 + self.H2 * rXr1 + self.H3 * rXr1 * rXr1,
+                    np.where(rX <= r2, 1 - (rX - r1) / (r2 - r1), 0.0),
+                )
             T4 = 1 - (zTop * zTop) / 100.0  # noqa: N806
-            T5 = 1.0 if rJB == 0.0 else 1 - rJB / 30.0  # noqa: N806
-            f4 = self.a13 * T1 * T2 * T3 * T4 * T5
+            T5 = np.where(rJB == 0.0, 1.0, 1 - rJB / 30.0)  # noqa: N806
+            f4 = np.where(
+                (rJB < 30) & (rX >= 0.0),  # noqa: PLR2004
+                self.a13 * T1 * T2 * T3 * T4 * T5,
+                0.0,
+            )
         f6 = self.a15
         if zTop < 20.0:  # noqa: PLR2004
             f6 *= zTop / 20.0
@@ -517,35 +526,35 @@ class abrahamson_silva_kamai_2014:  # noqa: D101
         f10 = self.calcSoilTerm(vs30, z1p0)
 
         # Site Response Model
-        f5 = 0.0
         v1 = self.getV1()  # -- Equation 9
-        vs30s = min(v1, vs30)  # -- Equation 8
+        vs30s = np.minimum(v1, vs30)  # -- Equation 8
 
         # Site term -- Equation 7
-        saRock = 0.0  # calc Sa1180 (rock reference) if necessary  # noqa: N806
-        if vs30 < self.Vlin:
-            if v1 > self.VS_RK:
-                vs30s_rk = self.VS_RK
-            else:
-                vs30s_rk = v1
-            f5_rk = (self.a10 + self.b * self.N) * np.log(vs30s_rk / self.Vlin)
-            saRock = np.exp(f1 + f78 + f5_rk + f4 + f6)  # noqa: N806
-            f5 = (
-                self.a10 * np.log(vs30s / self.Vlin)
-                - self.b * np.log(saRock + self.c)
-                + self.b * np.log(saRock + self.c * pow(vs30s / self.Vlin, self.N))
-            )
+        # calc Sa1180 (rock reference) where necessary
+        nonlinear = vs30 < self.Vlin
+        if v1 > self.VS_RK:
+            vs30s_rk = self.VS_RK
         else:
-            f5 = (self.a10 + self.b * self.N) * np.log(vs30s / self.Vlin)
+            vs30s_rk = v1
+        f5_rk = (self.a10 + self.b * self.N) * np.log(vs30s_rk / self.Vlin)
+        saRock = np.where(nonlinear, np.exp(f1 + f78 + f5_rk + f4 + f6), 0.0)  # noqa: N806
+        f5 = np.where(
+            nonlinear,
+            self.a10 * np.log(vs30s / self.Vlin)
+            - self.b * np.log(saRock + self.c)
+            + self.b * np.log(saRock + self.c * np.power(vs30s / self.Vlin, self.N)),
+            (self.a10 + self.b * self.N) * np.log(vs30s / self.Vlin),
+        )
         # total model (no aftershock f11) -- Equation 1
         mean = f1 + f78 + f5 + f4 + f6 + f10
 
         # ****** Aleatory uncertainty model ******
         # Intra-event term -- Equation 24
-        if vsInferred:
-            phiAsq = self.getPhiA(Mw, self.s1e, self.s2e)  # noqa: N806
-        else:
-            phiAsq = self.getPhiA(Mw, self.s1m, self.s2m)  # noqa: N806
+        phiAsq = np.where(  # noqa: N806
+            vsInferred,
+            self.getPhiA(Mw, self.s1e, self.s2e),
+            self.getPhiA(Mw, self.s1m, self.s2m),
+        )
         phiAsq *= phiAsq  # noqa: N806
         # Inter-event term -- Equation 25
         tauB = self.getTauA(Mw, self.s3, self.s4)  # noqa: N806
@@ -572,7 +581,8 @@ class abrahamson_silva_kamai_2014:  # noqa: D101
             return 'NORMAL'
 
     def get_IM(self, Mw, site_rup_dict, site_info, im_info):  # noqa: N802, N803, D102
-        vsInf = bool(site_info['vsInferred'])  # noqa: N806
+        # site_info values are either scalars of a site or arrays over sites
+        vsInf = np.asarray(site_info['vsInferred'], dtype=bool)  # noqa: N806
         style = self.getFaultFromRake(site_rup_dict['aveRake'])
         if 'SA' in im_info['Type']:
             cur_T = im_info.get('Periods', None)  # noqa: N806
@@ -720,13 +730,13 @@ class boore_etal_2014:  # noqa: D101
         return np.exp(FePGA + FpPGA)
 
     def calcLnFlin(self, vs30):  # noqa: N802, D102
-        vsLin = min(vs30, self.Vc)  # noqa: N806
+        vsLin = np.minimum(vs30, self.Vc)  # noqa: N806
         lnFlin = self.c * np.log(vsLin / self.V_REF)  # noqa: N806
         return lnFlin  # noqa: RET504
 
     def calcF2(self, vs30):  # noqa: N802, D102
         f2 = self.f4 * (
-            np.exp(self.f5 * (min(vs30, 760.0) - 360.0))
+            np.exp(self.f5 * (np.minimum(vs30, 760.0) - 360.0))
             - np.exp(self.f5 * (760.0 - 360.0))
         )
         return f2  # noqa: RET504
@@ -734,18 +744,13 @@ class boore_etal_2014:  # noqa: D101
     def calcFdz1(self, vs30, z1p0):  # noqa: N802, D102
         DZ1 = self.calcDeltaZ1(z1p0, vs30)  # noqa: N806
         if self.imt != 'PGA' and self.imt != 'PGV' and self.imt >= 0.65:  # noqa: PLR1714, PLR2004
-            if (self.f7 / self.f6) >= DZ1:
-                Fdz1 = self.f6 * DZ1  # noqa: N806
-            else:
-                Fdz1 = self.f7  # noqa: N806
+            Fdz1 = np.where((self.f7 / self.f6) >= DZ1, self.f6 * DZ1, self.f7)  # noqa: N806
         else:
             Fdz1 = 0.0  # noqa: N806
         return Fdz1
 
     def calcDeltaZ1(self, z1p0, vs30):  # noqa: N802, D102
-        if np.isnan(z1p0):
-            return 0.0
-        return z1p0 - self.calcZ1ref(vs30)
+        return np.where(np.isnan(z1p0), 0.0, z1p0 - self.calcZ1ref(vs30))
 
     def calcZ1ref(self, vs30):  # noqa: N802, D102
         vsPow4 = np.power(vs30, 4)  # noqa: N806
@@ -769,19 +774,32 @@ class boore_etal_2014:  # noqa: D101
             phiM = self.phi1  # noqa: N806
         else:
             phiM = self.phi1 + (self.phi2 - self.phi1) * (Mw - 4.5)  # noqa: N806
-        phiMR = phiM  # noqa: N806
-        if rJB > self.R2:
-            phiMR += self.dPhiR  # noqa: N806
-        elif rJB > self.R1:
-            phiMR += self.dPhiR * (np.log(rJB / self.R1) / np.log(self.R2 / self.R1))  # noqa: N806
-        phiMRV = phiMR  # noqa: N806
-        if vs30 <= self.V1:
-            phiMRV -= self.dPhiV  # noqa: N806
-        elif vs30 < self.V2:
-            phiMRV -= self.dPhiV * (  # noqa: N806
-                np.log(self.V2 / vs30) / np.log(self.V2 / self.V1)
-            )
-        return phiMRV
+        # rJB is floored at R1 only to keep log() finite where it is unused
+        phiMR = np.where(  # noqa: N806
+            rJB > self.R2,
+            phiM + self.dPhiR,
+            np.where(
+                rJB > self.R1,
+                phiM
+                + self.dPhiR
+                * (
+                    np.log(np.maximum(rJB, self.R1) / self.R1)
+                    / np.log(self.R2 / self.R1)
+                ),
+                phiM,
+            ),
+        )
+        phiMRV = np.where(  # noqa: N806
+            vs30 <= self.V1,
+            phiMR - self.dPhiV,
+            np.where(
+                vs30 < self.V2,
+                phiMR
+                - self.dPhiV * (np.log(self.V2 / vs30) / np.log(self.V2 / self.V1)),
+                phiMR,
+            ),
+        )
+        return phiMRV  # noqa: RET504
 
     def calcTau(self, Mw):  # noqa: N802, N803, D102
         if Mw >= 5.5:  # noqa: PLR2004
@@ -811,7 +829,8 @@ class boore_etal_2014:  # noqa: D101
         return mean, stdDev, tau, phi
 
     def get_IM(self, Mw, site_rup_dict, site_info, im_info):  # noqa: N802, N803, D102
-        vsInf = bool(site_info['vsInferred'])  # noqa: N806, F841
+        # site_info values are either scalars of a site or arrays over sites
+        vsInf = np.asarray(site_info['vsInferred'], dtype=bool)  # noqa: N806, F841
         style = self.getFaultFromRake(site_rup_dict['aveRake'])
         if 'SA' in im_info['Type']:
             cur_T = im_info.get('Periods', None)  # noqa: N806
@@ -966,7 +985,7 @@ class campbell_bozorgnia_2014:  # noqa: D101
             if Mw <= 5.5:  # noqa: PLR2004
                 Fflt *= Mw - 4.5  # noqa: N806
         Fhw = 0.0  # noqa: N806
-        if rX >= 0.0 and Mw > 5.5 and zTop <= 16.66:  # noqa: PLR2004
+        if Mw > 5.5 and zTop <= 16.66:  # noqa: PLR2004
             r1 = width * np.cos(np.radians(dip))
             r2 = 62.0 * Mw - 350.0
             if r1 != 0:
@@ -976,34 +995,42 @@ class campbell_bozorgnia_2014:  # noqa: D101
             rXr2r1 = (rX - r1) / (r2 - r1)  # noqa: N806
             f1_rX = self.h1 + self.h2 * rXr1 + self.h3 * (rXr1 * rXr1)  # noqa: N806
             f2_rX = self.H4 + self.h5 * (rXr2r1) + self.h6 * rXr2r1 * rXr2r1  # noqa: N806
-            Fhw_rX = max(f2_rX, 0.0) if (rX >= r1) else f1_rX  # noqa: N806
-            Fhw_rRup = 1.0 if (rRup == 0.0) else (rRup - rJB) / rRup  # noqa: N806
+            Fhw_rX = np.where(rX >= r1, np.maximum(f2_rX, 0.0), f1_rX)  # noqa: N806
+            Fhw_rRup = np.where(  # noqa: N806
+                rRup == 0.0, 1.0, (rRup - rJB) / np.where(rRup == 0.0, 1.0, rRup)
+            )
             Fhw_m = 1.0 + self.a2 * (Mw - 6.5)  # noqa: N806
             if Mw <= 6.5:  # noqa: PLR2004
                 Fhw_m *= Mw - 5.5  # noqa: N806
             Fhw_z = 1.0 - 0.06 * zTop  # noqa: N806
             Fhw_d = (90.0 - dip) / 45.0  # noqa: N806
-            Fhw = self.c10 * Fhw_rX * Fhw_rRup * Fhw_m * Fhw_z * Fhw_d  # noqa: N806
+            Fhw = np.where(  # noqa: N806
+                rX >= 0.0, self.c10 * Fhw_rX * Fhw_rRup * Fhw_m * Fhw_z * Fhw_d, 0.0
+            )
         vsk1 = vs30 / self.k1
-        if vs30 <= self.k1:
-            Fsite = self.c11 * np.log(vsk1) + self.k2 * (  # noqa: N806
+        Fsite = np.where(  # noqa: N806
+            vs30 <= self.k1,
+            self.c11 * np.log(vsk1)
+            + self.k2
+            * (
                 np.log(pgaRock + self.C * np.power(vsk1, self.N))
                 - np.log(pgaRock + self.C)
-            )
-        else:
-            Fsite = (self.c11 + self.k2 * self.N) * np.log(vsk1)  # noqa: N806
-        if np.isnan(z2p5):
-            z2p5 = self.calcZ25ref(vs30)
-        Fsed = 0.0  # noqa: N806
-        if z2p5 <= 1.0:
-            Fsed = self.c14 * (z2p5 - 1.0)  # noqa: N806
-        elif z2p5 > 3.0:  # noqa: PLR2004
-            Fsed = (  # noqa: N806
+            ),
+            (self.c11 + self.k2 * self.N) * np.log(vsk1),
+        )
+        z2p5 = np.where(np.isnan(z2p5), self.calcZ25ref(vs30), z2p5)
+        Fsed = np.where(  # noqa: N806
+            z2p5 <= 1.0,
+            self.c14 * (z2p5 - 1.0),
+            np.where(
+                z2p5 > 3.0,  # noqa: PLR2004
                 self.c16
                 * self.k3
                 * np.exp(-0.75)
-                * (1.0 - np.exp(-0.25 * (z2p5 - 3.0)))
-            )
+                * (1.0 - np.exp(-0.25 * (z2p5 - 3.0))),
+                0.0,
+            ),
+        )
         if zHyp <= 7.0:  # noqa: PLR2004
             Fhyp = 0.0  # noqa: N806
         elif zHyp <= 20.0:  # noqa: PLR2004
@@ -1022,26 +1049,22 @@ class campbell_bozorgnia_2014:  # noqa: D101
             Fdip = self.c19 * (5.5 - Mw) * dip  # noqa: N806
         else:
             Fdip = self.c19 * dip  # noqa: N806
-        if rRup > 80.0:  # noqa: PLR2004
-            Fatn = self.c20 * (rRup - 80.0)  # noqa: N806
-        else:
-            Fatn = 0.0  # noqa: N806
+        Fatn = np.where(rRup > 80.0, self.c20 * (rRup - 80.0), 0.0)  # noqa: N806, PLR2004
         return Fmag + Fr + Fflt + Fhw + Fsite + Fsed + Fhyp + Fdip + Fatn
 
     def calcAlpha(self, vs30, pgaRock):  # noqa: N802, N803, D102
         vsk1 = vs30 / self.k1
-        if vs30 < self.k1:
-            alpha = (
-                self.k2
-                * pgaRock
-                * (
-                    1 / (pgaRock + self.C * pow(vsk1, self.N))
-                    - 1 / (pgaRock + self.C)
-                )
-            )
-        else:
-            alpha = 0.0
-        return alpha
+        alpha = np.where(
+            vs30 < self.k1,
+            self.k2
+            * pgaRock
+            * (
+                1 / (pgaRock + self.C * np.power(vsk1, self.N))
+                - 1 / (pgaRock + self.C)
+            ),
+            0.0,
+        )
+        return alpha  # noqa: RET504
 
     def stdMagDep(self, lo, hi, Mw):  # noqa: N802, N803, D102
         return hi + (lo - hi) * (5.5 - Mw)
@@ -1085,7 +1108,7 @@ class campbell_bozorgnia_2014:  # noqa: D101
         return tauSq  # noqa: RET504
 
     def calc(self, Mw, rJB, rRup, rX, dip, width, zTop, zHyp, vs30, z2p5, style):  # noqa: N803, D102
-        if vs30 < self.k1:
+        if np.any(vs30 < self.k1):
             imt_tmp = self.imt
             self.setIMT('PGA')
             pgaRock = np.exp(  # noqa: N806
@@ -1105,6 +1128,7 @@ class campbell_bozorgnia_2014:  # noqa: D101
                 )
             )
             self.setIMT(imt_tmp)
+            pgaRock = np.where(vs30 < self.k1, pgaRock, 0.0)  # noqa: N806
         else:
             pgaRock = 0.0  # noqa: N806
         mean = self.calcMean(
@@ -1116,7 +1140,7 @@ class campbell_bozorgnia_2014:  # noqa: D101
             pgaMean = self.calcMean(  # noqa: N806
                 Mw, rJB, rRup, rX, dip, width, zTop, zHyp, vs30, z2p5, style, pgaRock
             )
-            mean = max(mean, pgaMean)
+            mean = np.maximum(mean, pgaMean)
             self.setIMT(imt_tmp)
         alpha = self.calcAlpha(vs30, pgaRock)
         phiSq = self.calcPhiSq(Mw, alpha)  # noqa: N806
@@ -1125,7 +1149,8 @@ class campbell_bozorgnia_2014:  # noqa: D101
         return mean, stdDev, np.sqrt(tauSq), np.sqrt(phiSq)
 
     def get_IM(self, Mw, site_rup_dict, site_info, im_info):  # noqa: N802, N803, D102
-        vsInf = bool(site_info['vsInferred'])  # noqa: N806, F841
+        # site_info values are either scalars of a site or arrays over sites
+        vsInf = np.asarray(site_info['vsInferred'], dtype=bool)  # noqa: N806, F841
         style = self.getFaultFromRake(site_rup_dict['aveRake'])
         if 'SA' in im_info['Type']:
             cur_T = im_info.get('Periods', None)  # noqa: N806
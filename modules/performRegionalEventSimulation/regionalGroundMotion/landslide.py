@@ -1,6 +1,4 @@
 import numpy as np  # noqa: CPY001, D100, I001, INP001, RUF100
-import rasterio as rio
-from scipy.interpolate import interp2d
 import sys, warnings, shapely, pandas, os  # noqa: ICN001, E401
 from pyproj import Transformer
 from pyproj import CRS
@@ -9,71 +7,8 @@ import geopandas as gpd
 from scipy.spatial import ConvexHull
 import pandas as pd
 
-
-## Helper functions  # noqa: E266, RUF100
-def sampleRaster(  # noqa: N802
-    raster_file_path, raster_crs, x, y, interp_scheme='nearest', dtype=None
-):
-    """performs 2D interpolation at (x,y) pairs. Accepted interp_scheme = 'nearest', 'linear', 'cubic', and 'quintic'"""  # noqa: D400, D401, D403
-    print(f'Sampling from the Raster File: {os.path.basename(raster_file_path)}...')  # noqa: T201, PTH119
-    invalid_value = np.nan
-    xy_crs = CRS.from_user_input(4326)
-    raster_crs = CRS.from_user_input(raster_crs)
-    with rio.open(raster_file_path) as raster_file:
-        try:
-            raster_data = raster_file.read()
-            if raster_data.shape[0] > 1:
-                warnings.warn(  # noqa: B028
-                    f'More than one band in the file {raster_file_path}, the first band is used.'
-                )
-        except:  # noqa: E722
-            sys.exit(f'Can not read data from {raster_file_path}')
-        if xy_crs != raster_crs:
-            # make transformer for reprojection
-            transformer_xy_to_data = Transformer.from_crs(
-                xy_crs, raster_crs, always_xy=True
-            )
-            # reproject and store
-            x_proj, y_proj = transformer_xy_to_data.transform(x, y)
-            x = x_proj
-            y = y_proj
-        n_sample = len(x)
-        if interp_scheme == 'nearest':
-            sample = np.array(
-                [val[0] for val in raster_file.sample(list(zip(x, y)))]
-            )
-        else:
-            # create x and y ticks for grid
-            x_tick = np.linspace(
-                raster_file.bounds.left,
-                raster_file.bounds.right,
-                raster_file.width,
-                endpoint=False,
-            )
-            y_tick = np.linspace(
-                raster_file.bounds.bottom,
-                raster_file.bounds.top,
-                raster_file.height,
-                endpoint=False,
-            )
-            # create interp2d function
-            interp_function = interp2d(
-                x_tick,
-                y_tick,
-                np.flipud(raster_file.read(1)),
-                kind=interp_scheme,
-                fill_value=invalid_value,
-            )
-            # get samples
-            sample = np.transpose(
-                [interp_function(x[i], y[i]) for i in range(n_sample)]
-            )[0]
-    # convert to target datatype
-    if dtype is not None:
-        sample = sample.astype(dtype)
-    # clean up invalid values (returned as 1e38 by NumPy)
-    sample[abs(sample) > 1e10] = invalid_value  # noqa: PLR2004
-    return sample  # noqa: DOC201, RUF100
+# rasters are sampled through the tile cache shared with the liquefaction models
+from liquefaction import evaluate_realizations, sampleRaster  # noqa: F401
 
 
 ## Helper functions  # noqa: E266, RUF100
@@ -256,7 +191,7 @@ def norm2_cdf_2d(x, loc, scale):
 
 def nb_round(x, decimals):  # noqa: D103
     out = np.empty_like(x)
-    return np.round_(x, decimals, out)  # noqa: NPY003, NPY201
+    return np.round(x, decimals, out)
 
 
 def erfinv_coeff(order=20):  # noqa: D103
@@ -494,32 +429,13 @@ class BrayMacedo2019(Landslide):
         im_list,
         output_keys=['lsd_PGD_h'],  # noqa: B006
         additional_output_keys=[],  # noqa: B006, ARG002
+        num_processes=1,
     ):
         if 'PGA' in im_list:
-            num_stations = len(self.stations)
-            num_scenarios = len(eq_data)
-            PGA_col_id = [i for i, x in enumerate(im_list) if x == 'PGA'][0]  # noqa: N806, RUF015
-            for scenario_id in range(num_scenarios):
-                num_rlzs = ln_im_data[scenario_id].shape[2]
-                im_data_scen = np.zeros(
-                    [num_stations, len(im_list) + len(output_keys), num_rlzs]
-                )
-                im_data_scen[:, 0 : len(im_list), :] = ln_im_data[scenario_id]
-                for rlz_id in range(num_rlzs):
-                    pga = np.exp(ln_im_data[scenario_id][:, PGA_col_id, rlz_id])
-                    mag = float(eq_data[scenario_id][0])
-                    model_output = self.model(
-                        pga,
-                        mag,
-                        self.slope,
-                        self.t_slope,
-                        self.gamma_soil,
-                        self.phi_soil,
-                        self.coh_soil,
-                    )
-                    for i, key in enumerate(output_keys):
-                        im_data_scen[:, len(im_list) + i, rlz_id] = model_output[key]
-                ln_im_data[scenario_id] = im_data_scen
+            self.pga_col_id = im_list.index('PGA')
+            ln_im_data = evaluate_realizations(
+                self, ln_im_data, eq_data, im_list, output_keys, num_processes
+            )
             im_list = im_list + output_keys  # noqa: PLR6104, RUF100
         else:
             sys.exit(
@@ -535,6 +451,18 @@ class BrayMacedo2019(Landslide):
             im_list,
         )
 
+    def evaluate(self, ln_im, mag):  # noqa: D102
+        pga = np.exp(ln_im[:, self.pga_col_id])
+        return self.model(
+            pga,
+            mag,
+            self.slope,
+            self.t_slope,
+            self.gamma_soil,
+            self.phi_soil,
+            self.coh_soil,
+        )
+
     def model(  # noqa: PLR6301, RUF100
         self,
         pga,
@@ -550,14 +478,7 @@ class BrayMacedo2019(Landslide):
 
         # get dimensions
         ndim = pga.ndim
-        if ndim == 1:
-            n_site = len(pga)
-            n_sample = 1
-            shape = n_site
-        else:
-            shape = pga.shape
-            n_site = shape[0]
-            n_sample = shape[1]
+        shape = pga.shape
 
         # initialize
         pgdef = np.zeros(shape)
@@ -579,6 +500,8 @@ class BrayMacedo2019(Landslide):
             * (1 + np.tan(phi_soil_rad) * np.tan(slope_rad))
         )
         ky = np.maximum(ky, 0.01)  # to avoid ky = 0
+        # broadcast over the realizations (columns) of pga
+        ky = ky.reshape((-1,) + (1,) * (ndim - 1))
 
         # aleatory
         sigma_val = 0.72
@@ -619,19 +542,11 @@ class BrayMacedo2019(Landslide):
         # apply non-zero displacement correction/condition, eq 11
         nonzero_median_cdf = 1 - 0.5 / (1 - prob_d_eq_0)
 
-        # loop through numper of samples
-        if ndim == 1:
-            nonzero_ln_pgdef[nonzero_median_cdf > 0] = ln_pgdef_trunc[
-                nonzero_median_cdf > 0
-            ] + sigma_val * norm2_ppf(
-                nonzero_median_cdf[nonzero_median_cdf > 0], 0.0, 1.0
-            )
-        else:
-            for i in range(n_sample):
-                cond = nonzero_median_cdf[:, i] > 0
-                nonzero_ln_pgdef[cond, i] = ln_pgdef_trunc[
-                    cond, i
-                ] + sigma_val * norm2_ppf(nonzero_median_cdf[cond, i], 0.0, 1.0)
+        # all samples at once
+        cond = nonzero_median_cdf > 0
+        nonzero_ln_pgdef[cond] = ln_pgdef_trunc[cond] + sigma_val * norm2_ppf(
+            nonzero_median_cdf[cond], 0.0, 1.0
+        )
 
         # rest of actions
         pgdef = np.exp(nonzero_ln_pgdef) / 100  # also convert from cm to m
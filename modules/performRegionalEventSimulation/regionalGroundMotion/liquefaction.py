@@ -1,6 +1,8 @@
-import os  # noqa: INP001, D100
+import functools  # noqa: INP001, D100
+import os
 import sys
 import warnings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from enum import Enum
 from itertools import starmap
 
@@ -10,9 +12,54 @@ import pandas  # noqa: ICN001
 import rasterio as rio
 import shapely
 from pyproj import CRS, Transformer
-from scipy.interpolate import interp2d
+from rasterio.transform import rowcol
+from rasterio.windows import Window
+from scipy.interpolate import RegularGridInterpolator
 from scipy.spatial import ConvexHull
 
+# Rasters are read in square tiles of RASTER_TILE_SIZE pixels, and the last
+# RASTER_TILE_CACHE_SIZE tiles read are kept in memory
+RASTER_TILE_SIZE = 512
+RASTER_TILE_CACHE_SIZE = 64
+
+
+@functools.lru_cache(maxsize=RASTER_TILE_CACHE_SIZE)
+def _read_raster_tile(raster_file_path, tile_row, tile_col):
+    with rio.open(raster_file_path) as raster_file:
+        row_off = tile_row * RASTER_TILE_SIZE
+        col_off = tile_col * RASTER_TILE_SIZE
+        window = Window(
+            col_off,
+            row_off,
+            min(RASTER_TILE_SIZE, raster_file.width - col_off),
+            min(RASTER_TILE_SIZE, raster_file.height - row_off),
+        )
+        tile = raster_file.read(1, window=window)
+    tile.setflags(write=False)
+    return tile
+
+
+def _read_raster_window(raster_file_path, row_start, row_stop, col_start, col_stop):
+    # rows [row_start, row_stop) and columns [col_start, col_stop) of the
+    # first band, assembled from the cached tiles
+    tile_rows = range(row_start // RASTER_TILE_SIZE, (row_stop - 1) // RASTER_TILE_SIZE + 1)
+    tile_cols = range(col_start // RASTER_TILE_SIZE, (col_stop - 1) // RASTER_TILE_SIZE + 1)
+    window = np.block(
+        [
+            [
+                _read_raster_tile(raster_file_path, tile_row, tile_col)
+                for tile_col in tile_cols
+            ]
+            for tile_row in tile_rows
+        ]
+    )
+    row_off = tile_rows[0] * RASTER_TILE_SIZE
+    col_off = tile_cols[0] * RASTER_TILE_SIZE
+    return window[
+        row_start - row_off : row_stop - row_off,
+        col_start - col_off : col_stop - col_off,
+    ]
+
 
 # Helper functions
 def sampleRaster(  # noqa: N802
@@ -23,20 +70,26 @@ def sampleRaster(  # noqa: N802
     interp_scheme='nearest',
     dtype=None,
 ):
-    """Performs 2D interpolation at (x,y) pairs. Accepted interp_scheme = 'nearest', 'linear', 'cubic', and 'quintic'"""  # noqa: D400, D401
+    """Performs 2D interpolation at (x,y) pairs. Accepted interp_scheme = 'nearest', 'linear', 'cubic', and 'quintic'
+
+    Only the tiles of the raster around the sites are read, and the tiles
+    are cached so the rasters shared by several parameters or models are
+    read once.
+    """  # noqa: D400, D401
     print(f'Sampling from the Raster File: {os.path.basename(raster_file_path)}...')  # noqa: T201, PTH119
     invalid_value = np.nan
     xy_crs = CRS.from_user_input(4326)
     raster_crs = CRS.from_user_input(raster_crs)
-    with rio.open(raster_file_path) as raster_file:
-        try:
-            raster_data = raster_file.read()
-            if raster_data.shape[0] > 1:
-                warnings.warn(  # noqa: B028
-                    f'More than one band in the file {raster_file_path}, the first band is used.'
-                )
-        except:  # noqa: E722
-            sys.exit(f'Can not read data from {raster_file_path}')
+    raster_file_path = os.path.abspath(raster_file_path)  # noqa: PTH100
+    try:
+        raster_file = rio.open(raster_file_path)
+    except:  # noqa: E722
+        sys.exit(f'Can not read data from {raster_file_path}')
+    with raster_file:
+        if raster_file.count > 1:
+            warnings.warn(  # noqa: B028
+                f'More than one band in the file {raster_file_path}, the first band is used.'
+            )
         if xy_crs != raster_crs:
             # make transformer for reprojection
             transformer_xy_to_data = Transformer.from_crs(
@@ -46,37 +99,60 @@ def sampleRaster(  # noqa: N802
             x_proj, y_proj = transformer_xy_to_data.transform(x, y)
             x = x_proj
             y = y_proj
-        n_sample = len(x)
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        height = raster_file.height
+        width = raster_file.width
         if interp_scheme == 'nearest':
-            sample = np.array(
-                [val[0] for val in raster_file.sample(list(zip(x, y)))]
+            # pixels containing the sites, read tile by tile
+            rows, cols = (
+                np.asarray(a, dtype=int) for a in rowcol(raster_file.transform, x, y)
             )
+            inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+            fill = raster_file.nodata if raster_file.nodata is not None else 0
+            sample = np.full(len(x), fill, dtype=raster_file.dtypes[0])
+            tile_ids = (rows // RASTER_TILE_SIZE) * (
+                (width - 1) // RASTER_TILE_SIZE + 1
+            ) + cols // RASTER_TILE_SIZE
+            for tile_id in np.unique(tile_ids[inside]):
+                in_tile = np.where(inside & (tile_ids == tile_id))[0]
+                tile_row = rows[in_tile[0]] // RASTER_TILE_SIZE
+                tile_col = cols[in_tile[0]] // RASTER_TILE_SIZE
+                tile = _read_raster_tile(raster_file_path, tile_row, tile_col)
+                sample[in_tile] = tile[
+                    rows[in_tile] - tile_row * RASTER_TILE_SIZE,
+                    cols[in_tile] - tile_col * RASTER_TILE_SIZE,
+                ]
         else:
-            # create x and y ticks for grid
-            x_tick = np.linspace(
-                raster_file.bounds.left,
-                raster_file.bounds.right,
-                raster_file.width,
-                endpoint=False,
+            # x and y ticks of the grid (left and bottom edges of the pixels)
+            x_res = (raster_file.bounds.right - raster_file.bounds.left) / width
+            y_res = (raster_file.bounds.top - raster_file.bounds.bottom) / height
+            # window around the sites, with a margin for the (spline)
+            # interpolation to be insensitive to the values outside
+            margin = 16
+            cols = np.floor((x - raster_file.bounds.left) / x_res)
+            rows = np.floor((raster_file.bounds.top - y) / y_res)
+            col_start = int(np.clip(cols.min() - margin, 0, width - 1))
+            col_stop = int(np.clip(cols.max() + margin + 1, col_start + 1, width))
+            row_start = int(np.clip(rows.min() - margin, 0, height - 1))
+            row_stop = int(np.clip(rows.max() + margin + 1, row_start + 1, height))
+            x_tick = raster_file.bounds.left + x_res * np.arange(col_start, col_stop)
+            y_tick = raster_file.bounds.bottom + y_res * (
+                height - np.arange(row_stop, row_start, -1)
             )
-            y_tick = np.linspace(
-                raster_file.bounds.bottom,
-                raster_file.bounds.top,
-                raster_file.height,
-                endpoint=False,
-            )
-            # create interp2d function
-            interp_function = interp2d(
-                x_tick,
-                y_tick,
-                np.flipud(raster_file.read(1)),
-                kind=interp_scheme,
+            interp_function = RegularGridInterpolator(
+                (y_tick, x_tick),
+                np.flipud(
+                    _read_raster_window(
+                        raster_file_path, row_start, row_stop, col_start, col_stop
+                    )
+                ).astype(float),
+                method=interp_scheme,
+                bounds_error=False,
                 fill_value=invalid_value,
             )
             # get samples
-            sample = np.transpose(
-                [interp_function(x[i], y[i]) for i in range(n_sample)]
-            )[0]
+            sample = interp_function(np.column_stack([y, x]))
     # convert to target datatype
     if dtype is not None:
         sample = sample.astype(dtype)
@@ -168,6 +244,113 @@ def sampleVector(vector_file_path, vector_crs, x, y, dtype=None):  # noqa: ARG00
     return gdf_sites  # noqa: DOC201, RUF100
 
 
+# Ground failure model of a worker process of evaluate_realizations
+_worker_model = None
+
+
+def _init_model_worker(model):
+    global _worker_model  # noqa: PLW0603
+    _worker_model = model
+
+
+def _evaluate_in_worker(ln_im, mag):
+    return _worker_model.evaluate(ln_im, mag)
+
+
+def evaluate_realizations(
+    model,
+    ln_im_data,
+    eq_data,
+    im_list,
+    output_keys,
+    num_processes=1,
+    rlz_block_size=256,
+):
+    """Append the outputs of a ground failure model to the IM realizations.
+
+    The model is evaluated on blocks of realizations of each scenario at
+    once by `model.evaluate(ln_im, mag)`, where `ln_im` holds the log IMs
+    of `im_list` of the block, shape (sites, IMs, realizations), and the
+    outputs by key have the shape (sites, realizations). With
+    `num_processes` > 1 the blocks are evaluated in worker processes.
+
+    Parameters
+    ----------
+    model : object
+        Ground failure model with an `evaluate` method.
+    ln_im_data : list
+        Log IM realizations of each scenario, shape (sites, IMs,
+        realizations). Each array is replaced by one with the outputs
+        appended as new IM columns.
+    eq_data : list
+        Magnitude (first column) and other data of each scenario.
+    im_list : list
+        Names of the IM columns.
+    output_keys : list
+        Outputs of the model to append, in order.
+    num_processes : int, optional
+        Number of worker processes, by default 1 (no workers).
+    rlz_block_size : int, optional
+        Number of realizations evaluated at once, by default 256.
+
+    Returns
+    -------
+    list
+        `ln_im_data` with the outputs appended.
+
+    """
+    num_im = len(im_list)
+    blocks = []
+    for scenario_id in range(len(eq_data)):
+        num_stations, _, num_rlzs = ln_im_data[scenario_id].shape
+        im_data_scen = np.zeros([num_stations, num_im + len(output_keys), num_rlzs])
+        im_data_scen[:, 0:num_im, :] = ln_im_data[scenario_id]
+        ln_im_data[scenario_id] = im_data_scen
+        blocks += [
+            (scenario_id, rlz_start, min(rlz_start + rlz_block_size, num_rlzs))
+            for rlz_start in range(0, num_rlzs, rlz_block_size)
+        ]
+
+    def block_input(block):
+        scenario_id, rlz_start, rlz_stop = block
+        return (
+            ln_im_data[scenario_id][:, 0:num_im, rlz_start:rlz_stop],
+            float(eq_data[scenario_id][0]),
+        )
+
+    def write_block(block, model_output):
+        scenario_id, rlz_start, rlz_stop = block
+        for i, key in enumerate(output_keys):
+            ln_im_data[scenario_id][:, num_im + i, rlz_start:rlz_stop] = (
+                model_output[key]
+            )
+
+    if num_processes <= 1 or len(blocks) <= 1:
+        for block in blocks:
+            write_block(block, model.evaluate(*block_input(block)))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=num_processes,
+            initializer=_init_model_worker,
+            initargs=(model,),
+        ) as executor:
+            # keep a bounded number of blocks in flight
+            pending = iter(blocks)
+            running = dict()  # noqa: C408
+            for block in pending:
+                running[executor.submit(_evaluate_in_worker, *block_input(block))] = (
+                    block
+                )
+                if len(running) < 2 * num_processes:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write_block(running.pop(future), future.result())
+            for future in list(running):
+                write_block(running.pop(future), future.result())
+    return ln_im_data
+
+
 def find_additional_output_req(liq_info, current_step):  # noqa: D103
     additional_output_keys = []
     if current_step == 'Triggering':
@@ -331,26 +514,21 @@ class ZhuEtal2017(Liquefaction):
         self.vs30 = np.array([site['vs30'] for site in self.stations])
         print('Sampling finished')  # noqa: T201
 
-    def run(self, ln_im_data, eq_data, im_list, output_keys, additional_output_keys):  # noqa: D102
+    def run(  # noqa: D102
+        self,
+        ln_im_data,
+        eq_data,
+        im_list,
+        output_keys,
+        additional_output_keys,
+        num_processes=1,
+    ):
         if ('PGA' in im_list) and ('PGV' in im_list):
-            num_stations = len(self.stations)
-            num_scenarios = len(eq_data)
-            PGV_col_id = [i for i, x in enumerate(im_list) if x == 'PGV'][0]  # noqa: N806, RUF015
-            PGA_col_id = [i for i, x in enumerate(im_list) if x == 'PGA'][0]  # noqa: N806, RUF015
-            for scenario_id in range(num_scenarios):
-                num_rlzs = ln_im_data[scenario_id].shape[2]
-                im_data_scen = np.zeros(
-                    [num_stations, len(im_list) + len(output_keys), num_rlzs]
-                )
-                im_data_scen[:, 0 : len(im_list), :] = ln_im_data[scenario_id]
-                for rlz_id in range(num_rlzs):
-                    pgv = np.exp(ln_im_data[scenario_id][:, PGV_col_id, rlz_id])
-                    pga = np.exp(ln_im_data[scenario_id][:, PGA_col_id, rlz_id])
-                    mag = float(eq_data[scenario_id][0])
-                    model_output = self.model(pgv, pga, mag)
-                    for i, key in enumerate(output_keys):
-                        im_data_scen[:, len(im_list) + i, rlz_id] = model_output[key]
-                ln_im_data[scenario_id] = im_data_scen
+            self.pgv_col_id = im_list.index('PGV')
+            self.pga_col_id = im_list.index('PGA')
+            ln_im_data = evaluate_realizations(
+                self, ln_im_data, eq_data, im_list, output_keys, num_processes
+            )
             im_list = im_list + output_keys
             additional_output = dict()  # noqa: C408
             for key in additional_output_keys:
@@ -371,6 +549,11 @@ class ZhuEtal2017(Liquefaction):
             # sys.exit(-1)
         return ln_im_data, eq_data, im_list, additional_output
 
+    def evaluate(self, ln_im, mag):  # noqa: D102
+        pgv = np.exp(ln_im[:, self.pgv_col_id])
+        pga = np.exp(ln_im[:, self.pga_col_id])
+        return self.model(pgv, pga, mag)
+
     def model(self, pgv, pga, mag):
         """Model"""  # noqa: D400
         # zero prob_liq
@@ -379,11 +562,13 @@ class ZhuEtal2017(Liquefaction):
         # distance cutoff for model
         model_transition = 20  # km
 
+        # site terms are broadcast over the realizations (columns) of pgv
+        site_shape = (-1,) + (1,) * (pgv.ndim - 1)
+
         # initialize arrays
-        x_logistic = np.empty(pgv.shape)
         prob_liq = np.empty(pgv.shape)
-        liq_susc_val = np.ones(pgv.shape) * -99
-        liq_susc = np.empty(pgv.shape, dtype=int)
+        liq_susc_val = np.ones(self.vs30.shape) * -99
+        liq_susc = np.empty(self.vs30.shape, dtype=int)
 
         # magnitude correction, from Baise & Rashidian (2020) and Allstadt et al. (2022)
         pgv_mag = pgv / (1 + np.exp(-2 * (mag - 6)))
@@ -423,13 +608,9 @@ class ZhuEtal2017(Liquefaction):
         # catch nan values
         liq_susc_val[np.isnan(liq_susc_val)] = -99.0
         # x-term for logistic model = liq susc val + pgv term
-        x_logistic[ind_global] = liq_susc_val[ind_global] + 0.334 * np.log(
-            pgv_mag[ind_global]
-        )
-        # x-term for logistic model = liq susc val + pgv term
-        x_logistic[ind_coastal] = liq_susc_val[ind_coastal] + 0.301 * np.log(
-            pgv_mag[ind_coastal]
-        )
+        x_logistic = liq_susc_val.reshape(site_shape) + np.where(
+            ind_coastal.reshape(site_shape), 0.301, 0.334
+        ) * np.log(pgv_mag)
 
         # probability of liquefaction
         prob_liq = 1 / (1 + np.exp(-x_logistic))  # decimal
@@ -456,6 +637,7 @@ class ZhuEtal2017(Liquefaction):
         liq_susc[liq_susc_val <= -38.1] = liq_susc_enum['none'].value  # noqa: PLR2004
 
         # liq_susc[prob_liq==zero_prob_liq] = 'none'
+        liq_susc = np.broadcast_to(liq_susc.reshape(site_shape), pgv.shape)
 
         return {'liq_prob': prob_liq, 'liq_susc': liq_susc}  # noqa: DOC201, RUF100
 
@@ -550,24 +732,20 @@ class Hazus2020(Liquefaction):
         # self.liq_susc = liq_susc.to_numpy()
         print('Initiation finished')  # noqa: T201
 
-    def run(self, ln_im_data, eq_data, im_list, output_keys, additional_output_keys):  # noqa: D102
+    def run(  # noqa: D102
+        self,
+        ln_im_data,
+        eq_data,
+        im_list,
+        output_keys,
+        additional_output_keys,
+        num_processes=1,
+    ):
         if 'PGA' in im_list:
-            num_stations = len(self.stations)
-            num_scenarios = len(eq_data)
-            PGA_col_id = [i for i, x in enumerate(im_list) if x == 'PGA'][0]  # noqa: N806, RUF015
-            for scenario_id in range(num_scenarios):
-                num_rlzs = ln_im_data[scenario_id].shape[2]
-                im_data_scen = np.zeros(
-                    [num_stations, len(im_list) + len(output_keys), num_rlzs]
-                )
-                im_data_scen[:, 0 : len(im_list), :] = ln_im_data[scenario_id]
-                for rlz_id in range(num_rlzs):
-                    pga = np.exp(ln_im_data[scenario_id][:, PGA_col_id, rlz_id])
-                    mag = float(eq_data[scenario_id][0])
-                    model_output = self.model(pga, mag, self.gw_depth, self.liq_susc)
-                    for i, key in enumerate(output_keys):
-                        im_data_scen[:, len(im_list) + i, rlz_id] = model_output[key]
-                ln_im_data[scenario_id] = im_data_scen
+            self.pga_col_id = im_list.index('PGA')
+            ln_im_data = evaluate_realizations(
+                self, ln_im_data, eq_data, im_list, output_keys, num_processes
+            )
             im_list = im_list + output_keys
             additional_output = dict()  # noqa: C408
             for key in additional_output_keys:
@@ -584,6 +762,10 @@ class Hazus2020(Liquefaction):
             )
         return ln_im_data, eq_data, im_list, additional_output
 
+    def evaluate(self, ln_im, mag):  # noqa: D102
+        pga = np.exp(ln_im[:, self.pga_col_id])
+        return self.model(pga, mag, self.gw_depth, self.liq_susc)
+
     @staticmethod
     # @njit
     def model(
@@ -597,6 +779,9 @@ class Hazus2020(Liquefaction):
         # zero prob_liq
         zero_prob_liq = 1e-5  # decimal
 
+        # site terms are broadcast over the realizations (columns) of pga
+        site_shape = (-1,) + (1,) * (pga.ndim - 1)
+
         # initialize arrays
         prob_liq_pga = np.zeros(pga.shape)
         p_ml = np.zeros(pga.shape)
@@ -607,7 +792,7 @@ class Hazus2020(Liquefaction):
         # correction factor for moment magnitudes other than M=7.5, eq. 4-21
         k_mag = 0.0027 * mag**3 - 0.0267 * mag**2 - 0.2055 * mag + 2.9188
         # correction for groudnwater depths other than 5 feet, eq. 4-22
-        k_gw_depth = 0.022 * gw_depth * 3.28 + 0.93
+        k_gw_depth = (0.022 * gw_depth * 3.28 + 0.93).reshape(site_shape)
 
         # get uncorrected p_liq given pga
         prob_liq_pga[liq_susc == liq_susc_enum['very_high'].value] = np.maximum(
@@ -659,6 +844,7 @@ class Hazus2020(Liquefaction):
         # magnitude correction, from Baise & Rashidian (2020) and Allstadt et al. (2022)
         pga_mag = pga / (10**2.24 / mag**2.56)
         prob_liq[pga_mag < 0.1] = zero_prob_liq  # noqa: PLR2004
+        liq_susc = np.broadcast_to(liq_susc.reshape(site_shape), pga.shape)
 
         return {'liq_prob': prob_liq, 'liq_susc': liq_susc}  # noqa: DOC201, RUF100
 
@@ -714,10 +900,13 @@ class Hazus2020_with_ZhuEtal2017(ZhuEtal2017):
         # distance cutoff for model
         model_transition = 20  # km
 
+        # site terms are broadcast over the realizations (columns) of pga
+        site_shape = (-1,) + (1,) * (pga.ndim - 1)
+
         # initialize arrays
         prob_liq = np.empty(pgv.shape)
-        liq_susc_val = np.ones(pgv.shape) * -99
-        liq_susc = np.empty(pgv.shape, dtype=int)
+        liq_susc_val = np.ones(self.vs30.shape) * -99
+        liq_susc = np.empty(self.vs30.shape, dtype=int)
 
         # find where dist_water <= cutoff for model of 20 km
         # coastal model
@@ -769,7 +958,7 @@ class Hazus2020_with_ZhuEtal2017(ZhuEtal2017):
         # correction factor for moment magnitudes other than M=7.5, eq. 4-21
         k_mag = 0.0027 * mag**3 - 0.0267 * mag**2 - 0.2055 * mag + 2.9188
         # correction for groudnwater depths other than 5 feet, eq. 4-22
-        k_gw_depth = 0.022 * self.gw_depth * 3.28 + 0.93
+        k_gw_depth = (0.022 * self.gw_depth * 3.28 + 0.93).reshape(site_shape)
         # get uncorrected p_liq given pga
         prob_liq_pga[liq_susc == liq_susc_enum['very_high'].value] = np.maximum(
             np.minimum(
@@ -822,6 +1011,7 @@ class Hazus2020_with_ZhuEtal2017(ZhuEtal2017):
         prob_liq[self.vs30 > 620] = zero_prob_liq  # noqa: PLR2004
         # for precip > 1700 mm, set prob to "0"
         prob_liq[self.precip > 1700] = zero_prob_liq  # noqa: PLR2004
+        liq_susc = np.broadcast_to(liq_susc.reshape(site_shape), pga.shape)
 
         return {'liq_prob': prob_liq, 'liq_susc': liq_susc}  # noqa: DOC201, RUF100
 
@@ -886,39 +1076,19 @@ class Hazus2020Lateral(LateralSpread):
         else:
             self.dist_to_water = np.zeros(len(self.stations))
 
-    def run(self, ln_im_data, eq_data, im_list):  # noqa: D102
+    def run(self, ln_im_data, eq_data, im_list, num_processes=1):  # noqa: D102
         output_keys = ['liq_PGD_h']
         if (
             ('PGA' in im_list)
             and ('liq_prob' in im_list)
             and ('liq_susc' in im_list)
         ):
-            num_stations = len(self.stations)
-            num_scenarios = len(eq_data)
-            PGA_col_id = [i for i, x in enumerate(im_list) if x == 'PGA'][0]  # noqa: N806, RUF015
-            liq_prob_col_id = [i for i, x in enumerate(im_list) if x == 'liq_prob'][  # noqa: RUF015
-                0
-            ]
-            liq_susc_col_id = [i for i, x in enumerate(im_list) if x == 'liq_susc'][  # noqa: RUF015
-                0
-            ]
-            for scenario_id in range(num_scenarios):
-                num_rlzs = ln_im_data[scenario_id].shape[2]
-                im_data_scen = np.zeros(
-                    [num_stations, len(im_list) + len(output_keys), num_rlzs]
-                )
-                im_data_scen[:, 0 : len(im_list), :] = ln_im_data[scenario_id]
-                for rlz_id in range(num_rlzs):
-                    liq_prob = ln_im_data[scenario_id][:, liq_prob_col_id, rlz_id]
-                    liq_susc = ln_im_data[scenario_id][:, liq_susc_col_id, rlz_id]
-                    pga = np.exp(ln_im_data[scenario_id][:, PGA_col_id, rlz_id])
-                    mag = float(eq_data[scenario_id][0])
-                    model_output = self.model(
-                        pga, mag, liq_prob, self.dist_to_water, liq_susc
-                    )
-                    for i, key in enumerate(output_keys):
-                        im_data_scen[:, len(im_list) + i, rlz_id] = model_output[key]
-                ln_im_data[scenario_id] = im_data_scen
+            self.pga_col_id = im_list.index('PGA')
+            self.liq_prob_col_id = im_list.index('liq_prob')
+            self.liq_susc_col_id = im_list.index('liq_susc')
+            ln_im_data = evaluate_realizations(
+                self, ln_im_data, eq_data, im_list, output_keys, num_processes
+            )
             im_list = im_list + output_keys
         else:
             sys.exit(
@@ -926,6 +1096,12 @@ class Hazus2020Lateral(LateralSpread):
             )
         return ln_im_data, eq_data, im_list
 
+    def evaluate(self, ln_im, mag):  # noqa: D102
+        liq_prob = ln_im[:, self.liq_prob_col_id]
+        liq_susc = ln_im[:, self.liq_susc_col_id]
+        pga = np.exp(ln_im[:, self.pga_col_id])
+        return self.model(pga, mag, liq_prob, self.dist_to_water, liq_susc)
+
     @staticmethod
     # @njit
     def model(
@@ -1064,30 +1240,19 @@ class Hazus2020Vertical(GroundSettlement):
         # return
         return output  # noqa: DOC201, RUF100
 
-    def run(self, ln_im_data, eq_data, im_list):  # noqa: D102
+    def evaluate(self, ln_im, mag):  # noqa: ARG002, D102
+        liq_prob = ln_im[:, self.liq_prob_col_id]
+        liq_susc = ln_im[:, self.liq_susc_col_id]
+        return self.model(liq_prob, liq_susc)
+
+    def run(self, ln_im_data, eq_data, im_list, num_processes=1):  # noqa: D102
         output_keys = ['liq_PGD_v']
         if ('liq_susc' in im_list) and ('liq_prob' in im_list):
-            num_stations = ln_im_data[0].shape[0]
-            num_scenarios = len(eq_data)
-            liq_prob_col_id = [i for i, x in enumerate(im_list) if x == 'liq_prob'][  # noqa: RUF015
-                0
-            ]
-            liq_susc_col_id = [i for i, x in enumerate(im_list) if x == 'liq_susc'][  # noqa: RUF015
-                0
-            ]
-            for scenario_id in range(num_scenarios):
-                num_rlzs = ln_im_data[scenario_id].shape[2]
-                im_data_scen = np.zeros(
-                    [num_stations, len(im_list) + len(output_keys), num_rlzs]
-                )
-                im_data_scen[:, 0 : len(im_list), :] = ln_im_data[scenario_id]
-                for rlz_id in range(num_rlzs):
-                    liq_prob = ln_im_data[scenario_id][:, liq_prob_col_id, rlz_id]
-                    liq_susc = ln_im_data[scenario_id][:, liq_susc_col_id, rlz_id]
-                    model_output = self.model(liq_prob, liq_susc)
-                    for i, key in enumerate(output_keys):
-                        im_data_scen[:, len(im_list) + i, rlz_id] = model_output[key]
-                ln_im_data[scenario_id] = im_data_scen
+            self.liq_prob_col_id = im_list.index('liq_prob')
+            self.liq_susc_col_id = im_list.index('liq_susc')
+            ln_im_data = evaluate_realizations(
+                self, ln_im_data, eq_data, im_list, output_keys, num_processes
+            )
             im_list = im_list + output_keys
         else:
             sys.exit(
@@ -84,6 +84,9 @@ def find_neighbors(  # noqa: C901, D103
     event_dir = event_grid_path.parent
     event_grid_file = event_grid_path.name
 
+    # labels used to pre-select grid points for each asset
+    grid_extra_keys = []
+
     # Check if the file is a CSV or a GIS file
     file_extension = Path(event_grid_file).suffix.lower()
 
@@ -140,238 +143,169 @@ def find_neighbors(  # noqa: C901, D103
     with open(asset_file, encoding='utf-8') as f:  # noqa: PTH123
         asset_dict = json.load(f)
 
-    # prepare a dataframe that holds asset filenames and locations
-    aim_df = pd.DataFrame(
-        columns=['Latitude', 'Longitude', 'file'], index=np.arange(len(asset_dict))
-    )
-
-    count = 0
+    # load the AIM of every asset handled by this process once and keep it in
+    # memory until the selected events are written back to the file
+    asset_files = []
+    asset_data_list = []
+    bldg_locations = []
     for i, asset in enumerate(asset_dict):
         if run_parallel == False or (i % num_processes) == process_id:  # noqa: E712
             with open(asset['file'], encoding='utf-8') as f:  # noqa: PTH123
                 asset_data = json.load(f)
 
             asset_loc = asset_data['GeneralInformation']['location']
-            aim_id = aim_df.index[count]
-            aim_df.loc[aim_id, 'Longitude'] = asset_loc['longitude']
-            aim_df.loc[aim_id, 'Latitude'] = asset_loc['latitude']
-            aim_df.loc[aim_id, 'file'] = asset['file']
-            count = count + 1
-
-    # store building locations in bldg_locations
-    bldg_locations = np.array(
-        [
-            [lo, la]
-            for lo, la in zip(aim_df['Longitude'], aim_df['Latitude'])
-            if not np.isnan(lo) and not np.isnan(la)
-        ]
-    )
+            asset_files.append(asset['file'])
+            asset_data_list.append(asset_data)
+            bldg_locations.append([asset_loc['longitude'], asset_loc['latitude']])
+
+    if len(asset_files) == 0:
+        return
+
+    bldg_locations = np.array(bldg_locations, dtype=float)
 
     # collect the neighbor indices and distances for every building
     distances, indices = nbrs.kneighbors(bldg_locations)
     distances = distances + 1e-20
 
+    # only keep the neighbors that match the labels of the asset
+    if filter_label != '':
+        filter_keys = [filter_label]
+    else:
+        filter_keys = grid_extra_keys
+
+    if len(filter_keys) > 0:
+        distances, indices = filter_neighbors(
+            distances,
+            indices,
+            [asset_data['GeneralInformation'] for asset_data in asset_data_list],
+            grid_df,
+            filter_keys,
+            neighbors,
+        )
+
     # initialize the random generator
     if seed is not None:
         rng = np.random.default_rng(seed)
     else:
         rng = np.random.default_rng()
 
-    count = 0
+    # get the pre-defined number of samples for each asset at once; the
+    # weight of each neighbor is inversely proportional to its squared
+    # distance from the asset
+    nbr_samples = sample_neighbors(distances, samples, rng)
+    indices = np.ma.getdata(indices)
 
-    # iterate through the buildings and store the selected events in the AIM
-    for asset_i, (aim_id, dist_list, ind_list) in enumerate(  # noqa: B007
-        zip(aim_df.index, distances, indices)
-    ):
-        # open the AIM file
-        aim_index_id = aim_df.index[aim_id]
-        asst_file = aim_df.loc[aim_index_id, 'file']
-
-        with open(asst_file, encoding='utf-8') as f:  # noqa: PTH123
-            asset_data = json.load(f)
-
-        if filter_label != '':
-            # soil type of building
-            asset_label = asset_data['GeneralInformation'][filter_label]
-            # soil types of all initial neighbors
-            grid_label = grid_df[filter_label][ind_list]
-
-            # only keep the distances and indices corresponding to neighbors
-            # with the same soil type
-            dist_list = dist_list[(grid_label == asset_label).values]  # noqa: PD011, PLW2901
-            ind_list = ind_list[(grid_label == asset_label).values]  # noqa: PD011, PLW2901
-
-            # return dist_list & ind_list with a length equals neighbors
-            # assuming that at least neighbors grid points exist with
-            # the same filter_label as the building
-
-            # because dist_list, ind_list sorted initially in order of increasing
-            # distance, just take the first neighbors grid points of each
-            dist_list = dist_list[:neighbors]  # noqa: PLW2901
-            ind_list = ind_list[:neighbors]  # noqa: PLW2901
-
-        if len(grid_extra_keys) > 0:
-            filter_labels = []
-            for key in asset_data['GeneralInformation'].keys():  # noqa: SIM118
-                if key in grid_extra_keys:
-                    filter_labels.append(key)  # noqa: PERF401
-
-            filter_list = [True for i in dist_list]
-            for filter_label in filter_labels:  # noqa: PLR1704
-                asset_label = asset_data['GeneralInformation'][filter_label]
-                grid_label = grid_df[filter_label][ind_list]
-                filter_list_i = (grid_label == asset_label).values  # noqa: PD011
-                filter_list = filter_list and filter_list_i
-
-            # only keep the distances and indices corresponding to neighbors
-            # with the same soil type
-            dist_list = dist_list[filter_list]  # noqa: PLW2901
-            ind_list = ind_list[filter_list]  # noqa: PLW2901
-
-            # return dist_list & ind_list with a length equals neighbors
-            # assuming that at least neighbors grid points exist with
-            # the same filter_label as the building
-
-            # because dist_list, ind_list sorted initially in order of increasing
-            # distance, just take the first neighbors grid points of each
-            dist_list = dist_list[:neighbors]  # noqa: PLW2901
-            ind_list = ind_list[:neighbors]  # noqa: PLW2901
-
-        # calculate the weights for each neighbor based on their distance
-        dist_list = 1.0 / (dist_list**2.0)  # noqa: PLW2901
-        weights = np.array(dist_list) / np.sum(dist_list)
-
-        # get the pre-defined number of samples for each neighbor
-        nbr_samples = np.where(rng.multinomial(1, weights, samples) == 1)[1]
-
-        # this is the preferred behavior, the else clause is left for legacy inputs
-        if file_extension == '.csv':
-            if grid_df.iloc[0]['GP_file'][-3:] == 'csv':
-                # We assume that every grid point has the same type and number of
-                # event data. That is, you cannot mix ground motion records and
-                # intensity measures and you cannot assign 10 records to one point
-                # and 15 records to another.
-
-                # Load the first file and identify if this is a grid of IM or GM
-                # information. GM grids have GM record filenames defined in the
-                # grid point files.
-                first_file = pd.read_csv(
-                    event_dir / grid_df.iloc[0]['GP_file'], header=0
-                )
-                if first_file.columns[0] == 'TH_file':
-                    event_type = 'timeHistory'
-                else:
-                    event_type = 'intensityMeasure'
-                event_count = first_file.shape[0]
-
-                # collect the list of events and scale factors
-                event_list = []
-                scale_list = []
-
-                # for each neighbor
-                for sample_j, nbr in enumerate(nbr_samples):
-                    # make sure we resample events if samples > event_count
-                    event_j = sample_j % event_count
-
-                    # get the index of the nth neighbor
-                    nbr_index = ind_list[nbr]
-
-                    # if the grid has ground motion records...
-                    if event_type == 'timeHistory':
-                        # load the file for the selected grid point
-                        event_collection_file = grid_df.iloc[nbr_index]['GP_file']
-                        event_df = pd.read_csv(
-                            event_dir / event_collection_file, header=0
-                        )
-
-                        # append the GM record name to the event list
-                        event_list.append(event_df.iloc[event_j, 0])
-
-                        # append the scale factor (or 1.0) to the scale list
-                        if len(event_df.columns) > 1:
-                            scale_list.append(float(event_df.iloc[event_j, 1]))
-                        else:
-                            scale_list.append(1.0)
-
-                    # if the grid has intensity measures
-                    elif event_type == 'intensityMeasure':
-                        # save the collection file name and the IM row id
-                        event_list.append(
-                            grid_df.iloc[nbr_index]['GP_file'] + f'x{event_j}'
-                        )
-
-                        # IM collections are not scaled
-                        scale_list.append(1.0)
-
-            # TODO: update the LLNL input data and remove this clause  # noqa: TD002
+    # the grid point selected for every asset and sample
+    nbr_index = np.take_along_axis(indices, nbr_samples, axis=1)
+
+    # event_list and scale_list are arrays with one row per asset
+    # this is the preferred behavior, the else clause is left for legacy inputs
+    if file_extension == '.csv':
+        if grid_df.iloc[0]['GP_file'][-3:] == 'csv':
+            # We assume that every grid point has the same type and number of
+            # event data. That is, you cannot mix ground motion records and
+            # intensity measures and you cannot assign 10 records to one point
+            # and 15 records to another.
+
+            # Load the first file and identify if this is a grid of IM or GM
+            # information. GM grids have GM record filenames defined in the
+            # grid point files.
+            first_file = pd.read_csv(event_dir / grid_df.iloc[0]['GP_file'], header=0)
+            if first_file.columns[0] == 'TH_file':
+                event_type = 'timeHistory'
             else:
-                event_list = []
-                for e, i in zip(nbr_samples, ind_list):
-                    event_list += [
-                        grid_df.iloc[i]['GP_file'],
-                    ] * e
+                event_type = 'intensityMeasure'
+            event_count = first_file.shape[0]
+
+            # make sure we resample events if samples > event_count
+            event_j = np.arange(samples) % event_count
 
-                scale_list = np.ones(len(event_list))
+            gp_files = grid_df['GP_file'].to_numpy()
+
+            # if the grid has ground motion records...
+            if event_type == 'timeHistory':
+                # load every grid point file that was selected exactly once
+                used_gp, gp_pos = np.unique(nbr_index, return_inverse=True)
+                gp_pos = gp_pos.reshape(nbr_index.shape)
+                record_table, scale_table = load_event_collections(
+                    event_dir, gp_files[used_gp], event_count
+                )
+
+                event_list = record_table[gp_pos, event_j]
+                scale_list = scale_table[gp_pos, event_j]
+
+            # if the grid has intensity measures
+            elif event_type == 'intensityMeasure':
+                # save the collection file name and the IM row id
+                event_suffix = np.array([f'x{j}' for j in event_j], dtype=object)
+                event_list = gp_files[nbr_index].astype(object) + event_suffix
+
+                # IM collections are not scaled
+                scale_list = np.ones(nbr_index.shape)
+
+        # TODO: update the LLNL input data and remove this clause  # noqa: TD002
         else:
+            event_type = None
             event_list = []
             scale_list = []
-            event_type = 'intensityMeasure'
-
-            # Determine event_count (number of IMs per grid point)
-            im_columns = [
-                col
-                for col in grid_df.columns
-                if col not in ['geometry', 'Longitude', 'Latitude']
-            ]
-            # event_count = len(im_columns)
-            event_count = 1
-
-            # for each neighbor
-            for sample_j, nbr in enumerate(nbr_samples):
-                # make sure we resample events if samples > event_count
-                event_j = sample_j % event_count
-
-                # get the index of the nth neighbor
-                nbr_index = ind_list[nbr]
-
-                # For GIS files, create a new CSV file
-                csv_filename = f'Site_{nbr_index}.csv'
-
-                csv_path = event_dir / csv_filename
-
-                if not csv_path.exists():
-                    # Create a CSV file with data from the GIS file
-                    # Use actual data from the GIS file if available, otherwise use dummy data
-                    im_columns = [
-                        col
-                        for col in grid_df.columns
-                        if col not in ['geometry', 'Longitude', 'Latitude']
-                    ]
-
-                    im_data = pd.DataFrame(
-                        {
-                            col: [grid_df.iloc[nbr_index][col]] * event_count
-                            for col in im_columns
-                        }
-                    )
-
-                    im_data.to_csv(csv_path, index=False)
-                # save the collection file name and the IM row id
-                event_list.append(csv_filename + f'x{event_j}')
+            for nbr_samples_i, ind_list in zip(nbr_samples, indices):
+                event_list_i = []
+                for e, i in zip(nbr_samples_i, ind_list):
+                    event_list_i += [
+                        grid_df.iloc[i]['GP_file'],
+                    ] * e
+                event_list.append(event_list_i)
+                scale_list.append(np.ones(len(event_list_i)))
 
-                # IM collections are not scaled
-                scale_list.append(1.0)
+    else:
+        event_type = 'intensityMeasure'
+
+        # Determine event_count (number of IMs per grid point)
+        # event_count = len(im_columns)
+        event_count = 1
+
+        im_columns = [
+            col
+            for col in grid_df.columns
+            if col not in ['geometry', 'Longitude', 'Latitude']
+        ]
+
+        # For GIS files, create a new CSV file for every selected grid point
+        for gp_i in np.unique(nbr_index):
+            csv_path = event_dir / f'Site_{gp_i}.csv'
+
+            if not csv_path.exists():
+                # Create a CSV file with data from the GIS file
+                im_data = pd.DataFrame(
+                    {
+                        col: [grid_df.iloc[gp_i][col]] * event_count
+                        for col in im_columns
+                    }
+                )
 
+                im_data.to_csv(csv_path, index=False)
+
+        # save the collection file name and the IM row id
+        # make sure we resample events if samples > event_count
+        event_suffix = np.array(
+            [f'.csvx{j}' for j in np.arange(samples) % event_count], dtype=object
+        )
+        event_list = (
+            np.char.add('Site_', nbr_index.astype(str)).astype(object) + event_suffix
+        )
+
+        # IM collections are not scaled
+        scale_list = np.ones(nbr_index.shape)
+
+    # iterate through the buildings and store the selected events in the AIM
+    for asst_file, asset_data, event_list_i, scale_list_i in zip(
+        asset_files, asset_data_list, event_list, scale_list
+    ):
         # prepare a dictionary of events
-        event_list_json = []
-        for e_i, event in enumerate(event_list):
-            # event_list_json.append({
-            #    #"EventClassification": "Earthquake",
-            #    "fileName": f'{event}x{e_i:05d}',
-            #    "factor": scale_list[e_i],
-            #    #"type": event_type
-            #    })
-            event_list_json.append([f'{event}x{e_i:05d}', scale_list[e_i]])
+        event_list_json = [
+            [f'{event}x{e_i:05d}', float(scale_list_i[e_i])]
+            for e_i, event in enumerate(event_list_i)
+        ]
 
         # save the event dictionary to the AIM
         # TODO: we assume there is only one event  # noqa: TD002
@@ -396,6 +330,111 @@ def find_neighbors(  # noqa: C901, D103
             json.dump(asset_data, f, indent=2)
 
 
+def filter_neighbors(distances, indices, asset_info, grid_df, filter_keys, neighbors):
+    """Keep the closest neighbors that share the labels of each asset.
+
+    Parameters
+    ----------
+    distances: ndarray
+        Distances of the initial neighbors, one row per asset sorted in
+        order of increasing distance.
+    indices: ndarray
+        Grid point indices of the initial neighbors.
+    asset_info: list of dict
+        GeneralInformation of each asset.
+    grid_df: DataFrame
+        Grid point data with one column per label.
+    filter_keys: list of str
+        Labels to match. Assets that do not have a label are not filtered
+        by it.
+    neighbors: int
+        Number of neighbors to keep for each asset.
+
+    Returns
+    -------
+    distances, indices: MaskedArray
+        Arrays with `neighbors` columns; neighbors that do not match the
+        labels of the asset are masked. We assume that at least one grid
+        point matches the labels of every asset.
+
+    """
+    keep = np.ones(indices.shape, dtype=bool)
+
+    for key in filter_keys:
+        has_key = np.array([key in info for info in asset_info])
+        asset_label = np.empty(len(asset_info), dtype=object)
+        asset_label[:] = [info.get(key) for info in asset_info]
+
+        grid_label = grid_df[key].to_numpy(dtype=object)[indices]
+
+        keep &= (grid_label == asset_label[:, np.newaxis]) | ~has_key[:, np.newaxis]
+
+    # because dist_list, ind_list sorted initially in order of increasing
+    # distance, a stable sort moves the matching neighbors to the front while
+    # keeping their order; just take the first neighbors grid points of each
+    order = np.argsort(~keep, axis=1, kind='stable')[:, :neighbors]
+
+    mask = ~np.take_along_axis(keep, order, axis=1)
+    distances = np.ma.array(np.take_along_axis(distances, order, axis=1), mask=mask)
+    indices = np.ma.array(np.take_along_axis(indices, order, axis=1), mask=mask)
+
+    return distances, indices
+
+
+def sample_neighbors(distances, samples, rng):
+    """Sample neighbor ids for every asset in one vectorized pass.
+
+    The probability of selecting a neighbor is inversely proportional to its
+    squared distance. Masked neighbors are never selected.
+
+    Returns
+    -------
+    nbr_samples: ndarray
+        Column index of the selected neighbor for each asset and sample.
+
+    """
+    weights = np.ma.filled(1.0 / (distances**2.0), 0.0)
+    weights = np.cumsum(weights, axis=1)
+    weights = weights / weights[:, -1:]
+    weights[:, -1] = 1.0
+
+    # offsetting each row by its id lets one sorted search serve every asset
+    row_offset = np.arange(weights.shape[0])[:, np.newaxis]
+    cum_weights = (weights + row_offset).ravel()
+    u = rng.random((weights.shape[0], samples)) + row_offset
+
+    nbr_samples = np.searchsorted(cum_weights, u.ravel(), side='right')
+    nbr_samples = nbr_samples.reshape(u.shape) - row_offset * weights.shape[1]
+
+    # guard against round-off pointing past the last neighbor of a row
+    return np.minimum(nbr_samples, weights.shape[1] - 1)
+
+
+def load_event_collections(event_dir, gp_files, event_count):
+    """Load grid point event collections into a pair of columnar tables.
+
+    Returns
+    -------
+    record_table: ndarray
+        Ground motion record names, one row per grid point file.
+    scale_table: ndarray
+        Scale factors of the records (1.0 if not provided).
+
+    """
+    record_table = np.empty((len(gp_files), event_count), dtype=object)
+    scale_table = np.ones((len(gp_files), event_count))
+
+    for gp_i, gp_file in enumerate(gp_files):
+        event_df = pd.read_csv(event_dir / gp_file, header=0)
+
+        record_table[gp_i] = event_df.iloc[:event_count, 0].to_numpy()
+
+        if len(event_df.columns) > 1:
+            scale_table[gp_i] = event_df.iloc[:event_count, 1].astype(float)
+
+    return record_table, scale_table
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--assetFile')
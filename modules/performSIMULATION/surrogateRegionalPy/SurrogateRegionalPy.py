@@ -65,20 +65,7 @@ def main(aimName, samName, evtName, edpName, simName, getRV):  # noqa: N803, D10
     #
     # Get user-uploaded filter script
     #
-    # sy - so far works only for single model
-    filterFileName = root_AIM['Simulation']['filterFileName']  # noqa: N806
-    filateFilePath = root_AIM['Simulation']['filterFilePath']  # noqa: N806
-    sys.path.insert(0, filateFilePath)
-    analysis_script = importlib.__import__(
-        filterFileName[:-3],
-        globals(),
-        locals(),
-        [
-            'model_distributor',
-        ],
-        0,
-    )
-    model_distributor = analysis_script.model_distributor
+    model_distributor = import_model_distributor(root_AIM)
     modelName = model_distributor(GI, SAM)  # noqa: N806
 
     if getRV:
@@ -184,11 +171,78 @@ def runDefault(root_AIM, aimName, samName, evtName, edpName, simName, getRV=Fals
         )
 
 
-def runSurrogate(modelName, GI, SAM, root_AIM, aimName, edpName):  # noqa: C901, N802, N803, D103
+def runSurrogate(modelName, GI, SAM, root_AIM, aimName, edpName):  # noqa: N802, N803, D103
     #
     # Augment to params.in file
     #
 
+    with open('params.in') as f:  # noqa: PTH123
+        paramsStr = f.read()  # noqa: N806
+    paramsStr += ''.join(f'{line}\n' for line in get_surrogate_params(GI, SAM))  # noqa: N806
+    stringList = merge_params(paramsStr)  # noqa: N806
+    with open('params.in', 'w') as f:  # noqa: PTH123
+        f.write('\n'.join(stringList))
+
+    #
+    # get sur model info
+    #
+
+    surFileName = None  # noqa: N806
+    for model in root_AIM['Simulation']['Models']:
+        if model['modelName'] == modelName:
+            surFileName = model['fileName']  # noqa: N806
+
+    if surFileName is None:
+        print(f'surrogate model {modelName} is not found')  # noqa: T201
+        exit(-1)  # noqa: PLR1722
+
+    #
+    # import surrogate functions
+    #
+
+    root_AIM['Applications']['Modeling']['ApplicationData']['MS_Path'] = ''
+    root_AIM['Applications']['Modeling']['ApplicationData']['postprocessScript'] = ''
+    root_AIM['Applications']['Modeling']['ApplicationData']['mainScript'] = (
+        r'..\\..\\..\\..\\input_data\\' + surFileName
+    )
+
+    currentDir = os.getcwd()  # noqa: PTH109, N806
+    newAimName = os.path.join(currentDir, os.path.basename(aimName))  # noqa: PTH118, PTH119, N806
+    with open(newAimName, 'w', encoding='utf-8') as f:  # noqa: PTH123
+        json_object = json.dumps(root_AIM)
+        f.write(json_object)
+
+    sur_module = import_surrogate_simulation()
+
+    #
+    # run prediction
+    #
+
+    sur_module.run_surrogateGP(newAimName, edpName)
+
+    #
+    # write EDP file
+    #
+
+    sur_module.write_EDP(newAimName, edpName)
+
+
+def get_surrogate_params(GI, SAM):  # noqa: C901, N803
+    """
+    Collect the GI and SAM values of an asset that are passed to the surrogate.
+
+    Parameters
+    ----------
+    GI : dict
+        General information of the asset.
+    SAM : dict
+        Structural analysis model of the asset.
+
+    Returns
+    -------
+    list of str
+        Lines of the params.in file with the name and value of each input.
+    """
     GIkeys = [  # noqa: N806
         'Latitude',
         'Longitude',
@@ -214,28 +268,24 @@ def runSurrogate(modelName, GI, SAM, root_AIM, aimName, edpName):  # noqa: C901,
     ]
     SAMkeys_nodes = ['mass']  # noqa: N806
 
-    with open('params.in') as f:  # noqa: PTH123
-        paramsStr = f.read()  # noqa: N806
-    nAddParams = 0  # noqa: N806
+    params = []
 
     for key in GI:
         if key in GIkeys:
             val = GI[key]
             if not isinstance(val, str):
-                paramsStr += f'{key} {val}\n'  # noqa: N806
+                params += [f'{key} {val}']
             else:
-                paramsStr += f'{key} "{val}"\n'  # noqa: N806
-            nAddParams += 1  # noqa: N806
+                params += [f'{key} "{val}"']
 
     # For damping
     for key in SAM['Properties']:
         if key in SAMkeys_properties:
             val = SAM['Properties'][key]
             if not isinstance(val, str):
-                paramsStr += f'{key} {val}\n'  # noqa: N806
+                params += [f'{key} {val}']
             else:
-                paramsStr += f'{key} "{val}"\n'  # noqa: N806
-            nAddParams += 1  # noqa: N806
+                params += [f'{key} "{val}"']
 
     # For material properties
     for SAM_elem in SAM['Properties']['uniaxialMaterials']:  # noqa: N806
@@ -243,10 +293,9 @@ def runSurrogate(modelName, GI, SAM, root_AIM, aimName, edpName):  # noqa: C901,
             if key in SAMkeys_properties:
                 val = SAM_elem[key]
                 if not isinstance(val, str):
-                    paramsStr += '{}-{} {}\n'.format(key, SAM_elem['name'], val)  # noqa: N806
+                    params += ['{}-{} {}'.format(key, SAM_elem['name'], val)]
                 else:
-                    paramsStr += '{}-{} "{}"\n'.format(key, SAM_elem['name'], val)  # noqa: N806
-                nAddParams += 1  # noqa: N806
+                    params += ['{}-{} "{}"'.format(key, SAM_elem['name'], val)]
 
     # For mass
     for SAM_node in SAM['Geometry']['nodes']:  # noqa: N806
@@ -254,34 +303,23 @@ def runSurrogate(modelName, GI, SAM, root_AIM, aimName, edpName):  # noqa: C901,
             if key in SAMkeys_nodes:
                 val = SAM_node[key]
                 if not isinstance(val, str):
-                    paramsStr += '{}-{} {}\n'.format(key, SAM_node['name'], val)  # noqa: N806
+                    params += ['{}-{} {}'.format(key, SAM_node['name'], val)]
                 else:
-                    paramsStr += '{}-{} "{}"\n'.format(key, SAM_node['name'], val)  # noqa: N806
-                nAddParams += 1  # noqa: N806
+                    params += ['{}-{} "{}"'.format(key, SAM_node['name'], val)]
 
+    return params
+
+
+def merge_params(paramsStr):  # noqa: N803
+    """Return the lines of a params.in file without duplicates, count first."""
     stringList = paramsStr.split('\n')  # noqa: N806
     stringList.remove(stringList[0])  # remove # params (will be added later)
     stringList = set(stringList)  # remove duplicates  # noqa: N806
     stringList = [i for i in stringList if i]  # remove empty  # noqa: N806
-    stringList = [str(len(stringList))] + stringList  # noqa: N806, RUF005
-    with open('params.in', 'w') as f:  # noqa: PTH123
-        f.write('\n'.join(stringList))
-
-    f.close()
-
-    #
-    # get sur model info
-    #
-
-    surFileName = None  # noqa: N806
-    for model in root_AIM['Simulation']['Models']:
-        if model['modelName'] == modelName:
-            surFileName = model['fileName']  # noqa: N806
+    return [str(len(stringList))] + stringList  # noqa: RUF005
 
-    if surFileName is None:
-        print(f'surrogate model {modelName} is not found')  # noqa: T201
-        exit(-1)  # noqa: PLR1722
 
+def import_surrogate_simulation():  # noqa: D103
     #
     # find surrogate model prediction app
     #
@@ -309,24 +347,8 @@ def runSurrogate(modelName, GI, SAM, root_AIM, aimName, edpName):  # noqa: C901,
         mySurrogatePath = os.path.join(*s)  # noqa: PTH118, N806
         mySurrogateName = os.path.basename(myApp['ExecutablePath'])  # noqa: PTH119, N806
 
-    #
-    # import surrogate functions
-    #
-
-    root_AIM['Applications']['Modeling']['ApplicationData']['MS_Path'] = ''
-    root_AIM['Applications']['Modeling']['ApplicationData']['postprocessScript'] = ''
-    root_AIM['Applications']['Modeling']['ApplicationData']['mainScript'] = (
-        r'..\\..\\..\\..\\input_data\\' + surFileName
-    )
-
-    currentDir = os.getcwd()  # noqa: PTH109, N806
-    newAimName = os.path.join(currentDir, os.path.basename(aimName))  # noqa: PTH118, PTH119, N806
-    with open(newAimName, 'w', encoding='utf-8') as f:  # noqa: PTH123
-        json_object = json.dumps(root_AIM)
-        f.write(json_object)
-
     sys.path.insert(0, mySurrogatePath)
-    sur_module = importlib.__import__(
+    return importlib.__import__(
         mySurrogateName[:-3],
         globals(),
         locals(),
@@ -334,17 +356,23 @@ def runSurrogate(modelName, GI, SAM, root_AIM, aimName, edpName):  # noqa: C901,
         0,
     )
 
-    #
-    # run prediction
-    #
-
-    sur_module.run_surrogateGP(newAimName, edpName)
 
-    #
-    # write EDP file
-    #
-
-    sur_module.write_EDP(newAimName, edpName)
+def import_model_distributor(root_AIM):  # noqa: N803, D103
+    # sy - so far works only for single model
+    filterFileName = root_AIM['Simulation']['filterFileName']  # noqa: N806
+    filateFilePath = root_AIM['Simulation']['filterFilePath']  # noqa: N806
+    if filateFilePath not in sys.path:
+        sys.path.insert(0, filateFilePath)
+    analysis_script = importlib.__import__(
+        filterFileName[:-3],
+        globals(),
+        locals(),
+        [
+            'model_distributor',
+        ],
+        0,
+    )
+    return analysis_script.model_distributor
 
 
 if __name__ == '__main__':
@@ -12,10 +12,11 @@ import numpy as np
 import pandas as pd
 import PLoM_library as plom
 from general import *  # noqa: F403
+from scipy import sparse
 
 
 class PLoM:  # noqa: D101
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         model_name='plom',
         data='',
@@ -32,6 +33,7 @@ class PLoM:  # noqa: D101
         max_iter=50,
         runDiffMaps=True,  # noqa: FBT002, N803
         db_path=None,
+        n_neighbors_kde=None,
     ):
         # basic setups
         self._basic_config(model_name=model_name, db_path=db_path)
@@ -80,6 +82,7 @@ class PLoM:  # noqa: D101
                 max_iter=max_iter,
                 plot_tag=plot_tag,
                 runDiffMaps=self.runDiffMaps,
+                n_neighbors_kde=n_neighbors_kde,
             )
         else:
             self.logfile.write_msg(
@@ -684,6 +687,9 @@ class PLoM:  # noqa: D101
         runDiffMaps=None,  # noqa: N803
         seed_num=None,
         tolKDE=0.1,  # noqa: N803
+        n_neighbors_kde=None,
+        n_chains=0,
+        num_processes=1,
     ):
         """Running the PLoM algorithm to train the model and generate new realizations
         - n_mc: realization/sample size ratio
@@ -691,6 +697,9 @@ class PLoM:  # noqa: D101
         - epsilon_kde: smoothing parameter in the kernel density estimation
         - tol: tolerance in the PLoM iterations
         - max_iter: maximum number of iterations of the PLoM algorithm
+        - n_neighbors_kde: if given, the diffusion-maps kernel only keeps the n_neighbors_kde nearest neighbors of each point (sparse kernel for large data sets)
+        - n_chains: if given, the realizations are generated by n_chains independent ISDE chains (ISDEGenerationChains) with n_mc of each chain
+        - num_processes: number of processes running the ISDE chains
         """  # noqa: D205, D400, D401
         if runDiffMaps == None:  # noqa: E711
             runDiffMaps = self.runDiffMaps  # noqa: N806
@@ -789,7 +798,7 @@ class PLoM:  # noqa: D101
                 ).avail_var_list = []
                 # parameters KDE
                 self.s_v, self.c_v, self.hat_s_v, self.K, self.b = self.RunKDE(
-                    self.H, epsilon_kde
+                    self.H, epsilon_kde, n_neighbors=n_neighbors_kde
                 )
                 self.logfile.write_msg(
                     msg='PLoM.RunAlgorithm: kernel density estimation completed.',
@@ -801,11 +810,20 @@ class PLoM:  # noqa: D101
                 self.dbserver.add_item(
                     item_name='hat_s_v', item=np.array([self.hat_s_v])
                 )
+                if sparse.issparse(self.K):
+                    # sparse kernels are saved as (row, column, value) triplets
+                    # and their normalization as its diagonal
+                    k_coo = self.K.tocoo()
+                    k_item = np.column_stack([k_coo.row, k_coo.col, k_coo.data])
+                    b_item = self.b.diagonal()
+                else:
+                    k_item = self.K
+                    b_item = self.b
                 self.dbserver.add_item(
-                    item_name='X_KDE', item=self.K, data_shape=self.K.shape
+                    item_name='X_KDE', item=k_item, data_shape=k_item.shape
                 )
                 self.dbserver.add_item(
-                    item_name='EigenValues_KDE', item=self.b, data_shape=self.b.shape
+                    item_name='EigenValues_KDE', item=b_item, data_shape=b_item.shape
                 )
                 self.logfile.write_msg(
                     msg='PLoM.RunAlgorithm: KDE, X_KDE and EigenValues_KDE saved.',
@@ -892,13 +910,38 @@ class PLoM:  # noqa: D101
                     'task_' + cur_task.task_name
                 ).avail_var_list = []
                 # ISDE generation
-                self.ISDEGeneration(
-                    n_mc=n_mc,
-                    tol_PCA2=tol_PCA2,
-                    tol=tol,
-                    max_iter=max_iter,
-                    seed_num=seed_num,
-                )
+                if n_chains and self.g_c:
+                    self.logfile.write_msg(
+                        msg='PLoM.RunAlgorithm: ISDE chains do not support constraints, using ISDEGeneration.',
+                        msg_type='WARNING',
+                        msg_level=0,
+                    )
+                if n_chains and not self.g_c:
+                    files = self.ISDEGenerationChains(
+                        n_mc=n_mc,
+                        n_chains=n_chains,
+                        num_processes=num_processes,
+                        seed_num=seed_num,
+                    )
+                    # collect the unscaled realizations of all the chains
+                    self.Xnew = np.transpose(
+                        np.vstack(
+                            [
+                                np.load(f)
+                                for chain_files in files
+                                for f in chain_files
+                            ]
+                        )
+                    )
+                    self.errors = []
+                else:
+                    self.ISDEGeneration(
+                        n_mc=n_mc,
+                        tol_PCA2=tol_PCA2,
+                        tol=tol,
+                        max_iter=max_iter,
+                        seed_num=seed_num,
+                    )
                 self.logfile.write_msg(
                     msg='PLoM.RunAlgorithm: Realizations generated.',
                     msg_type='RUNNING',
@@ -987,13 +1030,14 @@ class PLoM:  # noqa: D101
         """
         return H, mu, phi, nu, errors
 
-    def RunKDE(self, X, epsilon_kde):  # noqa: N802, N803
+    def RunKDE(self, X, epsilon_kde, n_neighbors=None):  # noqa: N802, N803
         """Running Kernel Density Estimation
         - X: the data matrix to be reduced
         - epsilon_kde: smoothing parameter in the kernel density estimation
+        - n_neighbors: number of nearest neighbors kept in a sparse kernel (None for a dense kernel)
         """  # noqa: D205, D400, D401
         (s_v, c_v, hat_s_v) = plom.parameters_kde(X)
-        K, b = plom.K(X, epsilon_kde)  # noqa: N806
+        K, b = plom.K(X, epsilon_kde, n_neighbors=n_neighbors)  # noqa: N806
 
         return s_v, c_v, hat_s_v, K, b  # noqa: DOC201, RUF100
 
@@ -1001,7 +1045,11 @@ class PLoM:  # noqa: D101
         # ..diff maps basis...
         # self.Z = PCA(self.H)
         try:
-            g, eigenvalues = plom.g(K, b)  # diffusion maps
+            if sparse.issparse(K) or K.shape[0] > plom.DENSE_EIGEN_MAX_N:
+                # only the leading eigenvectors are used by the basis
+                g, eigenvalues = plom.g_leading(K, b, tol=tol)
+            else:
+                g, eigenvalues = plom.g(K, b)  # diffusion maps
             g = g.real
             m = plom.m(eigenvalues, tol=tol)
             a = g[:, 0:m].dot(np.linalg.inv(np.transpose(g[:, 0:m]).dot(g[:, 0:m])))
@@ -1184,6 +1232,63 @@ class PLoM:  # noqa: D101
         # unscale
         self.Xnew = np.diag(self.alpha).dot(self.Xnew) + self.x_min
 
+    def ISDEGenerationChains(  # noqa: N802
+        self,
+        n_mc=5,
+        n_chains=1,
+        out_dir=None,
+        chunk_size=10,
+        num_processes=1,
+        seed_num=None,
+    ):
+        """Generating realizations of X with independent ISDE chains saved to disk in chunks
+        - n_mc: realization/sample size ratio of each chain
+        - n_chains: number of independent chains
+        - out_dir: directory of the X_new_chain{chain}_{chunk}.npy files (default: run directory)
+        - chunk_size: number of realization/sample size ratios saved in one file
+        - num_processes: number of processes running the chains
+        - seed_num: seed the seeds of the chains are spawned from
+        """  # noqa: D205, D400, D401
+        if self.g_c:
+            self.logfile.write_msg(
+                msg='PLoM.ISDEGenerationChains: constraints are not supported, use ISDEGeneration.',
+                msg_type='ERROR',
+                msg_level=0,
+            )
+            return None
+        if out_dir is None:
+            out_dir = self.dir_run
+        files, moments = plom.generate_chains(
+            n_chains,
+            n_mc,
+            self.Z,
+            self.a,
+            self.x_mean,
+            self.H,
+            self.s_v,
+            self.hat_s_v,
+            self.mu,
+            self.phi,
+            self.g[:, 0 : int(self.m)],
+            out_dir,
+            seed_num=seed_num,
+            chunk_size=chunk_size,
+            num_processes=num_processes,
+            alpha=self.alpha,
+            x_min=self.x_min,
+        )
+        # mean and standard deviation of the realizations in the original scale
+        self.Xnew_mean = np.diag(self.alpha).dot(moments.mean) + self.x_min
+        self.Xnew_std = np.diag(self.alpha).dot(
+            np.sqrt(np.maximum(moments.mean_sq - moments.mean**2, 0))
+        )
+        self.logfile.write_msg(
+            msg=f'PLoM.ISDEGenerationChains: {moments.count} realizations from {n_chains} chains saved in {out_dir}.',
+            msg_type='RUNNING',
+            msg_level=0,
+        )
+        return files
+
     def export_results(self, data_list=[], file_format_list=['csv']):  # noqa: B006
         """Exporting results by the data names
         - data_list: list of data names
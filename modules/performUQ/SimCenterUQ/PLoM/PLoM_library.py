@@ -2,13 +2,16 @@
 # from matplotlib import pyplot as plt
 import os
 import platform
+from concurrent.futures import ProcessPoolExecutor
 from ctypes import *  # noqa: F403
 from math import exp, log, pi, sqrt
 from sys import platform as pltm
 
 import numpy as np
 from general import Logfile
-from scipy import integrate
+from scipy import integrate, sparse
+from scipy.sparse.linalg import eigsh
+from scipy.spatial import cKDTree
 
 if pltm == 'linux' or pltm == 'linux2':
     c_lib = CDLL(  # noqa: F405
@@ -40,6 +43,10 @@ elif pltm == 'win32':
         )
     )
 
+# largest number of points whose diffusion-maps basis is found with a dense
+# eigendecomposition, larger sets use the iterative solver in g_leading
+DENSE_EIGEN_MAX_N = 2000
+
 c_lib.rho.restype = c_double  # noqa: F405
 c_lib.rho.argtypes = [
     np.ctypeslib.ndpointer(dtype=np.float64),
@@ -105,46 +112,110 @@ def kernel(x, y, epsilon):
     return k  # noqa: RET504
 
 
-def K(eta, epsilon):  # noqa: N802
+def K(eta, epsilon, n_neighbors=None, block_size=1024):  # noqa: N802
     """>>> K((np.array([[1,1],[1,1]])), 3)
     (array([[1., 1.],
            [1., 1.]]), array([[2., 0.],
            [0., 2.]]))
+
+    The squared distances between the points (columns of eta) are computed
+    block_size rows at a time with matrix products. If n_neighbors is given,
+    only the kernel values between each point and its n_neighbors nearest
+    neighbors are kept (symmetrized) and K and b are sparse matrices.
     """  # noqa: D205, D400
     N = eta.shape[1]  # noqa: N806
-    K = np.zeros((N, N))  # noqa: N806
-    b = np.zeros((N, N))
-    for i in range(N):
-        row_sum = 0
-        for j in range(N):
-            if j != i:
-                K[i, j] = kernel((eta[:, i]), (eta[:, j]), epsilon)
-                row_sum = row_sum + K[i, j]
-            else:
-                K[i, j] = 1
-                row_sum = row_sum + 1
-        b[i, i] = row_sum
+    x = np.ascontiguousarray(np.transpose(eta), dtype=float)
+    if n_neighbors is not None:
+        return K_knn(x, epsilon, n_neighbors)
+    sq_norm = np.einsum('ij,ij->i', x, x)
+    K = np.empty((N, N))  # noqa: N806
+    for start in range(0, N, block_size):
+        stop = min(start + block_size, N)
+        dist = sq_norm[start:stop, None] + sq_norm[None, :]
+        dist -= 2 * x[start:stop].dot(np.transpose(x))
+        np.maximum(dist, 0, out=dist)
+        K[start:stop] = np.exp(-dist / (4 * epsilon))
+    np.fill_diagonal(K, 1)
+    b = np.diag(K.sum(axis=1))
     return K, b
 
 
-def g(K, b):  # noqa: N803
+def K_knn(x, epsilon, n_neighbors):  # noqa: N802
+    """Sparse diffusion-maps kernel of the points x (rows) restricted to the
+    n_neighbors nearest neighbors of each point.
+    """  # noqa: D205
+    N = x.shape[0]  # noqa: N806
+    n_neighbors = min(n_neighbors, N - 1)
+    dist, idx = cKDTree(x).query(x, k=n_neighbors + 1)
+    rows = np.repeat(np.arange(N), n_neighbors + 1)
+    K = sparse.csr_matrix(  # noqa: N806
+        (np.exp(-(dist.ravel() ** 2) / (4 * epsilon)), (rows, idx.ravel())),
+        shape=(N, N),
+    )
+    K = K.maximum(K.transpose()).tocsr()  # noqa: N806
+    K.setdiag(1)
+    b = sparse.diags(np.asarray(K.sum(axis=1)).ravel())
+    return K, b
+
+
+def g(K, b, n_eigenvalues=None):  # noqa: N803
     """>>> g((np.array([[1,0.5],[0.5,1]])), np.array([[1.5, 0.], [0., 1.5]]))
     (array([[ 0.57735027, -0.57735027],
            [ 0.57735027,  0.57735027]]), array([1.        , 0.33333333]))
+
+    If n_eigenvalues is given or K is sparse, only the n_eigenvalues leading
+    eigenvectors are found, with an iterative solver.
     """  # noqa: D205, D400
-    invb = np.diag(1 / np.diag(b))
-    inv_sqrt_b = np.sqrt(invb)
-    xi = np.linalg.eigh(inv_sqrt_b.dot(K).dot(inv_sqrt_b))
-    xi[1][:, :] = np.transpose(xi[1][:, :])
-    xi[1][:, :] = xi[1][[np.argsort(xi[0], kind='mergesort', axis=0)[::-1]], :]
-    eigenvalues = np.sort(xi[0], kind='mergesort', axis=0)[::-1]
-    g = inv_sqrt_b.dot(np.transpose(xi[1][:, :]))
-    norm = np.diagonal(np.transpose(g).dot(b).dot(g))
-    sqrt_norm = np.sqrt(1 / norm)
-    g = np.multiply(g, sqrt_norm)
+    if n_eigenvalues is None and not sparse.issparse(K):
+        invb = np.diag(1 / np.diag(b))
+        inv_sqrt_b = np.sqrt(invb)
+        xi = np.linalg.eigh(inv_sqrt_b.dot(K).dot(inv_sqrt_b))
+        xi[1][:, :] = np.transpose(xi[1][:, :])
+        xi[1][:, :] = xi[1][[np.argsort(xi[0], kind='mergesort', axis=0)[::-1]], :]
+        eigenvalues = np.sort(xi[0], kind='mergesort', axis=0)[::-1]
+        g = inv_sqrt_b.dot(np.transpose(xi[1][:, :]))
+        norm = np.diagonal(np.transpose(g).dot(b).dot(g))
+        sqrt_norm = np.sqrt(1 / norm)
+        g = np.multiply(g, sqrt_norm)
+        return g, eigenvalues
+
+    N = K.shape[0]  # noqa: N806
+    b_diag = b.diagonal()
+    inv_sqrt_b = 1 / np.sqrt(b_diag)
+    if sparse.issparse(K):
+        scale = sparse.diags(inv_sqrt_b)
+        k_norm = scale.dot(K).dot(scale)
+    else:
+        k_norm = inv_sqrt_b[:, None] * K * inv_sqrt_b[None, :]
+    n_eigenvalues = min(n_eigenvalues or N - 1, N - 1)
+    eigenvalues, eigenvectors = eigsh(k_norm, k=n_eigenvalues, which='LA')
+    order = np.argsort(eigenvalues, kind='mergesort')[::-1]
+    eigenvalues = eigenvalues[order]
+    g = inv_sqrt_b[:, None] * eigenvectors[:, order]
+    norm = np.einsum('ij,i,ij->j', g, b_diag, g)
+    g = np.multiply(g, np.sqrt(1 / norm))
     return g, eigenvalues
 
 
+def g_leading(K, b, tol=0.1, n_eigenvalues=32):  # noqa: N803
+    """Diffusion-maps basis limited to the eigenvectors needed by m.
+
+    The number of leading eigenvectors found with the iterative solver is
+    doubled until an eigenvalue falls below tol times the second one. If
+    that needs more than half of the eigenvectors, the full basis is found
+    with a dense eigendecomposition.
+    """
+    N = K.shape[0]  # noqa: N806
+    while 2 * n_eigenvalues <= N:
+        g_k, eigenvalues = g(K, b, n_eigenvalues=n_eigenvalues)
+        if np.any(eigenvalues[2:] <= eigenvalues[1] * tol):
+            return g_k, eigenvalues
+        n_eigenvalues = 2 * n_eigenvalues
+    if sparse.issparse(K):
+        return g(K.toarray(), b.toarray())
+    return g(K, b)
+
+
 def m(eigenvalues, tol=0.1):
     """>>> m(np.array([1, 0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2, 0.1, 0.05, 0.025]))
     11
@@ -322,7 +393,34 @@ def solve_inverse(matrix):  # noqa: D103
         return inverse
 
 
-def generator(  # noqa: D103, PLR0913
+class RunningMoments:
+    """Running mean and mean square of the columns of x added so far."""
+
+    def __init__(self, n):
+        self.count = 0
+        self.sum = np.zeros((n, 1))
+        self.sum_sq = np.zeros((n, 1))
+
+    def add(self, x):  # noqa: D102
+        self.count += x.shape[1]
+        self.sum += np.sum(x, axis=1, keepdims=True)
+        self.sum_sq += np.sum(x**2, axis=1, keepdims=True)
+
+    def merge(self, other):  # noqa: D102
+        self.count += other.count
+        self.sum += other.sum
+        self.sum_sq += other.sum_sq
+
+    @property
+    def mean(self):  # noqa: D102
+        return self.sum / self.count
+
+    @property
+    def mean_sq(self):  # noqa: D102
+        return self.sum_sq / self.count
+
+
+def generator_stream(  # noqa: PLR0913
     z_init,
     y_init,
     a,
@@ -339,9 +437,19 @@ def generator(  # noqa: D103, PLR0913
     g_c=0,
     D_x_g_c=0,  # noqa: N803
     seed_num=None,
+    rng=None,
+    chunk_size=1,
 ):
+    """Solve the ISDE and yield the n_mc generated realizations in chunks.
+
+    Each chunk is a tuple (eta_lambda, nu_lambda) of up to chunk_size
+    realizations of N columns each, so only one chunk is held in memory.
+    The Wiener increments are drawn from rng, or from np.random (seeded
+    with seed_num) if rng is None.
+    """
     if seed_num:
         np.random.seed(seed_num)
+    normal = np.random.normal if rng is None else rng.normal
     delta_t = 2 * pi * hat_s_v / 20
     print('delta t: ', delta_t)  # noqa: T201
     f_0 = 1.5
@@ -350,20 +458,13 @@ def generator(  # noqa: D103, PLR0913
     beta = f_0 * delta_t / 4
     nu = z_init.shape[0]
     N = a.shape[0]  # noqa: N806
-    eta_lambda = np.zeros((nu, (n_mc + 1) * N))
-    nu_lambda = np.zeros((nu, (n_mc + 1) * N))
-    n = x_mean.shape[0]
-    x_ = np.zeros((n, n_mc))
-    x_2 = np.zeros((n, n_mc))
     z_l = z_init
     y_l = y_init
-    eta_lambda[:, 0:N] = z_init.dot(np.transpose(g))
-    nu_lambda[:, 0:N] = y_init.dot(np.transpose(g))
-    for i in range(l_0):  # noqa: B007
+    eta_chunk = []
+    nu_chunk = []
+    for l in range(M_0 * (n_mc + 1) - M_0 + l_0):  # noqa: E741
         z_l_half = z_l + delta_t * 0.5 * y_l
-        w_l_1 = np.random.normal(scale=sqrt(delta_t), size=(nu, N)).dot(
-            a
-        )  # wiener process
+        w_l_1 = normal(scale=sqrt(delta_t), size=(nu, N)).dot(a)  # wiener process
         L_l_half = L(  # noqa: N806
             z_l_half.dot(np.transpose(g)),
             g_c,
@@ -384,52 +485,200 @@ def generator(  # noqa: D103, PLR0913
         )
         z_l = z_l_half + delta_t * 0.5 * y_l_1
         y_l = y_l_1
-    for l in range(M_0, M_0 * (n_mc + 1)):  # noqa: E741
-        z_l_half = z_l + delta_t * 0.5 * y_l
-        w_l_1 = np.random.normal(scale=sqrt(delta_t), size=(nu, N)).dot(
-            a
-        )  # wiener process
-        L_l_half = L(  # noqa: N806
-            z_l_half.dot(np.transpose(g)),
-            g_c,
+        # the first l_0 steps are burn-in, then every M_0-th state is saved
+        if l >= l_0 and (l - l_0) % M_0 == M_0 - 1:
+            eta_chunk.append(z_l.dot(np.transpose(g)))
+            nu_chunk.append(y_l.dot(np.transpose(g)))
+            if len(eta_chunk) == chunk_size:
+                yield np.hstack(eta_chunk), np.hstack(nu_chunk)
+                eta_chunk = []
+                nu_chunk = []
+    if eta_chunk:
+        yield np.hstack(eta_chunk), np.hstack(nu_chunk)
+
+
+def generator(  # noqa: D103, PLR0913
+    z_init,
+    y_init,
+    a,
+    n_mc,
+    x_mean,
+    eta,
+    s_v,
+    hat_s_v,
+    mu,
+    phi,
+    g,
+    psi=0,
+    lambda_i=0,
+    g_c=0,
+    D_x_g_c=0,  # noqa: N803
+    seed_num=None,
+):
+    N = a.shape[0]  # noqa: N806
+    nu = z_init.shape[0]
+    n = x_mean.shape[0]
+    phi_mu = phi.dot(np.diag(mu))
+    eta_lambda = np.zeros((nu, n_mc * N))
+    nu_lambda = np.zeros((nu, n_mc * N))
+    x_ = np.zeros((n, n_mc))
+    x_2 = np.zeros((n, n_mc))
+    # the moments also count the initial state
+    moments = RunningMoments(n)
+    moments.add(x_mean + phi_mu.dot(z_init.dot(np.transpose(g))))
+    for i, (eta_i, nu_i) in enumerate(
+        generator_stream(
+            z_init,
+            y_init,
+            a,
+            n_mc,
             x_mean,
             eta,
             s_v,
             hat_s_v,
             mu,
             phi,
-            psi,
-            lambda_i,
-            D_x_g_c,
-        ).dot(a)
-        y_l_1 = (
-            (1 - beta) * y_l / (1 + beta)
-            + delta_t * (L_l_half) / (1 + beta)
-            + sqrt(f_0) * w_l_1 / (1 + beta)
+            g,
+            psi=psi,
+            lambda_i=lambda_i,
+            g_c=g_c,
+            D_x_g_c=D_x_g_c,
+            seed_num=seed_num,
         )
-        z_l = z_l_half + delta_t * 0.5 * y_l_1
-        y_l = y_l_1
-        if l % M_0 == M_0 - 1:
-            eta_lambda[:, int(l / M_0) * N : (int(l / M_0) + 1) * N] = z_l.dot(
-                np.transpose(g)
-            )
-            nu_lambda[:, int(l / M_0) * N : (int(l / M_0) + 1) * N] = y_l.dot(
-                np.transpose(g)
-            )
-            x_[:, int(l / M_0) - 1 : int(l / M_0)] = mean(
-                x_mean
-                + phi.dot(np.diag(mu)).dot(eta_lambda[:, : (int(l / M_0) + 1) * N])
-            )
-            x_2[:, int(l / M_0) - 1 : int(l / M_0)] = mean(
-                (
-                    x_mean
-                    + phi.dot(np.diag(mu)).dot(
-                        eta_lambda[:, : (int(l / M_0) + 1) * N]
-                    )
-                )
-                ** 2
-            )
-    return eta_lambda[:, N:], nu_lambda[:, N:], x_, x_2
+    ):
+        eta_lambda[:, i * N : (i + 1) * N] = eta_i
+        nu_lambda[:, i * N : (i + 1) * N] = nu_i
+        moments.add(x_mean + phi_mu.dot(eta_i))
+        x_[:, i : i + 1] = moments.mean
+        x_2[:, i : i + 1] = moments.mean_sq
+    return eta_lambda, nu_lambda, x_, x_2
+
+
+# shared by the chains run in a process, see generate_chains
+_chain_context = None
+
+
+def _init_chain_worker(context):
+    global _chain_context  # noqa: PLW0603
+    _chain_context = context
+
+
+def run_chain(chain, seed_seq):
+    """Run one ISDE chain and save its realizations chunk by chunk.
+
+    The chain draws its initial velocity and Wiener increments from its own
+    generator seeded with seed_seq, so it gives the same realizations in
+    any process. Each chunk is saved in out_dir as
+    X_new_chain{chain}_{k}.npy with the realizations as rows.
+
+    Returns the chain number, the saved files and the running moments of the
+    (scaled) realizations.
+    """
+    context = _chain_context
+    rng = np.random.default_rng(seed_seq)
+    z_init = context['z_init']
+    a = context['a']
+    x_mean = context['x_mean']
+    phi_mu = context['phi'].dot(np.diag(context['mu']))
+    y_init = rng.normal(size=(z_init.shape[0], a.shape[0])).dot(a)
+    moments = RunningMoments(x_mean.shape[0])
+    files = []
+    for k, (eta_k, _) in enumerate(
+        generator_stream(
+            z_init,
+            y_init,
+            a,
+            context['n_mc'],
+            x_mean,
+            context['eta'],
+            context['s_v'],
+            context['hat_s_v'],
+            context['mu'],
+            context['phi'],
+            context['g'],
+            rng=rng,
+            chunk_size=context['chunk_size'],
+        )
+    ):
+        x_k = x_mean + phi_mu.dot(eta_k)
+        moments.add(x_k)
+        if context['alpha'] is not None:
+            x_k = np.diag(context['alpha']).dot(x_k) + context['x_min']
+        file_path = os.path.join(context['out_dir'], f'X_new_chain{chain}_{k}.npy')  # noqa: PTH118
+        np.save(file_path, np.transpose(x_k))
+        files.append(file_path)
+    return chain, files, moments
+
+
+def generate_chains(  # noqa: PLR0913
+    n_chains,
+    n_mc,
+    z_init,
+    a,
+    x_mean,
+    eta,
+    s_v,
+    hat_s_v,
+    mu,
+    phi,
+    g,
+    out_dir,
+    seed_num=None,
+    chunk_size=10,
+    num_processes=1,
+    alpha=None,
+    x_min=None,
+):
+    """Generate realizations with independent ISDE chains without constraints.
+
+    Each chain starts from z_init, generates n_mc x N realizations and saves
+    them in chunks of chunk_size x N realizations (see run_chain). The seeds
+    of the chains are spawned from seed_num, so the realizations do not
+    depend on num_processes. If alpha and x_min are given, the saved
+    realizations are unscaled.
+
+    Returns the saved files of each chain and the running moments of all the
+    (scaled) realizations.
+    """
+    context = {
+        'z_init': z_init,
+        'a': a,
+        'n_mc': n_mc,
+        'x_mean': x_mean,
+        'eta': eta,
+        's_v': s_v,
+        'hat_s_v': hat_s_v,
+        'mu': mu,
+        'phi': phi,
+        'g': g,
+        'out_dir': out_dir,
+        'chunk_size': chunk_size,
+        'alpha': alpha,
+        'x_min': x_min,
+    }
+    seed_seqs = np.random.SeedSequence(seed_num).spawn(n_chains)
+    results = []
+    if num_processes > 1 and n_chains > 1:
+        with ProcessPoolExecutor(
+            max_workers=num_processes,
+            initializer=_init_chain_worker,
+            initargs=(context,),
+        ) as executor:
+            futures = [
+                executor.submit(run_chain, chain, seed_seqs[chain])
+                for chain in range(n_chains)
+            ]
+            results = [future.result() for future in futures]
+    else:
+        _init_chain_worker(context)
+        results = [run_chain(chain, seed_seqs[chain]) for chain in range(n_chains)]
+
+    moments = RunningMoments(x_mean.shape[0])
+    files = []
+    for _, chain_files, chain_moments in results:
+        files.append(chain_files)
+        moments.merge(chain_moments)
+    return files, moments
 
 
 def ac(sig):  # noqa: D103
@@ -608,6 +608,11 @@ class runPLoM:
             # self.smootherKDE = surrogateInfo.get("smootherKDE",25)
             self.randomSeed = surrogateInfo.get('randomSeed', None)
             self.diffMap = surrogateInfo.get('diffusionMaps', True)
+            # number of nearest neighbors kept in the sparse KDE kernel (None: dense)
+            self.kdeNeighbors = surrogateInfo.get('kdeNeighbors', None)
+            # number of independent ISDE chains (0: a single ISDE run), each
+            # chain generates newSampleRatio x the sample size realizations
+            self.isdeChains = int(surrogateInfo.get('isdeChains', 0))
             self.logTransform = surrogateInfo.get('logTransform', False)
             self.constraintsFlag = surrogateInfo.get('constraints', False)
             # KZ: 07/24: adding customized option for kdeTolerance
@@ -844,6 +849,11 @@ class runPLoM:
             max_iter=self.numIter,
             seed_num=self.randomSeed,
             tolKDE=self.kdeTolerance,
+            n_neighbors_kde=self.kdeNeighbors,
+            n_chains=self.isdeChains,
+            num_processes=self.n_processor
+            if self.do_parallel and self.run_type.lower() == 'runninglocal'
+            else 1,
         )
         if self.n_mc > 0:
             self.modelPLoM.export_results(data_list=['/X0', '/X_new'])
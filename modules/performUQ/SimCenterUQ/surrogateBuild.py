@@ -2455,9 +2455,39 @@ class surrogate(UQengine):  # noqa: D101
                             file.write(f' : {parvals[0]:.2e}\n')
                     file.write('\n'.format())
 
+        self.save_portable_model(filename)
+
         print('Results Saved', flush=True)  # noqa: T201
         return 0
 
+    def save_portable_model(self, filename):
+        """Save the models in the portable format read by gpPredict without GPy."""
+        if self.do_mf:
+            # multi-fidelity surrogates have no portable format
+            return
+        try:
+            sys.path.insert(
+                0,
+                os.path.join(file_dir, '..', '..', 'performFEM', 'surrogateGP'),  # noqa: PTH118
+            )
+            import gpPortable
+            import gpPredict
+
+            # the portable models are built from the saved surrogate file so
+            # they are identical to the models gpPredict would build
+            with open(self.work_dir + '/dakota.out', encoding='utf-8') as f:  # noqa: PTH123
+                sur = json.load(f)
+            gpPortable.save_portable_surrogate(
+                gpPredict.load_surrogate(sur),
+                self.work_dir + '/' + filename,
+                sur,
+            )
+        except Exception as e:  # noqa: BLE001
+            print(  # noqa: T201
+                f'Warning: the portable surrogate model was not saved: {e}',
+                flush=True,
+            )
+
     def run_design_of_experiments(self, nc1, nq, e2, doeIdx='HF'):  # noqa: C901, N803, D102, PLR0912, PLR0915
         if doeIdx == 'LF':
             lfset = set([tuple(x) for x in self.X_lf.tolist()])  # noqa: C403
@@ -293,7 +293,9 @@ class GP_AB_Algorithm:
         """
         Safely evaluate the model in parallel over a batch of input samples.
 
-        Each sample is evaluated using the provided function in a separate workdir.
+        Each sample is evaluated using the provided function. Every worker
+        process reuses one persistent workdir for its samples, which is reset
+        to the template files before each evaluation.
         Failed model evaluations (e.g., due to runtime errors or invalid output)
         are skipped and logged to a JSON file with error messages.
 
@@ -635,6 +637,10 @@ class GP_AB_Algorithm:
                     logger=self.logger,
                     use_pca=self.use_pca,
                     pca_threshold=self.pca_threshold,
+                    sparse_threshold=2000,
+                    num_processes=self.parallel_pool.num_processors
+                    if self.run_type == 'runningLocal'
+                    else 1,
                 )
                 self.current_gp_model.initialize(
                     self.inputs, self.outputs, reoptimize=True
@@ -858,6 +864,7 @@ class GP_AB_Algorithm:
                 log_prior_fn,
                 self.sample_transformation_function,
                 run_parallel=True,
+                vectorized=True,
                 logger=self.logger,
                 run_type=self.run_type,
             )
@@ -1747,6 +1754,8 @@ def preprocess(input_arguments):
         run_directory=input_arguments.path_to_working_directory,
         driver_filename=str(input_arguments.driver_file_name),
         workdir_prefix='workdir',
+        # GP-AB runs many cheap evaluations, so each worker reuses its workdir
+        persistent_workdir=True,
     )
     model_evaluation_function = model.evaluate_model_once
 
@@ -1895,7 +1904,13 @@ def run_gp_ab_algorithm(input_arguments, logger: logging.Logger | None = None):
     logger = logger or setup_logger()
     inputs = preprocess(input_arguments)
     gp_ab = GP_AB_Algorithm(*inputs, logger=logger)
-    gp_ab.run()
+    try:
+        gp_ab.run()
+    finally:
+        # the workers reused one workdir each, remove them once the run ends
+        uq_utilities.remove_persistent_workdirs(
+            input_arguments.path_to_working_directory, workdir_prefix='workdir'
+        )
 
 
 def parse_arguments(args=None):
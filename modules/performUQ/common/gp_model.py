@@ -7,10 +7,12 @@ import json
 import logging
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import GPy
 import numpy as np
+import scipy.linalg
 from config_utilities import load_settings_from_config, save_used_settings_as_config
 from logging_utilities import (  # decorate_methods_with_log_step,
     flush_logger,
@@ -26,6 +28,10 @@ from pydantic import BaseModel, Field, model_validator
 from sklearn.linear_model import LinearRegression
 from uq_utilities import make_json_serializable
 
+# smallest cosine between a principal direction before and after new training
+# data is added for the GP of that direction to be warm-started
+LATENT_BASIS_ALIGNMENT = 0.99
+
 # =========================================================
 # Top-level Classes
 # =========================================================
@@ -72,6 +78,11 @@ class GaussianProcessModelSettings(BaseModel):
     pca_threshold: float = 0.999
     scale_inputs: bool = True
     scale_outputs: bool = True
+    sparse_threshold: int = Field(0, ge=0)
+    num_inducing: int = Field(500, gt=0)
+    inducing_tolerance: float = Field(1e-6, gt=0)
+    num_processes: int = Field(1, gt=0)
+    num_warm_start_restarts: int = Field(2, ge=1)
 
     @model_validator(mode='after')
     def check_nugget_value(self):  # noqa: D102
@@ -104,6 +115,11 @@ class GaussianProcessModel:
         self.use_pca = settings.use_pca
         self.pca_threshold = settings.pca_threshold
         self.scale_inputs = settings.scale_inputs
+        self.sparse_threshold = settings.sparse_threshold
+        self.num_inducing = settings.num_inducing
+        self.inducing_tolerance = settings.inducing_tolerance
+        self.num_processes = settings.num_processes
+        self.num_warm_start_restarts = settings.num_warm_start_restarts
 
         self.pca = (
             PrincipalComponentAnalysis(self.pca_threshold, perform_scaling=False)
@@ -279,7 +295,134 @@ class GaussianProcessModel:
         else:
             kernel.lengthscale = float(np.median(initial_lengthscales))
 
-    def _fit_pca_and_create_models(self, *, reoptimize=True, num_random_restarts=10):
+    def _use_sparse(self, num_points):
+        """Whether an inducing-point model is used for num_points training points."""
+        return self.sparse_threshold > 0 and num_points > self.sparse_threshold
+
+    def _select_inducing_inputs(self, x, kernel):
+        """
+        Select the inducing inputs of a sparse GP by pivoted Cholesky.
+
+        Training points are added one at a time, each time the point whose
+        kernel variance is explained worst by the points already chosen,
+        until the unexplained variance falls below inducing_tolerance of
+        the total or num_inducing points are chosen. The rank of the
+        approximation therefore adapts to the data and the kernel.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            Training inputs of shape (n_samples, input_dimension).
+        kernel : GPy kernel
+            Kernel with the hyperparameters used to rank the points.
+
+        Returns
+        -------
+        np.ndarray
+            Inducing inputs of shape (num_inducing_points, input_dimension).
+        """
+        max_rank = min(self.num_inducing, x.shape[0])
+        residual = np.array(kernel.Kdiag(x), dtype=float)
+        tolerance = self.inducing_tolerance * residual.sum()
+        factors = np.zeros((max_rank, x.shape[0]))
+        pivots = []
+        for k in range(max_rank):
+            pivot = int(np.argmax(residual))
+            if residual.sum() <= tolerance or residual[pivot] <= 0:
+                break
+            row = kernel.K(x[[pivot]], x)[0] - factors[:k, pivot] @ factors[:k]
+            factors[k] = row / np.sqrt(residual[pivot])
+            residual = np.maximum(residual - factors[k] ** 2, 0)
+            residual[pivot] = 0
+            pivots.append(pivot)
+        return x[pivots]
+
+    def _create_gp(self, x, y, kernel, inducing_inputs=None):
+        """Create an exact GP, or a sparse GP for large training sets."""
+        use_gpy_normalizer = self.output_scaler is None
+        if inducing_inputs is not None or self._use_sparse(x.shape[0]):
+            if inducing_inputs is None:
+                inducing_inputs = self._select_inducing_inputs(x, kernel)
+            gp = GPy.models.SparseGPRegression(
+                X=x,
+                Y=y,
+                kernel=kernel,
+                Z=inducing_inputs,
+                normalizer=use_gpy_normalizer,
+            )
+            gp.inducing_inputs.fix()
+        else:
+            gp = GPy.models.GPRegression(
+                X=x,
+                Y=y,
+                kernel=kernel,
+                mean_function=None,
+                normalizer=use_gpy_normalizer,
+            )
+        self._configure_nugget(gp)
+        return gp
+
+    def _optimize_models(self, num_restarts_list):
+        """Optimize the GP of each component, in parallel when num_processes > 1."""
+        num_processes = min(self.num_processes, len(self.model))
+        if num_processes > 1:
+            with ProcessPoolExecutor(max_workers=num_processes) as executor:
+                optimizer_arrays = list(
+                    executor.map(_optimize_restarts, self.model, num_restarts_list)
+                )
+            for gp, optimizer_array in zip(self.model, optimizer_arrays):
+                gp.optimizer_array = optimizer_array
+        else:
+            for gp, num_restarts in zip(self.model, num_restarts_list):
+                gp.optimize_restarts(num_restarts)
+
+    def _create_component_model(self, x, y, previous_model=None):
+        """
+        Create the GP and the linear trend of one latent output.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            Scaled training inputs of shape (n_samples, input_dimension).
+        y : np.ndarray
+            Latent training outputs of shape (n_samples, 1).
+        previous_model : GPy model, optional
+            Model of the same latent output whose hyperparameters are used
+            as the starting point of the optimization.
+
+        Returns
+        -------
+        tuple
+            The GP and the fitted LinearRegression, or None without a
+            linear mean function.
+        """
+        linear_model = None
+        if self.mean_function_type == 'linear':
+            linear_model = LinearRegression()
+            linear_model.fit(x, y)  # type: ignore
+            y_detrended = y - linear_model.predict(x)  # type: ignore
+        else:
+            y_detrended = y
+
+        kernel_copy = self.kernel.copy()
+        if previous_model is not None:
+            # Warm start from the hyperparameters of the previous model
+            kernel_copy[:] = previous_model.kern.param_array.copy()
+        else:
+            # Data-adaptive lengthscale initialization (always for new models)
+            self._initialize_kernel_lengthscales(
+                kernel_copy, force_initialization=True
+            )
+        self._set_kernel_hyperparameter_bounds(kernel_copy)
+
+        gp = self._create_gp(x, y_detrended, kernel_copy)
+        if previous_model is not None and not self.fix_nugget:
+            gp.likelihood.variance = float(previous_model.likelihood.variance[0])
+        return gp, linear_model
+
+    def _fit_pca_and_create_models(
+        self, *, reoptimize=True, num_random_restarts=10, previous_models=None
+    ):
         self.x_train_scaled = self.apply_input_scaling(self.x_train, fit=True)
         if self.scale_inputs:
             self.loginfo(
@@ -312,46 +455,39 @@ class GaussianProcessModel:
                 'for training GP. Not using PCA.'
             )
 
+        if self._use_sparse(self.x_train_scaled.shape[0]):
+            self.loginfo(
+                f'Using sparse GP models with up to {self.num_inducing} inducing '
+                f'points for {self.x_train_scaled.shape[0]} training points.'
+            )
+
+        previous_models = previous_models or []
         self.model = []
         self.linear_models = []
 
         for i in range(self.output_dimension):
-            x = self.x_train_scaled
             y = np.reshape(y_latent[:, i], (-1, 1))  # type: ignore
-
-            linear_model = None
-            if self.mean_function_type == 'linear':
-                linear_model = LinearRegression()
-                linear_model.fit(x, y)  # type: ignore
-                y_detrended = y - linear_model.predict(x)  # type: ignore
-            else:
-                y_detrended = y
-
-            kernel_copy = self.kernel.copy()
-            # Data-adaptive lengthscale initialization (always for new models)
-            self._initialize_kernel_lengthscales(
-                kernel_copy, force_initialization=True
+            previous_model = previous_models[i] if i < len(previous_models) else None
+            gp, linear_model = self._create_component_model(
+                self.x_train_scaled, y, previous_model
             )
-            self._set_kernel_hyperparameter_bounds(kernel_copy)
-
-            use_gpy_normalizer = self.output_scaler is None
+            self.model.append(gp)
+            self.linear_models.append(linear_model)
 
-            gp = GPy.models.GPRegression(
-                X=x,
-                Y=y_detrended,
-                kernel=kernel_copy,
-                mean_function=None,
-                normalizer=use_gpy_normalizer,
+        if reoptimize:
+            warm_restarts = min(num_random_restarts, self.num_warm_start_restarts)
+            self._optimize_models(
+                [
+                    warm_restarts
+                    if i < len(previous_models)
+                    else num_random_restarts
+                    for i in range(self.output_dimension)
+                ]
             )
-            self._configure_nugget(gp)
-            if reoptimize:
-                gp.optimize_restarts(num_random_restarts)
-            else:
+        else:
+            for gp in self.model:
                 _ = gp.posterior
 
-            self.model.append(gp)
-            self.linear_models.append(linear_model)
-
     def initialize(
         self, x_train, y_train, *, reoptimize=True, num_random_restarts=10
     ):
@@ -381,12 +517,36 @@ class GaussianProcessModel:
             reoptimize=reoptimize, num_random_restarts=num_random_restarts
         )
 
+    def _latent_basis(self):
+        """Principal directions of the latent outputs, or None without PCA."""
+        if self.pca is None or self.pca.pca is None:
+            return None
+        return self.pca.pca.components_[: self.pca.n_components].copy()
+
+    def _same_latent_basis(self, previous_basis):
+        """Whether the latent outputs still have the directions previous_basis."""
+        basis = self._latent_basis()
+        if basis is None or previous_basis is None:
+            return basis is previous_basis
+        if basis.shape != previous_basis.shape:
+            return False
+        # a flipped sign also changes the latent outputs the models were fitted to
+        alignment = np.sum(basis * previous_basis, axis=1)
+        return bool(np.all(alignment >= LATENT_BASIS_ALIGNMENT))
+
     def update_training_dataset(
         self, x_train, y_train, *, reoptimize=False, num_random_restarts=10
     ):
         """
         Add new training data to the Gaussian Process Model.
 
+        While the PCA keeps the latent dimension and basis, the hyperparameters
+        of the current models are used as the starting point of the
+        optimization, which is restarted from random values only
+        num_warm_start_restarts - 1 times. Sparse models are rebuilt so that
+        their inducing inputs are selected from the new data. When the latent
+        basis changes, the models are retrained from scratch.
+
         Parameters
         ----------
         x_train : ndarray
@@ -411,25 +571,25 @@ class GaussianProcessModel:
         self.x_train = inputs
         self.y_train = outputs
 
+        previous_basis = self._latent_basis()
         self.x_train_scaled = self.apply_input_scaling(self.x_train, fit=True)
         y_latent = self._preprocess_outputs(self.y_train, fit=True)
 
-        if self.pca is not None:
-            # self.pca.fit(self.y_train)
-            # y_latent = self.pca.project_to_latent_space(self.y_train)
-            new_latent_dim = int(self.pca.n_components)  # type: ignore
-        else:
-            # y_latent = self.y_train
-            new_latent_dim = self.model_output_dimension
-
-        if (
-            new_latent_dim != self.output_dimension
-        ):  # PCA dimension has changed — retrain all GP models from scratch
-            self.loginfo('Latent dimension changed. Reinitializing GP models.')
-            self.output_dimension = new_latent_dim
+        if not self._same_latent_basis(
+            previous_basis
+        ):  # PCA basis has changed — retrain all GP models from scratch
+            self.loginfo('Latent basis changed. Reinitializing GP models.')
             self._fit_pca_and_create_models(
                 reoptimize=True, num_random_restarts=num_random_restarts
             )
+        elif self._use_sparse(self.x_train_scaled.shape[0]) or any(
+            _is_sparse(gp) for gp in self.model
+        ):  # inducing inputs are reselected for the new training data
+            self._fit_pca_and_create_models(
+                reoptimize=reoptimize,
+                num_random_restarts=num_random_restarts,
+                previous_models=self.model,
+            )
         else:
             for i in range(self.output_dimension):
                 y = np.reshape(y_latent[:, i], (-1, 1))
@@ -445,10 +605,15 @@ class GaussianProcessModel:
                     self.model[i].kern, force_initialization=False
                 )
                 self.model[i].set_XY(self.x_train_scaled, y_detrended)
-                if reoptimize:
-                    self.model[i].optimize_restarts(num_random_restarts)
-                else:
-                    _ = self.model[i].posterior
+
+            if reoptimize:
+                warm_restarts = min(
+                    num_random_restarts, self.num_warm_start_restarts
+                )
+                self._optimize_models([warm_restarts] * self.output_dimension)
+            else:
+                for gp in self.model:
+                    _ = gp.posterior
 
     def predict(self, x_predict):
         """
@@ -539,9 +704,12 @@ class GaussianProcessModel:
                 y_detrended = y
 
             # Step 2: LOO for GP residual
-            posterior = self.model[i].posterior  # type: ignore
-            alpha = posterior.woodbury_vector  # type: ignore # shape (N, 1)
-            k_inv_diag = np.diag(posterior.woodbury_inv)  # type: ignore
+            if _is_sparse(self.model[i]):
+                alpha, k_inv_diag = _sparse_loo_terms(self.model[i])
+            else:
+                posterior = self.model[i].posterior  # type: ignore
+                alpha = posterior.woodbury_vector  # type: ignore # shape (N, 1)
+                k_inv_diag = np.diag(posterior.woodbury_inv)  # type: ignore
 
             # Step 3: Guard against numerical issues
             if np.any(k_inv_diag == 0):
@@ -617,6 +785,9 @@ class GaussianProcessModel:
             'pca_threshold': self.pca_threshold,
             'scale_inputs': self.scale_inputs,
             'scale_outputs': bool(self.output_scaler is not None),
+            'sparse_threshold': self.sparse_threshold,
+            'num_inducing': self.num_inducing,
+            'inducing_tolerance': self.inducing_tolerance,
             'pca_info': self.pca_info,
             'models': [],
         }
@@ -658,6 +829,8 @@ class GaussianProcessModel:
                 },
                 'nugget': float(gp.likelihood.variance[0]),
             }
+            if _is_sparse(gp):
+                params['inducing_inputs'] = gp.inducing_inputs.values.tolist()  # noqa: PD011
 
             if self.linear_models[i] is not None:
                 linear_model = self.linear_models[i]
@@ -698,6 +871,11 @@ class GaussianProcessModel:
         self.pca_threshold = model_params['pca_threshold']
         self.scale_inputs = model_params.get('scale_inputs', True)
         scale_outputs_flag = model_params.get('scale_outputs', True)
+        self.sparse_threshold = model_params.get('sparse_threshold', 0)
+        self.num_inducing = model_params.get('num_inducing', self.num_inducing)
+        self.inducing_tolerance = model_params.get(
+            'inducing_tolerance', self.inducing_tolerance
+        )
 
         # --- Input scaler ---
         self.input_scaler = None
@@ -779,6 +957,15 @@ class GaussianProcessModel:
                 if name in gp.kern.parameter_names():
                     gp.kern[name] = np.array(value['value']).reshape(value['shape'])
 
+            if has_training_data and 'inducing_inputs' in m:
+                gp = self._create_gp(
+                    gp.X,
+                    gp.Y,
+                    gp.kern.copy(),
+                    inducing_inputs=np.array(m['inducing_inputs']),
+                )
+                self.model[i] = gp
+
             gp.likelihood.variance = m['nugget']
             if self.fix_nugget:
                 gp.likelihood.variance.fix()
@@ -794,6 +981,43 @@ class GaussianProcessModel:
                 self.linear_models[i] = None
 
 
+def _is_sparse(gp):
+    return isinstance(gp, GPy.core.SparseGP)
+
+
+def _optimize_restarts(gp, num_restarts):
+    """Optimize a GP in a worker process and return its optimized parameters."""
+    gp.optimize_restarts(num_restarts, verbose=False)
+    return gp.optimizer_array.copy()
+
+
+def _sparse_loo_terms(gp):
+    """
+    Compute the LOO terms of a sparse GP without forming N x N matrices.
+
+    The covariance of the training outputs under the inducing-point
+    approximation is C = Q + s2 * I with Q = Knm Kmm^-1 Kmn. By the
+    Woodbury identity, C^-1 = (I - V' B^-1 V / s2) / s2, where
+    V = Lm^-1 Kmn and B = I + V V' / s2, so alpha = C^-1 y and the
+    diagonal of C^-1 are obtained in O(N m^2).
+
+    Returns
+    -------
+    tuple
+        alpha of shape (N, 1) and the diagonal of C^-1 of shape (N,).
+    """
+    noise_variance = float(gp.likelihood.variance[0])
+    kmm = gp.kern.K(gp.Z) + gp.inference_method.const_jitter * np.eye(gp.Z.shape[0])
+    lm = np.linalg.cholesky(kmm)
+    v = scipy.linalg.solve_triangular(lm, gp.kern.K(gp.Z, gp.X), lower=True)
+    lb = np.linalg.cholesky(np.eye(v.shape[0]) + v @ v.T / noise_variance)
+    w = scipy.linalg.solve_triangular(lb, v, lower=True)
+    y = gp.Y_normalized
+    alpha = (y - w.T @ (w @ y) / noise_variance) / noise_variance
+    k_inv_diag = (1.0 - np.sum(w**2, axis=0) / noise_variance) / noise_variance
+    return alpha, k_inv_diag
+
+
 # ===============
 # Public function
 # ===============
@@ -996,6 +1220,40 @@ def parse_gp_arguments(args=None) -> dict:
         default=True,
         help='Whether to scale outputs before training the GP.',
     )
+    optional.add_argument(
+        '--sparse_threshold',
+        type=int,
+        default=0,
+        help='Use inducing-point GP models when the number of training points '
+        'exceeds this value (0: always use exact GP models).',
+    )
+    optional.add_argument(
+        '--num_inducing',
+        type=int,
+        default=500,
+        help='Maximum number of inducing points of a sparse GP model.',
+    )
+    optional.add_argument(
+        '--inducing_tolerance',
+        type=float,
+        default=1e-6,
+        help='Fraction of the kernel variance left unexplained by the inducing '
+        'points at which their selection stops.',
+    )
+    optional.add_argument(
+        '--num_processes',
+        type=int,
+        default=1,
+        help='Number of processes used to optimize the GP models of different '
+        'output components in parallel.',
+    )
+    optional.add_argument(
+        '--num_warm_start_restarts',
+        type=int,
+        default=2,
+        help='Number of optimizer restarts, including the one from the previous '
+        'hyperparameters, when the training dataset is updated.',
+    )
 
     parsed_args = parser.parse_args(args)
     return vars(parsed_args)
@@ -20,6 +20,9 @@ from scipy.special import logsumexp
 
 safer_cholesky = SaferCholesky(debug=True)
 
+# samples are stored as arrays of shape (number of samples, dimension)
+SAMPLES_NDIM = 2
+
 
 def _calculate_weights_warm_start(
     beta, current_loglikelihood_values, previous_loglikelihood_values
@@ -489,7 +492,7 @@ def metropolis_step(
     logtarget : float
         Log of the tempered target density of the accepted sample.
     """
-    if current_x.ndim != 2 or current_x.shape[0] != 1:
+    if current_x.ndim != SAMPLES_NDIM or current_x.shape[0] != 1:
         msg = f'current_x must be shape (1, d), got {current_x.shape}'
         raise ValueError(msg)
     if current_x_model.shape != current_x.shape:
@@ -597,6 +600,188 @@ def run_mcmc_chain(
     return current_x, current_x_model, loglike_current, logtarget_current, num_accept
 
 
+def _as_batch_values(values, num_chains, label):
+    """Flatten per-chain values returned by a model function to shape (n,)."""
+    values = np.asarray(values, dtype=float).reshape(-1)
+    if values.size != num_chains:
+        msg = f'{label} must return {num_chains} values, got {values.size}'
+        raise ValueError(msg)
+    return values
+
+
+def metropolis_step_vectorized(
+    current_x,  # shape: (n, d)
+    current_x_model,  # shape: (n, d)
+    loglike_current,
+    logtarget_current,
+    proposal_chol,
+    beta,
+    rng,
+    log_likelihood_fn,
+    log_prior_fn,
+    sample_transformation_fn,
+    step_num=0,
+):
+    """
+    Perform one Metropolis-Hastings step of a population of chains at once.
+
+    Every chain proposes a new sample from the same Cholesky-based Gaussian
+    proposal, the model functions are called once with all the proposals,
+    and the proposals are accepted or rejected independently per chain.
+
+    Parameters
+    ----------
+    current_x : np.ndarray
+        Current samples in latent space, shape (n, d).
+    current_x_model : np.ndarray
+        Corresponding model-space samples, shape (n, d).
+    loglike_current : np.ndarray
+        Log-likelihoods of the current model-space samples, shape (n,).
+    logtarget_current : np.ndarray
+        Log of the tempered target density at the current samples, shape (n,).
+    proposal_chol : np.ndarray
+        Lower Cholesky factor of the proposal covariance matrix, shape (d, d).
+    beta : float
+        Current tempering parameter for TMCMC.
+    rng : np.random.Generator
+        Random number generator instance.
+    log_likelihood_fn : callable
+        Function that computes log-likelihoods given model-space samples of shape (n, d).
+    log_prior_fn : callable
+        Function that computes log-priors given model-space samples of shape (n, d).
+    sample_transformation_fn : callable
+        Function mapping latent-space samples of shape (n, d) to model space (n, d).
+    step_num : int, optional
+        Step number passed to the log-likelihood function as simulation_number.
+
+    Returns
+    -------
+    new_x : np.ndarray
+        Samples in latent space after the step, shape (n, d).
+    new_x_model : np.ndarray
+        Corresponding samples in model space, shape (n, d).
+    loglike : np.ndarray
+        Log-likelihoods of the samples, shape (n,).
+    logtarget : np.ndarray
+        Log of the tempered target density of the samples, shape (n,).
+    accept : np.ndarray
+        Boolean array of shape (n,) marking the chains that moved.
+    """
+    if current_x.ndim != SAMPLES_NDIM:
+        msg = f'current_x must be shape (n, d), got {current_x.shape}'
+        raise ValueError(msg)
+    if current_x_model.shape != current_x.shape:
+        msg = f'current_x_model must match current_x shape: got {current_x_model.shape}'
+        raise ValueError(msg)
+
+    n, d = current_x.shape
+    if proposal_chol.shape != (d, d):
+        msg = f'proposal_chol must be shape ({d}, {d}), got {proposal_chol.shape}'
+        raise ValueError(msg)
+
+    # --- Propose new latent space samples for all chains ---
+    proposal_x = current_x + rng.standard_normal((n, d)) @ proposal_chol.T
+
+    # --- Map to model space and evaluate the whole batch ---
+    proposal_x_model = np.reshape(sample_transformation_fn(proposal_x), (n, d))
+    loglike = _as_batch_values(
+        log_likelihood_fn(proposal_x_model, simulation_number=step_num),
+        n,
+        'log_likelihood_fn',
+    )
+    logprior = _as_batch_values(log_prior_fn(proposal_x_model), n, 'log_prior_fn')
+    logtarget = beta * loglike + logprior
+
+    # --- Accept/reject each chain ---
+    log_alpha = logtarget - logtarget_current
+    accept = np.log(rng.uniform(size=n)) < log_alpha
+    return (
+        np.where(accept[:, None], proposal_x, current_x),
+        np.where(accept[:, None], proposal_x_model, current_x_model),
+        np.where(accept, loglike, loglike_current),
+        np.where(accept, logtarget, logtarget_current),
+        accept,
+    )
+
+
+def run_mcmc_chains_vectorized(
+    initial_x,
+    initial_x_model,
+    loglike_initial,
+    logtarget_initial,
+    proposal_chol,
+    beta,
+    log_likelihood_fn,
+    log_prior_fn,
+    sample_transformation_fn,
+    rng,
+    num_steps,
+):
+    """
+    Run a population of MCMC chains of equal length in lockstep.
+
+    Parameters
+    ----------
+    initial_x : np.ndarray
+        Initial samples in latent space, shape (n, d).
+    initial_x_model : np.ndarray
+        Corresponding model-space samples, shape (n, d).
+    loglike_initial : np.ndarray
+        Log-likelihoods of the initial model-space samples, shape (n,).
+    logtarget_initial : np.ndarray
+        Log of the tempered target density at the initial samples, shape (n,).
+    proposal_chol : np.ndarray
+        Cholesky factor of the fixed proposal covariance matrix, shape (d, d).
+    beta : float
+        Current tempering parameter.
+    log_likelihood_fn, log_prior_fn, sample_transformation_fn : callable
+        Model functions, called with all the chains at once.
+    rng : np.random.Generator
+        Random number generator.
+    num_steps : int
+        Number of Metropolis-Hastings steps to run.
+
+    Returns
+    -------
+    final_x : np.ndarray
+        Final latent space samples (n, d).
+    final_x_model : np.ndarray
+        Final model space samples (n, d).
+    loglike : np.ndarray
+        Final log-likelihoods (n,).
+    logtarget : np.ndarray
+        Final log-target densities (n,).
+    num_accept : np.ndarray
+        Number of accepted proposals of each chain (n,).
+    """
+    current_x = initial_x
+    current_x_model = initial_x_model
+    loglike_current = loglike_initial
+    logtarget_current = logtarget_initial
+
+    num_accept = np.zeros(initial_x.shape[0], dtype=int)
+
+    for step in range(num_steps):
+        current_x, current_x_model, loglike_current, logtarget_current, accept = (
+            metropolis_step_vectorized(
+                current_x,
+                current_x_model,
+                loglike_current,
+                logtarget_current,
+                proposal_chol,
+                beta,
+                rng,
+                log_likelihood_fn,
+                log_prior_fn,
+                sample_transformation_fn,
+                step,
+            )
+        )
+        num_accept += accept
+
+    return current_x, current_x_model, loglike_current, logtarget_current, num_accept
+
+
 def run_one_stage_equal_chain_lengths(
     samples,
     model_parameters,
@@ -612,6 +797,7 @@ def run_one_stage_equal_chain_lengths(
     num_burn_in=0,
     thinning_factor=2,
     run_type='runningLocal',
+    vectorized=False,  # noqa: FBT002
 ):
     """
     Run one TMCMC stage with equal-length MCMC chains and fixed proposal scale.
@@ -643,6 +829,12 @@ def run_one_stage_equal_chain_lengths(
     thinning_factor : int
         If >1 and beta=1, the chain will run num_steps * thinning_factor steps after burn-in.
         Only the last sample is returned.
+    run_type : str
+        The run type ("runningLocal" or "runningRemote") of the parallel pool.
+    vectorized : bool
+        If True, all chains are advanced together in this process and the
+        model functions are called once per step with the proposals of all
+        chains, shape (N, d), instead of running each chain in the pool.
 
     Returns
     -------
@@ -718,6 +910,51 @@ def run_one_stage_equal_chain_lengths(
         f'Total number of model evaluations = {total_num_model_evaluations}'
     )
 
+    if vectorized:
+        x = samples[chain_starting_indices, :]
+        x_model = model_parameters[chain_starting_indices, :]
+        loglike = np.reshape(log_likelihood_values, -1)[chain_starting_indices]
+        logprior = _as_batch_values(
+            log_prior_fn(x_model), num_samples, 'log_prior_fn'
+        )
+        logtarget = new_beta * loglike + logprior
+        logging_msg_list.append(
+            f'Running {num_samples} chains together, one batch of proposals per step'
+        )
+        (
+            new_samples,
+            new_model_parameters,
+            new_log_likelihoods,
+            new_log_target_densities,
+            num_accepts,
+        ) = run_mcmc_chains_vectorized(
+            x,
+            x_model,
+            loglike,
+            logtarget,
+            proposal_chol,
+            new_beta,
+            log_likelihood_fn,
+            log_prior_fn,
+            sample_transformation_fn,
+            default_rng(ss.spawn(1)[0]),
+            chain_length,
+        )
+        logging_msg_list.append(
+            f'{total_num_model_evaluations} model evaluations completed'
+        )
+        return (
+            new_samples,
+            new_model_parameters,
+            new_log_likelihoods.reshape(np.shape(log_likelihood_values)),
+            new_log_target_densities.reshape(np.shape(log_likelihood_values)),
+            new_beta,
+            log_evidence,
+            total_num_model_evaluations,
+            np.sum(num_accepts),
+            logging_msg_list,
+        )
+
     # Build job arguments for each chain
     job_args = []
     for i, idx in enumerate(chain_starting_indices):
@@ -886,6 +1123,9 @@ class TMCMC:
             The run type ("runningLocal" or "runningRemote"). Defaults to "runningLocal".
     run_parallel : bool
         Whether to evaluate MCMC chains in parallel.
+    vectorized : bool
+        Whether to advance all MCMC chains of a stage together, with one
+        batched call of the model functions per step.
     num_steps : int
         Number of MCMC steps per chain.
     cov_threshold : float
@@ -905,6 +1145,7 @@ class TMCMC:
         seed=None,
         run_type='runningLocal',
         run_parallel=True,
+        vectorized=False,
         cov_threshold=1,
         num_steps=1,
         thinning_factor=10,
@@ -928,6 +1169,11 @@ class TMCMC:
             The run type ("runningLocal" or "runningRemote"). Defaults to "runningLocal".
         run_parallel : bool, optional
             Whether to run chains in parallel using parallel_evaluation_function. Defaults to True.
+        vectorized : bool, optional
+            Whether to run equal-length chains in lockstep in this process,
+            calling the log-likelihood, log-prior and sample transformation
+            functions once per step with the samples of all chains, shape
+            (n_chains, d). Takes precedence over run_parallel. Defaults to False.
         cov_threshold : float, optional
             Coefficient of variation threshold (unused in current implementation). Defaults to 1.
         num_steps : int, optional
@@ -955,6 +1201,7 @@ class TMCMC:
             self._sample_transformation_function = sample_transformation_function
             self.run_type = run_type
             self.run_parallel = run_parallel
+            self.vectorized = vectorized
             self._seed = seed
             self.num_steps = num_steps
             self.cov_threshold = cov_threshold
@@ -1038,7 +1285,7 @@ class TMCMC:
                     #     f'Stage {stage_num} | Current β = {betas_dict[stage_num]:.4f}'
                     # ):
                     seed = seed_sequence.spawn(1)[0].entropy
-                    if self.run_parallel:
+                    if self.run_parallel or self.vectorized:
                         (
                             new_samples,
                             new_model_parameters,
@@ -1064,6 +1311,7 @@ class TMCMC:
                             num_burn_in=num_burn_in,
                             thinning_factor=self.thinning_factor,
                             run_type=self.run_type,
+                            vectorized=self.vectorized,
                         )
                     else:
                         (
@@ -1134,7 +1382,7 @@ class TMCMC:
                                 scale_factor_dict[i] = (
                                     scale_factor_dict[i] * 0.8 + scale_factor * 0.2
                                 )
-                        if self.run_parallel:
+                        if self.run_parallel or self.vectorized:
                             self.loginfo(
                                 f'Adjusted scale factor = {scale_factor:.4f}, ({adapt_message})'
                             )
@@ -2,6 +2,7 @@ import glob  # noqa: D100, INP001
 import json
 import os
 import shutil
+import socket
 import subprocess
 import sys
 import traceback
@@ -65,6 +66,40 @@ def _append_msg_in_out_file(msg, out_file_name: str = 'ops.out') -> str:
     return msg
 
 
+def _snapshot_workdir(workdir: str) -> dict:
+    # size and modification time of everything in a workdir, used to find
+    # what a model evaluation added or changed
+    snapshot = {}
+    for root, dirs, files in os.walk(workdir):
+        for directory in dirs:
+            path = os.path.join(root, directory)  # noqa: PTH118
+            snapshot[os.path.relpath(path, workdir)] = None
+        for file in files:
+            path = os.path.join(root, file)  # noqa: PTH118
+            stat = os.stat(path)  # noqa: PTH116
+            snapshot[os.path.relpath(path, workdir)] = (
+                stat.st_size,
+                stat.st_mtime_ns,
+            )
+    return snapshot
+
+
+# persistent workdirs of this process and the snapshot taken after they were
+# populated from the template directories
+_persistent_workdirs = {}
+
+
+def remove_persistent_workdirs(run_directory, workdir_prefix: str = 'workdir') -> None:
+    """Remove the persistent workdirs that the worker processes left in run_directory."""
+    # persistent workdirs are named <prefix>.<host>.<pid>, the workdirs of
+    # single evaluations <prefix>.<number>
+    pattern = os.path.join(run_directory, f'{workdir_prefix}.*.*')  # noqa: PTH118
+    for workdir in glob.glob(pattern):  # noqa: PTH207
+        if os.path.isdir(workdir):  # noqa: PTH112
+            shutil.rmtree(workdir, ignore_errors=True)
+    _persistent_workdirs.clear()
+
+
 class ModelEvaluationError(Exception):  # noqa: D101
     def __init__(self, msg: str) -> None:
         super().__init__(msg)
@@ -80,6 +115,7 @@ class SimCenterWorkflowDriver:  # noqa: D101
         length_of_results: int,
         workdir_prefix: str = 'workdir',
         ignore_nans: bool = True,  # noqa: FBT001, FBT002
+        persistent_workdir: bool = False,  # noqa: FBT001, FBT002
     ) -> None:
         self.full_path_of_tmpSimCenter_dir = full_path_of_tmpSimCenter_dir
         self.list_of_dir_names_to_copy_files_from = (
@@ -90,6 +126,9 @@ class SimCenterWorkflowDriver:  # noqa: D101
         self.length_of_results = length_of_results
         self.workdir_prefix = workdir_prefix
         self.ignore_nans = ignore_nans
+        # when set, every worker process keeps one workdir for all of its
+        # model evaluations and only restores the files a run added or changed
+        self.persistent_workdir = persistent_workdir
 
         self.num_rv = len(self.list_of_rv_names)
 
@@ -126,11 +165,57 @@ class SimCenterWorkflowDriver:  # noqa: D101
                     msg = f'Could not remove directory {directory} from {workdir}.'
                     raise ModelEvaluationError(msg) from ex
 
+        self._copy_files_to_workdir(workdir)
+        return workdir
+
+    def _copy_files_to_workdir(self, workdir: str) -> None:
         for src_dir in self.list_of_dir_names_to_copy_files_from:
             src = os.path.join(self.full_path_of_tmpSimCenter_dir, src_dir)  # noqa: PTH118
             msg = _copytree(src, workdir)
             if msg != '0':
                 raise ModelEvaluationError(msg)
+
+    def _get_persistent_workdir(self) -> str:
+        # the workdir is named after the host and process, so workers on
+        # different nodes sharing a file system do not collide
+        workdir = os.path.join(  # noqa: PTH118
+            self.full_path_of_tmpSimCenter_dir,
+            f'{self.workdir_prefix}.{socket.gethostname()}.{os.getpid()}',
+        )
+        snapshot = _persistent_workdirs.get(workdir)
+        if snapshot is None:
+            if os.path.exists(workdir):  # noqa: PTH110
+                shutil.rmtree(workdir)
+            self._copy_files_to_workdir(workdir)
+            _persistent_workdirs[workdir] = _snapshot_workdir(workdir)
+            return workdir
+
+        # remove what the previous evaluation added or changed, then copy the
+        # changed template files again
+        for root, dirs, files in os.walk(workdir):
+            for directory in list(dirs):
+                path = os.path.join(root, directory)  # noqa: PTH118
+                if os.path.relpath(path, workdir) not in snapshot:
+                    try:
+                        shutil.rmtree(path)
+                    except Exception as ex:
+                        msg = f'Could not remove directory {directory} from {workdir}.'
+                        raise ModelEvaluationError(msg) from ex
+                    dirs.remove(directory)
+            for file in files:
+                path = os.path.join(root, file)  # noqa: PTH118
+                stat = os.stat(path)  # noqa: PTH116
+                if snapshot.get(os.path.relpath(path, workdir)) != (
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                ):
+                    try:
+                        os.chmod(path, 0o777)  # noqa: S103, PTH101
+                        os.unlink(path)  # noqa: PTH108
+                    except Exception as ex:
+                        msg = f'Could not remove file {file} from {workdir}.'
+                        raise ModelEvaluationError(msg) from ex
+        self._copy_files_to_workdir(workdir)
         return workdir
 
     def _create_params_file(self, sample_values: NDArray, workdir: str) -> None:
@@ -192,7 +277,10 @@ class SimCenterWorkflowDriver:  # noqa: D101
         try:
             sample_values = np.atleast_2d(sample_values)
             self._check_size_of_sample(sample_values)
-            workdir = self._create_workdir(simulation_number)
+            if self.persistent_workdir:
+                workdir = self._get_persistent_workdir()
+            else:
+                workdir = self._create_workdir(simulation_number)
             self._create_params_file(sample_values, workdir)
             self._execute_driver_file(workdir)
             outputs = self._read_outputs_from_results_file(workdir)
@@ -394,6 +482,7 @@ def create_default_model(  # noqa: D103
     driver_filename,
     length_of_results,
     workdir_prefix,
+    persistent_workdir=False,  # noqa: FBT002
 ):
     model = SimCenterWorkflowDriver(
         full_path_of_tmpSimCenter_dir=run_directory,
@@ -402,6 +491,7 @@ def create_default_model(  # noqa: D103
         driver_filename=driver_filename,
         length_of_results=length_of_results,
         workdir_prefix=workdir_prefix,
+        persistent_workdir=persistent_workdir,
     )
     return model  # noqa: RET504
 
@@ -432,6 +522,7 @@ def get_default_model(  # noqa: D103
     run_directory,
     driver_filename='driver',
     workdir_prefix='workdir',
+    persistent_workdir=False,  # noqa: FBT002
 ):
     list_of_rv_names = make_list_of_rv_names(list_of_rv_data)
     length_of_results = get_length_of_results(edp_data)
@@ -446,6 +537,7 @@ def get_default_model(  # noqa: D103
         driver_filename,
         length_of_results,
         workdir_prefix,
+        persistent_workdir,
     )
     return model  # noqa: RET504
 
@@ -397,6 +397,62 @@ def set_settings_data(input_json, rewet_input_data, input_dir):
     rewet_input_data['settings']['Pipe_damage_input_method'] = 'pickle'
 
 
+def create_damage_input_files(  # noqa: PLR0913
+    run_dir,
+    dl_file_path,
+    scn_numbers,
+    event_time,
+    sc_geojson,
+    damage_save_path,
+):
+    """Create the REWET damage files of a batch of scenarios.
+
+    The damage of all scenarios is read into one damage index, so the asset
+    source file and the AIM file of each asset are read only once, and then
+    the damage files of every scenario are written from the index.
+
+    Parameters
+    ----------
+    run_dir : path
+        Run Directory.
+    dl_file_path : path
+        Path to the damage file. If None, the damage file of each scenario
+        is found in run_dir.
+    scn_numbers : list
+        Damage scenario numbers.
+    event_time : int
+        Time of the event.
+    sc_geojson : path
+        Asset source GeoJSON file of the water network.
+    damage_save_path : path
+        path to the damage directory.
+
+    Returns
+    -------
+    scenario_table : List
+        Scenario table in the records format.
+
+    """
+    damage_index = damage_convertor.DamageIndex(run_dir, sc_geojson)
+    for scn_number in scn_numbers:
+        scn_dl_file_path, _ = get_dl_file_name(run_dir, dl_file_path, scn_number)
+        damage_index.add_realization(scn_number, scn_dl_file_path)
+
+    scenario_table = preprocessorIO.create_scneario_table()
+    for scn_number in scn_numbers:
+        damage_data = damage_index.create_rewet_damage(scn_number, event_time)
+
+        cur_damage_file_name_list = preprocessorIO.save_damage_data(
+            damage_save_path, damage_data, scn_number
+        )
+
+        scenario_table = preprocessorIO.update_scenario_table(
+            scenario_table, cur_damage_file_name_list, scn_number
+        )
+
+    return scenario_table
+
+
 def create_path(path):
     """
     Create a path.
@@ -566,8 +622,6 @@ if __name__ == '__main__':
             rewet_input_data, damage_save_path, parser_data.number
         )
 
-        scenario_table = preprocessorIO.create_scneario_table()
-
         if parser_data.number is None:
             Damage_file_name = list(range(number_of_realization))
 
@@ -576,22 +630,14 @@ if __name__ == '__main__':
 
         damage_save_path = scneario_list_path.parent
 
-        for scn_number in Damage_file_name:
-            dl_file_path, dl_file_dir = get_dl_file_name(
-                run_dir, parser_data.dir, scn_number
-            )
-
-            damage_data = damage_convertor.read_damage_file(
-                dl_file_path, run_dir, event_time, sc_geojson
-            )
-
-            cur_damage_file_name_list = preprocessorIO.save_damage_data(
-                damage_save_path, damage_data, scn_number
-            )
-
-            scenario_table = preprocessorIO.update_scenario_table(
-                scenario_table, cur_damage_file_name_list, scn_number
-            )
+        scenario_table = create_damage_input_files(
+            run_dir,
+            parser_data.dir,
+            Damage_file_name,
+            event_time,
+            sc_geojson,
+            damage_save_path,
+        )
 
         preprocessorIO.save_scenario_table(
             scenario_table, rewet_input_data['settings']['pipe_damage_file_list']
@@ -43,23 +43,207 @@ CBIG_int = int(1e9)
 LEAK_VALUE = 1
 BREAK_VALUE = 2
 
+DAMAGE_TABLE_COLUMNS = {
+    'Pipe': [
+        'scn_number',
+        'asset_id',
+        'pipe_id',
+        'segment_count',
+        'damage_rank',
+        'damage_state',
+        'Material',
+    ],
+    'Node': ['scn_number', 'asset_id', 'number_of_damages', 'Total_length'],
+    'Pump': ['scn_number', 'asset_id', 'damage_state', 'Repair'],
+    'Tank': ['scn_number', 'asset_id', 'damage_state', 'Repair'],
+}
+
+
+class DamageIndex:
+    """Columnar index of the WaterDistributionNetwork damage of realizations.
+
+    The asset source GeoJSON is read once, the AIM file of an asset is read
+    the first time the asset is met, and the PELICUN damage file of each
+    realization is read once. The damage of all realizations is kept in one
+    table per element type, with a row per damaged element (per damaged
+    segment for pipes) holding the asset id, the element attributes and the
+    damage state, so the REWET damage of any realization is a slice of the
+    tables.
 
-def create_pipe_damage_input_for_rewet(
-    pipe_damage_data, run_dir, event_time, sc_geojson
-):
+    Parameters
+    ----------
+    run_dir : path
+        The directory where data is stored (aka the R2dTool directory).
+    sc_geojson : path
+        Asset source GeoJSON file of the water network.
+
+    """
+
+    def __init__(self, run_dir, sc_geojson):
+        self.run_dir = run_dir
+        sc_geojson_file = preprocessorIO.read_json_file(sc_geojson)
+        self.pipe_index_to_id = {
+            str(ss['id']): ss['properties']['InpID']
+            for ss in sc_geojson_file['features']
+            if ss['properties']['type'] == 'Pipe'
+        }
+        self.aim_data = {}
+        self.scn_numbers = []
+        self._rows = {element: [] for element in DAMAGE_TABLE_COLUMNS}
+        self._tables = None
+
+    def read_aim_file(self, asset_id, asset_sub_type):
+        """Return the AIM file data of an asset, reading it only once."""
+        key = (asset_sub_type, asset_id)
+        if key not in self.aim_data:
+            self.aim_data[key] = find_read_aim_file(
+                asset_id, 'WaterDistributionNetwork', asset_sub_type, self.run_dir
+            )
+        return self.aim_data[key]
+
+    def add_realization(self, scn_number, file_addr):
+        """Add the damage of a realization to the index.
+
+        Parameters
+        ----------
+        scn_number : int
+            Damage scenario number.
+        file_addr : path
+            PELICUN damage file in JSON format.
+
+        Raises
+        ------
+        ValueError
+            If damage type is not what it should be.
+
+        """
+        damage_data = preprocessorIO.read_json_file(file_addr)
+        wn_damage_data = damage_data['WaterDistributionNetwork']
+        self.scn_numbers.append(scn_number)
+        self._tables = None
+
+        self._add_pipe_damage(scn_number, wn_damage_data.get('Pipe', {}))
+        self._add_node_damage(scn_number, wn_damage_data.get('Junction', {}))
+        for element in ['Pump', 'Tank']:
+            for asset_id, cur_data in wn_damage_data.get(element, {}).items():
+                # damage state 0 means undamaged element
+                if cur_data['Damage'] == 0:
+                    continue
+                self._rows[element].append(
+                    (scn_number, asset_id, cur_data['Damage'], cur_data['Repair'])
+                )
+
+    def _add_pipe_damage(self, scn_number, pipe_damage_data):
+        # one row per damaged segment of a pipe
+        for pipe_id, cur_data in pipe_damage_data.items():
+            cur_damage = cur_data['Damage']
+            material = None
+            aggregates_list = [
+                cur_agg
+                for cur_agg in list(cur_damage.keys())
+                if 'aggregate' in cur_agg
+            ]
+            damage_rank = 0
+            for cur_agg in aggregates_list:
+                damage_val = cur_damage[cur_agg]
+                if damage_val <= 0:
+                    continue
+                if damage_val not in {LEAK_VALUE, BREAK_VALUE}:
+                    raise ValueError('The damage type must be either 1 or 2')  # noqa: EM101, TRY003
+                if material is None:
+                    aim_data = self.read_aim_file(pipe_id, 'Pipe')
+                    material = aim_data['GeneralInformation'].get('Material', None)
+                    # If material is not ptovided, then the material is CI as the default
+                    if material is None:
+                        material = 'CI'
+                self._rows['Pipe'].append(
+                    (
+                        scn_number,
+                        pipe_id,
+                        self.pipe_index_to_id[pipe_id],
+                        len(aggregates_list),
+                        damage_rank,
+                        damage_val,
+                        material,
+                    )
+                )
+                damage_rank += 1
+
+    def _add_node_damage(self, scn_number, node_damage_data):
+        for node_id, cur_data in node_damage_data.items():
+            aggregates_list = [
+                cur_agg
+                for cur_agg in list(cur_data.keys())
+                if 'aggregate' in cur_agg
+            ]
+            if len(aggregates_list) == 0:
+                continue
+            aim_data = self.read_aim_file(node_id, 'Node')
+            self._rows['Node'].append(
+                (
+                    scn_number,
+                    node_id,
+                    cur_data['Damage']['aggregate'],
+                    aim_data['GeneralInformation'].get('Total_length', None),
+                )
+            )
+
+    @property
+    def tables(self):
+        """dict: Damage table of each element type for all realizations."""
+        if self._tables is None:
+            self._tables = {
+                element: pd.DataFrame(rows, columns=DAMAGE_TABLE_COLUMNS[element])
+                for element, rows in self._rows.items()
+            }
+        return self._tables
+
+    def get_damage(self, scn_number, element):
+        """Return the damage table rows of an element type in a realization."""
+        table = self.tables[element]
+        return table[table['scn_number'] == scn_number]
+
+    def create_rewet_damage(self, scn_number, event_time):
+        """Create the REWET-style damage of a realization.
+
+        Parameters
+        ----------
+        scn_number : int
+            Damage scenario number.
+        event_time : int
+            Time of the event.
+
+        Returns
+        -------
+        damage_data : dict
+            REWET-style damage data of pipes, tanks, pumps and nodes.
+
+        """
+        damage_data = {}
+        damage_data['Pipe'] = create_pipe_damage_input_for_rewet(
+            self.get_damage(scn_number, 'Pipe'), event_time
+        )
+        damage_data['Tank'] = create_tank_damage_input_for_rewet(
+            self.get_damage(scn_number, 'Tank'), event_time
+        )
+        damage_data['Pump'] = create_pump_damage_input_for_rewet(
+            self.get_damage(scn_number, 'Pump'), event_time
+        )
+        damage_data['Node'] = create_node_damage_input_for_rewet(
+            self.get_damage(scn_number, 'Node'), event_time
+        )
+        return damage_data
+
+
+def create_pipe_damage_input_for_rewet(pipe_damage, event_time):
     """Create REWET-style pipe damage file.
 
     Parameters
     ----------
-    pipe_damage_data : dict
-        Pipe damage data from PELICUN.
-    rewet_input_data : dict
-        REWET input data.
-
-    Raises
-    ------
-    ValueError
-        If damage type is not what it should be.
+    pipe_damage : Pandas DataFrame
+        Damaged pipe segments of a scenario from DamageIndex.
+    event_time : int
+        Time of the event.
 
     Returns
     -------
@@ -67,67 +251,24 @@ def create_pipe_damage_input_for_rewet(
         REWET-style pipe damage file.
 
     """
-    pipe_id_list = list(pipe_damage_data.keys())
-
-    damage_list = []
     damage_time = event_time
-    sc_geojson_file = preprocessorIO.read_json_file(sc_geojson)
-    pipe_data = [
-        ss
-        for ss in sc_geojson_file['features']
-        if ss['properties']['type'] == 'Pipe'
-    ]
-    pipe_index = [str(ss['id']) for ss in pipe_data]
-    pipe_id = [ss['properties']['InpID'] for ss in pipe_data]
-    pipe_index_to_id = dict(zip(pipe_index, pipe_id))
-
-    for pipe_id in pipe_id_list:
-        cur_data = pipe_damage_data[pipe_id]
-
-        cur_damage = cur_data['Damage']
+    segment_step = 1 / pipe_damage['segment_count']
+    damage_loc = pipe_damage['damage_rank'] * segment_step + segment_step / 2
+    damage_type = pipe_damage['damage_state'].map(
+        {LEAK_VALUE: 'leak', BREAK_VALUE: 'break'}
+    )
 
-        aim_data = find_read_aim_file(
-            pipe_id,
-            'WaterDistributionNetwork',
-            'Pipe',
-            run_dir,
+    damage_list = [
+        {
+            'pipe_id': pipe_id,
+            'damage_loc': cur_loc,
+            'type': cur_type,
+            'Material': material,
+        }
+        for pipe_id, cur_loc, cur_type, material in zip(
+            pipe_damage['pipe_id'], damage_loc, damage_type, pipe_damage['Material']
         )
-
-        material = aim_data['GeneralInformation'].get('Material', None)
-
-        # If material is not ptovided, then the material is CI as the default
-        if material is None:
-            material = 'CI'
-
-        aggregates_list = [
-            cur_agg for cur_agg in list(cur_damage.keys()) if 'aggregate' in cur_agg
-        ]
-        segment_sizes = len(aggregates_list)
-        segment_step = 1 / segment_sizes
-        c = 0
-
-        for cur_agg in aggregates_list:
-            damage_val = cur_damage[cur_agg]
-            if damage_val > 0:
-                if damage_val == LEAK_VALUE:
-                    damage_type = 'leak'
-                elif damage_val == BREAK_VALUE:
-                    damage_type = 'break'
-                else:
-                    raise ValueError('The damage type must be either 1 or 2')  # noqa: EM101, TRY003
-            else:
-                continue
-
-            cur_loc = c * segment_step + segment_step / 2
-            c += 1
-            damage_list.append(
-                {
-                    'pipe_id': pipe_index_to_id[pipe_id],
-                    'damage_loc': cur_loc,
-                    'type': damage_type,
-                    'Material': material,
-                }
-            )
+    ]
     damage_list.reverse()
     pipe_damage_list = pd.Series(
         data=damage_list, index=[damage_time for val in damage_list], dtype='O'
@@ -136,15 +277,15 @@ def create_pipe_damage_input_for_rewet(
     return pipe_damage_list  # noqa: RET504
 
 
-def create_node_damage_input_for_rewet(node_damage_data, run_dir, event_time):
+def create_node_damage_input_for_rewet(node_damage, event_time):
     """Create REWET-style node damage file.
 
     Parameters
     ----------
-    node_damage_data : dict
-        Node damage data from PELICUN.
-    rewet_input_data : dict
-        REWET input data.
+    node_damage : Pandas DataFrame
+        Damaged nodes of a scenario from DamageIndex.
+    event_time : int
+        Time of the event.
 
     Returns
     -------
@@ -152,41 +293,20 @@ def create_node_damage_input_for_rewet(node_damage_data, run_dir, event_time):
         REWET-style node damage file.
 
     """
-    node_id_list = node_damage_data.keys()
-
-    damage_list = []
     damage_time = event_time
 
-    for node_id in node_id_list:
-        cur_damage = node_damage_data[node_id]
-        aggregates_list = [
-            cur_agg for cur_agg in list(cur_damage.keys()) if 'aggregate' in cur_agg
-        ]
-
-        if len(aggregates_list) == 0:
-            continue
-
-        cur_data = node_damage_data[node_id]
-
-        cur_damage = cur_data['Damage']
-
-        aim_data = find_read_aim_file(
-            node_id,
-            'WaterDistributionNetwork',
-            'Node',
-            run_dir,
-        )
-
-        total_length = aim_data['GeneralInformation'].get('Total_length', None)
-        total_number_of_damages = cur_damage['aggregate']
-
-        damage_list.append(
-            {
-                'node_name': node_id,
-                'number_of_damages': total_number_of_damages,
-                'node_Pipe_Length': total_length,
-            }
+    damage_list = [
+        {
+            'node_name': node_id,
+            'number_of_damages': total_number_of_damages,
+            'node_Pipe_Length': total_length,
+        }
+        for node_id, total_number_of_damages, total_length in zip(
+            node_damage['asset_id'],
+            node_damage['number_of_damages'],
+            node_damage['Total_length'],
         )
+    ]
 
     node_damage_list = pd.Series(
         data=damage_list, index=[damage_time for val in damage_list], dtype='O'
@@ -195,15 +315,15 @@ def create_node_damage_input_for_rewet(node_damage_data, run_dir, event_time):
     return node_damage_list  # noqa: RET504
 
 
-def create_pump_damage_input_for_rewet(pump_damage_data, rewet_input_data):
+def create_pump_damage_input_for_rewet(pump_damage, event_time):
     """Create REWET-style pump damage file.
 
     Parameters
     ----------
-    pump_damage_data : dict
-        Pump damage data from PELICUN.
-    rewet_input_data : dict
-        REWET input data.
+    pump_damage : Pandas DataFrame
+        Damaged pumps of a scenario from DamageIndex.
+    event_time : int
+        Time of the event.
 
     Returns
     -------
@@ -211,51 +331,36 @@ def create_pump_damage_input_for_rewet(pump_damage_data, rewet_input_data):
         REWET-style pump damage file.
 
     """
-    pump_id_list = list(pump_damage_data.keys())
-
-    damage_list = []
-    damage_time = rewet_input_data['event_time']
-
-    for pump_id in pump_id_list:
-        cur_data = pump_damage_data[pump_id]
-
-        cur_damage = cur_data['Damage']
-        cur_repair_time = cur_data['Repair']
-
-        if cur_damage == 0:
-            continue  # cur_damage_state = 0 means undamaged pump
-
-        # (SINA) I'm not sure if we need any data about the pump at this point
-
-        # aim_data = findAndReadAIMFile(tank_id, os.path.join(
-        # "Results", "WaterDistributionNetwork", "Pump"),
-        # rewet_input_data["run_dir"])
+    damage_time = event_time
 
-        # We are getting this data from PELICUN
-        # restore_time = getPumpRetsoreTime(cur_damage)
-        damage_list.append(
-            {
-                'pump_id': pump_id,
-                'time': damage_time,
-                'Restore_time': cur_repair_time,
-            }
+    # (SINA) I'm not sure if we need any data about the pump at this point
+    # We are getting the restore time from PELICUN
+    damage_list = [
+        {
+            'pump_id': pump_id,
+            'time': damage_time,
+            'Restore_time': cur_repair_time,
+        }
+        for pump_id, cur_repair_time in zip(
+            pump_damage['asset_id'], pump_damage['Repair']
         )
+    ]
     pump_damage_list = pd.Series(
-        index=[damage_time for val in damage_list], data=damage_list
+        index=[damage_time for val in damage_list], data=damage_list, dtype='O'
     )
 
     return pump_damage_list  # noqa: RET504
 
 
-def create_tank_damage_input_for_rewet(tank_damage_data, rewet_input_data):
+def create_tank_damage_input_for_rewet(tank_damage, event_time):
     """Create REWET-style Tank damage file.
 
     Parameters
     ----------
-    tank_damage_data : dict
-        Tank damage data from PELICUN.
-    rewet_input_data : dict
-        REWET input data.
+    tank_damage : Pandas DataFrame
+        Damaged tanks of a scenario from DamageIndex.
+    event_time : int
+        Time of the event.
 
     Returns
     -------
@@ -263,40 +368,22 @@ def create_tank_damage_input_for_rewet(tank_damage_data, rewet_input_data):
         REWET-style tank damage file.
 
     """
-    tank_id_list = tank_damage_data.keys()
-
-    damage_list = []
-    damage_time = rewet_input_data['event_time']
-
-    for tank_id in tank_id_list:
-        cur_data = tank_damage_data[tank_id]
-
-        cur_damage = cur_data['Damage']
-        cur_repair_time = cur_data['Repair']
-
-        if cur_damage == 0:
-            continue  # cur_damage_state = 0 meeans undamged tank
-
-        # =============================================================================
-        #         # We are getting his data from REWET
-        #
-        #         aim_data = findAndReadAIMFile(tank_id, os.path.join(
-        #             "Results", "WaterDistributionNetwork", "Tank"),
-        #                                            rewet_input_data["run_dir"])
-        #         tank_type = aim_data["GeneralInformation"].get("Type", None)
-        #         restore_time = getTankRetsoreTime(tank_type, cur_damage)
-        # =============================================================================
-
-        damage_list.append(
-            {
-                'tank_id': tank_id,
-                'time': damage_time,
-                'Restore_time': cur_repair_time,
-            }
+    damage_time = event_time
+
+    # We are getting the restore time from PELICUN
+    damage_list = [
+        {
+            'tank_id': tank_id,
+            'time': damage_time,
+            'Restore_time': cur_repair_time,
+        }
+        for tank_id, cur_repair_time in zip(
+            tank_damage['asset_id'], tank_damage['Repair']
         )
+    ]
 
     tank_damage_list = pd.Series(
-        index=[damage_time for val in damage_list], data=damage_list
+        index=[damage_time for val in damage_list], data=damage_list, dtype='O'
     )
 
     return tank_damage_list  # noqa: RET504
@@ -336,61 +423,26 @@ def read_damage_file(file_addr, run_dir, event_time, sc_geojson):
     """Read PELICUN damage files.
 
     Read PELICUN damage files and create REWET-Style damage for all
-    WaterDistributionNetwork elements.
+    WaterDistributionNetwork elements. To convert several scenarios, use
+    DamageIndex so that the shared files are read only once.
 
     Parameters
     ----------
     file_addr : path
         PELICUN damage file in JSON format.
-    rewet_input_data : dict
-        REWET input data, which is updated in the function.
-    scn_number : dict
-        JSON FILE.
+    run_dir : path
+        The directory where data is stored (aka the R2dTool directory).
+    event_time : int
+        Time of the event.
+    sc_geojson : path
+        Asset source GeoJSON file of the water network.
 
     Returns
     -------
     damage_data : dict
-        Damage data in PELICUN dict format.
+        REWET-style damage data of pipes, tanks, pumps and nodes.
 
     """
-    # TODO(SINA): Make reading once for each scenario
-
-    damage_data = preprocessorIO.read_json_file(file_addr)
-
-    wn_damage_data = damage_data['WaterDistributionNetwork']
-
-    if 'Pipe' in wn_damage_data:
-        pipe_damage_data = create_pipe_damage_input_for_rewet(
-            wn_damage_data['Pipe'], run_dir, event_time, sc_geojson
-        )
-    else:
-        pipe_damage_data = pd.Series(dtype='O')
-
-    if 'Tank' in wn_damage_data:
-        tank_damage_data = create_tank_damage_input_for_rewet(
-            wn_damage_data['Tank'], run_dir, event_time
-        )
-    else:
-        tank_damage_data = pd.Series(dtype='O')
-
-    if 'Pump' in wn_damage_data:
-        pump_damage_data = create_pump_damage_input_for_rewet(
-            wn_damage_data['Pump'], run_dir, event_time
-        )
-    else:
-        pump_damage_data = pd.Series(dtype='O')
-
-    if 'Junction' in wn_damage_data:
-        node_damage_data = create_node_damage_input_for_rewet(
-            wn_damage_data['Junction'], run_dir, event_time
-        )
-    else:
-        node_damage_data = pd.Series(dtype='O')
-
-    damage_data = {}
-    damage_data['Pipe'] = pipe_damage_data
-    damage_data['Tank'] = tank_damage_data
-    damage_data['Pump'] = pump_damage_data
-    damage_data['Node'] = node_damage_data
-
-    return damage_data
+    damage_index = DamageIndex(run_dir, sc_geojson)
+    damage_index.add_realization(0, file_addr)
+    return damage_index.create_rewet_damage(0, event_time)
@@ -37,6 +37,7 @@
 # Jinyan Zhao
 
 import argparse
+import importlib.util
 import json
 import logging
 import math
@@ -44,7 +45,9 @@ import os
 import shutil
 import sys
 import time
+import traceback
 import warnings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
 
@@ -100,7 +103,7 @@ def select_realizations_to_run(damage_input, run_dir):
             else:
                 rlzs_requested.append(int(rlzs))
         rlzs_requested = np.array(rlzs_requested)
-        rlzs_in_available = np.in1d(rlzs_requested, rlzs_available)  # noqa: NPY201
+        rlzs_in_available = np.isin(rlzs_requested, rlzs_available)
         if rlzs_in_available.sum() != 0:
             rlzs_to_run = rlzs_requested[np.where(rlzs_in_available)[0]]
         else:
@@ -684,6 +687,7 @@ def run_one_realization(
     damage_rlz_file,
     damage_det_file,
     config_file_dict,
+    network_data=None,
 ):
     """
     Run the simulation for a single realization.
@@ -704,6 +708,11 @@ def run_one_realization(
         Path to the JSON file containing detailed damage information.
     config_file_dict : dict
         Dictionary containing configuration parameters.
+    network_data : dict, optional
+        Undamaged edges, nodes, post-event demand, detailed damage information
+        and undamaged trip information already in memory. When given, the
+        capacity reductions are applied in memory and none of these files is
+        read again.
 
     Returns
     -------
@@ -753,11 +762,28 @@ def run_one_realization(
         tmp_dir=Path.cwd(),
     )
     # update the capacity due to damage
-    damaged_edge_file, closed_edge_file = residual_demand_simulator.update_edge_capacity(
-        damage_rlz_file, damage_det_file
-    )
-    residual_demand_simulator.csv_files.update({'network_edges': damaged_edge_file})
-    residual_demand_simulator.csv_files.update({'edge_closures': closed_edge_file})
+    if network_data is None:
+        damaged_edge_file, closed_edge_file = (
+            residual_demand_simulator.update_edge_capacity(
+                damage_rlz_file, damage_det_file
+            )
+        )
+        residual_demand_simulator.csv_files.update(
+            {'network_edges': damaged_edge_file}
+        )
+        residual_demand_simulator.csv_files.update(
+            {'edge_closures': closed_edge_file}
+        )
+    else:
+        damaged_edges, closed_links = residual_demand_simulator.apply_edge_capacity(
+            network_data['edges'], damage_rlz, network_data['damage_det']
+        )
+        residual_demand_simulator.network_data = {
+            'edges': damaged_edges,
+            'closed_links': closed_links,
+            'nodes': network_data['nodes'],
+            'od': network_data['od'],
+        }
     # run simulation on damaged network
     Path('damaged').mkdir()
     Path(Path('damaged') / 'trip_info').mkdir()
@@ -771,9 +797,12 @@ def run_one_realization(
         )
 
     # conpute the delay time of each trip
-    undamaged_trip_info = pd.read_csv(
-        undamaged_dir / 'trip_info' / 'trip_info_simulation_out.csv'
-    )
+    if network_data is None:
+        undamaged_trip_info = pd.read_csv(
+            undamaged_dir / 'trip_info' / 'trip_info_simulation_out.csv'
+        )
+    else:
+        undamaged_trip_info = network_data['undamaged_trip_info']
     damaged_trip_info = pd.read_csv(
         Path.cwd() / 'damaged' / 'trip_info' / 'trip_info_simulation_out.csv'
     )
@@ -801,6 +830,235 @@ def run_one_realization(
     return True
 
 
+def summarize_travel_times(rlz, trip_info_compare_file):
+    """
+    Summarize the travel times of a realization.
+
+    Parameters
+    ----------
+    rlz : int or str
+        Realization ID.
+    trip_info_compare_file : str
+        Path to the CSV file comparing undamaged and damaged trips.
+
+    Returns
+    -------
+    dict
+        Number of trips and incomplete trips, and the mean travel times and
+        delays of the trips that were completed.
+    """
+    trip_info = pd.read_csv(trip_info_compare_file)
+    summary = {
+        'rlz': rlz,
+        'trips': len(trip_info),
+        'incomplete_trips': int(
+            np.isinf(trip_info['travel_time_used_damaged']).sum()
+        ),
+    }
+    for key, column in [
+        ('mean_travel_time_undamaged', 'travel_time_used_undamaged'),
+        ('mean_travel_time_damaged', 'travel_time_used_damaged'),
+        ('mean_delay_duration', 'delay_duration'),
+        ('mean_delay_ratio', 'delay_ratio'),
+    ]:
+        values = trip_info[column].to_numpy(dtype=float)
+        summary[key] = values[np.isfinite(values)].mean()
+    return summary
+
+
+# shared by all realizations run in a process, see run_realizations
+_realization_context = None
+
+
+def _init_realization_worker(context):
+    global _realization_context  # noqa: PLW0603
+    _realization_context = context
+
+
+def run_realization(rlz, seed):
+    """
+    Run a realization in its own work directory and collect its results.
+
+    Parameters
+    ----------
+    rlz : int or str
+        Realization ID.
+    seed : int
+        Seed of the random demand split of the realization.
+
+    Returns
+    -------
+    tuple
+        Realization ID, undamaged and damaged travel times of the agents,
+        highest congestion of the edges, and the travel time summary.
+    """
+    context = _realization_context
+    print(f'Running realization {rlz}')  # noqa: T201
+    rlz_run_dir = context['residual_demand_dir'] / f'workdir.{rlz}'
+    rlz_run_dir.mkdir()
+    os.chdir(rlz_run_dir)
+    np.random.seed(seed)
+
+    # Run the simulation
+    run_one_realization(
+        context['residual_demand_dir'] / 'edges.csv',
+        context['residual_demand_dir'] / 'nodes.csv',
+        context['undamaged_dir'],
+        context['od_file_post'],
+        Path(context['run_dir'] / f'Results_{rlz}.json'),
+        Path(context['run_dir'] / 'Results_det.json'),
+        context['config_file_dict'],
+        network_data=context['network_data'],
+    )
+
+    # Collect the delay and congestion results of the realization
+    undamaged_time, damaged_time = append_to_delay_agg(
+        {
+            'agent_id': context['undamaged_agents'],
+            'data': np.zeros((len(context['undamaged_agents']), 0)),
+        },
+        {
+            'agent_id': context['damaged_agents'],
+            'data': np.zeros((len(context['damaged_agents']), 0)),
+        },
+        rlz_run_dir / 'trip_info_compare.csv',
+    )
+    damaged_congestion = get_highest_congestion(
+        rlz_run_dir / 'damaged' / 'edge_vol', context['edges_csv']
+    ).sort_index()[['congestion']].to_numpy()
+    summary = summarize_travel_times(rlz, rlz_run_dir / 'trip_info_compare.csv')
+    print(f'Rrealization {rlz} completed')  # noqa: T201
+    return (
+        rlz,
+        undamaged_time['data'],
+        damaged_time['data'],
+        damaged_congestion,
+        summary,
+    )
+
+
+def run_realizations(  # noqa: C901
+    rlz_to_run,
+    rlz_seeds,
+    context,
+    summary_file,
+    num_processes=1,
+    comm=None,
+):
+    """
+    Run the damaged network simulations of a set of realizations.
+
+    The undamaged network, demand and results in the context are loaded once
+    and passed to every process when it starts, so each worker process holds
+    its own unpickled copy of the context. Realizations are spread over
+    the MPI ranks when a communicator is given, and over num_processes
+    worker processes otherwise. The travel time summary of each realization
+    is appended to the summary file as soon as the realization finishes.
+
+    Parameters
+    ----------
+    rlz_to_run : list
+        Realization IDs to run.
+    rlz_seeds : list
+        Seed of the random demand split of each realization.
+    context : dict
+        Paths, configuration and network data shared by the realizations.
+    summary_file : str
+        Path to the CSV file of the travel time summaries. Only written by
+        the root rank.
+    num_processes : int, optional
+        Number of worker processes used without MPI.
+    comm : mpi4py.MPI.Comm, optional
+        Communicator of the ranks sharing the realizations.
+
+    Returns
+    -------
+    list
+        Results of run_realization in the order of rlz_to_run on the root
+        rank, None on the other ranks.
+    """
+    if comm is not None:
+        from mpi4py import MPI
+
+        rank, size = comm.Get_rank(), comm.Get_size()
+        tasks = list(zip(rlz_to_run, rlz_seeds)) if rank == 0 else None
+        context = comm.bcast(context, root=0)
+        tasks = comm.bcast(tasks, root=0)
+    else:
+        rank, size = 0, 1
+        tasks = list(zip(rlz_to_run, rlz_seeds))
+    _init_realization_worker(context)
+
+    results = {}
+    summary_stream = Path(summary_file).open('w') if rank == 0 else None  # noqa: SIM115
+
+    def collect(result):
+        results[result[0]] = result
+        pd.DataFrame([result[4]]).to_csv(
+            summary_stream, header=len(results) == 1, index=False
+        )
+        summary_stream.flush()
+
+    try:
+        if comm is not None:
+            # every rank runs its share and the root collects the results
+            # between and after its own realizations
+            for rlz, seed in tasks[rank::size]:
+                result = run_realization(rlz, seed)
+                if rank == 0:
+                    collect(result)
+                    while comm.Iprobe(source=MPI.ANY_SOURCE, tag=1):
+                        collect(comm.recv(source=MPI.ANY_SOURCE, tag=1))
+                else:
+                    comm.send(result, dest=0, tag=1)
+            if rank != 0:
+                return None
+            while len(results) < len(tasks):
+                collect(comm.recv(source=MPI.ANY_SOURCE, tag=1))
+        elif num_processes > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(
+                max_workers=num_processes,
+                initializer=_init_realization_worker,
+                initargs=(context,),
+            ) as executor:
+                pending = {
+                    executor.submit(run_realization, rlz, seed) for rlz, seed in tasks
+                }
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future.result())
+        else:
+            for rlz, seed in tasks:
+                collect(run_realization(rlz, seed))
+    finally:
+        if summary_stream is not None:
+            summary_stream.close()
+    return [results[rlz] for rlz, _ in tasks]
+
+
+def abort_mpi_ranks():
+    """
+    Stop all MPI ranks after an error on one of them.
+
+    The ranks exchange inputs and results with blocking calls, so a rank that
+    stops on an error would leave the others waiting. Does nothing when not
+    running on several MPI ranks.
+
+    Returns
+    -------
+    None
+    """
+    if importlib.util.find_spec('mpi4py') is None:
+        return
+    from mpi4py import MPI
+
+    if MPI.COMM_WORLD.Get_size() > 1:
+        traceback.print_exc()
+        sys.stderr.flush()
+        MPI.COMM_WORLD.Abort(1)
+
+
 def run_residual_demand(  # noqa: C901
     edge_geojson,
     node_geojson,
@@ -809,6 +1067,7 @@ def run_residual_demand(  # noqa: C901
     config_file,
     r2d_run_dir,
     residual_demand_dir,
+    num_processes=1,
 ):
     """
     Run the residual demand simulation.
@@ -829,11 +1088,40 @@ def run_residual_demand(  # noqa: C901
         Directory containing the R2D run results.
     residual_demand_dir : str
         Directory to store the residual demand results.
+    num_processes : int, optional
+        Number of processes running realizations in parallel. Ignored when
+        running on several MPI ranks.
 
     Returns
     -------
     None
     """
+    # Load the config file and check it on every rank, before the ranks take
+    # different paths, so that an invalid config stops all of them
+    with Path(config_file).open() as f:
+        config_file_dict = json.load(f)
+    damage_input = config_file_dict['DamageInput']
+    if damage_input['Type'] not in {
+        'MostlikelyDamageState',
+        'SpecificRealization',
+        'SampleFromRealizations',
+    }:
+        msg = 'Damage input type not recognized'
+        raise ValueError(msg)
+
+    # Realizations are shared by the ranks when running with MPI
+    comm = None
+    mpi_spec = importlib.util.find_spec('mpi4py')
+    if mpi_spec is not None:
+        from mpi4py import MPI
+
+        if MPI.COMM_WORLD.Get_size() > 1:
+            comm = MPI.COMM_WORLD
+            if comm.Get_rank() != 0:
+                # the root rank prepares the inputs and sends them over
+                run_realizations(None, None, None, None, comm=comm)
+                return
+
     if r2d_run_dir is None:
         run_dir = Path.cwd()
     else:
@@ -867,10 +1155,6 @@ def run_residual_demand(  # noqa: C901
         residual_demand_dir.mkdir()
     os.chdir(residual_demand_dir)
 
-    # Load the config file
-    with Path(config_file).open() as f:
-        config_file_dict = json.load(f)
-
     # Prepare edges and nodes files
     edges_gdf = gpd.read_file(edge_geojson).to_crs(epsg=6500)
     if 'length' not in edges_gdf.columns:
@@ -908,9 +1192,6 @@ def run_residual_demand(  # noqa: C901
 
     edges_csv = residual_demand_dir / 'edges.csv'
 
-    # Get Damage Input
-    damage_input = config_file_dict['DamageInput']
-
     # Run the undamaged network
     undamged_dir_path = residual_demand_dir / 'undamaged'
     undamged_dir_path.mkdir()
@@ -976,107 +1257,80 @@ def run_residual_demand(  # noqa: C901
         rlz = 'mostlikely'
         with (run_dir / f'Results_{rlz}.json').open('w') as f:
             json.dump(results_rlz, f)
+        rlz_to_run = [rlz]
 
-        # Create a directory for the realization
-        Path(f'workdir.{rlz}').mkdir()
-        os.chdir(f'workdir.{rlz}')
-        rlz_run_dir = Path.cwd()
-        ## Create arrays to store the delay results and congestion results
-        undamaged_time, damaged_time = create_delay_agg(od_file_pre, od_file_post)
-        undamaged_congestion, damaged_congestion = create_congestion_agg(edges_csv)
-        # Run the simulation
-        run_one_realization(
-            residual_demand_dir / 'edges.csv',
-            residual_demand_dir / 'nodes.csv',
-            undamged_dir_path,
-            od_file_post,
-            Path(run_dir / f'Results_{rlz}.json'),
-            Path(run_dir / 'Results_det.json'),
-            config_file_dict,
-        )
-        # Append relay and congestion results to the aggregated results
-        undamaged_time, damaged_time = append_to_delay_agg(
-            undamaged_time, damaged_time, rlz_run_dir / 'trip_info_compare.csv'
-        )
-        undamaged_edge_vol_dir = undamged_dir_path / 'edge_vol'
-        damaged_edge_vol_dir = rlz_run_dir / 'damaged' / 'edge_vol'
-        undamaged_congestion, damaged_congestion = append_to_congestion_agg(
-            undamaged_congestion,
-            damaged_congestion,
-            undamaged_edge_vol_dir,
-            damaged_edge_vol_dir,
-            edges_csv,
-        )
-
-        # Write the aggregated results to the travel_delay_stats.csv and Results_det.json file
-        os.chdir(residual_demand_dir)
-        aggregate_delay_results(
-            undamaged_time, damaged_time, od_file_pre, od_file_post
-        )
-        aggregate_congestions_results_to_det(
-            undamaged_congestion,
-            damaged_congestion,
-            Path(run_dir / 'Results_det.json'),
-            edges_csv,
-        )
-
-    elif (
-        damage_input['Type'] == 'SpecificRealization'
-        or damage_input['Type'] == 'SampleFromRealizations'
-    ):
-        # Get the realizations to run
+    else:
+        # SpecificRealization or SampleFromRealizations
         rlz_to_run = select_realizations_to_run(damage_input, run_dir)
 
-        ## Create arrays to store the delay results and congestion results
-        undamaged_time, damaged_time = create_delay_agg(od_file_pre, od_file_post)
-        undamaged_congestion, damaged_congestion = create_congestion_agg(edges_csv)
-
-        for rlz in rlz_to_run:
-            print(f'Running realization {rlz}')  # noqa: T201
-            # Create a directory for the realization
-            rlz_run_dir = residual_demand_dir / f'workdir.{rlz}'
-            rlz_run_dir.mkdir()
-            os.chdir(rlz_run_dir)
-
-            # Run the simulation
-            run_one_realization(
-                residual_demand_dir / 'edges.csv',
-                residual_demand_dir / 'nodes.csv',
-                undamged_dir_path,
-                od_file_post,
-                Path(run_dir / f'Results_{rlz}.json'),
-                Path(run_dir / 'Results_det.json'),
-                config_file_dict,
-            )
+    ## Create arrays to store the delay results and congestion results
+    undamaged_time, damaged_time = create_delay_agg(od_file_pre, od_file_post)
+    undamaged_congestion, damaged_congestion = create_congestion_agg(edges_csv)
 
-            # Append relay and congestion results to the aggregated results
-            undamaged_time, damaged_time = append_to_delay_agg(
-                undamaged_time, damaged_time, rlz_run_dir / 'trip_info_compare.csv'
-            )
-            undamaged_edge_vol_dir = undamged_dir_path / 'edge_vol'
-            damaged_edge_vol_dir = rlz_run_dir / 'damaged' / 'edge_vol'
-            undamaged_congestion, damaged_congestion = append_to_congestion_agg(
-                undamaged_congestion,
-                damaged_congestion,
-                undamaged_edge_vol_dir,
-                damaged_edge_vol_dir,
-                edges_csv,
-            )
-            print(f'Rrealization {rlz} completed')  # noqa: T201
-        # Write the aggregated results to the travel_delay_stats.csv and Results_det.json file
-        os.chdir(residual_demand_dir)
-        aggregate_delay_results(
-            undamaged_time, damaged_time, od_file_pre, od_file_post
+    # Load the undamaged network, the demand and the undamaged results once
+    # for all realizations
+    base_edges = pd.read_csv(edges_csv)
+    base_edges['geometry'] = base_edges['geometry'].map(loads)
+    with Path(run_dir / 'Results_det.json').open() as f:
+        damage_det = json.load(f)
+    context = {
+        'residual_demand_dir': residual_demand_dir,
+        'run_dir': run_dir,
+        'undamaged_dir': undamged_dir_path,
+        'od_file_post': od_file_post,
+        'edges_csv': edges_csv,
+        'config_file_dict': config_file_dict,
+        'undamaged_agents': undamaged_time['agent_id'],
+        'damaged_agents': damaged_time['agent_id'],
+        'network_data': {
+            'edges': base_edges,
+            'nodes': pd.read_csv(residual_demand_dir / 'nodes.csv'),
+            'od': pd.read_csv(od_file_post),
+            'damage_det': damage_det,
+            'undamaged_trip_info': pd.read_csv(
+                undamged_dir_path / 'trip_info' / 'trip_info_simulation_out.csv'
+            ),
+        },
+    }
+    # every realization gets its own seed so that its results do not depend
+    # on which process runs it
+    rlz_seeds = np.random.randint(0, 2**31 - 1, size=len(rlz_to_run)).tolist()
+    results = run_realizations(
+        rlz_to_run,
+        rlz_seeds,
+        context,
+        residual_demand_dir / 'travel_time_summary.csv',
+        num_processes=num_processes,
+        comm=comm,
+    )
+
+    # Append relay and congestion results to the aggregated results
+    if len(results) > 0:
+        undamaged_time['data'] = np.concatenate(
+            [result[1] for result in results], axis=1
         )
-        aggregate_congestions_results_to_det(
-            undamaged_congestion,
-            damaged_congestion,
-            Path(run_dir / 'Results_det.json'),
-            edges_csv,
+        damaged_time['data'] = np.concatenate(
+            [result[2] for result in results], axis=1
         )
-    else:
-        msg = 'Damage input type not recognized'
-        raise ValueError(msg)
+        undamaged_congest = (
+            get_highest_congestion(undamged_dir_path / 'edge_vol', edges_csv)
+            .sort_index()[['congestion']]
+            .to_numpy()
+        )
+        undamaged_congestion = np.repeat(undamaged_congest, len(results), axis=1)
+        damaged_congestion = np.concatenate(
+            [result[3] for result in results], axis=1
+        )
+
+    # Write the aggregated results to the travel_delay_stats.csv and Results_det.json file
+    os.chdir(residual_demand_dir)
+    aggregate_delay_results(undamaged_time, damaged_time, od_file_pre, od_file_post)
+    aggregate_congestions_results_to_det(
+        undamaged_congestion,
+        damaged_congestion,
+        Path(run_dir / 'Results_det.json'),
+        edges_csv,
+    )
 
     if geojson_needed:
         # If run in tool box, compile a geojson for visualization
@@ -1128,6 +1382,13 @@ if __name__ == '__main__':
         help='Residual demand run directory',
     )
 
+    workflowArgParser.add_argument(
+        '--numProcesses',
+        type=int,
+        default=1,
+        help='Number of processes running realizations in parallel',
+    )
+
     workflowArgParser.add_argument(
         '--input',
         default=None,
@@ -1137,12 +1398,19 @@ if __name__ == '__main__':
     # Parsing the command line arguments
     wfArgs = workflowArgParser.parse_args()  # noqa: N816
 
-    run_residual_demand(
-        edge_geojson=wfArgs.edgeFile,
-        node_geojson=wfArgs.nodeFile,
-        od_file_pre=wfArgs.ODFilePre,
-        od_file_post=wfArgs.ODFilePost,
-        config_file=wfArgs.configFile,
-        r2d_run_dir=wfArgs.r2dRunDir,
-        residual_demand_dir=wfArgs.residualDemandRunDir,
-    )
+    try:
+        run_residual_demand(
+            edge_geojson=wfArgs.edgeFile,
+            node_geojson=wfArgs.nodeFile,
+            od_file_pre=wfArgs.ODFilePre,
+            od_file_post=wfArgs.ODFilePost,
+            config_file=wfArgs.configFile,
+            r2d_run_dir=wfArgs.r2dRunDir,
+            residual_demand_dir=wfArgs.residualDemandRunDir,
+            num_processes=wfArgs.numProcesses,
+        )
+    except Exception:
+        # the other MPI ranks may be waiting for this one, stop them all
+        # instead of leaving the job hanging
+        abort_mpi_ranks()
+        raise
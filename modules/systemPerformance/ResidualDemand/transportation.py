@@ -66,6 +66,8 @@ import numpy as np
 import pandana.network as pdna
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
 from scipy.spatial.distance import cdist
 from shapely.wkt import loads
 import warnings
@@ -105,6 +107,224 @@ def calculate_road_capacity(nlanes: int,
     """
     return nlanes * traffic_volume_per_lane
 
+
+class SubstepRouter:
+    """
+    Shortest-path engine shared by the substeps of a traffic assignment.
+
+    The road graph is built once from the open edges and only its edge
+    weights are replaced between substeps, so the network no longer has to
+    be rebuilt for every substep. Paths come from Dijkstra trees rooted at
+    the agents' current or destination nodes, whichever needs fewer trees.
+    Substeps that would need more than max_trees trees fall back to a
+    pandana network built for that substep, which is faster when the
+    demand is very scattered.
+
+    Args__
+        nodes_df (pd.DataFrame): Nodes indexed by node id.
+        edges_df (pd.DataFrame): Open edges indexed by edge string.
+        two_way_edges (bool): Flag indicating if edges are two-way.
+        max_trees (int): Largest number of trees computed for one substep.
+        tree_block_size (int): Number of trees computed at once.
+    """
+
+    def __init__(
+        self,
+        nodes_df,
+        edges_df,
+        two_way_edges=False,  # noqa: FBT002
+        max_trees=4000,
+        tree_block_size=64,
+    ):
+        self.nodes_df = nodes_df
+        self.node_ids = nodes_df.index
+        self.edge_index = edges_df.index
+        self.edge_start = edges_df['start_nid']
+        self.edge_end = edges_df['end_nid']
+        self.two_way_edges = two_way_edges
+        self.max_trees = max_trees
+        self.tree_block_size = tree_block_size
+        self.last_method = None
+
+        n_nodes = len(self.node_ids)
+        tail = self.node_ids.get_indexer(self.edge_start).astype(np.int64)
+        head = self.node_ids.get_indexer(self.edge_end).astype(np.int64)
+        rows = np.arange(len(edges_df))
+        if two_way_edges:
+            # the reverse of an edge is only added when the network does not
+            # have that direction as an edge of its own
+            reverse = ~np.isin(head * n_nodes + tail, tail * n_nodes + head)
+            tail, head = (
+                np.concatenate([tail, head[reverse]]),
+                np.concatenate([head, tail[reverse]]),
+            )
+            rows = np.concatenate([rows, rows[reverse]])
+
+        # arcs are stored in CSR order so the weights can be written straight
+        # into the graph data
+        order = np.lexsort((head, tail))
+        self.arc_tail = tail[order]
+        self.arc_head = head[order]
+        self.arc_rows = rows[order]
+        node_ids = self.node_ids.to_numpy()
+        self.arc_tail_ids = node_ids[self.arc_tail]
+        self.arc_head_ids = node_ids[self.arc_head]
+        self._arc_keys = self.arc_tail * n_nodes + self.arc_head
+        self._graph = csr_matrix(
+            (
+                np.ones(len(order)),
+                self.arc_head,
+                np.searchsorted(self.arc_tail, np.arange(n_nodes + 1)),
+            ),
+            shape=(n_nodes, n_nodes),
+        )
+        # trees rooted at destinations are grown on the reversed graph
+        self._reverse_arcs = np.lexsort((self.arc_tail, self.arc_head))
+        self._reverse_graph = csr_matrix(
+            (
+                np.ones(len(order)),
+                self.arc_tail[self._reverse_arcs],
+                np.searchsorted(
+                    self.arc_head[self._reverse_arcs], np.arange(n_nodes + 1)
+                ),
+            ),
+            shape=(n_nodes, n_nodes),
+        )
+        self.weights = None
+
+    def update_weights(self, weights):
+        """
+        Replace the edge weights used for routing.
+
+        Args__
+            weights (pd.Series): Edge weights indexed by edge string.
+        """
+        if not weights.index.equals(self.edge_index):
+            weights = weights.reindex(self.edge_index)
+        self.weights = weights.to_numpy(dtype=float)
+        self._graph.data[:] = self.weights[self.arc_rows]
+        self._reverse_graph.data[:] = self._graph.data[self._reverse_arcs]
+
+    def find_arcs(self, tail, head):
+        """Return the ids of the arcs joining the node indices tail and head."""
+        return np.searchsorted(
+            self._arc_keys, tail.astype(np.int64) * len(self.node_ids) + head
+        )
+
+    def iter_shortest_paths(self, sources, targets):
+        """
+        Find the shortest paths between pairs of nodes, one block at a time.
+
+        Args__
+            sources (np.ndarray): Node ids where the paths start.
+            targets (np.ndarray): Node ids where the paths end.
+
+        Yields
+        ------
+            tuple: Positions of the pairs in the block, a matrix of the arc
+                ids along each path padded with -1, and the path lengths.
+        """
+        src = self.node_ids.get_indexer(sources)
+        dst = self.node_ids.get_indexer(targets)
+        src_roots, src_inverse = np.unique(src, return_inverse=True)
+        dst_roots, dst_inverse = np.unique(dst, return_inverse=True)
+        if min(len(src_roots), len(dst_roots)) > self.max_trees:
+            self.last_method = 'pandana network'
+            yield from self._iter_pandana_paths(sources, targets)
+            return
+
+        from_targets = len(dst_roots) < len(src_roots)
+        if from_targets:
+            roots, inverse, graph = dst_roots, dst_inverse, self._reverse_graph
+        else:
+            roots, inverse, graph = src_roots, src_inverse, self._graph
+        self.last_method = f'{len(roots)} Dijkstra trees'
+
+        order = np.argsort(inverse, kind='stable')
+        block_bounds = np.searchsorted(
+            inverse[order],
+            np.arange(0, len(roots) + self.tree_block_size, self.tree_block_size),
+        )
+        for block, (a0, a1) in enumerate(zip(block_bounds[:-1], block_bounds[1:])):
+            if a0 == a1:
+                continue
+            first_root = block * self.tree_block_size
+            dist, pred = dijkstra(
+                graph,
+                directed=True,
+                indices=roots[first_root : first_root + self.tree_block_size],
+                return_predecessors=True,
+            )
+            agents = order[a0:a1]
+            tree = inverse[agents] - first_root
+            start, end = src[agents], dst[agents]
+            if from_targets:
+                # trees grown on the reversed graph point from every node
+                # towards their root, so the paths are walked forward
+                lengths = dist[tree, start]
+                arcs = self._walk_tree(pred, tree, start, end, lengths, True)
+            else:
+                lengths = dist[tree, end]
+                arcs = self._walk_tree(pred, tree, end, start, lengths, False)
+                # flip the paths that were walked back from their ends
+                counts = (arcs >= 0).sum(axis=1)
+                cols = counts[:, None] - 1 - np.arange(arcs.shape[1])
+                arcs = np.where(
+                    cols >= 0,
+                    arcs[np.arange(len(agents))[:, None], np.maximum(cols, 0)],
+                    -1,
+                )
+            yield agents, arcs, lengths
+
+    def _walk_tree(self, pred, tree, start, end, lengths, forward):  # noqa: PLR0913, FBT001
+        """Collect the arcs between start and end following the predecessors."""
+        cur = start.copy()
+        active = np.isfinite(lengths) & (cur != end)
+        steps = []
+        while active.any():
+            idx = np.flatnonzero(active)
+            nxt = pred[tree[idx], cur[idx]]
+            step = np.full(len(cur), -1)
+            if forward:
+                step[idx] = self.find_arcs(cur[idx], nxt)
+            else:
+                step[idx] = self.find_arcs(nxt, cur[idx])
+            cur[idx] = nxt
+            active[idx] = nxt != end[idx]
+            steps.append(step)
+        if len(steps) == 0:
+            return np.full((len(cur), 0), -1)
+        return np.stack(steps, axis=1)
+
+    def _iter_pandana_paths(self, sources, targets):
+        """Find the shortest paths on a pandana network with the current weights."""
+        net = pdna.Network(
+            self.nodes_df['x'],
+            self.nodes_df['y'],
+            self.edge_start,
+            self.edge_end,
+            pd.DataFrame({'weight': self.weights}, index=self.edge_index),
+            twoway=self.two_way_edges,
+        )
+        net.set(pd.Series(net.node_ids))
+        paths = net.shortest_paths(sources, targets)
+        lengths = np.asarray(net.shortest_path_lengths(sources, targets), float)
+        counts = np.array([max(len(path) - 1, 0) for path in paths], dtype=int)
+        arcs = np.full((len(paths), counts.max(initial=0)), -1)
+        if counts.sum() > 0:
+            nodes = self.node_ids.get_indexer(
+                np.concatenate([path for path in paths if len(path) > 1])
+            )
+            # skip the pairs that join the end of a path to the next path
+            path_ends = np.cumsum(counts[counts > 0] + 1) - 1
+            keep = np.ones(len(nodes) - 1, dtype=bool)
+            keep[path_ends[:-1]] = False
+            agent = np.repeat(np.arange(len(paths)), counts)
+            col = np.arange(len(agent)) - np.repeat(np.cumsum(counts) - counts, counts)
+            arcs[agent, col] = self.find_arcs(nodes[:-1][keep], nodes[1:][keep])
+        yield np.arange(len(paths)), arcs, lengths
+
+
 class TransportationPerformance(ABC):  # noqa: B024
     """
     An abstract base class for simulating transportation networks.
@@ -213,6 +433,8 @@ class TransportationPerformance(ABC):  # noqa: B024
         self.od_file = od_file
         self.hour_list = hour_list
         self.tmp_dir = tmp_dir
+        # network, closures and demand already in memory, see system_performance
+        self.network_data = None
 
     # @abstractmethod
     def system_state(
@@ -347,13 +569,32 @@ class TransportationPerformance(ABC):  # noqa: B024
             damage_rlz = json.load(file)
         with Path(damage_det_file).open() as file:
             damage_det = json.load(file)
-        transportation_damage = damage_rlz['TransportationNetwork']
         edges = pd.read_csv(self.csv_files['network_edges'])
+        edges, closed_links = self.apply_edge_capacity(edges, damage_rlz, damage_det)
+        damged_edges_file = Path.cwd() / 'damaged_edges.csv'
+        closed_links_file = Path.cwd() / 'closed_edges.csv'
+        edges.to_csv(damged_edges_file, index=False)
+        closed_links.to_csv(closed_links_file, index=False)
+        return damged_edges_file, closed_links_file
+
+    def apply_edge_capacity(self, edges, damage_rlz, damage_det):
+        """
+        Reduce edge capacities and speeds for one damage realization.
+
+        The input edges are not modified, so the undamaged network can be
+        loaded once and shared by all realizations.
+
+        Args__
+            edges (pd.DataFrame): Undamaged edges with an id column.
+            damage_rlz (dict): Damage realization of the assets.
+            damage_det (dict): Detailed information of the assets.
+
+        Returns__
+            tuple: DataFrames of the damaged edges and the closed links.
+        """
+        transportation_damage = damage_rlz['TransportationNetwork']
         edges = edges.set_index('id')
-        orig_capacity = edges['capacity'].to_dict()
-        orig_maxspeed = edges['maxspeed'].to_dict()
-        new_capacity = edges['capacity'].apply(lambda x: [x]).to_dict()
-        new_maxspeed = edges['maxspeed'].apply(lambda x: [x]).to_dict()
+        capacity_ratios = {}
         closed_links_roads_id = []
         for asset_type in self.assets:
             for asset_id, asset_id_dict in transportation_damage[asset_type].items():
@@ -368,39 +609,20 @@ class TransportationPerformance(ABC):  # noqa: B024
                         asset_id
                     ]['GeneralInformation']['RoadID']
                     road_ids = [int(x) for x in road_id_str.split(',')]
+                # each road keeps the largest reduction of the assets on it
                 for road_id in road_ids:
-                    new_capacity[road_id].append(
-                        orig_capacity[road_id] * capacity_ratio
+                    capacity_ratios[road_id] = min(
+                        capacity_ratio, capacity_ratios.get(road_id, 1)
                     )
-                    new_maxspeed[road_id].append(
-                        orig_maxspeed[road_id] * capacity_ratio
-                    )
-        for key, value in new_capacity.items():
-            new_capacity[key] = min(value)
-        for key, value in new_maxspeed.items():
-            new_maxspeed[key] = min(value)
-        new_capacity_df = pd.DataFrame.from_dict(
-            new_capacity, orient='index', columns=['capacity']
-        )
-        new_maxspeed_df = pd.DataFrame.from_dict(
-            new_maxspeed, orient='index', columns=['maxspeed']
-        )
-        edges = edges.merge(new_capacity_df, left_index=True, right_index=True)
-        edges = edges.merge(new_maxspeed_df, left_index=True, right_index=True)
-        edges = edges.drop(columns=['capacity_x', 'maxspeed_x'])
-        edges = edges.rename(
-            columns={'capacity_y': 'capacity', 'maxspeed_y': 'maxspeed'}
-        )
+        ratio = edges.index.to_series().map(capacity_ratios).fillna(1).to_numpy()
+        edges['capacity'] = edges['capacity'] * ratio
+        edges['maxspeed'] = edges['maxspeed'] * ratio
         closed_links = edges[edges.index.isin(closed_links_roads_id)]
-        edges['capacity'] = edges['capacity'].apply(lambda x: 1 if x == 0 else x)
-        edges['maxspeed'] = edges['maxspeed'].apply(lambda x: 0.001 if x == 0 else x)
-        damged_edges_file = Path.cwd() / 'damaged_edges.csv'
-        closed_links_file = Path.cwd() / 'closed_edges.csv'
+        edges['capacity'] = edges['capacity'].where(edges['capacity'] != 0, 1)
+        edges['maxspeed'] = edges['maxspeed'].where(edges['maxspeed'] != 0, 0.001)
         edges = edges.reset_index().rename(columns={'index': 'id'})
         closed_links = closed_links.reset_index().rename(columns={'index': 'id'})
-        edges.to_csv(damged_edges_file, index=False)
-        closed_links.to_csv(closed_links_file, index=False)
-        return damged_edges_file, closed_links_file
+        return edges, closed_links
 
     def get_graph_network(self, csv_file_dir) -> None:  # noqa: D102
         # Get edges and nodes from the network inventory
@@ -452,6 +674,7 @@ class TransportationPerformance(ABC):  # noqa: B024
         alpha_f=0.3,
         beta_f=3,
         two_way_edges=False,  # noqa: FBT002
+        router=None,
     ):
         """
         Perform substep assignment for transportation network simulation.
@@ -473,108 +696,135 @@ class TransportationPerformance(ABC):  # noqa: B024
             alpha_f (float): Alpha factor for travel time calculation.
             beta_f (float): Beta factor for travel time calculation.
             two_way_edges (bool): Flag indicating if edges are two-way.
+            router (SubstepRouter): Shortest-path engine reused across
+                substeps. A new one is built when not given.
 
         Returns
         -------
             tuple: Updated edges DataFrame, residual OD list, trip information, and agent paths.
         """
-        # open_edges_df = weighted_edges_df.loc[weighted_edges_df['fft'] < 36000]
-        open_edges_df = weighted_edges_df
-
-        net = pdna.Network(
-            nodes_df['x'],
-            nodes_df['y'],
-            open_edges_df['start_nid'],
-            open_edges_df['end_nid'],
-            open_edges_df[['weight']],
-            twoway=two_way_edges,
-        )
-
-        # print('network')  # noqa: RUF100, T201
-        net.set(pd.Series(net.node_ids))
-        # print('net')  # noqa: RUF100, T201
+        time_0 = time.time()
+        if router is None:
+            router = SubstepRouter(
+                nodes_df, weighted_edges_df, two_way_edges=two_way_edges
+            )
+        if not weighted_edges_df.index.equals(router.edge_index):
+            weighted_edges_df = weighted_edges_df.reindex(router.edge_index)
+        router.update_weights(weighted_edges_df['weight'])
 
         nodes_origin = od_ss['origin_nid'].to_numpy()
         nodes_destin = od_ss['destin_nid'].to_numpy()
         nodes_current = od_ss['current_nid'].to_numpy()
         agent_ids = od_ss['agent_id'].to_numpy()
-        agent_current_links = od_ss['current_link'].to_numpy()
-        agent_current_link_times = od_ss['current_link_time'].to_numpy()
-        paths = net.shortest_paths(nodes_current, nodes_destin)
-
-        # check agent time limit
-        path_lengths = net.shortest_path_lengths(nodes_current, nodes_destin)
-        remove_agent_list = []
-        if agent_time_limit is None:
-            pass
-        else:
-            for agent_idx, agent_id in enumerate(agent_ids):
-                planned_trip_length = path_lengths[agent_idx]
-                # agent_time_limit[agent_id]
-                trip_length_limit = agent_time_limit
-                if planned_trip_length > trip_length_limit + 0:
-                    remove_agent_list.append(agent_id)
-
-        edge_travel_time_dict = weighted_edges_df['t_avg'].T.to_dict()
-        edge_current_vehicles = weighted_edges_df['veh_current'].T.to_dict()
-        edge_quarter_vol = weighted_edges_df['vol_true'].T.to_dict()
-        # edge_length_dict = weighted_edges_df['length'].T.to_dict()
-        od_residual_ss_list = []
-        # all_paths = []
-        path_i = 0
-        for path in paths:
-            trip_origin = nodes_origin[path_i]
-            trip_destin = nodes_destin[path_i]
-            agent_id = agent_ids[path_i]
+        # edges are referred to by their row in weighted_edges_df
+        agent_current_links = router.edge_index.get_indexer(
+            od_ss['current_link'].to_numpy()
+        )
+        edge_travel_time = weighted_edges_df['t_avg'].to_numpy()
+
+        quarter_time = 3600 / quarter_counts
+        remaining_time = quarter_time + od_ss['current_link_time'].to_numpy(
+            dtype=float
+        )
+        used_time = np.zeros(len(agent_ids))
+        trip_stop = nodes_current.copy()
+        # arc where each agent stopped, -1 if the agent reached its destination
+        stop_arc = np.full(len(agent_ids), -1)
+        removed = np.zeros(len(agent_ids), dtype=bool)
+        entered_links = []
+        left_links = []
+        traversed_links = []
+        path_time = 0
+        time_1 = time.time()
+        for agents, arcs, path_lengths in router.iter_shortest_paths(
+            nodes_current, nodes_destin
+        ):
+            time_2 = time.time()
             # remove some agent (path too long)
-            if agent_id in remove_agent_list:
-                path_i += 1
-                # no need to update trip info
-                continue
-            remaining_time = (
-                3600 / quarter_counts + agent_current_link_times[path_i]
-            )
-            used_time = 0
-            for edge_s, edge_e in zip(path, path[1:]):
-                edge_str = f'{edge_s}-{edge_e}'
-                edge_travel_time = edge_travel_time_dict[edge_str]
-                if (remaining_time > edge_travel_time) and (
-                    edge_travel_time < 36000  # noqa: PLR2004
-                ):
-                    # all_paths.append(edge_str)
-                    # p_dist += edge_travel_time
-                    remaining_time -= edge_travel_time
-                    used_time += edge_travel_time
-                    edge_quarter_vol[edge_str] += 1 * sample_interval
-                    trip_stop = edge_e
-                    if edge_str == agent_current_links[path_i]:
-                        edge_current_vehicles[edge_str] -= 1 * sample_interval
-                else:
-                    if edge_str != agent_current_links[path_i]:
-                        edge_current_vehicles[edge_str] += 1 * sample_interval
-                    new_current_link = edge_str
-                    new_current_link_time = remaining_time
-                    trip_stop = edge_s
-                    od_residual_ss_list.append(
-                        [
-                            agent_id,
-                            trip_origin,
-                            trip_destin,
-                            trip_stop,
-                            new_current_link,
-                            new_current_link_time,
-                        ]
-                    )
+            if agent_time_limit is not None:
+                removed[agents] = path_lengths > agent_time_limit + 0
+            moving = ~removed[agents]
+            remaining = remaining_time[agents]
+            used = used_time[agents]
+            stop = trip_stop[agents]
+            current_links = agent_current_links[agents]
+            # advance all agents of the block one edge of their path at a time
+            for arc in arcs.T:
+                on_path = moving & (arc >= 0)
+                if not on_path.any():
                     break
-            trip_info[(agent_id, trip_origin, trip_destin)][0] += (
-                3600 / quarter_counts
+                link = router.arc_rows[arc]
+                link_time = edge_travel_time[link]
+                passed = (
+                    on_path
+                    & (remaining > link_time)
+                    & (link_time < 36000)  # noqa: PLR2004
+                )
+                stopped = on_path & ~passed
+                remaining[passed] -= link_time[passed]
+                used[passed] += link_time[passed]
+                stop[passed] = router.arc_head_ids[arc[passed]]
+                stop[stopped] = router.arc_tail_ids[arc[stopped]]
+                traversed_links.append(link[passed])
+                left_links.append(link[passed & (link == current_links)])
+                entered_links.append(link[stopped & (link != current_links)])
+                stop_arc[agents[stopped]] = arc[stopped]
+                moving &= ~stopped
+            remaining_time[agents] = remaining
+            used_time[agents] = used
+            trip_stop[agents] = stop
+            path_time += time_2 - time_1
+            time_1 = time.time()
+
+        def count_links(links):
+            return np.bincount(
+                np.concatenate([np.empty(0, dtype=int), *links]),
+                minlength=len(weighted_edges_df),
             )
-            trip_info[(agent_id, trip_origin, trip_destin)][1] += used_time
-            trip_info[(agent_id, trip_origin, trip_destin)][2] = trip_stop
-            trip_info[(agent_id, trip_origin, trip_destin)][3] = hour
-            trip_info[(agent_id, trip_origin, trip_destin)][4] = quarter
-            trip_info[(agent_id, trip_origin, trip_destin)][5] = ss_id
-            path_i += 1
+
+        edge_quarter_vol = (
+            weighted_edges_df['vol_true'].to_numpy()
+            + count_links(traversed_links) * sample_interval
+        )
+        edge_current_vehicles = (
+            weighted_edges_df['veh_current'].to_numpy()
+            + (count_links(entered_links) - count_links(left_links))
+            * sample_interval
+        )
+
+        stopped = np.flatnonzero(stop_arc >= 0)
+        od_residual_ss_list = [
+            list(residual)
+            for residual in zip(
+                agent_ids[stopped],
+                nodes_origin[stopped],
+                nodes_destin[stopped],
+                trip_stop[stopped],
+                router.edge_index[router.arc_rows[stop_arc[stopped]]],
+                remaining_time[stopped],
+            )
+        ]
+        # removed agents need no update of their trip info
+        kept = np.flatnonzero(~removed)
+        for agent_id, trip_origin, trip_destin, agent_used_time, agent_stop in zip(
+            agent_ids[kept],
+            nodes_origin[kept],
+            nodes_destin[kept],
+            used_time[kept],
+            trip_stop[kept],
+        ):
+            agent_trip_info = trip_info[(agent_id, trip_origin, trip_destin)]
+            agent_trip_info[0] += quarter_time
+            agent_trip_info[1] += agent_used_time
+            agent_trip_info[2] = agent_stop
+            agent_trip_info[3] = hour
+            agent_trip_info[4] = quarter
+            agent_trip_info[5] = ss_id
+        logging.info(
+            f'HR {hour} QT {quarter} SS {ss_id}: {len(agent_ids)} paths from '
+            f'{router.last_method} in {path_time:.2f} s, agents advanced in '
+            f'{time.time() - time_0 - path_time:.2f} s'
+        )
 
         new_edges_df = weighted_edges_df[
             [
@@ -597,10 +847,8 @@ class TransportationPerformance(ABC):  # noqa: B024
         # new_edges_df = new_edges_df.join(edge_volume, how='left')
         # new_edges_df['vol_ss'] = new_edges_df['vol_ss'].fillna(0)
         # new_edges_df['vol_true'] += new_edges_df['vol_ss']
-        new_edges_df['vol_true'] = new_edges_df.index.map(edge_quarter_vol)
-        new_edges_df['veh_current'] = new_edges_df.index.map(
-            edge_current_vehicles
-        )
+        new_edges_df['vol_true'] = edge_quarter_vol
+        new_edges_df['veh_current'] = edge_current_vehicles
         # new_edges_df['vol_tot'] += new_edges_df['vol_ss']
         new_edges_df['flow'] = (
             new_edges_df['vol_true'] * quarter_demand / assigned_demand
@@ -812,6 +1060,11 @@ class TransportationPerformance(ABC):  # noqa: B024
 
         net.set(pd.Series(net.node_ids))
         paths = net.shortest_paths(orig, dest)
+        # the open network stays the same over the substeps, only the edge
+        # weights change
+        router = SubstepRouter(
+            nodes_df, open_edges_df, two_way_edges=two_way_edges
+        )
         no_path_ind = [i for i in range(len(paths)) if len(paths[i]) == 0]
         od_no_path = od_all.iloc[no_path_ind].copy()
         od_all = od_all.drop(od_no_path.index)
@@ -997,6 +1250,7 @@ class TransportationPerformance(ABC):  # noqa: B024
                             alpha_f=alpha_f,
                             beta_f=beta_f,
                             two_way_edges=two_way_edges,
+                            router=router,
                         )
                         od_residual_list += od_residual_ss_list
                         # write_edge_vol(edges_df=edges_df,
@@ -1092,7 +1346,8 @@ class TransportationPerformance(ABC):  # noqa: B024
 
             This method processes the current state of the transportation network,
             reads necessary CSV files, and performs traffic assignment to evaluate
-            system performance.
+            system performance. When network_data holds the edges, closed links,
+            nodes and demand, they are used instead of the CSV files.
 
             Args:
                 state: The current state of the transportation network.
@@ -1108,14 +1363,32 @@ class TransportationPerformance(ABC):  # noqa: B024
         simulation_outputs = self.simulation_outputs
         scen_nm = 'simulation_out'
 
+        if self.network_data is None:
+            edges_df = pd.read_csv(network_edges)
+            edges_df['geometry'] = edges_df['geometry'].map(loads)
+            if closed_edges_file is not None:
+                closed_links = pd.read_csv(closed_edges_file)
+            else:
+                closed_links = pd.DataFrame([], columns=['uniqueid'])
+            nodes_df = pd.read_csv(network_nodes)
+            t_od_0 = time.time()
+            od_all = pd.read_csv(demand_file)
+            t_od_1 = time.time()
+            logging.info(
+                '%d sec to read %d OD pairs', t_od_1 - t_od_0, od_all.shape[0]
+            )
+        else:
+            edges_df = self.network_data['edges']
+            closed_links = self.network_data['closed_links']
+            nodes_df = self.network_data['nodes'].copy()
+            od_all = self.network_data['od']
+
         hour_list = self.hour_list
         if hour_list is None or len(hour_list) == 0:
-            od_all = pd.read_csv(demand_file)
             hour_list = sorted(od_all['hour'].unique())
         quarter_list = [0, 1, 2, 3, 4, 5]
         closure_hours = hour_list
 
-        edges_df = pd.read_csv(network_edges)
         # edges_df = edges_df[["uniqueid", "geometry", "osmid", "length", "type",
         #                      "lanes", "maxspeed", "fft", "capacity",
         #                      "start_nid", "end_nid"]]
@@ -1134,9 +1407,7 @@ class TransportationPerformance(ABC):  # noqa: B024
                 'end_nid',
             ]
         ]
-        edges_df = gpd.GeoDataFrame(
-            edges_df, crs='epsg:4326', geometry=edges_df['geometry'].map(loads)
-        )
+        edges_df = gpd.GeoDataFrame(edges_df, crs='epsg:4326', geometry='geometry')
         # pay attention to the unit conversion, length is in meters, maxspeed is mph
         # fft is in seconds
         edges_df['fft'] = edges_df['length'] / edges_df['maxspeed'] * METER_PER_SECOND_TO_MILES_PER_HOUR
@@ -1156,13 +1427,9 @@ class TransportationPerformance(ABC):  # noqa: B024
         edges_df['v'] = edges_df['end_nid']
         edges_df = edges_df.set_index('edge_str')
         # closure locations
-        if closed_edges_file is not None:
-            closed_links = pd.read_csv(closed_edges_file)
-            for row in closed_links.itertuples():
-                edges_df.loc[(edges_df['uniqueid'] == row.uniqueid), 'capacity'] = 1
-                edges_df.loc[(edges_df['uniqueid'] == row.uniqueid), 'fft'] = 36000
-        else:
-            closed_links = pd.DataFrame([], columns=['uniqueid'])
+        for row in closed_links.itertuples():
+            edges_df.loc[(edges_df['uniqueid'] == row.uniqueid), 'capacity'] = 1
+            edges_df.loc[(edges_df['uniqueid'] == row.uniqueid), 'fft'] = 36000
         # output closed file for visualization
         # edges_df.loc[edges_df['fft'] == 36000, ['uniqueid',
         #                                         'start_nid',
@@ -1175,17 +1442,10 @@ class TransportationPerformance(ABC):  # noqa: B024
         #                                             f'{scen_nm}.csv')
 
         # nodes processing
-        nodes_df = pd.read_csv(network_nodes)
-
         nodes_df['x'] = nodes_df['lon']
         nodes_df['y'] = nodes_df['lat']
         nodes_df = nodes_df.set_index('node_id')
 
-        # demand processing
-        t_od_0 = time.time()
-        od_all = pd.read_csv(demand_file)
-        t_od_1 = time.time()
-        logging.info('%d sec to read %d OD pairs', t_od_1 - t_od_0, od_all.shape[0])
         # run residual_demand_assignment
         self.assignment(
             edges_df=edges_df,